@@ -17,7 +17,10 @@ from invokeai.app.services.events.events_fastapievents import FastAPIEventServic
 from invokeai.app.services.image_files.image_files_disk import DiskImageFileStorage
 from invokeai.app.services.image_records.image_records_sqlite import SqliteImageRecordStorage
 from invokeai.app.services.images.images_default import ImageService
+from invokeai.app.services.invocation_cache.invocation_cache_base import InvocationCacheBase
+from invokeai.app.services.invocation_cache.invocation_cache_disk import DiskInvocationCacheStore
 from invokeai.app.services.invocation_cache.invocation_cache_memory import MemoryInvocationCache
+from invokeai.app.services.invocation_cache.invocation_cache_shared import SharedInvocationCache
 from invokeai.app.services.invocation_services import InvocationServices
 from invokeai.app.services.invocation_stats.invocation_stats_default import InvocationStatsService
 from invokeai.app.services.invoker import Invoker
@@ -94,7 +97,11 @@ class ApiDependencies:
         if output_folder is None:
             raise ValueError("Output folder is not set")
 
-        image_files = DiskImageFileStorage(f"{output_folder}/images")
+        image_files = DiskImageFileStorage(
+            f"{output_folder}/images",
+            max_cache_bytes=config.image_cache_ram_mb * 2**20,
+            encoder_threads=config.image_encoder_threads,
+        )
 
         model_images_folder = config.models_path
         style_presets_folder = config.style_presets_path
@@ -113,13 +120,17 @@ class ApiDependencies:
         bulk_download = BulkDownloadService()
         image_records = SqliteImageRecordStorage(db=db)
         images = ImageService()
-        invocation_cache = MemoryInvocationCache(max_cache_size=config.node_cache_size)
+        invocation_cache = ApiDependencies._create_invocation_cache(config, logger)
         tensors = ObjectSerializerForwardCache(
             ObjectSerializerDisk[torch.Tensor](
                 output_folder / "tensors",
                 safe_globals=[torch.Tensor],
                 ephemeral=True,
+                file_format=config.intermediates_file_format,
+                write_behind=config.intermediates_write_behind,
             ),
+            max_cache_size=0,
+            max_cache_bytes=config.object_cache_ram_mb * 2**20,
         )
         conditioning = ObjectSerializerForwardCache(
             ObjectSerializerDisk[ConditioningFieldData](
@@ -134,7 +145,11 @@ class ApiDependencies:
                     ZImageConditioningInfo,
                 ],
                 ephemeral=True,
+                file_format=config.intermediates_file_format,
+                write_behind=config.intermediates_write_behind,
             ),
+            max_cache_size=0,
+            max_cache_bytes=config.object_cache_ram_mb * 2**20,
         )
         download_queue_service = DownloadQueueService(app_config=configuration, event_bus=events)
         model_images_service = ModelImageFileStorageDisk(model_images_folder / "model_images")
@@ -148,7 +163,9 @@ class ApiDependencies:
         model_relationship_records = SqliteModelRelationshipRecordStorage(db=db)
         names = SimpleNameService()
         performance_statistics = InvocationStatsService()
-        session_processor = DefaultSessionProcessor(session_runner=DefaultSessionRunner())
+        session_processor = DefaultSessionProcessor(
+            session_runner=DefaultSessionRunner(), thread_limit=config.session_processor_workers
+        )
         session_queue = SqliteSessionQueue(db=db)
         urls = LocalUrlService()
         workflow_records = SqliteWorkflowRecordsStorage(db=db)
@@ -203,3 +220,28 @@ class ApiDependencies:
     def shutdown() -> None:
         if ApiDependencies.invoker:
             ApiDependencies.invoker.stop()
+
+    @staticmethod
+    def _create_invocation_cache(config: InvokeAIAppConfig, logger: Logger) -> InvocationCacheBase:
+        if config.node_cache_disk_size_mb == 0 or config.use_memory_db:
+            if config.node_cache_backend == "shared":
+                logger.warning(
+                    "The shared node cache requires node_cache_disk_size_mb and an on-disk database, using the memory node cache instead"
+                )
+            return MemoryInvocationCache(
+                max_cache_size=config.node_cache_size, max_size_bytes=config.node_cache_ram_mb * 2**20
+            )
+
+        disk_store = DiskInvocationCacheStore(
+            db_path=config.db_path.parent / "invocation_cache.db",
+            max_size_bytes=config.node_cache_disk_size_mb * 2**20,
+            logger=logger,
+            max_size=config.node_cache_size if config.node_cache_backend == "shared" else 0,
+        )
+        if config.node_cache_backend == "shared":
+            return SharedInvocationCache(disk_store)
+        return MemoryInvocationCache(
+            max_cache_size=config.node_cache_size,
+            disk_store=disk_store,
+            max_size_bytes=config.node_cache_ram_mb * 2**20,
+        )
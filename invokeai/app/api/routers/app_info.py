@@ -8,6 +8,7 @@ from pydantic import BaseModel, Field
 
 from invokeai.app.api.dependencies import ApiDependencies
 from invokeai.app.services.config.config_default import InvokeAIAppConfig, get_config
+from invokeai.app.services.events.events_common import EventQueueStats
 from invokeai.app.services.invocation_cache.invocation_cache_common import InvocationCacheStatus
 from invokeai.backend.image_util.infill_methods.patchmatch import PatchMatch
 from invokeai.backend.util.logging import logging
@@ -135,3 +136,14 @@ async def disable_invocation_cache() -> None:
 async def get_invocation_cache_status() -> InvocationCacheStatus:
     """Clears the invocation cache"""
     return ApiDependencies.invoker.services.invocation_cache.get_status()
+
+
+@app_router.get(
+    "/events/stats",
+    operation_id="get_event_queue_stats",
+    status_code=200,
+    response_model=EventQueueStats,
+)
+async def get_event_queue_stats() -> EventQueueStats:
+    """Gets the number of events waiting to be sent to clients, sent and coalesced, by event name"""
+    return ApiDependencies.invoker.services.events.get_stats()
@@ -232,13 +232,14 @@ async def reidentify_model(
 ) -> AnyModelConfig:
     """Attempt to reidentify a model by re-probing its weights file."""
     try:
-        config = ApiDependencies.invoker.services.model_manager.store.get_model(key)
+        store = ApiDependencies.invoker.services.model_manager.store
+        config = store.get_model(key)
         models_path = ApiDependencies.invoker.services.configuration.models_path
         if pathlib.Path(config.path).is_relative_to(models_path):
             model_path = pathlib.Path(config.path)
         else:
             model_path = models_path / config.path
-        mod = ModelOnDisk(model_path)
+        mod = ModelOnDisk(model_path, hash_cache=store)
         result = ModelConfigFactory.from_model_on_disk(mod)
         if result.config is None:
             raise InvalidModelException("Unable to identify model format")
@@ -252,7 +253,7 @@ async def reidentify_model(
         result.config.source = config.source
         result.config.source_type = config.source_type
 
-        new_config = ApiDependencies.invoker.services.model_manager.store.replace_model(config.key, result.config)
+        new_config = store.replace_model(config.key, result.config)
         return new_config
     except UnknownModelException as e:
         raise HTTPException(status_code=404, detail=str(e))
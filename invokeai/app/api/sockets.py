@@ -1,5 +1,6 @@
 # Copyright (c) 2022 Kyle Schouviller (https://github.com/kyle0654)
 
+import asyncio
 from typing import Any
 
 from fastapi import FastAPI
@@ -8,6 +9,7 @@ from socketio import ASGIApp, AsyncServer
 
 from invokeai.app.services.events.events_common import (
     BatchEnqueuedEvent,
+    BatchEnqueueProgressEvent,
     BulkDownloadCompleteEvent,
     BulkDownloadErrorEvent,
     BulkDownloadEventBase,
@@ -45,6 +47,9 @@ class QueueSubscriptionEvent(BaseModel):
     This is a pydantic model to ensure the data is in the correct format."""
 
     queue_id: str
+    binary_progress_images: bool = False
+    """Receive progress images as binary attachments instead of data URLs. The `image` of each `invocation_progress`
+    event is then `{"width", "height", "mime_type", "data"}`, where `data` holds the encoded image."""
 
 
 class BulkDownloadSubscriptionEvent(BaseModel):
@@ -61,6 +66,7 @@ QUEUE_EVENTS = {
     InvocationErrorEvent,
     QueueItemStatusChangedEvent,
     BatchEnqueuedEvent,
+    BatchEnqueueProgressEvent,
     QueueClearedEvent,
     RecallParametersUpdatedEvent,
 }
@@ -105,11 +111,22 @@ class SocketIO:
         register_events(MODEL_EVENTS, self._handle_model_event)
         register_events(BULK_DOWNLOAD_EVENTS, self._handle_bulk_image_download_event)
 
+    @staticmethod
+    def _get_binary_room(queue_id: str) -> str:
+        """Gets the room of a queue's subscribers that receive progress images as binary attachments."""
+        return f"{queue_id}:binary"
+
     async def _handle_sub_queue(self, sid: str, data: Any) -> None:
-        await self._sio.enter_room(sid, QueueSubscriptionEvent(**data).queue_id)
+        subscription = QueueSubscriptionEvent(**data)
+        if subscription.binary_progress_images:
+            await self._sio.enter_room(sid, self._get_binary_room(subscription.queue_id))
+        else:
+            await self._sio.enter_room(sid, subscription.queue_id)
 
     async def _handle_unsub_queue(self, sid: str, data: Any) -> None:
-        await self._sio.leave_room(sid, QueueSubscriptionEvent(**data).queue_id)
+        queue_id = QueueSubscriptionEvent(**data).queue_id
+        await self._sio.leave_room(sid, queue_id)
+        await self._sio.leave_room(sid, self._get_binary_room(queue_id))
 
     async def _handle_sub_bulk_download(self, sid: str, data: Any) -> None:
         await self._sio.enter_room(sid, BulkDownloadSubscriptionEvent(**data).bulk_download_id)
@@ -118,7 +135,40 @@ class SocketIO:
         await self._sio.leave_room(sid, BulkDownloadSubscriptionEvent(**data).bulk_download_id)
 
     async def _handle_queue_event(self, event: FastAPIEvent[QueueEventBase]):
-        await self._sio.emit(event=event[0], data=event[1].model_dump(mode="json"), room=event[1].queue_id)
+        queue_id = event[1].queue_id
+        binary_room = self._get_binary_room(queue_id)
+        if isinstance(event[1], InvocationProgressEvent) and event[1].image is not None:
+            await self._emit_progress_event(event[0], event[1], queue_id, binary_room)
+            return
+        # A single emit to both rooms, so that the packet is only encoded once
+        await self._sio.emit(event=event[0], data=event[1].model_dump(mode="json"), room=[queue_id, binary_room])
+
+    async def _emit_progress_event(
+        self, event_name: str, event: InvocationProgressEvent, room: str, binary_room: str
+    ) -> None:
+        """Emits a progress event with a data URL image to the queue room, and with a binary image to its binary room.
+
+        The event is dumped once for both rooms. socket.io sends bytes as binary attachments, leaving only the image's
+        metadata in the JSON.
+        """
+        assert event.image is not None
+        data = event.model_dump(mode="json", exclude={"image"})
+        emits = []
+        if self._has_participants(room):
+            data_url_image = {"width": event.image.width, "height": event.image.height, "dataURL": event.image.dataURL}
+            emits.append(self._sio.emit(event=event_name, data={**data, "image": data_url_image}, room=room))
+        if self._has_participants(binary_room):
+            binary_image = {
+                "width": event.image.width,
+                "height": event.image.height,
+                "mime_type": event.image.mime_type,
+                "data": event.image.image_bytes,
+            }
+            emits.append(self._sio.emit(event=event_name, data={**data, "image": binary_image}, room=binary_room))
+        await asyncio.gather(*emits)
+
+    def _has_participants(self, room: str) -> bool:
+        return next(iter(self._sio.manager.get_participants("/", room)), None) is not None
 
     async def _handle_model_event(self, event: FastAPIEvent[ModelEventBase | DownloadEventBase]) -> None:
         await self._sio.emit(event=event[0], data=event[1].model_dump(mode="json"))
@@ -1,5 +1,7 @@
 import functools
-from typing import Callable
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Optional
 
 import numpy as np
 import torch
@@ -56,6 +58,81 @@ class SpandrelImageToImageInvocation(BaseInvocation, WithMetadata, WithBoard):
             ),
         )
 
+    @classmethod
+    def get_tile_batch_size(
+        cls, spandrel_model: SpandrelImageToImageModel, tile_size: int, max_batch_size: int, working_memory_bytes: int
+    ) -> int:
+        """Get the number of tiles to run the model on at once, so that a batch's estimated working memory fits."""
+        if tile_size <= 0:
+            # No tiling, so there is a single tile.
+            return 1
+        tile_working_memory = spandrel_model.estimate_working_memory(tile_size, tile_size)
+        return max(1, min(max_batch_size, working_memory_bytes // tile_working_memory))
+
+    def _get_tile_batch_size(self, context: InvocationContext, spandrel_model: SpandrelImageToImageModel) -> int:
+        if TorchDevice.choose_torch_device().type == "cpu":
+            # The model already keeps the CPU busy, so batching tiles only adds overhead.
+            return 1
+        config = context.config.get()
+        return self.get_tile_batch_size(
+            spandrel_model,
+            self.tile_size,
+            config.spandrel_max_batch_size,
+            int(config.device_working_mem_gb * 2**30),
+        )
+
+    @classmethod
+    def batch_tiles(cls, tiles: list[tuple[Tile, Tile]], max_batch_size: int) -> list[list[tuple[Tile, Tile]]]:
+        """Group consecutive (tile, scaled tile) pairs of the same size into batches of at most `max_batch_size`."""
+        batches: list[list[tuple[Tile, Tile]]] = []
+        for tile, scaled_tile in tiles:
+            if (
+                batches
+                and len(batches[-1]) < max_batch_size
+                and cls._tile_size(batches[-1][0][0]) == cls._tile_size(tile)
+            ):
+                batches[-1].append((tile, scaled_tile))
+            else:
+                batches.append([(tile, scaled_tile)])
+        return batches
+
+    @staticmethod
+    def _tile_size(tile: Tile) -> tuple[int, int]:
+        return (tile.coords.bottom - tile.coords.top, tile.coords.right - tile.coords.left)
+
+    @staticmethod
+    def _copy_to_cpu(tensor: torch.Tensor) -> tuple[torch.Tensor, Optional[torch.cuda.Event]]:
+        """Start copying a tensor to the CPU. On CUDA, the copy is asynchronous and completes when the event does."""
+        if tensor.device.type != "cuda":
+            return tensor.to(device=torch.device("cpu")), None
+        cpu_tensor = torch.empty(tensor.shape, dtype=tensor.dtype, pin_memory=True)
+        cpu_tensor.copy_(tensor, non_blocking=True)
+        copied = torch.cuda.Event()
+        copied.record()
+        return cpu_tensor, copied
+
+    @staticmethod
+    def _merge_output_tiles(
+        output_tensor: torch.Tensor,
+        output_tiles: torch.Tensor,
+        copied: Optional[torch.cuda.Event],
+        scaled_tiles: list[Tile],
+    ) -> None:
+        """Merge a batch of output tiles, with shape (N, H, W, C), into the output tensor."""
+        if copied is not None:
+            copied.synchronize()
+        for output_tile, scaled_tile in zip(output_tiles, scaled_tiles, strict=True):
+            # We only keep half of the overlap on the top and left side of the tile. We do this in case there are
+            # edge artifacts. We don't bother with any 'blending' in the current implementation - for most upscalers
+            # it seems unnecessary, but we may find a need in the future.
+            top_overlap = scaled_tile.overlap.top // 2
+            left_overlap = scaled_tile.overlap.left // 2
+            output_tensor[
+                scaled_tile.coords.top + top_overlap : scaled_tile.coords.bottom,
+                scaled_tile.coords.left + left_overlap : scaled_tile.coords.right,
+                :,
+            ] = output_tile[top_overlap:, left_overlap:, :]
+
     @classmethod
     def upscale_image(
         cls,
@@ -64,6 +141,7 @@ class SpandrelImageToImageInvocation(BaseInvocation, WithMetadata, WithBoard):
         spandrel_model: SpandrelImageToImageModel,
         is_canceled: Callable[[], bool],
         step_callback: Callable[[int, int], None],
+        max_batch_size: int = 1,
     ) -> Image.Image:
         # Compute the image tiles.
         if tile_size > 0:
@@ -105,44 +183,53 @@ class SpandrelImageToImageInvocation(BaseInvocation, WithMetadata, WithBoard):
 
         image_tensor = image_tensor.to(device=TorchDevice.choose_torch_device(), dtype=spandrel_model.dtype)
 
-        # Run the model on each tile.
-        pbar = tqdm(list(zip(tiles, scaled_tiles, strict=True)), desc="Upscaling Tiles")
+        # Run the model on batches of tiles of the same size.
+        batches = cls.batch_tiles(list(zip(tiles, scaled_tiles, strict=True)), max_batch_size)
+        pbar = tqdm(total=len(tiles), desc="Upscaling Tiles")
 
         # Update progress, starting with 0.
         step_callback(0, pbar.total)
 
-        for tile, scaled_tile in pbar:
-            # Exit early if the invocation has been canceled.
-            if is_canceled():
-                raise CanceledException
+        # Output tiles are copied to the CPU and merged into the output tensor on a background thread, while the model
+        # runs on the next batch. At most two batches are in flight, which bounds the host memory used by output tiles.
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="spandrel_tile_merger") as merger:
+            merges: deque[Future[None]] = deque()
+            for batch in batches:
+                # Exit early if the invocation has been canceled.
+                if is_canceled():
+                    raise CanceledException
+
+                # Extract the batch's tiles from the input tensor.
+                input_tiles = torch.cat(
+                    [
+                        image_tensor[:, :, tile.coords.top : tile.coords.bottom, tile.coords.left : tile.coords.right]
+                        for tile, _ in batch
+                    ]
+                )
 
-            # Extract the current tile from the input tensor.
-            input_tile = image_tensor[:, :, tile.coords.top : tile.coords.bottom, tile.coords.left : tile.coords.right]
+                # Run the model on the tiles.
+                output_tiles = spandrel_model.run(input_tiles)
 
-            # Run the model on the tile.
-            output_tile = spandrel_model.run(input_tile)
+                # Convert the output tiles into the output tensor's format.
+                # (N, C, H, W) -> (N, H, W, C)
+                output_tiles = output_tiles.permute(0, 2, 3, 1)
+                output_tiles = output_tiles.clamp(0, 1)
+                output_tiles = (output_tiles * 255).to(dtype=torch.uint8)
+                output_tiles, copied = cls._copy_to_cpu(output_tiles)
 
-            # Convert the output tile into the output tensor's format.
-            # (N, C, H, W) -> (C, H, W)
-            output_tile = output_tile.squeeze(0)
-            # (C, H, W) -> (H, W, C)
-            output_tile = output_tile.permute(1, 2, 0)
-            output_tile = output_tile.clamp(0, 1)
-            output_tile = (output_tile * 255).to(dtype=torch.uint8, device=torch.device("cpu"))
+                if len(merges) == 2:
+                    merges.popleft().result()
+                merges.append(
+                    merger.submit(cls._merge_output_tiles, output_tensor, output_tiles, copied, [s for _, s in batch])
+                )
 
-            # Merge the output tile into the output tensor.
-            # We only keep half of the overlap on the top and left side of the tile. We do this in case there are
-            # edge artifacts. We don't bother with any 'blending' in the current implementation - for most upscalers
-            # it seems unnecessary, but we may find a need in the future.
-            top_overlap = scaled_tile.overlap.top // 2
-            left_overlap = scaled_tile.overlap.left // 2
-            output_tensor[
-                scaled_tile.coords.top + top_overlap : scaled_tile.coords.bottom,
-                scaled_tile.coords.left + left_overlap : scaled_tile.coords.right,
-                :,
-            ] = output_tile[top_overlap:, left_overlap:, :]
+                pbar.update(len(batch))
+                step_callback(pbar.n, pbar.total)
+
+            for merge in merges:
+                merge.result()
 
-            step_callback(pbar.n + 1, pbar.total)
+        pbar.close()
 
         # Convert the output tensor to a PIL image.
         np_image = output_tensor.detach().numpy().astype(np.uint8)
@@ -167,8 +254,9 @@ class SpandrelImageToImageInvocation(BaseInvocation, WithMetadata, WithBoard):
             assert isinstance(spandrel_model, SpandrelImageToImageModel)
 
             # Upscale the image
+            max_batch_size = self._get_tile_batch_size(context, spandrel_model)
             pil_image = self.upscale_image(
-                image, self.tile_size, spandrel_model, context.util.is_canceled, step_callback
+                image, self.tile_size, spandrel_model, context.util.is_canceled, step_callback, max_batch_size
             )
 
         image_dto = context.images.save(image=pil_image)
@@ -217,6 +305,8 @@ class SpandrelImageToImageAutoscaleInvocation(SpandrelImageToImageInvocation):
         with context.models.load(self.image_to_image_model) as spandrel_model:
             assert isinstance(spandrel_model, SpandrelImageToImageModel)
 
+            max_batch_size = self._get_tile_batch_size(context, spandrel_model)
+
             iteration = 1
             context.util.signal_progress(self._get_progress_message(iteration))
 
@@ -227,6 +317,7 @@ class SpandrelImageToImageAutoscaleInvocation(SpandrelImageToImageInvocation):
                 spandrel_model,
                 context.util.is_canceled,
                 functools.partial(step_callback, iteration),
+                max_batch_size,
             )
 
             # Some models don't upscale the image, but we have no way to know this in advance. We'll check if the model
@@ -245,6 +336,7 @@ class SpandrelImageToImageAutoscaleInvocation(SpandrelImageToImageInvocation):
                         spandrel_model,
                         context.util.is_canceled,
                         functools.partial(step_callback, iteration),
+                        max_batch_size,
                     )
 
                     # Sanity check to prevent excessive or infinite loops. All known upscaling models are at least 2x.
@@ -28,6 +28,7 @@ from invokeai.backend.stable_diffusion.diffusers_pipeline import ControlNetData,
 from invokeai.backend.stable_diffusion.multi_diffusion_pipeline import (
     MultiDiffusionPipeline,
     MultiDiffusionRegionConditioning,
+    estimate_region_working_memory,
 )
 from invokeai.backend.stable_diffusion.schedulers.schedulers import SCHEDULER_NAME_VALUES
 from invokeai.backend.tiles.tiles import (
@@ -272,6 +273,16 @@ class TiledMultiDiffusionDenoiseLatents(BaseInvocation):
                 seed=seed,
             )
 
+            # Batch tiles up to the configured batch size, as long as a batch fits in the device's working memory.
+            config = context.config.get()
+            max_batch_size = config.multi_diffusion_max_batch_size
+            if device.type != "cpu":
+                region_working_memory = estimate_region_working_memory(
+                    latent_tile_height, latent_tile_width, dtype=unet.dtype
+                )
+                max_working_memory = int(config.device_working_mem_gb * 2**30)
+                max_batch_size = max(1, min(max_batch_size, max_working_memory // region_working_memory))
+
             # Run Multi-Diffusion denoising.
             result_latents = pipeline.multi_diffusion_denoise(
                 multi_diffusion_conditioning=multi_diffusion_conditioning,
@@ -282,6 +293,7 @@ class TiledMultiDiffusionDenoiseLatents(BaseInvocation):
                 timesteps=timesteps,
                 init_timestep=init_timestep,
                 callback=step_callback,
+                max_batch_size=max_batch_size,
             )
 
         result_latents = result_latents.to("cpu")
@@ -14,11 +14,10 @@ from invokeai.app.invocations.fields import ImageField, Input, InputField, Outpu
 from invokeai.app.invocations.primitives import ImageOutput
 from invokeai.app.services.shared.invocation_context import InvocationContext
 from invokeai.backend.tiles.tiles import (
+    TileMerger,
     calc_tiles_even_split,
     calc_tiles_min_overlap,
     calc_tiles_with_overlap,
-    merge_tiles_with_linear_blending,
-    merge_tiles_with_seam_blending,
 )
 from invokeai.backend.tiles.utils import Tile
 
@@ -242,7 +241,6 @@ class MergeTilesToImageInvocation(BaseInvocation, WithMetadata, WithBoard):
     )
 
     def invoke(self, context: InvocationContext) -> ImageOutput:
-        images = [twi.image for twi in self.tiles_with_images]
         tiles = [twi.tile for twi in self.tiles_with_images]
 
         # Infer the output image dimensions from the max/min tile limits.
@@ -252,30 +250,31 @@ class MergeTilesToImageInvocation(BaseInvocation, WithMetadata, WithBoard):
             height = max(height, tile.coords.bottom)
             width = max(width, tile.coords.right)
 
-        # Get all tile images for processing.
+        # Sort tiles first by left x coordinate, then by top y coordinate. The tiles are merged left-to-right,
+        # top-to-bottom, one at a time, so that only one row of tiles is in memory at once.
+        tiles_with_images = sorted(self.tiles_with_images, key=lambda x: x.tile.coords.left)
+        tiles_with_images = sorted(tiles_with_images, key=lambda x: x.tile.coords.top)
+
         # TODO(ryand): It pains me that we spend time PNG decoding each tile from disk when they almost certainly
         # existed in memory at an earlier point in the graph.
-        tile_np_images: list[np.ndarray] = []
-        for image in images:
+        def get_tile_np_image(image: ImageField) -> np.ndarray:
             pil_image = context.images.get_pil(image.image_name)
             pil_image = pil_image.convert("RGB")
-            tile_np_images.append(np.array(pil_image))
+            return np.array(pil_image)
 
         # Prepare the output image buffer.
         # Check the first tile to determine how many image channels are expected in the output.
-        channels = tile_np_images[0].shape[-1]
-        dtype = tile_np_images[0].dtype
+        first_tile_np_image = get_tile_np_image(tiles_with_images[0].image)
+        channels = first_tile_np_image.shape[-1]
+        dtype = first_tile_np_image.dtype
         np_image = np.zeros(shape=(height, width, channels), dtype=dtype)
-        if self.blend_mode == "Linear":
-            merge_tiles_with_linear_blending(
-                dst_image=np_image, tiles=tiles, tile_images=tile_np_images, blend_amount=self.blend_amount
-            )
-        elif self.blend_mode == "Seam":
-            merge_tiles_with_seam_blending(
-                dst_image=np_image, tiles=tiles, tile_images=tile_np_images, blend_amount=self.blend_amount
-            )
-        else:
-            raise ValueError(f"Unsupported blend mode: '{self.blend_mode}'.")
+
+        merger = TileMerger(dst_image=np_image, blend_mode=self.blend_mode, blend_amount=self.blend_amount)
+        merger.add_tile(tiles_with_images[0].tile, first_tile_np_image)
+        del first_tile_np_image
+        for twi in tiles_with_images[1:]:
+            merger.add_tile(twi.tile, get_tile_np_image(twi.image))
+        merger.finish()
 
         # Convert into a PIL image and save
         pil_image = Image.fromarray(np_image)
@@ -29,6 +29,8 @@ ATTENTION_TYPE = Literal["auto", "normal", "xformers", "sliced", "torch-sdp"]
 ATTENTION_SLICE_SIZE = Literal["auto", "balanced", "max", 1, 2, 3, 4, 5, 6, 7, 8]
 LOG_FORMAT = Literal["plain", "color", "syslog", "legacy"]
 LOG_LEVEL = Literal["debug", "info", "warning", "error", "critical"]
+NODE_CACHE_BACKEND = Literal["memory", "shared"]
+INTERMEDIATES_FILE_FORMAT = Literal["torch", "safetensors"]
 CONFIG_SCHEMA_VERSION = "4.0.2"
 
 
@@ -89,6 +91,10 @@ class InvokeAIAppConfig(BaseSettings):
         device_working_mem_gb: The amount of working memory to keep available on the compute device (in GB). Has no effect if running on CPU. If you are experiencing OOM errors, try increasing this value.
         enable_partial_loading: Enable partial loading of models. This enables models to run with reduced VRAM requirements (at the cost of slower speed) by streaming the model from RAM to VRAM as its used. In some edge cases, partial loading can cause models to run more slowly if they were previously being fully loaded into VRAM.
         keep_ram_copy_of_weights: Whether to keep a full RAM copy of a model's weights when the model is loaded in VRAM. Keeping a RAM copy increases average RAM usage, but speeds up model switching and LoRA patching (assuming there is sufficient RAM). Set this to False if RAM pressure is consistently high.
+        intermediates_file_format: The file format for intermediate tensors and conditioning. Set to 'safetensors' to load intermediates memory-mapped, which is much faster than 'torch' (pickle) files. Objects that cannot be stored as safetensors are always stored with torch.<br>Valid values: `torch`, `safetensors`
+        intermediates_write_behind: Write intermediate tensors and conditioning to disk in a background thread, so nodes do not wait for the write. Unwritten objects are kept in memory until they are written, and objects that fail to be written are dropped.
+        image_cache_ram_mb: The memory budget of the in-memory cache of decoded images, in MB. Recently used images (e.g. control and reference images reused across queue items) are kept decoded up to this size, so they do not need to be decoded again. Set to 0 to disable the cache.
+        object_cache_ram_mb: The memory budget of each of the in-memory tensor and conditioning caches, in MB. Recently used intermediate tensors and conditioning are kept in memory up to this size, so they do not need to be reloaded from disk.
         ram: DEPRECATED: This setting is no longer used. It has been replaced by `max_cache_ram_gb`, but most users will not need to use this config since automatic cache size limits should work well in most cases. This config setting will be removed once the new model cache behavior is stable.
         vram: DEPRECATED: This setting is no longer used. It has been replaced by `max_cache_vram_gb`, but most users will not need to use this config since automatic cache size limits should work well in most cases. This config setting will be removed once the new model cache behavior is stable.
         lazy_offload: DEPRECATED: This setting is no longer used. Lazy-offloading is enabled by default. This config setting will be removed once the new model cache behavior is stable.
@@ -99,15 +105,27 @@ class InvokeAIAppConfig(BaseSettings):
         attention_type: Attention type.<br>Valid values: `auto`, `normal`, `xformers`, `sliced`, `torch-sdp`
         attention_slice_size: Slice size, valid when attention_type=="sliced".<br>Valid values: `auto`, `balanced`, `max`, `1`, `2`, `3`, `4`, `5`, `6`, `7`, `8`
         force_tiled_decode: Whether to enable tiled VAE decode (reduces memory consumption with some performance penalty).
+        multi_diffusion_max_batch_size: The maximum number of tiles that Tiled Multi-Diffusion denoises in a single UNet forward pass. Batching tiles of the same size is faster when the GPU has spare compute, but uses more VRAM. On GPUs, the batch size is further limited so that the estimated working memory of a batch fits in `device_working_mem_gb`.
+        spandrel_max_batch_size: The maximum number of tiles that Image-to-Image (spandrel) models run on in a single forward pass. Batching tiles is faster when the GPU has spare compute, but uses more VRAM, and rounding differences may change a few output pixel values by 1. The batch size is further limited so that the estimated working memory of a batch fits in `device_working_mem_gb`. Tiles are never batched on the CPU.
         pil_compress_level: The compress_level setting of PIL.Image.save(), used for PNG encoding. All settings are lossless. 0 = no compression, 1 = fastest with slightly larger filesize, 9 = slowest with smallest filesize. 1 is typically the best setting.
+        image_encoder_threads: The number of threads that encode and write images and thumbnails in the background, so the session processor does not wait for PNG compression. Set to 0 to encode images on the session processor thread.
+        image_durable_write: Wait for each image and its thumbnail to be written to disk before the image is reported as created. Only has an effect if `image_encoder_threads` is set.
         max_queue_size: Maximum number of items in the session queue.
         clear_queue_on_startup: Empties session queue on startup.
+        session_processor_workers: The number of queue items processed concurrently. With more than one worker, the next queue items are prepared and their nodes that do not use models run while the current queue item uses the device. Nodes that use models still run one at a time. Graph profiling is only supported with one worker.
+        queue_session_templates: Store the graph of each enqueued batch once, with only the field values of each of its queue items. Sessions are materialized when queue items are read. This greatly reduces the time and disk space needed to enqueue large batches.
+        progress_image_interval_ms: The minimum time between two denoising progress images of an invocation, in milliseconds. Steps in between report their progress without an image. The first and final steps always get an image. Set to 0 to render a progress image for every step.
+        progress_image_every_n_steps: Only render a denoising progress image for every Nth step. Set to 1 to consider every step.
         allow_nodes: List of nodes to allow. Omit to allow all.
         deny_nodes: List of nodes to deny. Omit to deny none.
         node_cache_size: How many cached nodes to keep in memory.
+        node_cache_ram_mb: The memory budget of the in-memory node cache, in MB. Least recently used cached nodes are evicted once their estimated size exceeds it. Set to 0 to only limit the cache by `node_cache_size`.
+        node_cache_disk_size_mb: Maximum size of the persistent on-disk node cache, in MB. Cached node outputs are written through to a database in the databases directory, so they survive restarts. Outputs that reference intermediate tensors or conditioning are discarded on restart. Set to 0 to disable the disk cache.
+        node_cache_backend: The node cache backend. 'memory' keeps cached nodes in memory, backed by the optional disk cache. 'shared' keeps cached nodes only in the disk cache database, so they are shared by all InvokeAI processes using the same databases directory; it requires `node_cache_disk_size_mb` to be set. With 'shared', `node_cache_size` limits the number of cached nodes in the database.<br>Valid values: `memory`, `shared`
         hashing_algorithm: Model hashing algorthim for model installs. 'blake3_multi' is best for SSDs. 'blake3_single' is best for spinning disk HDDs. 'random' disables hashing, instead assigning a UUID to models. Useful when using a memory db to reduce model installation time, or if you don't care about storing stable hashes for models. Alternatively, any other hashlib algorithm is accepted, though these are not nearly as performant as blake3.<br>Valid values: `blake3_multi`, `blake3_single`, `random`, `md5`, `sha1`, `sha224`, `sha256`, `sha384`, `sha512`, `blake2b`, `blake2s`, `sha3_224`, `sha3_256`, `sha3_384`, `sha3_512`, `shake_128`, `shake_256`
         remote_api_tokens: List of regular expression and token pairs used when downloading models from URLs. The download URL is tested against the regex, and if it matches, the token is provided in as a Bearer token.
         scan_models_on_startup: Scan the models directory on startup, registering orphaned models. This is typically only used in conjunction with `use_memory_db` for testing purposes.
+        model_scan_workers: Number of threads used to stat, hash and identify models when scanning the models directory or checking for missing models. Higher values help with slow or network storage.
         unsafe_disable_picklescan: UNSAFE. Disable the picklescan security check during model installation. Recommended only for development and testing purposes. This will allow arbitrary code execution during model installation, so should never be used in production.
         allow_unknown_models: Allow installation of models that we are unable to identify. If enabled, models will be marked as `unknown` in the database, and will not have any metadata associated with them. If disabled, unknown models will be rejected during installation.
     """
@@ -172,6 +190,10 @@ class InvokeAIAppConfig(BaseSettings):
     device_working_mem_gb:        float = Field(default=3,                  description="The amount of working memory to keep available on the compute device (in GB). Has no effect if running on CPU. If you are experiencing OOM errors, try increasing this value.")
     enable_partial_loading:        bool = Field(default=False,              description="Enable partial loading of models. This enables models to run with reduced VRAM requirements (at the cost of slower speed) by streaming the model from RAM to VRAM as its used. In some edge cases, partial loading can cause models to run more slowly if they were previously being fully loaded into VRAM.")
     keep_ram_copy_of_weights:      bool = Field(default=True,               description="Whether to keep a full RAM copy of a model's weights when the model is loaded in VRAM. Keeping a RAM copy increases average RAM usage, but speeds up model switching and LoRA patching (assuming there is sufficient RAM). Set this to False if RAM pressure is consistently high.")
+    intermediates_file_format: INTERMEDIATES_FILE_FORMAT = Field(default="torch",       description="The file format for intermediate tensors and conditioning. Set to 'safetensors' to load intermediates memory-mapped, which is much faster than 'torch' (pickle) files. Objects that cannot be stored as safetensors are always stored with torch.")
+    intermediates_write_behind:    bool = Field(default=False,              description="Write intermediate tensors and conditioning to disk in a background thread, so nodes do not wait for the write. Unwritten objects are kept in memory until they are written, and objects that fail to be written are dropped.")
+    image_cache_ram_mb:             int = Field(default=256, ge=0,          description="The memory budget of the in-memory cache of decoded images, in MB. Recently used images (e.g. control and reference images reused across queue items) are kept decoded up to this size, so they do not need to be decoded again. Set to 0 to disable the cache.")
+    object_cache_ram_mb:            int = Field(default=512, gt=0,          description="The memory budget of each of the in-memory tensor and conditioning caches, in MB. Recently used intermediate tensors and conditioning are kept in memory up to this size, so they do not need to be reloaded from disk.")
     # Deprecated CACHE configs
     ram:                Optional[float] = Field(default=None, gt=0,         description="DEPRECATED: This setting is no longer used. It has been replaced by `max_cache_ram_gb`, but most users will not need to use this config since automatic cache size limits should work well in most cases. This config setting will be removed once the new model cache behavior is stable.")
     vram:               Optional[float] = Field(default=None, ge=0,         description="DEPRECATED: This setting is no longer used. It has been replaced by `max_cache_vram_gb`, but most users will not need to use this config since automatic cache size limits should work well in most cases. This config setting will be removed once the new model cache behavior is stable.")
@@ -189,9 +211,17 @@ class InvokeAIAppConfig(BaseSettings):
     attention_type:      ATTENTION_TYPE = Field(default="auto",             description="Attention type.")
     attention_slice_size: ATTENTION_SLICE_SIZE = Field(default="auto",      description='Slice size, valid when attention_type=="sliced".')
     force_tiled_decode:            bool = Field(default=False,              description="Whether to enable tiled VAE decode (reduces memory consumption with some performance penalty).")
+    multi_diffusion_max_batch_size: int = Field(default=1, ge=1,            description="The maximum number of tiles that Tiled Multi-Diffusion denoises in a single UNet forward pass. Batching tiles of the same size is faster when the GPU has spare compute, but uses more VRAM. On GPUs, the batch size is further limited so that the estimated working memory of a batch fits in `device_working_mem_gb`.")
+    spandrel_max_batch_size:        int = Field(default=1, ge=1,            description="The maximum number of tiles that Image-to-Image (spandrel) models run on in a single forward pass. Batching tiles is faster when the GPU has spare compute, but uses more VRAM, and rounding differences may change a few output pixel values by 1. The batch size is further limited so that the estimated working memory of a batch fits in `device_working_mem_gb`. Tiles are never batched on the CPU.")
     pil_compress_level:             int = Field(default=1,                  description="The compress_level setting of PIL.Image.save(), used for PNG encoding. All settings are lossless. 0 = no compression, 1 = fastest with slightly larger filesize, 9 = slowest with smallest filesize. 1 is typically the best setting.")
+    image_encoder_threads:          int = Field(default=0, ge=0,            description="The number of threads that encode and write images and thumbnails in the background, so the session processor does not wait for PNG compression. Set to 0 to encode images on the session processor thread.")
+    image_durable_write:           bool = Field(default=False,              description="Wait for each image and its thumbnail to be written to disk before the image is reported as created. Only has an effect if `image_encoder_threads` is set.")
     max_queue_size:                 int = Field(default=10000, gt=0,        description="Maximum number of items in the session queue.")
     clear_queue_on_startup:        bool = Field(default=False,              description="Empties session queue on startup.")
+    session_processor_workers:      int = Field(default=1, ge=1,            description="The number of queue items processed concurrently. With more than one worker, the next queue items are prepared and their nodes that do not use models run while the current queue item uses the device. Nodes that use models still run one at a time. Graph profiling is only supported with one worker.")
+    queue_session_templates:       bool = Field(default=False,              description="Store the graph of each enqueued batch once, with only the field values of each of its queue items. Sessions are materialized when queue items are read. This greatly reduces the time and disk space needed to enqueue large batches.")
+    progress_image_interval_ms:     int = Field(default=100, ge=0,          description="The minimum time between two denoising progress images of an invocation, in milliseconds. Steps in between report their progress without an image. The first and final steps always get an image. Set to 0 to render a progress image for every step.")
+    progress_image_every_n_steps:   int = Field(default=1, ge=1,            description="Only render a denoising progress image for every Nth step. Set to 1 to consider every step.")
     video_default_fps:              int = Field(default=12, ge=4, le=60,    description="Default FPS for generated videos.")
     video_default_duration_sec:     int = Field(default=6, ge=1, le=30,     description="Default duration for generated videos in seconds.")
     video_require_consent_marker_for_real_identity: bool = Field(default=True, description="Require consent marker for real identity video profiles.")
@@ -200,11 +230,15 @@ class InvokeAIAppConfig(BaseSettings):
     allow_nodes:    Optional[list[str]] = Field(default=None,               description="List of nodes to allow. Omit to allow all.")
     deny_nodes:     Optional[list[str]] = Field(default=None,               description="List of nodes to deny. Omit to deny none.")
     node_cache_size:                int = Field(default=512,                description="How many cached nodes to keep in memory.")
+    node_cache_ram_mb:              int = Field(default=64, ge=0,           description="The memory budget of the in-memory node cache, in MB. Least recently used cached nodes are evicted once their estimated size exceeds it. Set to 0 to only limit the cache by `node_cache_size`.")
+    node_cache_disk_size_mb:        int = Field(default=0, ge=0,            description="Maximum size of the persistent on-disk node cache, in MB. Cached node outputs are written through to a database in the databases directory, so they survive restarts. Outputs that reference intermediate tensors or conditioning are discarded on restart. Set to 0 to disable the disk cache.")
+    node_cache_backend: NODE_CACHE_BACKEND = Field(default="memory",       description="The node cache backend. 'memory' keeps cached nodes in memory, backed by the optional disk cache. 'shared' keeps cached nodes only in the disk cache database, so they are shared by all InvokeAI processes using the same databases directory; it requires `node_cache_disk_size_mb` to be set. With 'shared', `node_cache_size` limits the number of cached nodes in the database.")
 
     # MODEL INSTALL
     hashing_algorithm: HASHING_ALGORITHMS = Field(default="blake3_single",  description="Model hashing algorthim for model installs. 'blake3_multi' is best for SSDs. 'blake3_single' is best for spinning disk HDDs. 'random' disables hashing, instead assigning a UUID to models. Useful when using a memory db to reduce model installation time, or if you don't care about storing stable hashes for models. Alternatively, any other hashlib algorithm is accepted, though these are not nearly as performant as blake3.")
     remote_api_tokens: Optional[list[URLRegexTokenPair]] = Field(default=None, description="List of regular expression and token pairs used when downloading models from URLs. The download URL is tested against the regex, and if it matches, the token is provided in as a Bearer token.")
     scan_models_on_startup:        bool = Field(default=False,              description="Scan the models directory on startup, registering orphaned models. This is typically only used in conjunction with `use_memory_db` for testing purposes.")
+    model_scan_workers:            int = Field(default=4, ge=1,             description="Number of threads used to stat, hash and identify models when scanning the models directory or checking for missing models. Higher values help with slow or network storage.")
     unsafe_disable_picklescan:     bool = Field(default=False,              description="UNSAFE. Disable the picklescan security check during model installation. Recommended only for development and testing purposes. This will allow arbitrary code execution during model installation, so should never be used in production.")
     allow_unknown_models:          bool = Field(default=True,              description="Allow installation of models that we are unable to identify. If enabled, models will be marked as `unknown` in the database, and will not have any metadata associated with them. If disabled, unknown models will be rejected during installation.")
 
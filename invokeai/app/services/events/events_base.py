@@ -3,8 +3,11 @@
 
 from typing import TYPE_CHECKING, Optional
 
+from PIL.Image import Image as PILImageType
+
 from invokeai.app.services.events.events_common import (
     BatchEnqueuedEvent,
+    BatchEnqueueProgressEvent,
     BulkDownloadCompleteEvent,
     BulkDownloadErrorEvent,
     BulkDownloadStartedEvent,
@@ -14,6 +17,7 @@ from invokeai.app.services.events.events_common import (
     DownloadProgressEvent,
     DownloadStartedEvent,
     EventBase,
+    EventQueueStats,
     InvocationCompleteEvent,
     InvocationErrorEvent,
     InvocationProgressEvent,
@@ -32,13 +36,14 @@ from invokeai.app.services.events.events_common import (
     QueueItemStatusChangedEvent,
     RecallParametersUpdatedEvent,
 )
+from invokeai.app.services.session_processor.session_processor_common import ProgressImage
 
 if TYPE_CHECKING:
     from invokeai.app.invocations.baseinvocation import BaseInvocation, BaseInvocationOutput
     from invokeai.app.services.download.download_base import DownloadJob
     from invokeai.app.services.model_install.model_install_common import ModelInstallJob
-    from invokeai.app.services.session_processor.session_processor_common import ProgressImage
     from invokeai.app.services.session_queue.session_queue_common import (
+        Batch,
         BatchStatus,
         EnqueueBatchResult,
         RetryItemsResult,
@@ -55,6 +60,10 @@ class EventServiceBase:
     def dispatch(self, event: "EventBase") -> None:
         pass
 
+    def get_stats(self) -> EventQueueStats:
+        """Gets statistics of the events waiting to be sent. Events are not queued by default."""
+        return EventQueueStats()
+
     # region: Invocation
 
     def emit_invocation_started(self, queue_item: "SessionQueueItem", invocation: "BaseInvocation") -> None:
@@ -67,9 +76,13 @@ class EventServiceBase:
         invocation: "BaseInvocation",
         message: str,
         percentage: float | None = None,
-        image: "ProgressImage | None" = None,
+        image: ProgressImage | PILImageType | None = None,
+        image_size: tuple[int, int] | None = None,
     ) -> None:
-        """Emitted at periodically during an invocation"""
+        """Emitted at periodically during an invocation. A PIL image is encoded as a progress image, which is displayed
+        at `image_size` if provided."""
+        if isinstance(image, PILImageType):
+            image = ProgressImage.build(image, image_size)
         self.dispatch(InvocationProgressEvent.build(queue_item, invocation, message, percentage, image))
 
     def emit_invocation_complete(
@@ -103,6 +116,10 @@ class EventServiceBase:
         """Emitted when a batch is enqueued"""
         self.dispatch(BatchEnqueuedEvent.build(enqueue_result))
 
+    def emit_batch_enqueue_progress(self, queue_id: str, batch: "Batch", enqueued: int, total: int) -> None:
+        """Emitted after each chunk of a large batch is enqueued"""
+        self.dispatch(BatchEnqueueProgressEvent.build(queue_id, batch, enqueued, total))
+
     def emit_queue_items_retried(self, retry_result: "RetryItemsResult") -> None:
         """Emitted when a list of queue items are retried"""
         self.dispatch(QueueItemsRetriedEvent.build(retry_result))
@@ -8,6 +8,7 @@ from invokeai.app.services.model_install.model_install_common import ModelInstal
 from invokeai.app.services.session_processor.session_processor_common import ProgressImage
 from invokeai.app.services.session_queue.session_queue_common import (
     QUEUE_ITEM_STATUS,
+    Batch,
     BatchStatus,
     EnqueueBatchResult,
     RetryItemsResult,
@@ -288,6 +289,22 @@ class BatchEnqueuedEvent(QueueEventBase):
         )
 
 
+@payload_schema.register
+class BatchEnqueueProgressEvent(QueueEventBase):
+    """Event model for batch_enqueue_progress"""
+
+    __event_name__ = "batch_enqueue_progress"
+
+    batch_id: str = Field(description="The ID of the batch")
+    enqueued: int = Field(description="The number of invocations enqueued so far")
+    total: int = Field(description="The number of invocations that will be enqueued")
+    origin: str | None = Field(default=None, description="The origin of the batch")
+
+    @classmethod
+    def build(cls, queue_id: str, batch: Batch, enqueued: int, total: int) -> "BatchEnqueueProgressEvent":
+        return cls(queue_id=queue_id, batch_id=batch.batch_id, origin=batch.origin, enqueued=enqueued, total=total)
+
+
 @payload_schema.register
 class QueueItemsRetriedEvent(QueueEventBase):
     """Event model for queue_items_retried"""
@@ -659,3 +676,18 @@ class RecallParametersUpdatedEvent(QueueEventBase):
     @classmethod
     def build(cls, queue_id: str, parameters: dict[str, Any]) -> "RecallParametersUpdatedEvent":
         return cls(queue_id=queue_id, parameters=parameters)
+
+
+class EventQueueStats(BaseModel):
+    """Statistics of the queue of events waiting to be sent to clients, by event name"""
+
+    pending: dict[str, int] = Field(default_factory=dict, description="The number of events waiting to be sent")
+    max_pending: dict[str, int] = Field(
+        default_factory=dict, description="The largest number of events that were waiting to be sent at once"
+    )
+    dispatched: dict[str, int] = Field(default_factory=dict, description="The number of events sent")
+    coalesced: dict[str, int] = Field(
+        default_factory=dict,
+        description="The number of events dropped without being sent, because a newer event of the same kind (e.g. "
+        "progress of the same queue item) superseded them",
+    )
@@ -1,18 +1,74 @@
 import asyncio
+import itertools
 import threading
+from collections import Counter
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Hashable, Optional
 
 from fastapi_events.dispatcher import dispatch
+from PIL.Image import Image as PILImageType
 
 from invokeai.app.services.events.events_base import EventServiceBase
-from invokeai.app.services.events.events_common import EventBase
+from invokeai.app.services.events.events_common import (
+    DownloadProgressEvent,
+    EventBase,
+    EventQueueStats,
+    InvocationProgressEvent,
+    ModelInstallDownloadProgressEvent,
+)
+from invokeai.app.services.session_processor.session_processor_common import ProgressImage
+from invokeai.backend.util.logging import InvokeAILogger
+
+if TYPE_CHECKING:
+    from invokeai.app.invocations.baseinvocation import BaseInvocation
+    from invokeai.app.services.session_queue.session_queue_common import SessionQueueItem
+
+
+def get_coalescing_key(event: EventBase) -> Optional[Hashable]:
+    """Gets the key of events that supersede each other, or None if the event must always be sent.
+
+    Only the newest progress event of a queue item, download or model install is worth sending: clients only display
+    the latest progress.
+    """
+    if isinstance(event, InvocationProgressEvent):
+        return (event.__event_name__, event.queue_id, event.item_id)
+    if isinstance(event, DownloadProgressEvent):
+        return (event.__event_name__, event.source)
+    if isinstance(event, ModelInstallDownloadProgressEvent):
+        return (event.__event_name__, event.id)
+    return None
+
+
+@dataclass
+class _QueuedEvent:
+    event: EventBase
+    sequence: int
+    coalescing_key: Optional[Hashable]
+    progress_image: Optional[Future[Optional[ProgressImage]]] = None
 
 
 class FastAPIEventService(EventServiceBase):
     def __init__(self, event_handler_id: int, loop: asyncio.AbstractEventLoop) -> None:
         self.event_handler_id = event_handler_id
-        self._queue = asyncio.Queue[EventBase | None]()
+        self._queue = asyncio.Queue[_QueuedEvent | None]()
         self._stop_event = threading.Event()
         self._loop = loop
+        self._logger = InvokeAILogger.get_logger(self.__class__.__name__)
+
+        # Events are queued from any thread, and sent from the event loop
+        self._lock = threading.Lock()
+        self._sequence = itertools.count()
+        # The sequence number of the newest queued event for each coalescing key
+        self._newest: dict[Hashable, int] = {}
+        self._pending: Counter[str] = Counter()
+        self._max_pending: Counter[str] = Counter()
+        self._dispatched: Counter[str] = Counter()
+        self._coalesced: Counter[str] = Counter()
+
+        # Progress images are JPEG-encoded here rather than on the session processor's thread. A single thread encodes
+        # them in the order they were emitted.
+        self._image_encoder = ThreadPoolExecutor(max_workers=1, thread_name_prefix="progress_image_encoder")
 
         # We need to store a reference to the task so it doesn't get GC'd
         # See: https://docs.python.org/3/library/asyncio-task.html#creating-tasks
@@ -25,20 +81,111 @@ class FastAPIEventService(EventServiceBase):
 
     def stop(self, *args, **kwargs):
         self._stop_event.set()
+        self._image_encoder.shutdown(wait=False, cancel_futures=True)
         self._loop.call_soon_threadsafe(self._queue.put_nowait, None)
 
     def dispatch(self, event: EventBase) -> None:
-        self._loop.call_soon_threadsafe(self._queue.put_nowait, event)
+        self._enqueue(event)
+
+    def emit_invocation_progress(
+        self,
+        queue_item: "SessionQueueItem",
+        invocation: "BaseInvocation",
+        message: str,
+        percentage: float | None = None,
+        image: ProgressImage | PILImageType | None = None,
+        image_size: tuple[int, int] | None = None,
+    ) -> None:
+        if not isinstance(image, PILImageType):
+            super().emit_invocation_progress(queue_item, invocation, message, percentage, image)
+            return
+        # The image is added to the event once it is encoded, just before the event is sent
+        self._enqueue(InvocationProgressEvent.build(queue_item, invocation, message, percentage), image, image_size)
+
+    def get_stats(self) -> EventQueueStats:
+        with self._lock:
+            return EventQueueStats(
+                pending=dict(self._pending),
+                max_pending=dict(self._max_pending),
+                dispatched=dict(self._dispatched),
+                coalesced=dict(self._coalesced),
+            )
+
+    def _enqueue(
+        self, event: EventBase, image: Optional[PILImageType] = None, image_size: tuple[int, int] | None = None
+    ) -> None:
+        """Queues an event to be sent from the event loop, encoding its progress image in the background if given."""
+        name = event.__event_name__
+        coalescing_key = get_coalescing_key(event)
+        with self._lock:
+            sequence = next(self._sequence)
+            if coalescing_key is not None:
+                self._newest[coalescing_key] = sequence
+            self._pending[name] += 1
+            self._max_pending[name] = max(self._max_pending[name], self._pending[name])
+        queued = _QueuedEvent(event=event, sequence=sequence, coalescing_key=coalescing_key)
+        if image is not None and not self._stop_event.is_set():
+            queued.progress_image = self._image_encoder.submit(self._encode_progress_image, queued, image, image_size)
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, queued)
+
+    def _encode_progress_image(
+        self, queued: _QueuedEvent, image: PILImageType, image_size: tuple[int, int] | None
+    ) -> Optional[ProgressImage]:
+        """Encodes the progress image of a queued event, unless a newer event has superseded it already."""
+        if self._is_superseded(queued):
+            return None
+        return ProgressImage.build(image, image_size)
+
+    def _is_superseded(self, queued: _QueuedEvent) -> bool:
+        if queued.coalescing_key is None:
+            return False
+        with self._lock:
+            return self._newest.get(queued.coalescing_key) != queued.sequence
+
+    def _done(self, queued: _QueuedEvent, coalesced: bool) -> None:
+        """Records that a queued event was sent or dropped."""
+        name = queued.event.__event_name__
+        with self._lock:
+            self._pending[name] -= 1
+            if coalesced:
+                self._coalesced[name] += 1
+            else:
+                self._dispatched[name] += 1
+            if queued.coalescing_key is not None and self._newest.get(queued.coalescing_key) == queued.sequence:
+                del self._newest[queued.coalescing_key]
+
+    async def _get_progress_image(self, queued: _QueuedEvent) -> Optional[ProgressImage]:
+        assert queued.progress_image is not None
+        try:
+            return await asyncio.wrap_future(queued.progress_image)
+        except asyncio.CancelledError:
+            if queued.progress_image.cancelled():  # Cancelled when the service is stopped
+                return None
+            raise
+        except Exception as e:
+            self._logger.warning(f"Failed to encode progress image: {e}")
+            return None
 
     async def _dispatch_from_queue(self, stop_event: threading.Event):
         """Get events on from the queue and dispatch them, from the correct thread"""
         while not stop_event.is_set():
             try:
-                event = await self._queue.get()
-                if not event:  # Probably stopping
+                queued = await self._queue.get()
+                if not queued:  # Probably stopping
+                    continue
+                # Events are sent in order, so an event waits for its progress image to be encoded before it is sent
+                if queued.progress_image is not None and not self._is_superseded(queued):
+                    progress_image = await self._get_progress_image(queued)
+                    assert isinstance(queued.event, InvocationProgressEvent)
+                    queued.event.image = progress_image
+                if self._is_superseded(queued):
+                    if queued.progress_image is not None:
+                        queued.progress_image.cancel()
+                    self._done(queued, coalesced=True)
                     continue
                 # Leave the payloads as live pydantic models
-                dispatch(event, middleware_id=self.event_handler_id, payload_schema_dump=False)
+                dispatch(queued.event, middleware_id=self.event_handler_id, payload_schema_dump=False)
+                self._done(queued, coalesced=False)
 
             except asyncio.CancelledError as e:
                 raise e  # Raise a proper error
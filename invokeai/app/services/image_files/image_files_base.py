@@ -38,6 +38,14 @@ class ImageFileStorageBase(ABC):
         """Saves an image and a 256x256 WEBP thumbnail. Returns a tuple of the image name, thumbnail name, and created timestamp."""
         pass
 
+    @abstractmethod
+    def wait_for_write(self, image_name: str) -> None:
+        """Blocks until an image and its thumbnail have been written to disk.
+
+        :raises ImageFileSaveException: if the image could not be written
+        """
+        pass
+
     @abstractmethod
     def delete(self, image_name: str) -> None:
         """Deletes an image and its thumbnail (if one exists)."""
@@ -1,3 +1,6 @@
+from dataclasses import dataclass
+
+
 # TODO: Should these excpetions subclass existing python exceptions?
 class ImageFileNotFoundException(Exception):
     """Raised when an image file is not found in storage."""
@@ -18,3 +21,16 @@ class ImageFileDeleteException(Exception):
 
     def __init__(self, message="Image file not deleted"):
         super().__init__(message)
+
+
+@dataclass
+class ImageFileCacheStats:
+    """Statistics for the in-memory cache of decoded images."""
+
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    evicted_bytes: int = 0
+    size: int = 0  # number of images in the cache
+    size_bytes: int = 0  # pixel bytes of the images in the cache
+    max_size_bytes: int = 0  # memory budget of the cache
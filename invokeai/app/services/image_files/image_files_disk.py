@@ -1,13 +1,18 @@
 # Copyright (c) 2022 Kyle Schouviller (https://github.com/kyle0654) and the InvokeAI Team
+import dataclasses
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
 from pathlib import Path
-from queue import Queue
+from threading import Lock
 from typing import Optional, Union
 
-from PIL import Image, PngImagePlugin
+from PIL import Image, ImageMode, PngImagePlugin
 from PIL.Image import Image as PILImageType
 
 from invokeai.app.services.image_files.image_files_base import ImageFileStorageBase
 from invokeai.app.services.image_files.image_files_common import (
+    ImageFileCacheStats,
     ImageFileDeleteException,
     ImageFileNotFoundException,
     ImageFileSaveException,
@@ -16,13 +21,43 @@ from invokeai.app.services.invoker import Invoker
 from invokeai.app.util.thumbnails import get_thumbnail_name, make_thumbnail
 
 
-class DiskImageFileStorage(ImageFileStorageBase):
-    """Stores images on disk"""
+def calc_image_size(image: PILImageType) -> int:
+    """Calculates the approximate size of an image's decoded pixel data in bytes."""
+    mode = ImageMode.getmode(image.mode)
+    return image.width * image.height * len(mode.bands) * int(mode.typestr[-1])
+
 
-    def __init__(self, output_folder: Union[str, Path]):
-        self.__cache: dict[Path, PILImageType] = {}
-        self.__cache_ids = Queue[Path]()
-        self.__max_cache_size = 10  # TODO: get this from config
+class DiskImageFileStorage(ImageFileStorageBase):
+    """Stores images on disk.
+
+    Recently used images and thumbnails are kept decoded in a thread-safe LRU cache, bounded by the size of their
+    pixel data. Images larger than the whole budget are not cached.
+
+    With encoder threads, `save` hands the image to a pool that encodes the PNG and the thumbnail in parallel, and
+    returns immediately. The pool writes a copy of the image, so the image may be modified afterwards. In-flight
+    images are served from memory by `get`, while `get_path` and `delete` wait for the image's files to be written.
+
+    :param output_folder: The folder where the images will be stored
+    :param max_cache_bytes: The memory budget of the decoded image cache in bytes, or 0 to disable the cache
+    :param encoder_threads: The number of threads encoding images in the background, or 0 to encode them in `save`
+    """
+
+    def __init__(self, output_folder: Union[str, Path], max_cache_bytes: int = 256 * 2**20, encoder_threads: int = 0):
+        self.__cache: OrderedDict[Path, tuple[PILImageType, int]] = OrderedDict()
+        self.__cache_bytes = 0
+        self.__max_cache_bytes = max_cache_bytes
+        self.__cache_stats = ImageFileCacheStats(max_size_bytes=max_cache_bytes)
+        self.__cache_lock = Lock()
+
+        self.__encoder_pool = (
+            ThreadPoolExecutor(max_workers=encoder_threads, thread_name_prefix="image-encoder")
+            if encoder_threads > 0
+            else None
+        )
+        # Writes in progress and the images being written, by file path
+        self.__pending_writes: dict[Path, Future[None]] = {}
+        self.__pending_images: dict[Path, PILImageType] = {}
+        self.__pending_lock = Lock()
 
         self.__output_folder = output_folder if isinstance(output_folder, Path) else Path(output_folder)
         self.__thumbnails_folder = self.__output_folder / "thumbnails"
@@ -32,15 +67,32 @@ class DiskImageFileStorage(ImageFileStorageBase):
     def start(self, invoker: Invoker) -> None:
         self.__invoker = invoker
 
+    def stop(self, invoker: Invoker) -> None:
+        if self.__encoder_pool is not None:
+            # Finish writing all in-flight images
+            self.__encoder_pool.shutdown(wait=True)
+        stats = self.get_cache_stats()
+        invoker.services.logger.debug(
+            f"Image cache stats: {stats.hits} hits, {stats.misses} misses, {stats.evictions} evictions "
+            f"({stats.evicted_bytes / 2**20:.2f}MB evicted)"
+        )
+
     def get(self, image_name: str) -> PILImageType:
         try:
-            image_path = self.get_path(image_name)
+            image_path = self.__resolve_path(image_name)
 
             cache_item = self.__get_cache(image_path)
             if cache_item:
                 return cache_item
 
+            with self.__pending_lock:
+                pending_image = self.__pending_images.get(image_path)
+            if pending_image is not None:
+                return pending_image
+
             image = Image.open(image_path)
+            # Decode the image now, so cache hits do not decode it again
+            image.load()
             self.__set_cache(image_path, image)
             return image
         except FileNotFoundError as e:
@@ -57,7 +109,7 @@ class DiskImageFileStorage(ImageFileStorageBase):
     ) -> None:
         try:
             self.__validate_storage_folders()
-            image_path = self.get_path(image_name)
+            image_path = self.__resolve_path(image_name)
 
             pnginfo = PngImagePlugin.PngInfo()
             info_dict = {}
@@ -74,43 +126,66 @@ class DiskImageFileStorage(ImageFileStorageBase):
 
             # When saving the image, the image object's info field is not populated. We need to set it
             image.info = info_dict
-            image.save(
-                image_path,
-                "PNG",
-                pnginfo=pnginfo,
-                compress_level=self.__invoker.services.configuration.pil_compress_level,
-            )
+            compress_level = self.__invoker.services.configuration.pil_compress_level
+            thumbnail_path = self.__resolve_path(image_name, thumbnail=True)
 
-            thumbnail_name = get_thumbnail_name(image_name)
-            thumbnail_path = self.get_path(thumbnail_name, thumbnail=True)
-            thumbnail_image = make_thumbnail(image, thumbnail_size)
-            thumbnail_image.save(thumbnail_path)
+            if self.__encoder_pool is None:
+                self.__write_image(image, image_path, pnginfo, compress_level)
+                self.__write_thumbnail(image, thumbnail_path, thumbnail_size)
+                return
 
+            # The encoders write a decoded copy of the image, so the caller may modify the image after `save` returns
+            image = image.copy()
             self.__set_cache(image_path, image)
-            self.__set_cache(thumbnail_path, thumbnail_image)
+            with self.__pending_lock:
+                self.__pending_images[image_path] = image
+                writes = {
+                    image_path: self.__encoder_pool.submit(
+                        self.__write_image, image, image_path, pnginfo, compress_level
+                    ),
+                    thumbnail_path: self.__encoder_pool.submit(
+                        self.__write_thumbnail, image, thumbnail_path, thumbnail_size
+                    ),
+                }
+                self.__pending_writes.update(writes)
+            for path, future in writes.items():
+                future.add_done_callback(partial(self.__on_write_done, path))
         except Exception as e:
             raise ImageFileSaveException from e
 
+    def wait_for_write(self, image_name: str) -> None:
+        for path in (self.__resolve_path(image_name), self.__resolve_path(image_name, thumbnail=True)):
+            self.__wait_for_path(path)
+
     def delete(self, image_name: str) -> None:
         try:
-            image_path = self.get_path(image_name)
+            image_path = self.__resolve_path(image_name)
+            try:
+                self.wait_for_write(image_name)
+            except ImageFileSaveException:
+                # Delete whatever was written
+                pass
 
             if image_path.exists():
                 image_path.unlink()
-            if image_path in self.__cache:
-                del self.__cache[image_path]
+            self.__delete_cache(image_path)
 
             thumbnail_name = get_thumbnail_name(image_name)
-            thumbnail_path = self.get_path(thumbnail_name, True)
+            thumbnail_path = self.__resolve_path(thumbnail_name, True)
 
             if thumbnail_path.exists():
                 thumbnail_path.unlink()
-            if thumbnail_path in self.__cache:
-                del self.__cache[thumbnail_path]
+            self.__delete_cache(thumbnail_path)
         except Exception as e:
             raise ImageFileDeleteException from e
 
     def get_path(self, image_name: str, thumbnail: bool = False) -> Path:
+        path = self.__resolve_path(image_name, thumbnail)
+        # Callers expect the file to exist
+        self.__wait_for_path(path)
+        return path
+
+    def __resolve_path(self, image_name: str, thumbnail: bool = False) -> Path:
         base_folder = self.__thumbnails_folder if thumbnail else self.__output_folder
         filename = get_thumbnail_name(image_name) if thumbnail else image_name
 
@@ -156,14 +231,69 @@ class DiskImageFileStorage(ImageFileStorageBase):
         for folder in folders:
             folder.mkdir(parents=True, exist_ok=True)
 
+    def __write_image(
+        self, image: PILImageType, image_path: Path, pnginfo: PngImagePlugin.PngInfo, compress_level: int
+    ) -> None:
+        image.save(image_path, "PNG", pnginfo=pnginfo, compress_level=compress_level)
+        self.__set_cache(image_path, image)
+
+    def __write_thumbnail(self, image: PILImageType, thumbnail_path: Path, thumbnail_size: int) -> None:
+        thumbnail_image = make_thumbnail(image, thumbnail_size)
+        thumbnail_image.save(thumbnail_path)
+        self.__set_cache(thumbnail_path, thumbnail_image)
+
+    def __on_write_done(self, path: Path, future: "Future[None]") -> None:
+        with self.__pending_lock:
+            if self.__pending_writes.get(path) is future:
+                del self.__pending_writes[path]
+            self.__pending_images.pop(path, None)
+        if (e := future.exception()) is not None:
+            self.__invoker.services.logger.error(f"Failed to write image file {path.name}: {e}")
+
+    def __wait_for_path(self, path: Path) -> None:
+        """Waits for a pending write of the given file to finish."""
+        with self.__pending_lock:
+            future = self.__pending_writes.get(path)
+        if future is None:
+            return
+        try:
+            future.result()
+        except Exception as e:
+            raise ImageFileSaveException from e
+
+    def get_cache_stats(self) -> ImageFileCacheStats:
+        """Gets a snapshot of the decoded image cache's statistics."""
+        with self.__cache_lock:
+            return dataclasses.replace(self.__cache_stats, size=len(self.__cache), size_bytes=self.__cache_bytes)
+
     def __get_cache(self, image_name: Path) -> Optional[PILImageType]:
-        return None if image_name not in self.__cache else self.__cache[image_name]
+        with self.__cache_lock:
+            cache_item = self.__cache.get(image_name)
+            if cache_item is None:
+                self.__cache_stats.misses += 1
+                return None
+            self.__cache.move_to_end(image_name)
+            self.__cache_stats.hits += 1
+            return cache_item[0]
 
     def __set_cache(self, image_name: Path, image: PILImageType):
-        if image_name not in self.__cache:
-            self.__cache[image_name] = image
-            self.__cache_ids.put(image_name)  # TODO: this should refresh position for LRU cache
-            if len(self.__cache) > self.__max_cache_size:
-                cache_id = self.__cache_ids.get()
-                if cache_id in self.__cache:
-                    del self.__cache[cache_id]
+        size_bytes = calc_image_size(image)
+        if size_bytes > self.__max_cache_bytes:
+            return
+        with self.__cache_lock:
+            previous_item = self.__cache.pop(image_name, None)
+            if previous_item is not None:
+                self.__cache_bytes -= previous_item[1]
+            self.__cache[image_name] = (image, size_bytes)
+            self.__cache_bytes += size_bytes
+            while self.__cache_bytes > self.__max_cache_bytes:
+                _, (_, evicted_size_bytes) = self.__cache.popitem(last=False)
+                self.__cache_bytes -= evicted_size_bytes
+                self.__cache_stats.evictions += 1
+                self.__cache_stats.evicted_bytes += evicted_size_bytes
+
+    def __delete_cache(self, image_name: Path) -> None:
+        with self.__cache_lock:
+            cache_item = self.__cache.pop(image_name, None)
+            if cache_item is not None:
+                self.__cache_bytes -= cache_item[1]
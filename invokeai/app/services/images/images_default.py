@@ -83,6 +83,9 @@ class ImageService(ImageServiceABC):
             self.__invoker.services.image_files.save(
                 image_name=image_name, image=image, metadata=metadata, workflow=workflow, graph=graph
             )
+            if self.__invoker.services.configuration.image_durable_write:
+                # Do not report the image as created until its files are on disk
+                self.__invoker.services.image_files.wait_for_write(image_name)
             image_dto = self.get_dto(image_name)
 
             self._on_changed(image_dto)
@@ -274,8 +277,7 @@ class ImageService(ImageServiceABC):
             for image_name in image_names:
                 self.__invoker.services.image_files.delete(image_name)
             self.__invoker.services.image_records.delete_many(image_names)
-            for image_name in image_names:
-                self._on_deleted(image_name)
+            self._on_deleted_many(image_names)
         except ImageRecordDeleteException:
             self.__invoker.services.logger.error("Failed to delete image records")
             raise
@@ -292,7 +294,7 @@ class ImageService(ImageServiceABC):
             count = len(image_names)
             for image_name in image_names:
                 self.__invoker.services.image_files.delete(image_name)
-                self._on_deleted(image_name)
+            self._on_deleted_many(image_names)
             return count
         except ImageRecordDeleteException:
             self.__invoker.services.logger.error("Failed to delete image records")
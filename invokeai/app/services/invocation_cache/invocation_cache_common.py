@@ -1,4 +1,36 @@
+import sys
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Iterator, Optional
+
+from blake3 import blake3
 from pydantic import BaseModel, Field
+from pydantic_core import to_json
+
+if TYPE_CHECKING:
+    from invokeai.app.invocations.baseinvocation import BaseInvocation, BaseInvocationOutput
+
+CACHE_KEY_VERSION = 2
+"""Bump this to invalidate all persisted cache keys when the key encoding changes."""
+
+CACHE_KEY_EXCLUDED_FIELDS = frozenset({"id"})
+"""Invocation fields that do not affect the invocation's output."""
+
+EPHEMERAL_REFERENCE_FIELDS = frozenset({"latents_name", "tensor_name", "mask_name", "conditioning_name"})
+"""Output fields that reference objects held by the ephemeral tensors and conditioning services. These objects do not
+outlive the process that created them."""
+
+REFERENCE_FIELDS = EPHEMERAL_REFERENCE_FIELDS | {"image_name"}
+"""Output fields that reference objects stored by other services (images, tensors and conditioning)."""
+
+
+class InvocationCacheTierStatus(BaseModel):
+    size: int = Field(description="The number of items in this cache tier")
+    size_bytes: int = Field(description="The approximate size of the items in this cache tier, in bytes")
+    max_size: int = Field(description="The maximum number of items in this cache tier, or 0 if not limited by count")
+    max_size_bytes: int = Field(description="The maximum size of this cache tier in bytes, or 0 if not limited by size")
+    hits: int = Field(description="The number of cache hits served by this tier")
+    misses: int = Field(description="The number of lookups this tier could not serve")
+    evictions: int = Field(description="The number of items evicted from this tier to make room for new items")
 
 
 class InvocationCacheStatus(BaseModel):
@@ -7,3 +39,90 @@ class InvocationCacheStatus(BaseModel):
     misses: int = Field(description="The number of cache misses")
     enabled: bool = Field(description="Whether the invocation cache is enabled")
     max_size: int = Field(description="The maximum size of the invocation cache")
+    memory_tier: Optional[InvocationCacheTierStatus] = Field(
+        default=None, description="The status of the in-memory cache tier"
+    )
+    disk_tier: Optional[InvocationCacheTierStatus] = Field(
+        default=None, description="The status of the persistent on-disk cache tier, if enabled"
+    )
+
+
+def iter_referenced_object_names(output_dict: Any) -> Iterator[tuple[str, str]]:
+    """Yields `(field_name, object_name)` for every image, tensor or conditioning reference in a dumped output."""
+    if isinstance(output_dict, dict):
+        for field_name, value in output_dict.items():
+            if field_name in REFERENCE_FIELDS and isinstance(value, str):
+                yield field_name, value
+            else:
+                yield from iter_referenced_object_names(value)
+    elif isinstance(output_dict, list):
+        for item in output_dict:
+            yield from iter_referenced_object_names(item)
+
+
+def get_output_references(invocation_output: "BaseInvocationOutput") -> tuple[frozenset[str], bool]:
+    """Gets the names of the objects referenced by an output, and whether any of them are ephemeral."""
+    references: set[str] = set()
+    ephemeral = False
+    for field_name, object_name in iter_referenced_object_names(invocation_output.model_dump()):
+        references.add(object_name)
+        ephemeral = ephemeral or field_name in EPHEMERAL_REFERENCE_FIELDS
+    return frozenset(references), ephemeral
+
+
+def estimate_size_bytes(value: Any) -> int:
+    """Estimates the memory used by an invocation output, or any value held by one, in bytes.
+
+    This follows pydantic models, dicts, lists, tuples and sets. It does not account for objects shared with other
+    values, so the estimate may be larger than the memory an output actually keeps alive.
+    """
+    size = sys.getsizeof(value)
+    if isinstance(value, BaseModel):
+        size += estimate_size_bytes(value.__dict__)
+    elif isinstance(value, dict):
+        size += sum(estimate_size_bytes(k) + estimate_size_bytes(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(estimate_size_bytes(item) for item in value)
+    return size
+
+
+@lru_cache(maxsize=None)
+def _get_key_fields(invocation_class: type["BaseInvocation"]) -> tuple[tuple[str, bytes], ...]:
+    """Gets the sorted names of the fields that make up an invocation class's cache key, with their encoded names."""
+    field_names = sorted(set(invocation_class.model_fields) - CACHE_KEY_EXCLUDED_FIELDS)
+    return tuple((field_name, field_name.encode("utf-8")) for field_name in field_names)
+
+
+def _update_length_prefixed(hasher: blake3, data: bytes) -> None:
+    """Feeds a variable-length value to a hasher, prefixed with its length so adjacent values cannot run together."""
+    hasher.update(len(data).to_bytes(8, "little"))
+    hasher.update(data)
+
+
+def create_invocation_cache_key(invocation: "BaseInvocation") -> str:
+    """Creates a content-hash cache key for an invocation.
+
+    The key is a blake3 digest over a canonical encoding of the invocation's type, version and field values, so it is
+    stable across processes and restarts and may be used by persistent or shared cache backends. Scalars are encoded
+    directly; everything else is encoded with pydantic's JSON serializer, one field at a time. Every variable-length
+    part of the encoding is length-prefixed, so different field values never produce the same byte stream.
+    """
+    hasher = blake3()
+    _update_length_prefixed(
+        hasher, f"{CACHE_KEY_VERSION}:{invocation.get_type()}:{invocation.UIConfig.version}".encode("utf-8")
+    )
+    values = invocation.__dict__
+    for field_name, encoded_field_name in _get_key_fields(type(invocation)):
+        value = values.get(field_name)
+        value_type = type(value)
+        _update_length_prefixed(hasher, encoded_field_name)
+        if value_type is str:
+            hasher.update(b"s")
+            _update_length_prefixed(hasher, value.encode("utf-8"))
+        elif value_type is int or value_type is bool or value is None:
+            hasher.update(b"r")
+            _update_length_prefixed(hasher, b"%r" % value)
+        else:
+            hasher.update(b"j")
+            _update_length_prefixed(hasher, to_json(value))
+    return hasher.hexdigest()
@@ -0,0 +1,279 @@
+import os
+import sqlite3
+import time
+from logging import Logger
+from pathlib import Path
+from typing import Iterable, Optional, Union
+
+import psutil
+
+from invokeai.app.invocations.baseinvocation import BaseInvocationOutput, InvocationRegistry
+from invokeai.app.services.invocation_cache.invocation_cache_common import InvocationCacheTierStatus
+from invokeai.app.services.shared.sqlite.sqlite_database import SqliteDatabase
+from invokeai.app.util.misc import uuid_string
+
+# The disk cache is a cache, not a record of anything. If the schema changes, we simply drop it and start over.
+DISK_CACHE_SCHEMA_VERSION = 4
+
+DURABLE_OWNER = ""
+"""The owner of outputs that may be served to any process."""
+
+
+class DiskInvocationCacheStore:
+    """
+    Persistent, size-bounded store for serialized invocation outputs. It is used as the second tier of the
+    `MemoryInvocationCache`, and on its own by the `SharedInvocationCache`.
+
+    Outputs are stored as JSON in a dedicated SQLite database in WAL mode, separate from the main app database, so they
+    survive restarts and may be shared by several processes on the same machine. When the total size of the stored
+    outputs exceeds `max_size_bytes`, or their number exceeds `max_size`, the least recently accessed outputs are
+    evicted. The totals are maintained by triggers, so they stay correct when several processes write to the database.
+
+    The names of the images, tensors and conditioning referenced by each output are indexed, so invalidating the
+    outputs that reference a deleted object does not require scanning the stored JSON.
+
+    Outputs that reference tensors or conditioning are owned by the store instance that saved them. Those objects are
+    held in per-process temporary directories, so owned outputs are only served to their owner. Each owner is
+    registered with the process that created it; `release()` purges an owner's outputs, and `purge_orphaned()` purges
+    the outputs of owners whose process is no longer running.
+
+    :param db_path: Path to the cache database file
+    :param max_size_bytes: The maximum total size of the stored outputs, in bytes
+    :param logger: Logger to use for logging
+    :param max_size: The maximum number of stored outputs, or 0 to limit the store by size only
+    """
+
+    def __init__(self, db_path: Path, max_size_bytes: int, logger: Logger, max_size: int = 0) -> None:
+        self._max_size_bytes = max_size_bytes
+        self._max_size = max_size
+        self._logger = logger
+        self._db = SqliteDatabase(db_path=db_path, logger=logger)
+        self._owner = uuid_string()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._init_schema()
+        self._register_owner()
+
+    def _init_schema(self) -> None:
+        with self._db.transaction() as cursor:
+            cursor.execute("PRAGMA user_version;")
+            version = cursor.fetchone()[0]
+            if version == DISK_CACHE_SCHEMA_VERSION:
+                return
+            cursor.execute("DROP TABLE IF EXISTS invocation_cache_owners;")
+            cursor.execute("DROP TABLE IF EXISTS invocation_cache_references;")
+            cursor.execute("DROP TABLE IF EXISTS invocation_cache_totals;")
+            cursor.execute("DROP TABLE IF EXISTS invocation_cache;")
+            cursor.execute(
+                """--sql
+                CREATE TABLE invocation_cache (
+                    key TEXT NOT NULL PRIMARY KEY,
+                    output_json TEXT NOT NULL,
+                    size_bytes INTEGER NOT NULL,
+                    owner TEXT NOT NULL DEFAULT '',
+                    accessed_at REAL NOT NULL
+                );
+                """
+            )
+            cursor.execute("CREATE INDEX idx_invocation_cache_accessed_at ON invocation_cache(accessed_at);")
+            cursor.execute("CREATE INDEX idx_invocation_cache_owner ON invocation_cache(owner);")
+            cursor.execute(
+                """--sql
+                CREATE TABLE invocation_cache_references (
+                    name TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    PRIMARY KEY (name, key),
+                    FOREIGN KEY (key) REFERENCES invocation_cache(key) ON DELETE CASCADE
+                );
+                """
+            )
+            cursor.execute("CREATE INDEX idx_invocation_cache_references_key ON invocation_cache_references(key);")
+            cursor.execute(
+                """--sql
+                CREATE TABLE invocation_cache_totals (
+                    id INTEGER NOT NULL PRIMARY KEY CHECK (id = 0),
+                    size_bytes INTEGER NOT NULL,
+                    count INTEGER NOT NULL
+                );
+                """
+            )
+            cursor.execute("INSERT INTO invocation_cache_totals (id, size_bytes, count) VALUES (0, 0, 0);")
+            cursor.execute(
+                """--sql
+                CREATE TRIGGER tg_invocation_cache_insert AFTER INSERT ON invocation_cache
+                BEGIN
+                    UPDATE invocation_cache_totals SET size_bytes = size_bytes + NEW.size_bytes, count = count + 1;
+                END;
+                """
+            )
+            cursor.execute(
+                """--sql
+                CREATE TRIGGER tg_invocation_cache_delete AFTER DELETE ON invocation_cache
+                BEGIN
+                    UPDATE invocation_cache_totals SET size_bytes = size_bytes - OLD.size_bytes, count = count - 1;
+                END;
+                """
+            )
+            cursor.execute(
+                """--sql
+                CREATE TABLE invocation_cache_owners (
+                    owner TEXT NOT NULL PRIMARY KEY,
+                    pid INTEGER NOT NULL,
+                    process_created_at REAL NOT NULL
+                );
+                """
+            )
+            cursor.execute(f"PRAGMA user_version = {DISK_CACHE_SCHEMA_VERSION};")
+
+    def _get_totals(self, cursor: sqlite3.Cursor) -> tuple[int, int]:
+        cursor.execute("SELECT size_bytes, count FROM invocation_cache_totals;")
+        size_bytes, count = cursor.fetchone()
+        return size_bytes, count
+
+    @staticmethod
+    def _get_process_created_at(pid: int) -> Optional[float]:
+        try:
+            return psutil.Process(pid).create_time()
+        except psutil.Error:
+            return None
+
+    def _register_owner(self) -> None:
+        pid = os.getpid()
+        with self._db.transaction() as cursor:
+            cursor.execute(
+                "INSERT INTO invocation_cache_owners (owner, pid, process_created_at) VALUES (?, ?, ?);",
+                (self._owner, pid, self._get_process_created_at(pid) or 0.0),
+            )
+
+    def purge_orphaned(self) -> None:
+        """Deletes the stored outputs of owners whose process is no longer running.
+
+        An owner's process is identified by its pid and creation time, so a reused pid does not keep outputs alive.
+        Outputs of other running processes, and durable outputs, are kept."""
+        with self._db.transaction() as cursor:
+            cursor.execute("SELECT owner, pid, process_created_at FROM invocation_cache_owners;")
+            orphaned_owners = [
+                owner
+                for owner, pid, process_created_at in cursor.fetchall()
+                if self._get_process_created_at(pid) != process_created_at
+            ]
+            cursor.executemany("DELETE FROM invocation_cache_owners WHERE owner = ?;", [(o,) for o in orphaned_owners])
+            # Outputs of owners that were never registered, or whose registration was removed, are orphaned too.
+            cursor.execute(
+                """--sql
+                DELETE FROM invocation_cache
+                WHERE owner != ? AND owner NOT IN (SELECT owner FROM invocation_cache_owners);
+                """,
+                (DURABLE_OWNER,),
+            )
+            purged = cursor.rowcount
+        if purged > 0:
+            self._logger.debug(f"Purged {purged} orphaned ephemeral outputs from the disk invocation cache")
+
+    def release(self) -> None:
+        """Deletes the stored outputs owned by this store instance."""
+        with self._db.transaction() as cursor:
+            cursor.execute("DELETE FROM invocation_cache WHERE owner = ?;", (self._owner,))
+            cursor.execute("DELETE FROM invocation_cache_owners WHERE owner = ?;", (self._owner,))
+
+    def get(self, key: Union[int, str]) -> Optional[BaseInvocationOutput]:
+        with self._db.transaction() as cursor:
+            cursor.execute(
+                "SELECT output_json FROM invocation_cache WHERE key = ? AND owner IN (?, ?);",
+                (str(key), DURABLE_OWNER, self._owner),
+            )
+            row = cursor.fetchone()
+            if row is None:
+                self._misses += 1
+                return None
+            cursor.execute("UPDATE invocation_cache SET accessed_at = ? WHERE key = ?;", (time.time(), str(key)))
+        try:
+            output = InvocationRegistry.get_output_typeadapter().validate_json(row[0])
+        except Exception:
+            # The output type may no longer exist, e.g. if a node pack was removed. Treat it as a miss.
+            self.delete(key)
+            self._misses += 1
+            return None
+        self._hits += 1
+        return output
+
+    def save(self, key: Union[int, str], output_json: str, references: Iterable[str], ephemeral: bool) -> None:
+        size_bytes = len(output_json.encode("utf-8"))
+        if size_bytes > self._max_size_bytes:
+            return
+        with self._db.transaction() as cursor:
+            cursor.execute("DELETE FROM invocation_cache WHERE key = ?;", (str(key),))
+            cursor.execute(
+                """--sql
+                INSERT INTO invocation_cache (key, output_json, size_bytes, owner, accessed_at)
+                VALUES (?, ?, ?, ?, ?);
+                """,
+                (str(key), output_json, size_bytes, self._owner if ephemeral else DURABLE_OWNER, time.time()),
+            )
+            cursor.executemany(
+                "INSERT INTO invocation_cache_references (name, key) VALUES (?, ?);",
+                [(name, str(key)) for name in references],
+            )
+            total_size_bytes, count = self._get_totals(cursor)
+            if self._is_over_budget(total_size_bytes, count):
+                self._evict(cursor, total_size_bytes, count)
+
+    def _is_over_budget(self, size_bytes: int, count: int) -> bool:
+        return size_bytes > self._max_size_bytes or (self._max_size > 0 and count > self._max_size)
+
+    def _evict(self, cursor: sqlite3.Cursor, total_size_bytes: int, count: int) -> None:
+        """Deletes the least recently accessed outputs until the store fits within its budget."""
+        cursor.execute("SELECT key, size_bytes FROM invocation_cache ORDER BY accessed_at ASC;")
+        keys_to_delete: list[str] = []
+        for key, item_size_bytes in cursor.fetchall():
+            if not self._is_over_budget(total_size_bytes, count):
+                break
+            keys_to_delete.append(key)
+            total_size_bytes -= item_size_bytes
+            count -= 1
+        cursor.executemany("DELETE FROM invocation_cache WHERE key = ?;", [(k,) for k in keys_to_delete])
+        self._evictions += len(keys_to_delete)
+
+    def delete(self, key: Union[int, str]) -> None:
+        with self._db.transaction() as cursor:
+            cursor.execute("DELETE FROM invocation_cache WHERE key = ?;", (str(key),))
+
+    def delete_by_references(self, names: Iterable[str]) -> int:
+        """Deletes all stored outputs that reference any of the given names, returning the number deleted."""
+        names = list(names)
+        deleted = 0
+        with self._db.transaction() as cursor:
+            # Stay well under SQLite's limit on the number of bound parameters
+            for i in range(0, len(names), 500):
+                chunk = names[i : i + 500]
+                placeholders = ", ".join("?" * len(chunk))
+                cursor.execute(
+                    f"""--sql
+                    DELETE FROM invocation_cache
+                    WHERE key IN (SELECT key FROM invocation_cache_references WHERE name IN ({placeholders}));
+                    """,
+                    chunk,
+                )
+                deleted += cursor.rowcount
+        return deleted
+
+    def clear(self) -> None:
+        with self._db.transaction() as cursor:
+            cursor.execute("DELETE FROM invocation_cache;")
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get_status(self) -> InvocationCacheTierStatus:
+        with self._db.transaction() as cursor:
+            size_bytes, count = self._get_totals(cursor)
+        return InvocationCacheTierStatus(
+            size=count,
+            size_bytes=size_bytes,
+            max_size=self._max_size,
+            max_size_bytes=self._max_size_bytes,
+            hits=self._hits,
+            misses=self._misses,
+            evictions=self._evictions,
+        )
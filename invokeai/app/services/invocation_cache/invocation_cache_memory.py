@@ -1,44 +1,91 @@
 from collections import OrderedDict
 from dataclasses import dataclass, field
 from threading import Lock
-from typing import Optional, Union
+from typing import Iterable, Optional, Union
 
 from invokeai.app.invocations.baseinvocation import BaseInvocation, BaseInvocationOutput
 from invokeai.app.services.invocation_cache.invocation_cache_base import InvocationCacheBase
-from invokeai.app.services.invocation_cache.invocation_cache_common import InvocationCacheStatus
+from invokeai.app.services.invocation_cache.invocation_cache_common import (
+    InvocationCacheStatus,
+    InvocationCacheTierStatus,
+    create_invocation_cache_key,
+    estimate_size_bytes,
+    get_output_references,
+)
+from invokeai.app.services.invocation_cache.invocation_cache_disk import DiskInvocationCacheStore
 from invokeai.app.services.invoker import Invoker
 
 
 @dataclass(order=True)
 class CachedItem:
     invocation_output: BaseInvocationOutput = field(compare=False)
-    invocation_output_json: str = field(compare=False)
+    references: frozenset[str] = field(compare=False)
+    """The names of the images, tensors and conditioning referenced by the output."""
+    size_bytes: int = field(compare=False)
+    """The estimated memory used by the output."""
 
 
 class MemoryInvocationCache(InvocationCacheBase):
+    """
+    In-memory LRU invocation cache, optionally backed by a persistent disk tier.
+
+    When a disk store is provided, every saved output is written through to it. Memory misses fall back to the disk
+    store, and disk hits are promoted back into memory.
+
+    A reverse index maps the names of referenced images, tensors and conditioning to the keys of the cached outputs
+    that reference them, so that deleting an object invalidates only the affected outputs.
+
+    :param max_cache_size: The maximum number of outputs to keep in memory. If 0, the cache is disabled.
+    :param disk_store: An optional persistent store to use as the second cache tier.
+    :param max_size_bytes: The memory budget of the cached outputs, in bytes. Least recently used outputs are evicted
+        once their estimated size exceeds it. If 0, the memory tier is only limited by `max_cache_size`.
+    """
+
     _cache: OrderedDict[Union[int, str], CachedItem]
+    _references: dict[str, set[Union[int, str]]]
     _max_cache_size: int
+    _max_size_bytes: int
+    _size_bytes: int
     _disabled: bool
     _hits: int
     _misses: int
+    _memory_hits: int
+    _evictions: int
     _invoker: Invoker
     _lock: Lock
 
-    def __init__(self, max_cache_size: int = 0) -> None:
+    def __init__(
+        self,
+        max_cache_size: int = 0,
+        disk_store: Optional[DiskInvocationCacheStore] = None,
+        max_size_bytes: int = 0,
+    ) -> None:
         self._cache = OrderedDict()
+        self._references = {}
         self._max_cache_size = max_cache_size
+        self._max_size_bytes = max_size_bytes
+        self._size_bytes = 0
+        self._disk_store = disk_store
         self._disabled = False
         self._hits = 0
         self._misses = 0
+        self._memory_hits = 0
+        self._evictions = 0
         self._lock = Lock()
 
     def start(self, invoker: Invoker) -> None:
         self._invoker = invoker
         if self._max_cache_size == 0:
             return
-        self._invoker.services.images.on_deleted(self._delete_by_match)
-        self._invoker.services.tensors.on_deleted(self._delete_by_match)
-        self._invoker.services.conditioning.on_deleted(self._delete_by_match)
+        if self._disk_store is not None:
+            self._disk_store.purge_orphaned()
+        self._invoker.services.images.on_deleted_many(self._delete_by_references)
+        self._invoker.services.tensors.on_deleted(self._delete_by_reference)
+        self._invoker.services.conditioning.on_deleted(self._delete_by_reference)
+
+    def stop(self, invoker: Invoker) -> None:
+        if self._disk_store is not None:
+            self._disk_store.release()
 
     def get(self, key: Union[int, str]) -> Optional[BaseInvocationOutput]:
         with self._lock:
@@ -47,8 +94,17 @@ class MemoryInvocationCache(InvocationCacheBase):
             item = self._cache.get(key, None)
             if item is not None:
                 self._hits += 1
+                self._memory_hits += 1
                 self._cache.move_to_end(key)
                 return item.invocation_output
+            if self._disk_store is not None:
+                invocation_output = self._disk_store.get(key)
+                if invocation_output is not None:
+                    self._hits += 1
+                    references, _ = get_output_references(invocation_output)
+                    size_bytes = estimate_size_bytes(invocation_output)
+                    self._set_memory(key, CachedItem(invocation_output, references, size_bytes))
+                    return invocation_output
             self._misses += 1
             return None
 
@@ -56,24 +112,54 @@ class MemoryInvocationCache(InvocationCacheBase):
         with self._lock:
             if self._max_cache_size == 0 or self._disabled or key in self._cache:
                 return
-            # If the cache is full, we need to remove the least used
-            number_to_delete = len(self._cache) + 1 - self._max_cache_size
-            self._delete_oldest_access(number_to_delete)
-            self._cache[key] = CachedItem(
-                invocation_output,
-                invocation_output.model_dump_json(warnings=False, exclude_defaults=True, exclude_unset=True),
-            )
+            references, ephemeral = get_output_references(invocation_output)
+            size_bytes = estimate_size_bytes(invocation_output)
+            self._set_memory(key, CachedItem(invocation_output, references, size_bytes))
+            if self._disk_store is not None:
+                invocation_output_json = invocation_output.model_dump_json(warnings=False)
+                self._disk_store.save(key, invocation_output_json, references, ephemeral)
+
+    def _set_memory(self, key: Union[int, str], item: CachedItem) -> None:
+        if self._max_size_bytes > 0 and item.size_bytes > self._max_size_bytes:
+            # The output would evict everything else and still not fit. It is only kept in the disk tier, if any.
+            return
+        # If the cache is full, we need to remove the least used
+        number_to_delete = len(self._cache) + 1 - self._max_cache_size
+        self._delete_oldest_access(number_to_delete)
+        if self._max_size_bytes > 0:
+            while self._cache and self._size_bytes + item.size_bytes > self._max_size_bytes:
+                self._delete_oldest_access(1)
+        self._cache[key] = item
+        self._size_bytes += item.size_bytes
+        for name in item.references:
+            self._references.setdefault(name, set()).add(key)
+
+    def _pop_memory(self, key: Union[int, str], item: CachedItem) -> None:
+        """Removes an item from the memory tier, keeping the reverse index and the memory tier's size in sync."""
+        self._size_bytes -= item.size_bytes
+        for name in item.references:
+            keys = self._references.get(name)
+            if keys is None:
+                continue
+            keys.discard(key)
+            if not keys:
+                del self._references[name]
 
     def _delete_oldest_access(self, number_to_delete: int) -> None:
         number_to_delete = min(number_to_delete, len(self._cache))
         for _ in range(number_to_delete):
-            self._cache.popitem(last=False)
+            key, item = self._cache.popitem(last=False)
+            self._pop_memory(key, item)
+            self._evictions += 1
 
     def _delete(self, key: Union[int, str]) -> None:
         if self._max_cache_size == 0:
             return
-        if key in self._cache:
-            del self._cache[key]
+        item = self._cache.pop(key, None)
+        if item is not None:
+            self._pop_memory(key, item)
+        if self._disk_store is not None:
+            self._disk_store.delete(key)
 
     def delete(self, key: Union[int, str]) -> None:
         with self._lock:
@@ -84,12 +170,18 @@ class MemoryInvocationCache(InvocationCacheBase):
             if self._max_cache_size == 0:
                 return
             self._cache.clear()
+            self._references.clear()
+            self._size_bytes = 0
             self._misses = 0
             self._hits = 0
+            self._memory_hits = 0
+            self._evictions = 0
+            if self._disk_store is not None:
+                self._disk_store.clear()
 
     @staticmethod
-    def create_key(invocation: BaseInvocation) -> int:
-        return hash(invocation.model_dump_json(exclude={"id"}, warnings=False))
+    def create_key(invocation: BaseInvocation) -> str:
+        return create_invocation_cache_key(invocation)
 
     def disable(self) -> None:
         with self._lock:
@@ -111,20 +203,37 @@ class MemoryInvocationCache(InvocationCacheBase):
                 enabled=not self._disabled and self._max_cache_size > 0,
                 size=len(self._cache),
                 max_size=self._max_cache_size,
+                memory_tier=InvocationCacheTierStatus(
+                    size=len(self._cache),
+                    size_bytes=self._size_bytes,
+                    max_size=self._max_cache_size,
+                    max_size_bytes=self._max_size_bytes,
+                    hits=self._memory_hits,
+                    misses=self._hits + self._misses - self._memory_hits,
+                    evictions=self._evictions,
+                ),
+                disk_tier=self._disk_store.get_status() if self._disk_store is not None else None,
             )
 
-    def _delete_by_match(self, to_match: str) -> None:
+    def _delete_by_reference(self, name: str) -> None:
+        self._delete_by_references([name])
+
+    def _delete_by_references(self, names: Iterable[str]) -> None:
+        """Deletes all cached outputs that reference any of the given image, tensor or conditioning names."""
         with self._lock:
             if self._max_cache_size == 0:
                 return
-            keys_to_delete = set()
-            for key, cached_item in self._cache.items():
-                if to_match in cached_item.invocation_output_json:
-                    keys_to_delete.add(key)
-            if not keys_to_delete:
-                return
+            names = list(names)
+            keys_to_delete: set[Union[int, str]] = set()
+            for name in names:
+                keys_to_delete.update(self._references.pop(name, ()))
             for key in keys_to_delete:
-                self._delete(key)
+                self._pop_memory(key, self._cache.pop(key))
+            deleted_count = len(keys_to_delete)
+            if self._disk_store is not None:
+                deleted_count = max(deleted_count, self._disk_store.delete_by_references(names))
+            if deleted_count == 0:
+                return
             self._invoker.services.logger.debug(
-                f"Deleted {len(keys_to_delete)} cached invocation outputs for {to_match}"
+                f"Deleted {deleted_count} cached invocation outputs for {len(names)} deleted objects"
             )
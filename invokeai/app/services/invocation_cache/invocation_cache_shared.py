@@ -0,0 +1,112 @@
+from threading import Lock
+from typing import Iterable, Optional, Union
+
+from invokeai.app.invocations.baseinvocation import BaseInvocation, BaseInvocationOutput
+from invokeai.app.services.invocation_cache.invocation_cache_base import InvocationCacheBase
+from invokeai.app.services.invocation_cache.invocation_cache_common import (
+    InvocationCacheStatus,
+    create_invocation_cache_key,
+    get_output_references,
+)
+from invokeai.app.services.invocation_cache.invocation_cache_disk import DiskInvocationCacheStore
+from invokeai.app.services.invoker import Invoker
+
+
+class SharedInvocationCache(InvocationCacheBase):
+    """
+    Invocation cache shared by all InvokeAI processes on the same machine, backed by a SQLite database in WAL mode.
+
+    There is no in-memory tier: every lookup reads the shared database, so outputs invalidated by one process (e.g.
+    because it deleted an image) are never served by another.
+
+    Outputs that reference tensors or conditioning are only served to the process that saved them, because those
+    objects live in per-process temporary directories. They are removed from the shared database when the process
+    stops. All other outputs (images, models, primitives, etc) are shared.
+
+    :param store: The shared store. All processes sharing the cache must use the same database file.
+    """
+
+    def __init__(self, store: DiskInvocationCacheStore) -> None:
+        self._store = store
+        self._max_cache_size = store.get_status().max_size
+        self._disabled = False
+        self._lock = Lock()
+
+    def start(self, invoker: Invoker) -> None:
+        self._invoker = invoker
+        if self._max_cache_size == 0:
+            return
+        self._store.purge_orphaned()
+        self._invoker.services.images.on_deleted_many(self._delete_by_references)
+        self._invoker.services.tensors.on_deleted(self._delete_by_reference)
+        self._invoker.services.conditioning.on_deleted(self._delete_by_reference)
+
+    def stop(self, invoker: Invoker) -> None:
+        self._store.release()
+
+    def get(self, key: Union[int, str]) -> Optional[BaseInvocationOutput]:
+        with self._lock:
+            if self._max_cache_size == 0 or self._disabled:
+                return None
+            return self._store.get(key)
+
+    def save(self, key: Union[int, str], invocation_output: BaseInvocationOutput) -> None:
+        with self._lock:
+            if self._max_cache_size == 0 or self._disabled:
+                return
+            references, ephemeral = get_output_references(invocation_output)
+            self._store.save(key, invocation_output.model_dump_json(warnings=False), references, ephemeral)
+
+    def delete(self, key: Union[int, str]) -> None:
+        with self._lock:
+            self._store.delete(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            if self._max_cache_size == 0:
+                return
+            self._store.clear()
+
+    @staticmethod
+    def create_key(invocation: BaseInvocation) -> str:
+        return create_invocation_cache_key(invocation)
+
+    def disable(self) -> None:
+        with self._lock:
+            if self._max_cache_size == 0:
+                return
+            self._disabled = True
+
+    def enable(self) -> None:
+        with self._lock:
+            if self._max_cache_size == 0:
+                return
+            self._disabled = False
+
+    def get_status(self) -> InvocationCacheStatus:
+        with self._lock:
+            store_status = self._store.get_status()
+            return InvocationCacheStatus(
+                hits=store_status.hits,
+                misses=store_status.misses,
+                enabled=not self._disabled and self._max_cache_size > 0,
+                size=store_status.size,
+                max_size=self._max_cache_size,
+                disk_tier=store_status,
+            )
+
+    def _delete_by_reference(self, name: str) -> None:
+        self._delete_by_references([name])
+
+    def _delete_by_references(self, names: Iterable[str]) -> None:
+        """Deletes all cached outputs that reference any of the given image, tensor or conditioning names."""
+        with self._lock:
+            if self._max_cache_size == 0:
+                return
+            names = list(names)
+            deleted_count = self._store.delete_by_references(names)
+            if deleted_count == 0:
+                return
+            self._invoker.services.logger.debug(
+                f"Deleted {deleted_count} cached invocation outputs for {len(names)} deleted objects"
+            )
@@ -7,6 +7,7 @@ import re
 import sys
 import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from copy import deepcopy
 from pathlib import Path
 from queue import Empty, Queue
@@ -36,7 +37,7 @@ from invokeai.app.services.model_install.model_install_common import (
     StringLikeSource,
     URLModelSource,
 )
-from invokeai.app.services.model_records import DuplicateModelException, ModelRecordServiceBase
+from invokeai.app.services.model_records import DuplicateModelException, ModelRecordServiceBase, ModelScanRecord
 from invokeai.app.services.model_records.model_records_base import ModelRecordChanges
 from invokeai.backend.model_manager.configs.base import Checkpoint_Config_Base
 from invokeai.backend.model_manager.configs.factory import (
@@ -52,6 +53,7 @@ from invokeai.backend.model_manager.metadata import (
     RemoteModelFile,
 )
 from invokeai.backend.model_manager.metadata.metadata_base import HuggingFaceMetadata
+from invokeai.backend.model_manager.model_on_disk import ModelOnDisk
 from invokeai.backend.model_manager.search import ModelSearch
 from invokeai.backend.model_manager.taxonomy import ModelRepoVariant, ModelSourceType
 from invokeai.backend.model_manager.util.lora_metadata_extractor import apply_lora_metadata
@@ -629,21 +631,30 @@ class ModelInstallService(ModelInstallServiceBase):
 
     def _scan_for_missing_models(self) -> list[AnyModelConfig]:
         """Scan the models directory for missing models and return a list of them."""
-        missing_models: list[AnyModelConfig] = []
-        for model_config in self.record_store.all_models():
-            if not (self.app_config.models_path / model_config.path).resolve().exists():
-                missing_models.append(model_config)
-        return missing_models
+        model_configs = self.record_store.all_models()
+
+        def is_missing(model_config: AnyModelConfig) -> bool:
+            return not (self.app_config.models_path / model_config.path).resolve().exists()
+
+        # Checking that a path exists is slow on network storage, so the paths are checked concurrently
+        with ThreadPoolExecutor(max_workers=self.app_config.model_scan_workers) as executor:
+            missing = list(executor.map(is_missing, model_configs))
+        return [model_config for model_config, is_missing in zip(model_configs, missing, strict=True) if is_missing]
 
     def _register_orphaned_models(self) -> None:
         """Scan the invoke-managed models directory for orphaned models and registers them.
 
         This is typically only used during testing with a new DB or when using the memory DB, because those are the
         only situations in which we may have orphaned models in the models directory.
+
+        The models found are stat-ed, hashed and probed concurrently. The size and modification time of each model is
+        recorded, along with the key it was registered as, so that models which could not be registered are not
+        probed again on later scans until they change.
         """
         installed_model_paths = {
             (self._app_config.models_path / x.path).resolve() for x in self.record_store.all_models()
         }
+        orphaned_model_paths: list[Path] = []
 
         # The bool returned by this callback determines if the model is added to the list of models found by the search
         def on_model_found(model_path: Path) -> bool:
@@ -659,18 +670,98 @@ class ModelInstallService(ModelInstallServiceBase):
             ]:
                 if resolved_path.is_relative_to(special_directory):
                     return False
-            try:
-                model_id = self.register_path(model_path)
-                self._logger.info(f"Registered {model_path.name} with id {model_id}")
-            except DuplicateModelException:
-                # In case a duplicate models sneaks by, we will ignore this error - we "found" the model
-                pass
+            orphaned_model_paths.append(model_path)
             return True
 
         self._logger.info(f"Scanning {self._app_config.models_path} for orphaned models")
         search = ModelSearch(on_model_found=on_model_found)
         found_models = search.search(self._app_config.models_path)
-        self._logger.info(f"{len(found_models)} new models registered")
+
+        scan_records = self.record_store.get_scan_records()
+        new_scan_records: list[ModelScanRecord] = []
+        registered = 0
+        skipped = 0
+
+        # Models are probed (and hashed) on the worker threads, and registered on this thread as they are probed.
+        with ThreadPoolExecutor(max_workers=self.app_config.model_scan_workers) as executor:
+            futures = {
+                executor.submit(self._probe_orphaned_model, model_path, scan_records): model_path
+                for model_path in orphaned_model_paths
+            }
+            for future in as_completed(futures):
+                model_path = futures[future]
+                scan_record, config, info = future.result()
+                if scan_record is None:
+                    skipped += 1
+                    continue
+                new_scan_records.append(scan_record)
+                if info is None:
+                    continue
+                try:
+                    scan_record.model_key = self._register(model_path, config, info)
+                    registered += 1
+                    self._logger.info(f"Registered {model_path.name} with id {scan_record.model_key}")
+                except DuplicateModelException:
+                    # In case a duplicate models sneaks by, we will ignore this error - we "found" the model
+                    pass
+                except Exception as e:
+                    self._logger.warning(str(e))
+
+        self.record_store.save_scan_records(new_scan_records)
+        # Forget about models that are no longer in the models directory
+        found_paths = {p.resolve().as_posix() for p in found_models}
+        self.record_store.delete_scan_records([p for p in scan_records if p not in found_paths])
+
+        if skipped:
+            self._logger.info(f"Skipped {skipped} unchanged models that could not be registered on a previous scan")
+        self._logger.info(f"{registered} new models registered")
+
+    def _probe_orphaned_model(
+        self, model_path: Path, scan_records: dict[str, ModelScanRecord]
+    ) -> tuple[Optional[ModelScanRecord], ModelRecordChanges, Optional[AnyModelConfig]]:
+        """Probe a model found when scanning the models directory.
+
+        Returns the model's new scan record, the changes to register it with, and its config. The scan record is None
+        if the model could not be registered on a previous scan and is unchanged since, in which case it is not
+        probed again. The config is None if the model could not be probed.
+        """
+        resolved_path = model_path.resolve()
+        config = ModelRecordChanges(source=resolved_path.as_posix(), source_type=ModelSourceType.Path)
+        try:
+            size, mtime_ns = self._get_size_and_mtime(resolved_path)
+        except OSError as e:
+            self._logger.warning(str(e))
+            return None, config, None
+        scan_record = ModelScanRecord(path=resolved_path.as_posix(), size=size, mtime_ns=mtime_ns)
+
+        previous_record = scan_records.get(scan_record.path)
+        if (
+            previous_record is not None
+            and previous_record.model_key is None
+            and (previous_record.size, previous_record.mtime_ns) == (size, mtime_ns)
+        ):
+            return None, config, None
+
+        try:
+            return scan_record, config, self._probe(model_path, config)
+        except Exception as e:
+            self._logger.warning(str(e))
+            return scan_record, config, None
+
+    @staticmethod
+    def _get_size_and_mtime(path: Path) -> tuple[int, int]:
+        """Return the size and latest modification time (in ns) of a model file, or of the files of a model dir."""
+        if path.is_file():
+            stat = path.stat()
+            return stat.st_size, stat.st_mtime_ns
+        size = 0
+        mtime_ns = path.stat().st_mtime_ns
+        for dirpath, _, filenames in os.walk(path):
+            for filename in filenames:
+                stat = os.stat(os.path.join(dirpath, filename))
+                size += stat.st_size
+                mtime_ns = max(mtime_ns, stat.st_mtime_ns)
+        return size, mtime_ns
 
     def _probe(self, model_path: Path, config: Optional[ModelRecordChanges] = None):
         config = config or ModelRecordChanges()
@@ -678,7 +769,8 @@ class ModelInstallService(ModelInstallServiceBase):
         fields = config.model_dump()
 
         result = ModelConfigFactory.from_model_on_disk(
-            mod=model_path,
+            # Hashes of files that were hashed before, e.g. by an earlier install or scan, are reused
+            mod=ModelOnDisk(model_path, hash_algo, hash_cache=self.record_store),
             override_fields=deepcopy(fields),
             hash_algo=hash_algo,
             allow_unknown=self.app_config.allow_unknown_models,
@@ -8,16 +8,19 @@ from .model_records_base import (  # noqa F401
     ModelSummary,
     ModelRecordChanges,
     ModelRecordOrderBy,
+    ModelScanRecord,
 )
-from .model_records_sql import ModelRecordServiceSQL  # noqa F401
+from .model_records_sql import ModelConfigCacheStats, ModelRecordServiceSQL  # noqa F401
 
 __all__ = [
     "ModelRecordServiceBase",
     "ModelRecordServiceSQL",
+    "ModelConfigCacheStats",
     "DuplicateModelException",
     "InvalidModelException",
     "UnknownModelException",
     "ModelSummary",
     "ModelRecordChanges",
     "ModelRecordOrderBy",
+    "ModelScanRecord",
 ]
@@ -12,6 +12,7 @@ from pydantic import BaseModel, Field
 
 from invokeai.app.services.shared.pagination import PaginatedResults
 from invokeai.app.util.model_exclude_null import BaseModelExcludeNull
+from invokeai.backend.model_hash.model_hash import FileHashKey
 from invokeai.backend.model_manager.configs.controlnet import ControlAdapterDefaultSettings
 from invokeai.backend.model_manager.configs.factory import AnyModelConfig
 from invokeai.backend.model_manager.configs.lora import LoraModelDefaultSettings
@@ -103,6 +104,17 @@ class ModelRecordChanges(BaseModelExcludeNull):
     config_path: Optional[str] = Field(description="Path to config file for model", default=None)
 
 
+class ModelScanRecord(BaseModel):
+    """The result of scanning a model found in the models directory, used to skip models that are unchanged since."""
+
+    path: str = Field(description="Resolved path of the model")
+    size: int = Field(description="Size of the model file, or total size of the files of a model directory")
+    mtime_ns: int = Field(description="Latest modification time of the model's file(s), in nanoseconds")
+    model_key: Optional[str] = Field(
+        default=None, description="Key of the model the path was registered as, or None if it could not be registered"
+    )
+
+
 class ModelRecordServiceBase(ABC):
     """Abstract base class for storage and retrieval of model configs."""
 
@@ -229,6 +241,31 @@ class ModelRecordServiceBase(ABC):
         """
         pass
 
+    @abstractmethod
+    def get_scan_records(self) -> dict[str, ModelScanRecord]:
+        """Return the records of the last scan of the models directory, keyed by path."""
+        pass
+
+    @abstractmethod
+    def save_scan_records(self, records: List[ModelScanRecord]) -> None:
+        """Add or replace scan records."""
+        pass
+
+    @abstractmethod
+    def delete_scan_records(self, paths: List[str]) -> None:
+        """Delete the scan records of the given paths."""
+        pass
+
+    @abstractmethod
+    def get_file_hash(self, key: FileHashKey) -> Optional[str]:
+        """Return the cached hash of a model file, or None if the file has not been hashed since it last changed."""
+        pass
+
+    @abstractmethod
+    def set_file_hash(self, key: FileHashKey, file_hash: str) -> None:
+        """Cache the hash of a model file."""
+        pass
+
     def all_models(self) -> List[AnyModelConfig]:
         """Return all the model configs in the database."""
         return self.search_by_attr()
@@ -42,9 +42,11 @@ Typical usage:
 import json
 import logging
 import sqlite3
+import threading
+from dataclasses import dataclass
 from math import ceil
 from pathlib import Path
-from typing import List, Optional, Union
+from typing import List, Optional, Union, cast
 
 import pydantic
 
@@ -53,15 +55,31 @@ from invokeai.app.services.model_records.model_records_base import (
     ModelRecordChanges,
     ModelRecordOrderBy,
     ModelRecordServiceBase,
+    ModelScanRecord,
     ModelSummary,
     UnknownModelException,
 )
 from invokeai.app.services.shared.pagination import PaginatedResults
 from invokeai.app.services.shared.sqlite.sqlite_database import SqliteDatabase
+from invokeai.backend.model_hash.model_hash import FileHashKey
 from invokeai.backend.model_manager.configs.factory import AnyModelConfig, ModelConfigFactory
 from invokeai.backend.model_manager.taxonomy import BaseModelType, ModelFormat, ModelType
 
 
+@dataclass
+class ModelConfigCacheStats:
+    """Statistics of the cache of parsed model configs."""
+
+    hits: int = 0  # configs validated directly against their cached config class
+    misses: int = 0  # configs validated against the AnyModelConfig union
+    invalidations: int = 0  # configs dropped from the cache when their model was changed or deleted
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
 class ModelRecordServiceSQL(ModelRecordServiceBase):
     """Implementation of the ModelConfigStore ABC using a SQL database."""
 
@@ -74,6 +92,53 @@ class ModelRecordServiceSQL(ModelRecordServiceBase):
         super().__init__()
         self._db = db
         self._logger = logger
+        # Validating a config against the AnyModelConfig union is slow, and the same configs are fetched over and over
+        # while building and running graphs. The config class each model's JSON resolved to is cached by key, along
+        # with that JSON, and later lookups validate the JSON against the class directly. The cached class is only used
+        # if the JSON in the database is unchanged, so changes made to the database from elsewhere are picked up too.
+        self._config_cache: dict[str, tuple[str, type[pydantic.BaseModel]]] = {}
+        self._config_cache_lock = threading.Lock()
+        self._config_cache_stats = ModelConfigCacheStats()
+
+    @property
+    def cache_stats(self) -> ModelConfigCacheStats:
+        """Return a snapshot of the statistics of the parsed config cache."""
+        with self._config_cache_lock:
+            return ModelConfigCacheStats(
+                hits=self._config_cache_stats.hits,
+                misses=self._config_cache_stats.misses,
+                invalidations=self._config_cache_stats.invalidations,
+            )
+
+    def _parse_config(self, key: str, config_json: str) -> AnyModelConfig:
+        """Return the config for a model from its JSON, skipping the AnyModelConfig union if its class is cached.
+
+        Each call validates the JSON into a new config, so callers may change the config (including nested fields such
+        as its default settings) freely. Configs are not cached themselves, because copying a config costs more than
+        validating it against its class.
+
+        Can raise a pydantic.ValidationError if the config is invalid.
+        """
+        with self._config_cache_lock:
+            cached = self._config_cache.get(key)
+            if cached is not None and cached[0] == config_json:
+                self._config_cache_stats.hits += 1
+                config_class = cached[1]
+            else:
+                self._config_cache_stats.misses += 1
+                config_class = None
+        if config_class is not None:
+            return cast(AnyModelConfig, config_class.model_validate_json(config_json))
+        config = ModelConfigFactory.from_json(config_json)
+        with self._config_cache_lock:
+            self._config_cache[key] = (config_json, type(config))
+        return config
+
+    def _invalidate_config(self, key: str) -> None:
+        """Drop a model's config from the parsed config cache."""
+        with self._config_cache_lock:
+            if self._config_cache.pop(key, None) is not None:
+                self._config_cache_stats.invalidations += 1
 
     def add_model(self, config: AnyModelConfig) -> AnyModelConfig:
         """
@@ -113,6 +178,7 @@ class ModelRecordServiceSQL(ModelRecordServiceBase):
                 else:
                     raise e
 
+        self._invalidate_config(config.key)
         return self.get_model(config.key)
 
     def del_model(self, key: str) -> None:
@@ -133,6 +199,7 @@ class ModelRecordServiceSQL(ModelRecordServiceBase):
             )
             if cursor.rowcount == 0:
                 raise UnknownModelException("model not found")
+        self._invalidate_config(key)
 
     def update_model(self, key: str, changes: ModelRecordChanges, allow_class_change: bool = False) -> AnyModelConfig:
         with self._db.transaction() as cursor:
@@ -177,6 +244,7 @@ class ModelRecordServiceSQL(ModelRecordServiceBase):
             if cursor.rowcount == 0:
                 raise UnknownModelException("model not found")
 
+        self._invalidate_config(key)
         return self.get_model(key)
 
     def replace_model(self, key: str, new_config: AnyModelConfig) -> AnyModelConfig:
@@ -194,6 +262,7 @@ class ModelRecordServiceSQL(ModelRecordServiceBase):
             )
             if cursor.rowcount == 0:
                 raise UnknownModelException("model not found")
+        self._invalidate_config(key)
         return self.get_model(key)
 
     def get_model(self, key: str) -> AnyModelConfig:
@@ -215,14 +284,14 @@ class ModelRecordServiceSQL(ModelRecordServiceBase):
             rows = cursor.fetchone()
         if not rows:
             raise UnknownModelException("model not found")
-        model = ModelConfigFactory.from_dict(json.loads(rows[0]))
+        model = self._parse_config(key, rows[0])
         return model
 
     def get_model_by_hash(self, hash: str) -> AnyModelConfig:
         with self._db.transaction() as cursor:
             cursor.execute(
                 """--sql
-                SELECT config FROM models
+                SELECT id, config FROM models
                 WHERE hash=?;
                 """,
                 (hash,),
@@ -230,7 +299,7 @@ class ModelRecordServiceSQL(ModelRecordServiceBase):
             rows = cursor.fetchone()
         if not rows:
             raise UnknownModelException("model not found")
-        model = ModelConfigFactory.from_dict(json.loads(rows[0]))
+        model = self._parse_config(rows[0], rows[1])
         return model
 
     def exists(self, key: str) -> bool:
@@ -298,7 +367,7 @@ class ModelRecordServiceSQL(ModelRecordServiceBase):
 
             cursor.execute(
                 f"""--sql
-                SELECT config
+                SELECT id, config
                 FROM models
                 {where}
                 ORDER BY {ordering[order_by]} -- using ? to bind doesn't work here for some reason;
@@ -309,16 +378,16 @@ class ModelRecordServiceSQL(ModelRecordServiceBase):
 
         # Parse the model configs.
         results: list[AnyModelConfig] = []
-        for row in result:
+        for key, config_json in result:
             try:
-                model_config = ModelConfigFactory.from_dict(json.loads(row[0]))
+                model_config = self._parse_config(key, config_json)
             except pydantic.ValidationError as e:
                 # We catch this error so that the app can still run if there are invalid model configs in the database.
                 # One reason that an invalid model config might be in the database is if someone had to rollback from a
                 # newer version of the app that added a new model type.
-                row_data = f"{row[0][:64]}..." if len(row[0]) > 64 else row[0]
+                row_data = f"{config_json[:64]}..." if len(config_json) > 64 else config_json
                 try:
-                    name = json.loads(row[0]).get("name", "<unknown>")
+                    name = json.loads(config_json).get("name", "<unknown>")
                 except Exception:
                     name = "<unknown>"
                 self._logger.warning(
@@ -335,12 +404,13 @@ class ModelRecordServiceSQL(ModelRecordServiceBase):
         with self._db.transaction() as cursor:
             cursor.execute(
                 """--sql
-                SELECT config FROM models
+                SELECT id, config FROM models
                 WHERE path=?;
                 """,
                 (str(path),),
             )
-            results = [ModelConfigFactory.from_dict(json.loads(x[0])) for x in cursor.fetchall()]
+            rows = cursor.fetchall()
+        results = [self._parse_config(key, config_json) for key, config_json in rows]
         return results
 
     def search_by_hash(self, hash: str) -> List[AnyModelConfig]:
@@ -348,14 +418,71 @@ class ModelRecordServiceSQL(ModelRecordServiceBase):
         with self._db.transaction() as cursor:
             cursor.execute(
                 """--sql
-                SELECT config FROM models
+                SELECT id, config FROM models
                 WHERE hash=?;
                 """,
                 (hash,),
             )
-            results = [ModelConfigFactory.from_dict(json.loads(x[0])) for x in cursor.fetchall()]
+            rows = cursor.fetchall()
+        results = [self._parse_config(key, config_json) for key, config_json in rows]
         return results
 
+    def get_scan_records(self) -> dict[str, ModelScanRecord]:
+        with self._db.transaction() as cursor:
+            cursor.execute(
+                """--sql
+                SELECT path, size, mtime_ns, model_key FROM model_scan_records;
+                """
+            )
+            rows = cursor.fetchall()
+        return {row["path"]: ModelScanRecord.model_validate(dict(row)) for row in rows}
+
+    def save_scan_records(self, records: List[ModelScanRecord]) -> None:
+        with self._db.transaction() as cursor:
+            cursor.executemany(
+                """--sql
+                INSERT INTO model_scan_records (path, size, mtime_ns, model_key)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT (path) DO UPDATE SET
+                    size = excluded.size,
+                    mtime_ns = excluded.mtime_ns,
+                    model_key = excluded.model_key,
+                    updated_at = STRFTIME('%Y-%m-%d %H:%M:%f', 'NOW');
+                """,
+                [(r.path, r.size, r.mtime_ns, r.model_key) for r in records],
+            )
+
+    def delete_scan_records(self, paths: List[str]) -> None:
+        with self._db.transaction() as cursor:
+            cursor.executemany(
+                """--sql
+                DELETE FROM model_scan_records WHERE path = ?;
+                """,
+                [(path,) for path in paths],
+            )
+
+    def get_file_hash(self, key: FileHashKey) -> Optional[str]:
+        with self._db.transaction() as cursor:
+            cursor.execute(
+                """--sql
+                SELECT hash FROM model_file_hashes
+                WHERE inode = ? AND size = ? AND mtime_ns = ? AND algorithm = ?;
+                """,
+                (key.inode, key.size, key.mtime_ns, key.algorithm),
+            )
+            row = cursor.fetchone()
+        return row["hash"] if row is not None else None
+
+    def set_file_hash(self, key: FileHashKey, file_hash: str) -> None:
+        with self._db.transaction() as cursor:
+            cursor.execute(
+                """--sql
+                INSERT OR REPLACE INTO model_file_hashes (inode, size, mtime_ns, algorithm, hash)
+                VALUES (?, ?, ?, ?, ?);
+                """,
+                (key.inode, key.size, key.mtime_ns, key.algorithm, file_hash),
+            )
+
     def list_models(
         self, page: int = 0, per_page: int = 10, order_by: ModelRecordOrderBy = ModelRecordOrderBy.Default
     ) -> PaginatedResults[ModelSummary]:
@@ -1,5 +1,21 @@
+from dataclasses import dataclass
+
+
 class ObjectNotFoundError(KeyError):
     """Raised when an object is not found while loading"""
 
     def __init__(self, name: str) -> None:
         super().__init__(f"Object with name {name} not found")
+
+
+@dataclass
+class ObjectCacheStats:
+    """Statistics for an in-memory object cache."""
+
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    evicted_bytes: int = 0
+    size: int = 0  # number of objects in the cache
+    size_bytes: int = 0  # approximate size of the objects in the cache
+    max_size_bytes: int = 0  # memory budget of the cache, or 0 if not limited by size
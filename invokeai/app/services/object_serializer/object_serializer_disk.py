@@ -1,14 +1,22 @@
+import dataclasses
+import json
 import shutil
 import tempfile
+import threading
 import typing
+from contextlib import suppress
 from pathlib import Path
-from typing import TYPE_CHECKING, Optional, TypeVar
+from queue import Queue
+from typing import TYPE_CHECKING, Any, Literal, Optional, TypeVar
 
 import torch
+from safetensors import safe_open
+from safetensors.torch import save_file
 
 from invokeai.app.services.object_serializer.object_serializer_base import ObjectSerializerBase
 from invokeai.app.services.object_serializer.object_serializer_common import ObjectNotFoundError
 from invokeai.app.util.misc import uuid_string
+from invokeai.backend.util.logging import InvokeAILogger
 
 if TYPE_CHECKING:
     from invokeai.app.services.invoker import Invoker
@@ -16,13 +24,82 @@ if TYPE_CHECKING:
 
 T = TypeVar("T")
 
+OBJECT_FILE_FORMAT = Literal["torch", "safetensors"]
+
+SAFETENSORS_SUFFIX = ".safetensors"
+SAFETENSORS_STRUCTURE_KEY = "invokeai_object"
+"""The safetensors metadata key holding the JSON description of the serialized object's structure."""
+
+
+class _UnsupportedObjectError(Exception):
+    """Raised when an object cannot be serialized as safetensors."""
+
+
+def _encode_object(obj: Any, tensors: dict[str, torch.Tensor], dataclass_types: dict[str, type]) -> Any:
+    """Encodes an object as JSON-serializable structure, moving its tensors into `tensors`.
+
+    Tensors, `None`, scalars, lists, tuples and dataclasses whose type is in `dataclass_types` are supported."""
+    if isinstance(obj, torch.Tensor):
+        key = str(len(tensors))
+        tensor = obj.detach().to("cpu").contiguous()
+        # safetensors refuses to save tensors that share memory, so copy views and repeated tensors
+        storage = tensor.untyped_storage()
+        if storage.nbytes() != tensor.nbytes or any(
+            t.untyped_storage().data_ptr() == storage.data_ptr() for t in tensors.values()
+        ):
+            tensor = tensor.clone()
+        tensors[key] = tensor
+        return {"tensor": key, "device": str(obj.device)}
+    if obj is None or isinstance(obj, (bool, int, float, str)):
+        return {"value": obj}
+    if isinstance(obj, (list, tuple)):
+        return {
+            "list" if isinstance(obj, list) else "tuple": [_encode_object(o, tensors, dataclass_types) for o in obj]
+        }
+    if dataclasses.is_dataclass(obj) and dataclass_types.get(type(obj).__name__) is type(obj):
+        return {
+            "dataclass": type(obj).__name__,
+            "fields": {
+                f.name: _encode_object(getattr(obj, f.name), tensors, dataclass_types)
+                for f in dataclasses.fields(obj)
+                if f.init
+            },
+        }
+    raise _UnsupportedObjectError(type(obj).__name__)
+
+
+def _decode_object(structure: Any, tensors: dict[str, torch.Tensor], dataclass_types: dict[str, type]) -> Any:
+    """Decodes a structure created by `_encode_object`."""
+    if "tensor" in structure:
+        tensor = tensors[structure["tensor"]]
+        return tensor if structure["device"] == "cpu" else tensor.to(structure["device"])
+    if "value" in structure:
+        return structure["value"]
+    if "list" in structure:
+        return [_decode_object(s, tensors, dataclass_types) for s in structure["list"]]
+    if "tuple" in structure:
+        return tuple(_decode_object(s, tensors, dataclass_types) for s in structure["tuple"])
+    dataclass_type = dataclass_types[structure["dataclass"]]
+    return dataclass_type(
+        **{name: _decode_object(s, tensors, dataclass_types) for name, s in structure["fields"].items()}
+    )
+
 
 class ObjectSerializerDisk(ObjectSerializerBase[T]):
     """Disk-backed storage for arbitrary python objects. Serialization is handled by `torch.save` and `torch.load`.
 
+    In the "safetensors" file format, tensors, and dataclasses of tensors whose types are in `safe_globals` (e.g.
+    conditioning), are instead stored as safetensors files, with the object's structure as JSON in the file's metadata.
+    These files are loaded memory-mapped, so loading does not deserialize or copy the tensor data. Objects that cannot
+    be stored as safetensors fall back to `torch.save`.
+
     :param output_dir: The folder where the serialized objects will be stored
     :param safe_globals: A list of types to be added to the safe globals for torch serialization
     :param ephemeral: If True, objects will be stored in a temporary directory inside the given output_dir and cleaned up on exit
+    :param file_format: The file format to save objects in, "torch" or "safetensors"
+    :param write_behind: If True, `save` returns immediately and objects are written to disk by a background thread.
+        Unwritten objects are held in memory and may be loaded and deleted as usual. `stop` writes all pending objects.
+        Objects that fail to be written are logged and dropped. Objects must not be modified after they are saved.
     """
 
     def __init__(
@@ -30,9 +107,14 @@ class ObjectSerializerDisk(ObjectSerializerBase[T]):
         output_dir: Path,
         safe_globals: list[type],
         ephemeral: bool = False,
+        file_format: OBJECT_FILE_FORMAT = "torch",
+        write_behind: bool = False,
     ) -> None:
         super().__init__()
+        self._logger = InvokeAILogger.get_logger(self.__class__.__name__)
         self._ephemeral = ephemeral
+        self._file_format = file_format
+        self._dataclass_types = {t.__name__: t for t in safe_globals if dataclasses.is_dataclass(t)}
         self._base_output_dir = output_dir
         self._base_output_dir.mkdir(parents=True, exist_ok=True)
 
@@ -50,22 +132,120 @@ class ObjectSerializerDisk(ObjectSerializerBase[T]):
 
         torch.serialization.add_safe_globals(safe_globals) if safe_globals else None
 
+        # Objects that have been saved but not yet written to disk, by name
+        self._pending: dict[str, T] = {}
+        self._pending_lock = threading.Lock()
+        # Write and delete operations, processed in order by the writer thread. `None` stops the thread.
+        self._write_queue: Queue[Optional[tuple[str, Optional[T]]]] = Queue()
+        self._writer_thread: Optional[threading.Thread] = None
+        if write_behind:
+            self._writer_thread = threading.Thread(target=self._process_write_queue, name="object-writer", daemon=True)
+            self._writer_thread.start()
+
     def load(self, name: str) -> T:
-        file_path = self._get_path(name)
-        try:
-            return torch.load(file_path)  # pyright: ignore [reportUnknownMemberType]
-        except FileNotFoundError as e:
-            raise ObjectNotFoundError(name) from e
+        with self._pending_lock:
+            if name in self._pending:
+                return self._pending[name]
+        # Objects may be in either format, so try the preferred format first
+        loaders = [self._load_torch, self._load_safetensors]
+        if self._file_format == "safetensors":
+            loaders.reverse()
+        for loader in loaders:
+            try:
+                return loader(name)
+            except FileNotFoundError:
+                pass
+        raise ObjectNotFoundError(name)
 
     def save(self, obj: T) -> str:
         name = self._new_name()
-        file_path = self._get_path(name)
-        torch.save(obj, file_path)  # pyright: ignore [reportUnknownMemberType]
+        if self._writer_thread is not None:
+            with self._pending_lock:
+                self._pending[name] = obj
+            self._write_queue.put((name, obj))
+            return name
+        self._write(name, obj)
         return name
 
     def delete(self, name: str) -> None:
+        if self._writer_thread is not None:
+            with self._pending_lock:
+                was_pending = self._pending.pop(name, None) is not None
+            if not was_pending and not self._exists(name):
+                raise FileNotFoundError(name)
+            # Queued behind any pending write of the object, so the file is deleted after it is written
+            self._write_queue.put((name, None))
+            return
+        self._delete(name)
+
+    def flush(self) -> None:
+        """Blocks until all pending objects have been written to disk."""
+        if self._writer_thread is not None:
+            self._write_queue.join()
+
+    def _process_write_queue(self) -> None:
+        while True:
+            operation = self._write_queue.get()
+            if operation is None:
+                self._write_queue.task_done()
+                return
+            name, obj = operation
+            try:
+                if obj is None:
+                    self._delete(name, missing_ok=True)
+                    continue
+                with self._pending_lock:
+                    if self._pending.get(name) is not obj:
+                        # Deleted before it was written
+                        continue
+                self._write(name, obj)
+            except Exception as e:
+                # Failed writes are dropped rather than kept pending, so they do not hold objects in memory forever
+                self._logger.error(f"Failed to {'delete' if obj is None else 'write'} object {name}: {e}")
+                if obj is not None:
+                    # Remove any partially written file
+                    with suppress(OSError):
+                        self._delete(name, missing_ok=True)
+            finally:
+                if obj is not None:
+                    with self._pending_lock:
+                        if self._pending.get(name) is obj:
+                            del self._pending[name]
+                self._write_queue.task_done()
+
+    def _write(self, name: str, obj: T) -> None:
+        if self._file_format == "safetensors":
+            try:
+                self._save_safetensors(obj, self._get_safetensors_path(name))
+                return
+            except _UnsupportedObjectError:
+                pass
+        file_path = self._get_path(name)
+        torch.save(obj, file_path)  # pyright: ignore [reportUnknownMemberType]
+
+    def _exists(self, name: str) -> bool:
+        return self._get_path(name).exists() or self._get_safetensors_path(name).exists()
+
+    def _delete(self, name: str, missing_ok: bool = False) -> None:
         file_path = self._get_path(name)
-        file_path.unlink()
+        if not file_path.exists():
+            file_path = self._get_safetensors_path(name)
+        file_path.unlink(missing_ok=missing_ok)
+
+    def _save_safetensors(self, obj: T, file_path: Path) -> None:
+        tensors: dict[str, torch.Tensor] = {}
+        structure = _encode_object(obj, tensors, self._dataclass_types)
+        save_file(tensors, file_path, metadata={SAFETENSORS_STRUCTURE_KEY: json.dumps(structure)})
+
+    def _load_torch(self, name: str) -> T:
+        return torch.load(self._get_path(name))  # pyright: ignore [reportUnknownMemberType]
+
+    def _load_safetensors(self, name: str) -> T:
+        # safetensors maps the file copy-on-write, so the tensors stay valid (and writable) after the file is deleted
+        with safe_open(self._get_safetensors_path(name), framework="pt") as f:
+            structure = json.loads(f.metadata()[SAFETENSORS_STRUCTURE_KEY])
+            tensors = {key: f.get_tensor(key) for key in f.keys()}
+        return _decode_object(structure, tensors, self._dataclass_types)
 
     @property
     def _obj_class_name(self) -> str:
@@ -77,6 +257,9 @@ class ObjectSerializerDisk(ObjectSerializerBase[T]):
     def _get_path(self, name: str) -> Path:
         return self._output_dir / name
 
+    def _get_safetensors_path(self, name: str) -> Path:
+        return self._output_dir / f"{name}{SAFETENSORS_SUFFIX}"
+
     def _new_name(self) -> str:
         return f"{self._obj_class_name}_{uuid_string()}"
 
@@ -90,4 +273,9 @@ class ObjectSerializerDisk(ObjectSerializerBase[T]):
         self._tempdir_cleanup()
 
     def stop(self, invoker: "Invoker") -> None:
+        if self._writer_thread is not None:
+            self.flush()
+            self._write_queue.put(None)
+            self._writer_thread.join()
+            self._writer_thread = None
         self._tempdir_cleanup()
@@ -1,7 +1,13 @@
-from queue import Queue
-from typing import TYPE_CHECKING, Optional, TypeVar
+import dataclasses
+from collections import OrderedDict
+from threading import Lock
+from typing import TYPE_CHECKING, Any, Optional, TypeVar
+
+import torch
 
 from invokeai.app.services.object_serializer.object_serializer_base import ObjectSerializerBase
+from invokeai.app.services.object_serializer.object_serializer_common import ObjectCacheStats
+from invokeai.backend.util.calc_tensor_size import calc_tensor_size
 
 T = TypeVar("T")
 
@@ -9,18 +15,43 @@ if TYPE_CHECKING:
     from invokeai.app.services.invoker import Invoker
 
 
+def calc_object_size(obj: Any) -> int:
+    """Calculates the approximate size of an object in bytes, by summing the sizes of the tensors it holds.
+
+    Tensors nested in dataclasses, lists, tuples and dicts are counted. Anything else is considered negligible."""
+    if isinstance(obj, torch.Tensor):
+        return calc_tensor_size(obj)
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return sum(calc_object_size(getattr(obj, f.name)) for f in dataclasses.fields(obj))
+    if isinstance(obj, (list, tuple)):
+        return sum(calc_object_size(item) for item in obj)
+    if isinstance(obj, dict):
+        return sum(calc_object_size(value) for value in obj.values())
+    return 0
+
+
 class ObjectSerializerForwardCache(ObjectSerializerBase[T]):
     """
     Provides a LRU cache for an instance of `ObjectSerializerBase`.
     Saving an object to the cache always writes through to the underlying storage.
+
+    The cache is bounded by the number of objects and/or by the total size of the tensors they hold. Objects larger
+    than the whole memory budget are not cached. The cache is thread-safe.
+
+    :param underlying_storage: The storage to cache
+    :param max_cache_size: The maximum number of cached objects, or 0 to not limit the cache by count
+    :param max_cache_bytes: The maximum total size of the cached objects in bytes, or 0 to not limit the cache by size
     """
 
-    def __init__(self, underlying_storage: ObjectSerializerBase[T], max_cache_size: int = 20):
+    def __init__(self, underlying_storage: ObjectSerializerBase[T], max_cache_size: int = 20, max_cache_bytes: int = 0):
         super().__init__()
         self._underlying_storage = underlying_storage
-        self._cache: dict[str, T] = {}
-        self._cache_ids = Queue[str]()
+        self._cache: OrderedDict[str, tuple[T, int]] = OrderedDict()
         self._max_cache_size = max_cache_size
+        self._max_cache_bytes = max_cache_bytes
+        self._cache_bytes = 0
+        self._stats = ObjectCacheStats(max_size_bytes=max_cache_bytes)
+        self._lock = Lock()
 
     def start(self, invoker: "Invoker") -> None:
         self._invoker = invoker
@@ -30,6 +61,11 @@ class ObjectSerializerForwardCache(ObjectSerializerBase[T]):
 
     def stop(self, invoker: "Invoker") -> None:
         self._invoker = invoker
+        stats = self.get_stats()
+        invoker.services.logger.debug(
+            f"Object cache stats: {stats.hits} hits, {stats.misses} misses, {stats.evictions} evictions "
+            f"({stats.evicted_bytes / 2**20:.2f}MB evicted)"
+        )
         stop_op = getattr(self._underlying_storage, "stop", None)
         if callable(stop_op):
             stop_op(invoker)
@@ -50,16 +86,45 @@ class ObjectSerializerForwardCache(ObjectSerializerBase[T]):
 
     def delete(self, name: str) -> None:
         self._underlying_storage.delete(name)
-        if name in self._cache:
-            del self._cache[name]
+        with self._lock:
+            cache_item = self._cache.pop(name, None)
+            if cache_item is not None:
+                self._cache_bytes -= cache_item[1]
         self._on_deleted(name)
 
+    def get_stats(self) -> ObjectCacheStats:
+        """Gets a snapshot of the cache's statistics."""
+        with self._lock:
+            return dataclasses.replace(self._stats, size=len(self._cache), size_bytes=self._cache_bytes)
+
     def _get_cache(self, name: str) -> Optional[T]:
-        return None if name not in self._cache else self._cache[name]
+        with self._lock:
+            cache_item = self._cache.get(name)
+            if cache_item is None:
+                self._stats.misses += 1
+                return None
+            self._cache.move_to_end(name)
+            self._stats.hits += 1
+            return cache_item[0]
 
     def _set_cache(self, name: str, data: T):
-        if name not in self._cache:
-            self._cache[name] = data
-            self._cache_ids.put(name)
-            if self._cache_ids.qsize() > self._max_cache_size:
-                self._cache.pop(self._cache_ids.get())
+        size_bytes = calc_object_size(data)
+        if self._max_cache_bytes > 0 and size_bytes > self._max_cache_bytes:
+            return
+        with self._lock:
+            previous_item = self._cache.pop(name, None)
+            if previous_item is not None:
+                self._cache_bytes -= previous_item[1]
+            self._cache[name] = (data, size_bytes)
+            self._cache_bytes += size_bytes
+            self._evict()
+
+    def _evict(self) -> None:
+        """Evicts the least recently used objects until the cache fits within its limits. The lock must be held."""
+        while (self._max_cache_size > 0 and len(self._cache) > self._max_cache_size) or (
+            self._max_cache_bytes > 0 and self._cache_bytes > self._max_cache_bytes
+        ):
+            _, (_, size_bytes) = self._cache.popitem(last=False)
+            self._cache_bytes -= size_bytes
+            self._stats.evictions += 1
+            self._stats.evicted_bytes += size_bytes
@@ -1,7 +1,8 @@
-from PIL.Image import Image as PILImageType
-from pydantic import BaseModel, Field
+import base64
+import io
 
-from invokeai.backend.util.util import image_to_dataURL
+from PIL.Image import Image as PILImageType
+from pydantic import BaseModel, Field, PrivateAttr
 
 
 class SessionProcessorStatus(BaseModel):
@@ -22,12 +23,32 @@ class ProgressImage(BaseModel):
     height: int = Field(ge=1, description="The effective height of the image in pixels")
     dataURL: str = Field(description="The image data as a b64 data URL")
 
+    # The encoded image, kept so that it can be sent as binary without decoding the data URL
+    _image_bytes: bytes | None = PrivateAttr(default=None)
+
     @classmethod
     def build(cls, image: PILImageType, size: tuple[int, int] | None = None) -> "ProgressImage":
         """Build a ProgressImage from a PIL image"""
 
-        return cls(
+        buffered = io.BytesIO()
+        image.save(buffered, format="JPEG")
+        image_bytes = buffered.getvalue()
+        progress_image = cls(
             width=size[0] if size else image.width,
             height=size[1] if size else image.height,
-            dataURL=image_to_dataURL(image, image_format="JPEG"),
+            dataURL="data:image/jpeg;base64," + base64.b64encode(image_bytes).decode("UTF-8"),
         )
+        progress_image._image_bytes = image_bytes
+        return progress_image
+
+    @property
+    def mime_type(self) -> str:
+        """The MIME type of the image, e.g. `image/jpeg`"""
+        return self.dataURL[len("data:") : self.dataURL.index(";")]
+
+    @property
+    def image_bytes(self) -> bytes:
+        """The encoded image"""
+        if self._image_bytes is None:
+            self._image_bytes = base64.b64decode(self.dataURL[self.dataURL.index(",") + 1 :])
+        return self._image_bytes
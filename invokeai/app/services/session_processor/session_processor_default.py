@@ -1,13 +1,17 @@
+import copy
 import gc
+import itertools
 import traceback
 from contextlib import suppress
-from threading import BoundedSemaphore, Thread
+from dataclasses import dataclass
+from threading import BoundedSemaphore, Condition, Lock, Thread
 from threading import Event as ThreadEvent
-from typing import Optional
+from typing import Callable, Optional
 
 from invokeai.app.invocations.baseinvocation import BaseInvocation, BaseInvocationOutput
 from invokeai.app.services.events.events_common import (
     BatchEnqueuedEvent,
+    BatchEnqueueProgressEvent,
     FastAPIEvent,
     QueueClearedEvent,
     QueueItemStatusChangedEvent,
@@ -31,6 +35,53 @@ from invokeai.app.services.session_queue.session_queue_common import SessionQueu
 from invokeai.app.services.shared.graph import NodeInputError
 from invokeai.app.services.shared.invocation_context import InvocationContextData, build_invocation_context
 from invokeai.app.util.profiler import Profiler
+from invokeai.app.util.step_callback import PreviewThrottle
+
+
+class DeviceStage:
+    """Serializes the device-bound stages of sessions that are run concurrently.
+
+    A session runner enters the device stage when the node it is running first loads a model, and leaves it when that
+    node finishes. Only one node at a time may use models, so the model cache's locking and VRAM accounting behave as
+    if sessions were run one at a time, while the other nodes of concurrent sessions (image ops, metadata, saving
+    outputs, etc) overlap with it. Waiting runners enter the stage in the order their queue items were dequeued.
+    """
+
+    # How often waiting runners check whether their session has been canceled, in seconds
+    _CANCEL_POLL_INTERVAL = 0.1
+
+    def __init__(self) -> None:
+        self._condition = Condition()
+        self._owner: Optional[int] = None
+        self._waiting: set[int] = set()
+
+    def enter(self, order: int, is_canceled: Callable[[], bool]) -> None:
+        """Waits for and enters the device stage.
+
+        Args:
+            order: The order in which the runner's queue item was dequeued. Lower orders enter first.
+            is_canceled: Returns whether the runner's session has been canceled.
+
+        Raises:
+            CanceledException: If the session is canceled while waiting.
+        """
+        with self._condition:
+            self._waiting.add(order)
+            try:
+                while self._owner is not None or min(self._waiting) != order:
+                    if is_canceled():
+                        raise CanceledException
+                    self._condition.wait(self._CANCEL_POLL_INTERVAL)
+                self._owner = order
+            finally:
+                self._waiting.discard(order)
+                self._condition.notify_all()
+
+    def leave(self) -> None:
+        """Leaves the device stage."""
+        with self._condition:
+            self._owner = None
+            self._condition.notify_all()
 
 
 class DefaultSessionRunner(SessionRunnerBase):
@@ -59,10 +110,30 @@ class DefaultSessionRunner(SessionRunnerBase):
         self._on_node_error_callbacks = on_node_error_callbacks or []
         self._on_after_run_session_callbacks = on_after_run_session_callbacks or []
 
-    def start(self, services: InvocationServices, cancel_event: ThreadEvent, profiler: Optional[Profiler] = None):
+    def start(
+        self,
+        services: InvocationServices,
+        cancel_event: ThreadEvent,
+        profiler: Optional[Profiler] = None,
+        device_stage: Optional[DeviceStage] = None,
+    ):
+        """
+        Args:
+            services: The invocation services.
+            cancel_event: The cancel event.
+            profiler: The profiler to use for session profiling via cProfile. Omit to disable profiling.
+            device_stage: The device stage to enter when a node loads a model, if sessions are run concurrently.
+        """
         self._services = services
         self._cancel_event = cancel_event
         self._profiler = profiler
+        self._device_stage = device_stage
+        # The order in which the current queue item was dequeued, used to order entry to the device stage
+        self._order = 0
+
+    def set_order(self, order: int) -> None:
+        """Sets the order in which the queue item about to be run was dequeued."""
+        self._order = order
 
     def _is_canceled(self) -> bool:
         """Check if the cancel event is set. This is also passed to the invocation context builder and called during
@@ -110,6 +181,14 @@ class DefaultSessionRunner(SessionRunnerBase):
         self._on_after_run_session(queue_item=queue_item)
 
     def run_node(self, invocation: BaseInvocation, queue_item: SessionQueueItem):
+        in_device_stage = False
+
+        def on_load_model() -> None:
+            nonlocal in_device_stage
+            if self._device_stage is not None and not in_device_stage:
+                self._device_stage.enter(self._order, self._is_canceled)
+                in_device_stage = True
+
         try:
             # Any unhandled exception in this scope is an invocation error & will fail the graph
             with self._services.performance_statistics.collect_stats(invocation, queue_item.session_id):
@@ -124,6 +203,12 @@ class DefaultSessionRunner(SessionRunnerBase):
                     data=data,
                     services=self._services,
                     is_canceled=self._is_canceled,
+                    on_load_model=on_load_model,
+                    # Each invocation gets its own throttle, so its first and final steps are always previewed
+                    preview_throttle=PreviewThrottle(
+                        min_interval=self._services.configuration.progress_image_interval_ms / 1000,
+                        every_n_steps=self._services.configuration.progress_image_every_n_steps,
+                    ),
                 )
 
                 # Invoke the node
@@ -155,6 +240,10 @@ class DefaultSessionRunner(SessionRunnerBase):
                 error_message=error_message,
                 error_traceback=error_traceback,
             )
+        finally:
+            if in_device_stage:
+                assert self._device_stage is not None
+                self._device_stage.leave()
 
     def _on_before_run_session(self, queue_item: SessionQueueItem) -> None:
         """Called before a session is run.
@@ -308,7 +397,31 @@ class DefaultSessionRunner(SessionRunnerBase):
             )
 
 
+@dataclass
+class _SessionWorker:
+    """The state of one of the session processor's worker threads."""
+
+    session_runner: SessionRunnerBase
+    cancel_event: ThreadEvent
+    queue_item: Optional[SessionQueueItem] = None
+
+
 class DefaultSessionProcessor(SessionProcessorBase):
+    """Runs queue items in one or more worker threads.
+
+    With a single worker (the default), queue items are run one at a time. With more workers, the next queue items are
+    dequeued and prepared while the current one runs, and their nodes run concurrently, except for nodes that use
+    models: those enter a shared `DeviceStage` one at a time, oldest queue item first. This keeps the device busy while
+    the CPU-bound nodes of the following queue items run. Each worker is canceled independently.
+
+    Args:
+        session_runner: The session runner. Additional workers run copies of it. Only the `DefaultSessionRunner` can be
+            used with more than one worker.
+        on_non_fatal_processor_error_callbacks: Callbacks to run when a non-fatal processor error occurs.
+        thread_limit: The number of worker threads.
+        polling_interval: How often to poll the queue when it is empty, in seconds.
+    """
+
     def __init__(
         self,
         session_runner: Optional[SessionRunnerBase] = None,
@@ -325,19 +438,29 @@ class DefaultSessionProcessor(SessionProcessorBase):
 
     def start(self, invoker: Invoker) -> None:
         self._invoker: Invoker = invoker
-        self._queue_item: Optional[SessionQueueItem] = None
-        self._invocation: Optional[BaseInvocation] = None
 
         self._resume_event = ThreadEvent()
         self._stop_event = ThreadEvent()
         self._poll_now_event = ThreadEvent()
-        self._cancel_event = ThreadEvent()
 
         register_events(QueueClearedEvent, self._on_queue_cleared)
         register_events(BatchEnqueuedEvent, self._on_batch_enqueued)
+        register_events(BatchEnqueueProgressEvent, self._on_batch_enqueue_progress)
         register_events(QueueItemStatusChangedEvent, self._on_queue_item_status_changed)
 
-        self._thread_semaphore = BoundedSemaphore(self._thread_limit)
+        worker_count = self._thread_limit
+        if worker_count > 1 and not isinstance(self.session_runner, DefaultSessionRunner):
+            self._invoker.services.logger.warning(
+                "Concurrent session processing requires the default session runner, using a single worker"
+            )
+            worker_count = 1
+        if worker_count > 1 and self._invoker.services.configuration.profile_graphs:
+            self._invoker.services.logger.warning("Graph profiling is not supported with concurrent session processing")
+
+        self._thread_semaphore = BoundedSemaphore(worker_count)
+        # Dequeuing and assigning the dequeue order must be atomic across workers
+        self._dequeue_lock = Lock()
+        self._dequeue_order = itertools.count()
 
         # If profiling is enabled, create a profiler. The same profiler will be used for all sessions. Internally,
         # the profiler will create a new profile for each session.
@@ -347,22 +470,42 @@ class DefaultSessionProcessor(SessionProcessorBase):
                 output_dir=self._invoker.services.configuration.profiles_path,
                 prefix=self._invoker.services.configuration.profile_prefix,
             )
-            if self._invoker.services.configuration.profile_graphs
+            if self._invoker.services.configuration.profile_graphs and worker_count == 1
             else None
         )
 
-        self.session_runner.start(services=invoker.services, cancel_event=self._cancel_event, profiler=self._profiler)
-        self._thread = Thread(
-            name="session_processor",
-            target=self._process,
-            kwargs={
-                "stop_event": self._stop_event,
-                "poll_now_event": self._poll_now_event,
-                "resume_event": self._resume_event,
-                "cancel_event": self._cancel_event,
-            },
-        )
-        self._thread.start()
+        device_stage = DeviceStage() if worker_count > 1 else None
+        self._workers: list[_SessionWorker] = []
+        for i in range(worker_count):
+            session_runner = self.session_runner if i == 0 else copy.copy(self.session_runner)
+            cancel_event = ThreadEvent()
+            if isinstance(session_runner, DefaultSessionRunner):
+                session_runner.start(
+                    services=invoker.services,
+                    cancel_event=cancel_event,
+                    profiler=self._profiler,
+                    device_stage=device_stage,
+                )
+            else:
+                session_runner.start(services=invoker.services, cancel_event=cancel_event, profiler=self._profiler)
+            self._workers.append(_SessionWorker(session_runner=session_runner, cancel_event=cancel_event))
+
+        self._stop_event.clear()
+        self._resume_event.set()
+        self._threads: list[Thread] = []
+        for i, worker in enumerate(self._workers):
+            thread = Thread(
+                name="session_processor" if i == 0 else f"session_processor_{i}",
+                target=self._process,
+                kwargs={
+                    "worker": worker,
+                    "stop_event": self._stop_event,
+                    "poll_now_event": self._poll_now_event,
+                    "resume_event": self._resume_event,
+                },
+            )
+            self._threads.append(thread)
+            thread.start()
 
     def stop(self, *args, **kwargs) -> None:
         self._stop_event.set()
@@ -371,28 +514,35 @@ class DefaultSessionProcessor(SessionProcessorBase):
         self._poll_now_event.set()
 
     async def _on_queue_cleared(self, event: FastAPIEvent[QueueClearedEvent]) -> None:
-        if self._queue_item and self._queue_item.queue_id == event[1].queue_id:
-            self._cancel_event.set()
-            self._poll_now()
+        for worker in self._workers:
+            if worker.queue_item and worker.queue_item.queue_id == event[1].queue_id:
+                worker.cancel_event.set()
+                self._poll_now()
 
     async def _on_batch_enqueued(self, event: FastAPIEvent[BatchEnqueuedEvent]) -> None:
         self._poll_now()
 
+    async def _on_batch_enqueue_progress(self, event: FastAPIEvent[BatchEnqueueProgressEvent]) -> None:
+        # The first chunks of a large batch may be processed while the rest are enqueued
+        self._poll_now()
+
     async def _on_queue_item_status_changed(self, event: FastAPIEvent[QueueItemStatusChangedEvent]) -> None:
-        # Make sure the cancel event is for the currently processing queue item
-        if self._queue_item and self._queue_item.item_id != event[1].item_id:
-            return
-        if self._queue_item and event[1].status in ["completed", "failed", "canceled"]:
-            # When the queue item is canceled via HTTP, the queue item status is set to `"canceled"` and this event is
-            # emitted. We need to respond to this event and stop graph execution. This is done by setting the cancel
-            # event, which the session runner checks between invocations. If set, the session runner loop is broken.
-            #
-            # Long-running nodes that cannot be interrupted easily present a challenge. `denoise_latents` is one such
-            # node, but it gets a step callback, called on each step of denoising. This callback checks if the queue item
-            # is canceled, and if it is, raises a `CanceledException` to stop execution immediately.
-            if event[1].status == "canceled":
-                self._cancel_event.set()
-            self._poll_now()
+        for worker in self._workers:
+            # Make sure the cancel event is for the queue item this worker is processing
+            if not worker.queue_item or worker.queue_item.item_id != event[1].item_id:
+                continue
+            if event[1].status in ["completed", "failed", "canceled"]:
+                # When the queue item is canceled via HTTP, the queue item status is set to `"canceled"` and this event
+                # is emitted. We need to respond to this event and stop graph execution. This is done by setting the
+                # worker's cancel event, which the session runner checks between invocations. If set, the session
+                # runner loop is broken.
+                #
+                # Long-running nodes that cannot be interrupted easily present a challenge. `denoise_latents` is one
+                # such node, but it gets a step callback, called on each step of denoising. This callback checks if the
+                # queue item is canceled, and if it is, raises a `CanceledException` to stop execution immediately.
+                if event[1].status == "canceled":
+                    worker.cancel_event.set()
+                self._poll_now()
 
     def resume(self) -> SessionProcessorStatus:
         if not self._resume_event.is_set():
@@ -407,22 +557,20 @@ class DefaultSessionProcessor(SessionProcessorBase):
     def get_status(self) -> SessionProcessorStatus:
         return SessionProcessorStatus(
             is_started=self._resume_event.is_set(),
-            is_processing=self._queue_item is not None,
+            is_processing=any(worker.queue_item is not None for worker in self._workers),
         )
 
     def _process(
         self,
+        worker: _SessionWorker,
         stop_event: ThreadEvent,
         poll_now_event: ThreadEvent,
         resume_event: ThreadEvent,
-        cancel_event: ThreadEvent,
     ):
         try:
-            # Any unhandled exception in this block is a fatal processor error and will stop the processor.
+            # Any unhandled exception in this block is a fatal processor error and will stop the worker.
             self._thread_semaphore.acquire()
-            stop_event.clear()
-            resume_event.set()
-            cancel_event.clear()
+            worker.cancel_event.clear()
 
             while not stop_event.is_set():
                 poll_now_event.clear()
@@ -432,9 +580,11 @@ class DefaultSessionProcessor(SessionProcessorBase):
                     resume_event.wait()
 
                     # Get the next session to process
-                    self._queue_item = self._invoker.services.session_queue.dequeue()
+                    with self._dequeue_lock:
+                        worker.queue_item = self._invoker.services.session_queue.dequeue()
+                        dequeue_order = next(self._dequeue_order)
 
-                    if self._queue_item is None:
+                    if worker.queue_item is None:
                         # The queue was empty, wait for next polling interval or event to try again
                         self._invoker.services.logger.debug("Waiting for next polling interval or event")
                         poll_now_event.wait(self._polling_interval)
@@ -447,19 +597,21 @@ class DefaultSessionProcessor(SessionProcessorBase):
                     gc.collect()
 
                     self._invoker.services.logger.info(
-                        f"Executing queue item {self._queue_item.item_id}, session {self._queue_item.session_id}"
+                        f"Executing queue item {worker.queue_item.item_id}, session {worker.queue_item.session_id}"
                     )
-                    cancel_event.clear()
+                    worker.cancel_event.clear()
 
                     # Run the graph
-                    self.session_runner.run(queue_item=self._queue_item)
+                    if isinstance(worker.session_runner, DefaultSessionRunner):
+                        worker.session_runner.set_order(dequeue_order)
+                    worker.session_runner.run(queue_item=worker.queue_item)
 
                 except Exception as e:
                     error_type = e.__class__.__name__
                     error_message = str(e)
                     error_traceback = traceback.format_exc()
                     self._on_non_fatal_processor_error(
-                        queue_item=self._queue_item,
+                        queue_item=worker.queue_item,
                         error_type=error_type,
                         error_message=error_message,
                         error_traceback=error_traceback,
@@ -476,9 +628,8 @@ class DefaultSessionProcessor(SessionProcessorBase):
             self._invoker.services.logger.error(error_traceback)
             pass
         finally:
-            stop_event.clear()
             poll_now_event.clear()
-            self._queue_item = None
+            worker.queue_item = None
             self._thread_semaphore.release()
 
     def _on_non_fatal_processor_error(
@@ -17,6 +17,11 @@ from pydantic_core import to_jsonable_python
 
 from invokeai.app.invocations.fields import ImageField
 from invokeai.app.services.shared.graph import Graph, GraphExecutionState, NodeNotFoundError
+from invokeai.app.services.shared.sqlite.sqlite_compression import (
+    compress_json,
+    compress_json_or_none,
+    decompress_json,
+)
 from invokeai.app.services.workflow_records.workflow_records_common import (
     WorkflowWithoutID,
     WorkflowWithoutIDValidator,
@@ -192,8 +197,19 @@ def get_field_values(queue_item_dict: dict) -> Optional[list[NodeFieldValue]]:
 GraphExecutionStateValidator = TypeAdapter(GraphExecutionState)
 
 
+TEMPLATED_SESSION = ""
+"""Stored in the `session` column of queue items whose session is not stored in full. These sessions are materialized
+from their batch's session template and the queue item's field values when the queue item is read."""
+
+
 def get_session(queue_item_dict: dict) -> GraphExecutionState:
-    session_raw = queue_item_dict.get("session", "{}")
+    session_raw = decompress_json(queue_item_dict.get("session", "{}"))
+    if session_raw == TEMPLATED_SESSION:
+        session_raw = materialize_session(
+            session_template=queue_item_dict["session_template"],
+            session_id=queue_item_dict["session_id"],
+            field_values_json=queue_item_dict.get("field_values", None),
+        )
     session = GraphExecutionStateValidator.validate_json(session_raw, strict=False)
     return session
 
@@ -255,11 +271,18 @@ class SessionQueueItem(BaseModel):
     )
 
     @classmethod
-    def queue_item_from_dict(cls, queue_item_dict: dict) -> "SessionQueueItem":
-        # must parse these manually
+    def queue_item_from_dict(
+        cls, queue_item_dict: dict, session: Optional[GraphExecutionState] = None
+    ) -> "SessionQueueItem":
+        # must parse these manually - the session first, as templated sessions are materialized from the field values.
+        # If the caller already has the session, e.g. because it just stored it, it need not be parsed again.
+        for key in ("field_values", "workflow", "session_template"):
+            if key in queue_item_dict:
+                queue_item_dict[key] = decompress_json(queue_item_dict[key])
+        queue_item_dict["session"] = session if session is not None else get_session(queue_item_dict)
         queue_item_dict["field_values"] = get_field_values(queue_item_dict)
-        queue_item_dict["session"] = get_session(queue_item_dict)
         queue_item_dict["workflow"] = get_workflow(queue_item_dict)
+        queue_item_dict.pop("session_template", None)
         return SessionQueueItem(**queue_item_dict)
 
     model_config = ConfigDict(
@@ -402,11 +425,50 @@ class IsFullResult(BaseModel):
 # region Util
 
 
-def create_session_nfv_tuples(batch: Batch, maximum: int) -> Generator[tuple[str, str, str], None, None]:
+def create_session_template(batch: Batch) -> str:
+    """
+    Serializes the session template of a batch: a session with the batch's graph, before any field values are
+    substituted into it. The session ID in the template is a placeholder.
+
+    Sessions are materialized from the template with `materialize_session()`.
+    """
+    graph_as_dict = batch.graph.model_dump(warnings=False, exclude_none=True)
+    session_dict = GraphExecutionState(graph=Graph()).model_dump(warnings=False, exclude_none=True)
+    session_dict["graph"] = graph_as_dict
+    return json.dumps(session_dict, default=to_jsonable_python)
+
+
+def materialize_session(session_template: str, session_id: str, field_values_json: Optional[str]) -> str:
+    """
+    Materializes a session from a batch's session template, giving the same session JSON that
+    `create_session_nfv_tuples()` generates for the session.
+
+    Args:
+        session_template: The batch's session template, from `create_session_template()`
+        session_id: The ID of the session
+        field_values_json: The field values of the session, as stringified JSON
+
+    Returns:
+        The session, as stringified JSON.
+    """
+    session_dict = json.loads(session_template)
+    session_dict["id"] = session_id
+    nodes = session_dict["graph"]["nodes"]
+    for nfv in json.loads(field_values_json) if field_values_json else []:
+        nodes[nfv["node_path"]][nfv["field_name"]] = nfv["value"]
+    return json.dumps(session_dict)
+
+
+def create_session_nfv_tuples(
+    batch: Batch, maximum: int, templated: bool = False
+) -> Generator[tuple[str, str, str], None, None]:
     """
     Given a batch and a maximum number of sessions to create, generate a tuple of session_id, session_json, and
     field_values_json for each session.
 
+    If `templated` is set, the sessions are not serialized, and `TEMPLATED_SESSION` is yielded for each session_json
+    instead. The sessions may be materialized from the batch's session template with `materialize_session()`.
+
     The batch has a "source" graph and a data property. The data property is a list of lists of BatchDatum objects.
     Each BatchDatum has a field identifier (e.g. a node id and field name), and a list of values to substitute into
     the field.
@@ -424,6 +486,7 @@ def create_session_nfv_tuples(batch: Batch, maximum: int) -> Generator[tuple[str
     Args:
         batch: The batch to generate sessions from
         maximum: The maximum number of sessions to generate
+        templated: Whether to skip serializing the sessions
 
     Returns:
         A generator that yields tuples of session_id, session_json, and field_values_json for each session. The
@@ -510,6 +573,12 @@ def create_session_nfv_tuples(batch: Batch, maximum: int) -> Generator[tuple[str
             # Need a fresh ID for each session
             session_id = uuid_string()
 
+            if templated:
+                field_values_json = json.dumps(flat_node_field_values, default=to_jsonable_python)
+                yield (session_id, TEMPLATED_SESSION, field_values_json)
+                count += 1
+                continue
+
             # Mutate the session dict in place
             session_dict["id"] = session_id
 
@@ -539,29 +608,27 @@ def calc_session_count(batch: Batch) -> int:
 
     The count is used to communicate to the user how many sessions were _requested_ to be created, as opposed to how
     many were _actually_ created (which may be less due to the maximum number of sessions).
+
+    Each list of batch data is zipped, so it contributes as many permutations as its shortest item list (the batch
+    validators ensure the lengths are equal), and the lists are combined as a cartesian product.
     """
     # TODO: Should this be a class method on Batch?
     if not batch.data:
         return batch.runs
-    data = []
+    count = batch.runs
     for batch_datum_list in batch.data:
-        to_zip = []
-        for batch_datum in batch_datum_list:
-            batch_data_items = range(len(batch_datum.items))
-            to_zip.append(batch_data_items)
-        data.append(list(zip(*to_zip, strict=True)))
-    data_product = list(product(*data))
-    return len(data_product) * batch.runs
+        count *= min((len(batch_datum.items) for batch_datum in batch_datum_list), default=0)
+    return count
 
 
 ValueToInsertTuple: TypeAlias = tuple[
     str,  # queue_id
-    str,  # session (as stringified JSON)
+    str | bytes,  # session (as stringified JSON, or compressed)
     str,  # session_id
     str,  # batch_id
-    str | None,  # field_values (optional, as stringified JSON)
+    str | bytes | None,  # field_values (optional, as stringified JSON, or compressed)
     int,  # priority
-    str | None,  # workflow (optional, as stringified JSON)
+    str | bytes | None,  # workflow (optional, as stringified JSON, or compressed)
     str | None,  # origin (optional)
     str | None,  # destination (optional)
     int | None,  # retried_from_item_id (optional, this is always None for new items)
@@ -572,23 +639,30 @@ ValueToInsertTuple: TypeAlias = tuple[
 """
 
 
-def prepare_values_to_insert(
-    queue_id: str, batch: Batch, priority: int, max_new_queue_items: int
-) -> list[ValueToInsertTuple]:
+def iter_values_to_insert(
+    queue_id: str,
+    batch: Batch,
+    priority: int,
+    max_new_queue_items: int,
+    templated: bool = False,
+    compressed: bool = False,
+) -> Generator[ValueToInsertTuple, None, None]:
     """
-    Given a batch, prepare the values to insert into the session queue table. The list of tuples can be used with an
-    `executemany` statement to insert multiple rows at once.
+    Given a batch, generate the values to insert into the session queue table, one tuple per queue item. The sessions
+    are generated lazily, so very large batches may be inserted in chunks without holding all of them in memory.
 
     Args:
         queue_id: The ID of the queue to insert the items into
         batch: The batch to prepare the values for
         priority: The priority of the queue items
         max_new_queue_items: The maximum number of queue items to insert
+        templated: Whether the sessions are materialized from the batch's session template, instead of being stored
+        compressed: Whether to compress the session, field values and workflow with `compress_json()`
 
     Returns:
-        A list of tuples to insert into the session queue table. Each tuple contains the following values:
+        A generator of tuples to insert into the session queue table. Each tuple contains the following values:
         - queue_id
-        - session (as stringified JSON)
+        - session (as stringified JSON, or `TEMPLATED_SESSION` if templated)
         - session_id
         - batch_id
         - field_values (optional, as stringified JSON)
@@ -605,30 +679,39 @@ def prepare_values_to_insert(
     #
     # So, despite the inferior DX with normal tuples, we use one here for performance reasons.
 
-    values_to_insert: list[ValueToInsertTuple] = []
-
     # pydantic's to_jsonable_python handles serialization of any python object, including sets, which json.dumps does
     # not support by default. Apparently there are sets somewhere in the graph.
 
     # The same workflow is used for all sessions in the batch - serialize it once
     workflow_json = json.dumps(batch.workflow, default=to_jsonable_python) if batch.workflow else None
-
-    for session_id, session_json, field_values_json in create_session_nfv_tuples(batch, max_new_queue_items):
-        values_to_insert.append(
-            (
-                queue_id,
-                session_json,
-                session_id,
-                batch.batch_id,
-                field_values_json,
-                priority,
-                workflow_json,
-                batch.origin,
-                batch.destination,
-                None,
-            )
+    workflow_value = compress_json_or_none(workflow_json) if compressed else workflow_json
+
+    for session_id, session_json, field_values_json in create_session_nfv_tuples(batch, max_new_queue_items, templated):
+        yield (
+            queue_id,
+            # The templated session marker is never compressed, so templated queue items can be found by it
+            compress_json(session_json) if compressed and session_json != TEMPLATED_SESSION else session_json,
+            session_id,
+            batch.batch_id,
+            compress_json(field_values_json) if compressed else field_values_json,
+            priority,
+            workflow_value,
+            batch.origin,
+            batch.destination,
+            None,
         )
-    return values_to_insert
+
+
+def prepare_values_to_insert(
+    queue_id: str, batch: Batch, priority: int, max_new_queue_items: int, templated: bool = False
+) -> list[ValueToInsertTuple]:
+    """
+    Given a batch, prepare the values to insert into the session queue table. The list of tuples can be used with an
+    `executemany` statement to insert multiple rows at once.
+
+    See `iter_values_to_insert()` for the arguments and the values in each tuple.
+    """
+    return list(iter_values_to_insert(queue_id, batch, priority, max_new_queue_items, templated))
 
 
 # endregion Util
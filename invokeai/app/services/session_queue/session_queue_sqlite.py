@@ -1,7 +1,10 @@
 import asyncio
+import heapq
 import json
 import sqlite3
-from typing import Optional, Union, cast
+import threading
+from itertools import islice
+from typing import Iterable, Optional, Sequence, Union, cast
 
 from pydantic_core import to_jsonable_python
 
@@ -31,13 +34,27 @@ from invokeai.app.services.session_queue.session_queue_common import (
     SessionQueueStatus,
     ValueToInsertTuple,
     calc_session_count,
-    prepare_values_to_insert,
+    create_session_template,
+    iter_values_to_insert,
 )
 from invokeai.app.services.shared.graph import GraphExecutionState
 from invokeai.app.services.shared.pagination import CursorPaginatedResults
 from invokeai.app.services.shared.sqlite.sqlite_common import SQLiteDirection
+from invokeai.app.services.shared.sqlite.sqlite_compression import (
+    compress_json,
+    compress_json_or_none,
+    decompress_json,
+)
 from invokeai.app.services.shared.sqlite.sqlite_database import SqliteDatabase
 
+SELECT_QUEUE_ITEMS = """
+    SELECT session_queue.*, session_queue_templates.session AS session_template
+    FROM session_queue
+    LEFT JOIN session_queue_templates
+        ON session_queue.session = '' AND session_queue_templates.batch_id = session_queue.batch_id
+"""
+"""Selects queue items, along with the session template of those whose sessions are materialized from a template."""
+
 
 class SqliteSessionQueue(SessionQueueBase):
     __invoker: Invoker
@@ -49,10 +66,80 @@ class SqliteSessionQueue(SessionQueueBase):
             clear_result = self.clear(DEFAULT_QUEUE_ID)
             if clear_result.deleted > 0:
                 self.__invoker.services.logger.info(f"Cleared all {clear_result.deleted} queue items")
+        with self._db.transaction() as cursor:
+            self._load_pending(cursor)
 
-    def __init__(self, db: SqliteDatabase) -> None:
+    def __init__(self, db: SqliteDatabase, enqueue_chunk_size: int = 1000) -> None:
         super().__init__()
         self._db = db
+        self._enqueue_chunk_size = enqueue_chunk_size
+        # A heap of (-priority, item_id) for the pending queue items, in dequeue order, and the IDs of the items it
+        # holds. Entries whose item is no longer in `_pending_ids` (e.g. canceled) are stale and skipped when they reach
+        # the top of the heap. Both are only read or changed inside the database transaction that changes the items
+        # they mirror, so the database lock keeps them in sync with the database.
+        self._pending: list[tuple[int, int]] = []
+        self._pending_ids: set[int] = set()
+        # The session most recently stored with `set_queue_item_session`, with its item ID
+        self._checkpointed_session: Optional[tuple[int, GraphExecutionState]] = None
+        self._checkpoint_lock = threading.Lock()
+
+    def _load_pending(self, cursor: sqlite3.Cursor) -> None:
+        """Rebuilds the heap of pending queue items from the database."""
+        cursor.execute(
+            """--sql
+            SELECT priority, item_id
+            FROM session_queue
+            WHERE status = 'pending'
+            """
+        )
+        pending = [(-priority, item_id) for priority, item_id in cursor.fetchall()]
+        heapq.heapify(pending)
+        self._pending = pending
+        self._pending_ids = {item_id for _, item_id in pending}
+
+    def _push_pending(self, priority: int, item_ids: Iterable[int]) -> None:
+        """Adds pending queue items to the heap, inside the transaction that inserted them."""
+        for item_id in item_ids:
+            if item_id not in self._pending_ids:
+                self._pending_ids.add(item_id)
+                heapq.heappush(self._pending, (-priority, item_id))
+
+    def _discard_pending(self, item_ids: Iterable[int]) -> None:
+        """Removes queue items from the heap, inside the transaction that changed or deleted them."""
+        self._pending_ids.difference_update(item_ids)
+        # Compact the heap once most of its entries are stale, so bulk cancels and deletes don't leave it large
+        if len(self._pending) > 2 * len(self._pending_ids):
+            self._pending = [entry for entry in self._pending if entry[1] in self._pending_ids]
+            heapq.heapify(self._pending)
+
+    def _get_item_ids_with_status(
+        self, cursor: sqlite3.Cursor, status: QUEUE_ITEM_STATUS, condition: str, params: Sequence[Union[str, int]]
+    ) -> list[int]:
+        """Gets the IDs of the queue items with a status that match a condition."""
+        cursor.execute(
+            f"""--sql
+            SELECT item_id
+            FROM session_queue
+            WHERE
+              {condition}
+              AND status = ?
+            """,
+            (*params, status),
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+    def _get_counts(self, queue_id: str) -> dict[str, int]:
+        """Gets the number of queue items with each status, from the counts maintained by triggers."""
+        with self._db.transaction() as cursor:
+            cursor.execute(
+                """--sql
+                SELECT status, count
+                FROM session_queue_counts
+                WHERE queue_id = ?
+                """,
+                (queue_id,),
+            )
+            return {row[0]: row[1] for row in cursor.fetchall()}
 
     def _set_in_progress_to_canceled(self) -> None:
         """
@@ -70,19 +157,7 @@ class SqliteSessionQueue(SessionQueueBase):
 
     def _get_current_queue_size(self, queue_id: str) -> int:
         """Gets the current number of pending queue items"""
-        with self._db.transaction() as cursor:
-            cursor.execute(
-                """--sql
-                SELECT count(*)
-                FROM session_queue
-                WHERE
-                queue_id = ?
-                AND status = 'pending'
-                """,
-                (queue_id,),
-            )
-            count = cast(int, cursor.fetchone()[0])
-        return count
+        return self._get_counts(queue_id).get("pending", 0)
 
     def _get_highest_priority(self, queue_id: str) -> int:
         """Gets the highest priority value in the queue"""
@@ -109,20 +184,92 @@ class SqliteSessionQueue(SessionQueueBase):
         if prepend:
             priority = self._get_highest_priority(queue_id) + 1
 
-        requested_count = await asyncio.to_thread(
-            calc_session_count,
-            batch=batch,
+        requested_count = calc_session_count(batch)
+        total_count = max(min(requested_count, max_new_queue_items), 0)
+
+        # The session template is stored once per batch, and each queue item stores only its field values
+        session_template = (
+            await asyncio.to_thread(create_session_template, batch=batch)
+            if self.__invoker.services.configuration.queue_session_templates
+            else None
         )
-        values_to_insert = await asyncio.to_thread(
-            prepare_values_to_insert,
+        if session_template is not None and not self._can_use_session_template(batch.batch_id, session_template):
+            session_template = None
+
+        # Sessions are generated lazily and inserted in chunks, each in its own transaction, so that large batches
+        # neither hold every session in memory nor block the database (and therefore dequeuing) for long
+        values_to_insert = iter_values_to_insert(
             queue_id=queue_id,
             batch=batch,
             priority=priority,
             max_new_queue_items=max_new_queue_items,
+            templated=session_template is not None,
+            compressed=True,
+        )
+        item_ids: list[int] = []
+        while True:
+            chunk = await asyncio.to_thread(list, islice(values_to_insert, self._enqueue_chunk_size))
+            if not chunk:
+                break
+            chunk_item_ids = await asyncio.to_thread(
+                self._insert_queue_items, queue_id, chunk, batch.batch_id, priority, session_template
+            )
+            item_ids.extend(chunk_item_ids)
+            if len(chunk_item_ids) < len(chunk):
+                # The queue filled up while the batch was being enqueued
+                break
+            if total_count > self._enqueue_chunk_size:
+                self.__invoker.services.events.emit_batch_enqueue_progress(
+                    queue_id=queue_id, batch=batch, enqueued=len(item_ids), total=total_count
+                )
+
+        # Newest first, as the item IDs were previously reported
+        item_ids.reverse()
+        enqueue_result = EnqueueBatchResult(
+            queue_id=queue_id,
+            requested=requested_count,
+            enqueued=len(item_ids),
+            batch=batch,
+            priority=priority,
+            item_ids=item_ids,
         )
-        enqueued_count = len(values_to_insert)
+        self.__invoker.services.events.emit_batch_enqueued(enqueue_result)
+        return enqueue_result
 
+    def _insert_queue_items(
+        self,
+        queue_id: str,
+        values_to_insert: list[ValueToInsertTuple],
+        batch_id: str,
+        priority: int,
+        session_template: Optional[str],
+    ) -> list[int]:
+        """Inserts a chunk of queue items in a single transaction, returning their item IDs in ascending order.
+
+        Other batches may be enqueued concurrently, so the chunk is truncated to the room left in the queue."""
         with self._db.transaction() as cursor:
+            cursor.execute(
+                """--sql
+                SELECT count
+                FROM session_queue_counts
+                WHERE queue_id = ? AND status = 'pending'
+                """,
+                (queue_id,),
+            )
+            row = cursor.fetchone()
+            room = self.__invoker.services.configuration.max_queue_size - (row[0] if row else 0)
+            values_to_insert = values_to_insert[: max(room, 0)]
+            if not values_to_insert:
+                return []
+            if session_template is not None:
+                # Inserted with every chunk, in case the batch's queue items were deleted since the previous chunk
+                cursor.execute(
+                    """--sql
+                    INSERT OR IGNORE INTO session_queue_templates (batch_id, session)
+                    VALUES (?, ?)
+                    """,
+                    (batch_id, compress_json(session_template)),
+                )
             cursor.executemany(
                 """--sql
                     INSERT INTO session_queue (queue_id, session, session_id, batch_id, field_values, priority, workflow, origin, destination, retried_from_item_id)
@@ -130,53 +277,74 @@ class SqliteSessionQueue(SessionQueueBase):
                     """,
                 values_to_insert,
             )
+            # The items are inserted in one transaction, so their AUTOINCREMENT item IDs are consecutive
+            cursor.execute("SELECT last_insert_rowid();")
+            last_item_id = cast(int, cursor.fetchone()[0])
+            item_ids = list(range(last_item_id - len(values_to_insert) + 1, last_item_id + 1))
+            self._push_pending(priority, item_ids)
+        return item_ids
+
+    def _can_use_session_template(self, batch_id: str, session_template: str) -> bool:
+        """Checks that the batch does not already have a different session template.
+
+        A batch ID may be enqueued more than once, in which case its existing template must be kept for its existing
+        queue items. If the graph differs, the new queue items store their sessions in full."""
+        with self._db.transaction() as cursor:
             cursor.execute(
                 """--sql
-                    SELECT item_id
-                    FROM session_queue
-                    WHERE batch_id = ?
-                    ORDER BY item_id DESC;
-                    """,
-                (batch.batch_id,),
+                SELECT session
+                FROM session_queue_templates
+                WHERE batch_id = ?
+                """,
+                (batch_id,),
             )
-            item_ids = [row[0] for row in cursor.fetchall()]
-        enqueue_result = EnqueueBatchResult(
-            queue_id=queue_id,
-            requested=requested_count,
-            enqueued=enqueued_count,
-            batch=batch,
-            priority=priority,
-            item_ids=item_ids,
-        )
-        self.__invoker.services.events.emit_batch_enqueued(enqueue_result)
-        return enqueue_result
+            row = cursor.fetchone()
+        return row is None or decompress_json(row[0]) == session_template
 
     def dequeue(self) -> Optional[SessionQueueItem]:
         with self._db.transaction() as cursor:
+            item_id = self._claim_next_pending_item(cursor)
+        if item_id is None:
+            return None
+        return self._emit_queue_item_status_changed(item_id)
+
+    def _claim_next_pending_item(self, cursor: sqlite3.Cursor) -> Optional[int]:
+        """Sets the next pending queue item in progress, returning its ID, or None if no items are pending."""
+        # The database is the source of truth. Items may be changed without updating the heap (e.g. by another
+        # process), so the heap is rebuilt when it does not hold as many items as are pending
+        cursor.execute(
+            """--sql
+            SELECT COALESCE(SUM(count), 0)
+            FROM session_queue_counts
+            WHERE status = 'pending'
+            """
+        )
+        if cursor.fetchone()[0] != len(self._pending_ids):
+            self._load_pending(cursor)
+        while self._pending:
+            _, item_id = heapq.heappop(self._pending)
+            if item_id not in self._pending_ids:
+                continue
+            self._pending_ids.remove(item_id)
             cursor.execute(
                 """--sql
-                SELECT *
-                FROM session_queue
-                WHERE status = 'pending'
-                ORDER BY
-                    priority DESC,
-                    item_id ASC
-                LIMIT 1
-                """
+                UPDATE session_queue
+                SET status = 'in_progress'
+                WHERE item_id = ? AND status = 'pending'
+                """,
+                (item_id,),
             )
-            result = cast(Union[sqlite3.Row, None], cursor.fetchone())
-        if result is None:
-            return None
-        queue_item = SessionQueueItem.queue_item_from_dict(dict(result))
-        queue_item = self._set_queue_item_status(item_id=queue_item.item_id, status="in_progress")
-        return queue_item
+            if cursor.rowcount == 1:
+                return item_id
+            # The item is no longer pending, so the heap is out of date
+            self._load_pending(cursor)
+        return None
 
     def get_next(self, queue_id: str) -> Optional[SessionQueueItem]:
         with self._db.transaction() as cursor:
             cursor.execute(
-                """--sql
-                SELECT *
-                FROM session_queue
+                f"""--sql
+                {SELECT_QUEUE_ITEMS}
                 WHERE
                     queue_id = ?
                     AND status = 'pending'
@@ -195,9 +363,8 @@ class SqliteSessionQueue(SessionQueueBase):
     def get_current(self, queue_id: str) -> Optional[SessionQueueItem]:
         with self._db.transaction() as cursor:
             cursor.execute(
-                """--sql
-                SELECT *
-                FROM session_queue
+                f"""--sql
+                {SELECT_QUEUE_ITEMS}
                 WHERE
                     queue_id = ?
                     AND status = 'in_progress'
@@ -243,38 +410,34 @@ class SqliteSessionQueue(SessionQueueBase):
                 """,
                 (status, error_type, error_message, error_traceback, item_id),
             )
-
-        queue_item = self.get_queue_item(item_id)
+            if current_status == "pending":
+                self._discard_pending([item_id])
+
+        return self._emit_queue_item_status_changed(item_id)
+
+    def _pop_checkpointed_session(self, item_id: int) -> Optional[GraphExecutionState]:
+        """Gets the session most recently stored for the queue item, if it was the last queue item stored."""
+        with self._checkpoint_lock:
+            if self._checkpointed_session is None or self._checkpointed_session[0] != item_id:
+                return None
+            session = self._checkpointed_session[1]
+            self._checkpointed_session = None
+            return session
+
+    def _emit_queue_item_status_changed(self, item_id: int) -> SessionQueueItem:
+        queue_item = self._get_queue_item(item_id, self._pop_checkpointed_session(item_id))
         batch_status = self.get_batch_status(queue_id=queue_item.queue_id, batch_id=queue_item.batch_id)
         queue_status = self.get_queue_status(queue_id=queue_item.queue_id)
         self.__invoker.services.events.emit_queue_item_status_changed(queue_item, batch_status, queue_status)
         return queue_item
 
     def is_empty(self, queue_id: str) -> IsEmptyResult:
-        with self._db.transaction() as cursor:
-            cursor.execute(
-                """--sql
-                SELECT count(*)
-                FROM session_queue
-                WHERE queue_id = ?
-                """,
-                (queue_id,),
-            )
-            is_empty = cast(int, cursor.fetchone()[0]) == 0
+        is_empty = sum(self._get_counts(queue_id).values()) == 0
         return IsEmptyResult(is_empty=is_empty)
 
     def is_full(self, queue_id: str) -> IsFullResult:
-        with self._db.transaction() as cursor:
-            cursor.execute(
-                """--sql
-                SELECT count(*)
-                FROM session_queue
-                WHERE queue_id = ?
-                """,
-                (queue_id,),
-            )
-            max_queue_size = self.__invoker.services.configuration.max_queue_size
-            is_full = cast(int, cursor.fetchone()[0]) >= max_queue_size
+        max_queue_size = self.__invoker.services.configuration.max_queue_size
+        is_full = sum(self._get_counts(queue_id).values()) >= max_queue_size
         return IsFullResult(is_full=is_full)
 
     def clear(self, queue_id: str) -> ClearResult:
@@ -288,6 +451,7 @@ class SqliteSessionQueue(SessionQueueBase):
                 (queue_id,),
             )
             count = cursor.fetchone()[0]
+            self._discard_pending(self._get_item_ids_with_status(cursor, "pending", "queue_id = ?", (queue_id,)))
             cursor.execute(
                 """--sql
                 DELETE
@@ -369,10 +533,18 @@ class SqliteSessionQueue(SessionQueueBase):
         )
         return queue_item
 
+    def _cancel_in_progress_items(self, item_ids: list[int]) -> None:
+        """Cancels in-progress queue items one at a time, so a status change is emitted for each item's worker."""
+        for item_id in item_ids:
+            self._set_queue_item_status(item_id, "canceled")
+
     def cancel_by_batch_ids(self, queue_id: str, batch_ids: list[str]) -> CancelByBatchIDsResult:
         with self._db.transaction() as cursor:
-            current_queue_item = self.get_current(queue_id)
             placeholders = ", ".join(["?" for _ in batch_ids])
+            params = [queue_id] + batch_ids
+            in_progress_item_ids = self._get_item_ids_with_status(
+                cursor, "in_progress", f"queue_id == ? AND batch_id IN ({placeholders})", params
+            )
             where = f"""--sql
                 WHERE
                   queue_id == ?
@@ -380,19 +552,18 @@ class SqliteSessionQueue(SessionQueueBase):
                   AND status != 'canceled'
                   AND status != 'completed'
                   AND status != 'failed'
-                  -- We will cancel the current item separately below - skip it here
+                  -- We will cancel the in-progress items separately below - skip them here
                   AND status != 'in_progress'
                 """
-            params = [queue_id] + batch_ids
             cursor.execute(
                 f"""--sql
-                SELECT COUNT(*)
+                SELECT item_id
                 FROM session_queue
                 {where};
                 """,
                 tuple(params),
             )
-            count = cursor.fetchone()[0]
+            item_ids = [row[0] for row in cursor.fetchall()]
             cursor.execute(
                 f"""--sql
                 UPDATE session_queue
@@ -401,15 +572,17 @@ class SqliteSessionQueue(SessionQueueBase):
                 """,
                 tuple(params),
             )
+            self._discard_pending(item_ids)
 
-        if current_queue_item is not None and current_queue_item.batch_id in batch_ids:
-            self._set_queue_item_status(current_queue_item.item_id, "canceled")
-
-        return CancelByBatchIDsResult(canceled=count)
+        self._cancel_in_progress_items(in_progress_item_ids)
+        return CancelByBatchIDsResult(canceled=len(item_ids))
 
     def cancel_by_destination(self, queue_id: str, destination: str) -> CancelByDestinationResult:
         with self._db.transaction() as cursor:
-            current_queue_item = self.get_current(queue_id)
+            params = (queue_id, destination)
+            in_progress_item_ids = self._get_item_ids_with_status(
+                cursor, "in_progress", "queue_id == ? AND destination == ?", params
+            )
             where = """--sql
                 WHERE
                   queue_id == ?
@@ -417,19 +590,18 @@ class SqliteSessionQueue(SessionQueueBase):
                   AND status != 'canceled'
                   AND status != 'completed'
                   AND status != 'failed'
-                  -- We will cancel the current item separately below - skip it here
+                  -- We will cancel the in-progress items separately below - skip them here
                   AND status != 'in_progress'
                 """
-            params = (queue_id, destination)
             cursor.execute(
                 f"""--sql
-                SELECT COUNT(*)
+                SELECT item_id
                 FROM session_queue
                 {where};
                 """,
                 params,
             )
-            count = cursor.fetchone()[0]
+            item_ids = [row[0] for row in cursor.fetchall()]
             cursor.execute(
                 f"""--sql
                 UPDATE session_queue
@@ -438,16 +610,18 @@ class SqliteSessionQueue(SessionQueueBase):
                 """,
                 params,
             )
-        if current_queue_item is not None and current_queue_item.destination == destination:
-            self._set_queue_item_status(current_queue_item.item_id, "canceled")
-        return CancelByDestinationResult(canceled=count)
+            self._discard_pending(item_ids)
+        self._cancel_in_progress_items(in_progress_item_ids)
+        return CancelByDestinationResult(canceled=len(item_ids))
 
     def delete_by_destination(self, queue_id: str, destination: str) -> DeleteByDestinationResult:
         with self._db.transaction() as cursor:
-            current_queue_item = self.get_current(queue_id)
-            if current_queue_item is not None and current_queue_item.destination == destination:
-                self.cancel_queue_item(current_queue_item.item_id)
             params = (queue_id, destination)
+            in_progress_item_ids = self._get_item_ids_with_status(
+                cursor, "in_progress", "queue_id = ? AND destination = ?", params
+            )
+        self._cancel_in_progress_items(in_progress_item_ids)
+        with self._db.transaction() as cursor:
             cursor.execute(
                 """--sql
                 SELECT COUNT(*)
@@ -459,6 +633,9 @@ class SqliteSessionQueue(SessionQueueBase):
                 params,
             )
             count = cursor.fetchone()[0]
+            self._discard_pending(
+                self._get_item_ids_with_status(cursor, "pending", "queue_id = ? AND destination = ?", params)
+            )
             cursor.execute(
                 """--sql
                 DELETE
@@ -480,13 +657,13 @@ class SqliteSessionQueue(SessionQueueBase):
                 """
             cursor.execute(
                 f"""--sql
-                SELECT COUNT(*)
+                SELECT item_id
                 FROM session_queue
                 {where};
                 """,
                 (queue_id,),
             )
-            count = cursor.fetchone()[0]
+            item_ids = [row[0] for row in cursor.fetchall()]
             cursor.execute(
                 f"""--sql
                 DELETE
@@ -495,30 +672,31 @@ class SqliteSessionQueue(SessionQueueBase):
                 """,
                 (queue_id,),
             )
-        return DeleteAllExceptCurrentResult(deleted=count)
+            self._discard_pending(item_ids)
+        return DeleteAllExceptCurrentResult(deleted=len(item_ids))
 
     def cancel_by_queue_id(self, queue_id: str) -> CancelByQueueIDResult:
         with self._db.transaction() as cursor:
-            current_queue_item = self.get_current(queue_id)
+            params = [queue_id]
+            in_progress_item_ids = self._get_item_ids_with_status(cursor, "in_progress", "queue_id is ?", params)
             where = """--sql
                 WHERE
                   queue_id is ?
                   AND status != 'canceled'
                   AND status != 'completed'
                   AND status != 'failed'
-                  -- We will cancel the current item separately below - skip it here
+                  -- We will cancel the in-progress items separately below - skip them here
                   AND status != 'in_progress'
                 """
-            params = [queue_id]
             cursor.execute(
                 f"""--sql
-                SELECT COUNT(*)
+                SELECT item_id
                 FROM session_queue
                 {where};
                 """,
                 tuple(params),
             )
-            count = cursor.fetchone()[0]
+            item_ids = [row[0] for row in cursor.fetchall()]
             cursor.execute(
                 f"""--sql
                 UPDATE session_queue
@@ -527,10 +705,10 @@ class SqliteSessionQueue(SessionQueueBase):
                 """,
                 tuple(params),
             )
+            self._discard_pending(item_ids)
 
-        if current_queue_item is not None and current_queue_item.queue_id == queue_id:
-            self._set_queue_item_status(current_queue_item.item_id, "canceled")
-        return CancelByQueueIDResult(canceled=count)
+        self._cancel_in_progress_items(in_progress_item_ids)
+        return CancelByQueueIDResult(canceled=len(item_ids))
 
     def cancel_all_except_current(self, queue_id: str) -> CancelAllExceptCurrentResult:
         with self._db.transaction() as cursor:
@@ -541,13 +719,13 @@ class SqliteSessionQueue(SessionQueueBase):
                 """
             cursor.execute(
                 f"""--sql
-                SELECT COUNT(*)
+                SELECT item_id
                 FROM session_queue
                 {where};
                 """,
                 (queue_id,),
             )
-            count = cursor.fetchone()[0]
+            item_ids = [row[0] for row in cursor.fetchall()]
             cursor.execute(
                 f"""--sql
                 UPDATE session_queue
@@ -556,13 +734,18 @@ class SqliteSessionQueue(SessionQueueBase):
                 """,
                 (queue_id,),
             )
-        return CancelAllExceptCurrentResult(canceled=count)
+            self._discard_pending(item_ids)
+        return CancelAllExceptCurrentResult(canceled=len(item_ids))
 
     def get_queue_item(self, item_id: int) -> SessionQueueItem:
+        return self._get_queue_item(item_id)
+
+    def _get_queue_item(self, item_id: int, session: Optional[GraphExecutionState] = None) -> SessionQueueItem:
+        """Gets a queue item. If its session is given, the stored session is not parsed."""
         with self._db.transaction() as cursor:
             cursor.execute(
-                """--sql
-                SELECT * FROM session_queue
+                f"""--sql
+                {SELECT_QUEUE_ITEMS}
                 WHERE
                     item_id = ?
                 """,
@@ -571,23 +754,28 @@ class SqliteSessionQueue(SessionQueueBase):
             result = cast(Union[sqlite3.Row, None], cursor.fetchone())
         if result is None:
             raise SessionQueueItemNotFoundError(f"No queue item with id {item_id}")
-        return SessionQueueItem.queue_item_from_dict(dict(result))
+        return SessionQueueItem.queue_item_from_dict(dict(result), session=session)
 
     def set_queue_item_session(self, item_id: int, session: GraphExecutionState) -> SessionQueueItem:
+        # Use exclude_none so we don't end up with a bunch of nulls in the graph - this can cause validation errors
+        # when the graph is loaded. Graph execution occurs purely in memory - the session saved here is not referenced
+        # during execution.
+        session_json = session.model_dump_json(warnings=False, exclude_none=True)
         with self._db.transaction() as cursor:
-            # Use exclude_none so we don't end up with a bunch of nulls in the graph - this can cause validation errors
-            # when the graph is loaded. Graph execution occurs purely in memory - the session saved here is not referenced
-            # during execution.
-            session_json = session.model_dump_json(warnings=False, exclude_none=True)
             cursor.execute(
                 """--sql
                 UPDATE session_queue
                 SET session = ?
                 WHERE item_id = ?
                 """,
-                (session_json, item_id),
+                (compress_json(session_json), item_id),
             )
-        return self.get_queue_item(item_id)
+        # The stored session is the given session, so it is not parsed back from the JSON, here or when the queue item's
+        # status changes next (sessions are stored right before their queue items are completed or failed). For large
+        # sessions, parsing is far more expensive than serializing.
+        with self._checkpoint_lock:
+            self._checkpointed_session = (item_id, session)
+        return self._get_queue_item(item_id, session)
 
     def list_queue_items(
         self,
@@ -600,9 +788,8 @@ class SqliteSessionQueue(SessionQueueBase):
     ) -> CursorPaginatedResults[SessionQueueItem]:
         with self._db.transaction() as cursor_:
             item_id = cursor
-            query = """--sql
-                SELECT *
-                FROM session_queue
+            query = f"""--sql
+                {SELECT_QUEUE_ITEMS}
                 WHERE queue_id = ?
             """
             params: list[Union[str, int]] = [queue_id]
@@ -649,9 +836,8 @@ class SqliteSessionQueue(SessionQueueBase):
     ) -> list[SessionQueueItem]:
         """Gets all queue items that match the given parameters"""
         with self._db.transaction() as cursor:
-            query = """--sql
-                SELECT *
-                FROM session_queue
+            query = f"""--sql
+                {SELECT_QUEUE_ITEMS}
                 WHERE queue_id = ?
             """
             params: list[Union[str, int]] = [queue_id]
@@ -694,26 +880,27 @@ class SqliteSessionQueue(SessionQueueBase):
         return ItemIdsResult(item_ids=item_ids, total_count=len(item_ids))
 
     def get_queue_status(self, queue_id: str) -> SessionQueueStatus:
+        counts = self._get_counts(queue_id)
+        # Only the current item's IDs are needed, so its session is not read
         with self._db.transaction() as cursor:
             cursor.execute(
                 """--sql
-                SELECT status, count(*)
+                SELECT item_id, session_id, batch_id
                 FROM session_queue
-                WHERE queue_id = ?
-                GROUP BY status
+                WHERE
+                    queue_id = ?
+                    AND status = 'in_progress'
+                LIMIT 1
                 """,
                 (queue_id,),
             )
-            counts_result = cast(list[sqlite3.Row], cursor.fetchall())
-
-        current_item = self.get_current(queue_id=queue_id)
-        total = sum(row[1] or 0 for row in counts_result)
-        counts: dict[str, int] = {row[0]: row[1] for row in counts_result}
+            current_item = cursor.fetchone()
+        total = sum(counts.values())
         return SessionQueueStatus(
             queue_id=queue_id,
-            item_id=current_item.item_id if current_item else None,
-            session_id=current_item.session_id if current_item else None,
-            batch_id=current_item.batch_id if current_item else None,
+            item_id=current_item[0] if current_item else None,
+            session_id=current_item[1] if current_item else None,
+            batch_id=current_item[2] if current_item else None,
             pending=counts.get("pending", 0),
             in_progress=counts.get("in_progress", 0),
             completed=counts.get("completed", 0),
@@ -813,12 +1000,12 @@ class SqliteSessionQueue(SessionQueueBase):
 
                 value_to_insert: ValueToInsertTuple = (
                     queue_item.queue_id,
-                    cloned_session_json,
+                    compress_json(cloned_session_json),
                     cloned_session.id,
                     queue_item.batch_id,
-                    field_values_json,
+                    compress_json_or_none(field_values_json),
                     queue_item.priority,
-                    workflow_json,
+                    compress_json_or_none(workflow_json),
                     queue_item.origin,
                     queue_item.destination,
                     retried_from_item_id,
@@ -834,6 +1021,12 @@ class SqliteSessionQueue(SessionQueueBase):
                 """,
                 values_to_insert,
             )
+            # The items are inserted in one transaction, so their AUTOINCREMENT item IDs are consecutive
+            cursor.execute("SELECT last_insert_rowid();")
+            last_item_id = cast(int, cursor.fetchone()[0])
+            first_item_id = last_item_id - len(values_to_insert) + 1
+            for new_item_id, value_to_insert in enumerate(values_to_insert, start=first_item_id):
+                self._push_pending(value_to_insert[5], [new_item_id])
 
         retry_result = RetryItemsResult(
             queue_id=queue_id,
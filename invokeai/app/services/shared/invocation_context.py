@@ -16,9 +16,8 @@ from invokeai.app.services.image_records.image_records_common import ImageCatego
 from invokeai.app.services.images.images_common import ImageDTO
 from invokeai.app.services.invocation_services import InvocationServices
 from invokeai.app.services.model_records.model_records_base import UnknownModelException
-from invokeai.app.services.session_processor.session_processor_common import ProgressImage
 from invokeai.app.services.shared.sqlite.sqlite_common import SQLiteDirection
-from invokeai.app.util.step_callback import diffusion_step_callback
+from invokeai.app.util.step_callback import PreviewThrottle, diffusion_step_callback
 from invokeai.backend.model_manager.configs.base import Config_Base
 from invokeai.backend.model_manager.configs.factory import AnyModelConfig
 from invokeai.backend.model_manager.load.load_base import LoadedModel, LoadedModelWithoutConfig
@@ -163,7 +162,12 @@ class LoggerInterface(InvocationContextInterface):
 
 
 class ImagesInterface(InvocationContextInterface):
-    def __init__(self, services: InvocationServices, data: InvocationContextData, util: "UtilInterface") -> None:
+    def __init__(
+        self,
+        services: InvocationServices,
+        data: InvocationContextData,
+        util: "UtilInterface",
+    ) -> None:
         super().__init__(services, data)
         self._util = util
 
@@ -345,9 +349,20 @@ class ConditioningInterface(InvocationContextInterface):
 class ModelsInterface(InvocationContextInterface):
     """Common API for loading, downloading and managing models."""
 
-    def __init__(self, services: InvocationServices, data: InvocationContextData, util: "UtilInterface") -> None:
+    def __init__(
+        self,
+        services: InvocationServices,
+        data: InvocationContextData,
+        util: "UtilInterface",
+        on_load_model: Optional[Callable[[], None]] = None,
+    ) -> None:
         super().__init__(services, data)
         self._util = util
+        self._on_load_model = on_load_model
+
+    def _before_load_model(self) -> None:
+        if self._on_load_model is not None:
+            self._on_load_model()
 
     def exists(self, identifier: Union[str, "ModelIdentifierField"]) -> bool:
         """Check if a model exists.
@@ -389,6 +404,7 @@ class ModelsInterface(InvocationContextInterface):
         if submodel_type:
             message += f" ({submodel_type.value})"
         self._util.signal_progress(message)
+        self._before_load_model()
         return self._services.model_manager.load.load_model(model, submodel_type)
 
     def load_by_attrs(
@@ -418,6 +434,7 @@ class ModelsInterface(InvocationContextInterface):
         if submodel_type:
             message += f" ({submodel_type.value})"
         self._util.signal_progress(message)
+        self._before_load_model()
         return self._services.model_manager.load.load_model(configs[0], submodel_type)
 
     def get_config(self, identifier: Union[str, "ModelIdentifierField"]) -> AnyModelConfig:
@@ -513,6 +530,7 @@ class ModelsInterface(InvocationContextInterface):
         """
 
         self._util.signal_progress(f"Loading model {model_path.name}")
+        self._before_load_model()
         return self._services.model_manager.load.load_model_from_path(model_path=model_path, loader=loader)
 
     def load_remote_model(
@@ -540,6 +558,7 @@ class ModelsInterface(InvocationContextInterface):
         model_path = self._services.model_manager.install.download_and_cache_model(source=str(source))
 
         self._util.signal_progress(f"Loading model {source}")
+        self._before_load_model()
         return self._services.model_manager.load.load_model_from_path(model_path=model_path, loader=loader)
 
     def get_absolute_path(self, config_or_path: AnyModelConfig | Path | str) -> Path:
@@ -580,10 +599,15 @@ class ConfigInterface(InvocationContextInterface):
 
 class UtilInterface(InvocationContextInterface):
     def __init__(
-        self, services: InvocationServices, data: InvocationContextData, is_canceled: Callable[[], bool]
+        self,
+        services: InvocationServices,
+        data: InvocationContextData,
+        is_canceled: Callable[[], bool],
+        preview_throttle: Optional[PreviewThrottle] = None,
     ) -> None:
         super().__init__(services, data)
         self._is_canceled = is_canceled
+        self._preview_throttle = preview_throttle
 
     def is_canceled(self) -> bool:
         """Checks if the current session has been canceled.
@@ -610,6 +634,7 @@ class UtilInterface(InvocationContextInterface):
             intermediate_state=intermediate_state,
             base_model=base_model,
             is_canceled=self.is_canceled,
+            preview_throttle=self._preview_throttle,
         )
 
     def flux_step_callback(self, intermediate_state: PipelineIntermediateState) -> None:
@@ -628,6 +653,7 @@ class UtilInterface(InvocationContextInterface):
             intermediate_state=intermediate_state,
             base_model=BaseModelType.Flux,
             is_canceled=self.is_canceled,
+            preview_throttle=self._preview_throttle,
         )
 
     def flux2_step_callback(self, intermediate_state: PipelineIntermediateState) -> None:
@@ -643,6 +669,7 @@ class UtilInterface(InvocationContextInterface):
             intermediate_state=intermediate_state,
             base_model=BaseModelType.Flux2,
             is_canceled=self.is_canceled,
+            preview_throttle=self._preview_throttle,
         )
 
     def signal_progress(
@@ -691,6 +718,8 @@ class UtilInterface(InvocationContextInterface):
             signal_progress("Denoising", percentage, thumbnail, progress_image.size)
             ```
 
+        The image may be encoded after this method returns, on another thread. Do not modify it afterwards.
+
         Args:
             message: A message describing the current status. Do not include the percentage in this message.
             percentage: The current percentage completion for the process. Omit for indeterminate progress.
@@ -704,7 +733,8 @@ class UtilInterface(InvocationContextInterface):
             invocation=self._data.invocation,
             message=message,
             percentage=percentage,
-            image=ProgressImage.build(image, image_size) if image else None,
+            image=image,
+            image_size=image_size,
         )
 
 
@@ -761,12 +791,17 @@ def build_invocation_context(
     services: InvocationServices,
     data: InvocationContextData,
     is_canceled: Callable[[], bool],
+    on_load_model: Optional[Callable[[], None]] = None,
+    preview_throttle: Optional[PreviewThrottle] = None,
 ) -> InvocationContext:
     """Builds the invocation context for a specific invocation execution.
 
     Args:
         services: The invocation services to wrap.
         data: The invocation context data.
+        is_canceled: Returns whether the session has been canceled.
+        on_load_model: Called before the invocation loads a model.
+        preview_throttle: Decides which denoising steps get a progress image. Omit to render one for every step.
 
     Returns:
         The invocation context.
@@ -775,9 +810,9 @@ def build_invocation_context(
     logger = LoggerInterface(services=services, data=data)
     tensors = TensorsInterface(services=services, data=data)
     config = ConfigInterface(services=services, data=data)
-    util = UtilInterface(services=services, data=data, is_canceled=is_canceled)
+    util = UtilInterface(services=services, data=data, is_canceled=is_canceled, preview_throttle=preview_throttle)
     conditioning = ConditioningInterface(services=services, data=data)
-    models = ModelsInterface(services=services, data=data, util=util)
+    models = ModelsInterface(services=services, data=data, util=util, on_load_model=on_load_model)
     images = ImagesInterface(services=services, data=data, util=util)
     boards = BoardsInterface(services=services, data=data)
 
@@ -0,0 +1,78 @@
+"""Compression of large JSON values stored in the database.
+
+Compressed values are stored as BLOBs, so they are told apart from legacy (uncompressed) values, which are stored as
+TEXT, by their type alone. Each compressed value starts with a format byte, followed by a zlib stream compressed with a
+preset dictionary of strings that are common in serialized sessions, graphs and workflows. The dictionary gives small
+values, like the field values of a queue item, most of the benefit of compression that large values get anyway.
+
+The dictionary must never change for an existing format byte: values compressed with it could no longer be read. To
+improve the dictionary, add a new format with the new dictionary, and keep the old one for reading.
+"""
+
+import zlib
+from typing import Optional, Union
+
+COMPRESSION_LEVEL = 3
+"""zlib compression level. Higher levels are much slower for little gain on JSON."""
+
+_JSON_DICTIONARY_V1 = "".join(
+    [
+        # Workflows
+        '"meta":{"version":"3.0.0","category":"user"},"notes":"","exposedFields":[],"form":null,',
+        '"author":"","description":"","contact":"","tags":"","version":"","id":"","name":"",',
+        '"position":{"x":0,"y":0},"data":{"id":"","version":"1.0.0","label":"","notes":"","type":"",',
+        '"inputs":{},"isOpen":true,"isIntermediate":true,"useCache":true,"nodePack":"invokeai"},',
+        '"type":"invocation","width":320,"height":500},"sourceHandle":"","targetHandle":"","type":"default"}',
+        '"fieldName":"","nodeId":"","value":null,"description":"","label":"","name":"',
+        # Node types
+        '"type":"core_metadata","type":"main_model_loader","type":"sdxl_model_loader","type":"flux_model_loader",'
+        '"type":"compel","type":"sdxl_compel_prompt","type":"flux_text_encoder","type":"noise","type":"collect",'
+        '"type":"denoise_latents","type":"flux_denoise","type":"l2i","type":"i2l","type":"flux_vae_decode",'
+        '"type":"string","type":"integer","type":"float","type":"boolean","type":"image","type":"iterate",',
+        # Field types and values
+        '"model":{"key":"","hash":"blake3:","name":"","base":"sdxl","type":"main","submodel_type":null},',
+        '"base":"sd-1","base":"sdxl","base":"flux","type":"lora","type":"vae","type":"controlnet",',
+        '"image":{"image_name":""},"image_name":"","latents":{"latents_name":"","seed":0},"latents_name":"',
+        '"conditioning":{"conditioning_name":""},"conditioning_name":"","mask":null,"tensor_name":"',
+        '"unet":{"unet":{"key":""},"scheduler":{"key":""},"loras":[],"seamless_axes":[],"freeu_config":null},',
+        '"clip":{"tokenizer":{"key":""},"text_encoder":{"key":""},"skipped_layers":0,"loras":[]},',
+        '"vae":{"vae":{"key":""},"seamless_axes":[]},"positive_conditioning":{},"negative_conditioning":{},',
+        '"scheduler":"euler","scheduler":"dpmpp_2m","cfg_scale":7.5,"cfg_rescale_multiplier":0,',
+        '"denoising_start":0,"denoising_end":1,"steps":30,"width":1024,"height":1024,"seed":0,',
+        '"fp32":false,"use_cpu":false,"tiled":false,"tile_size":0,"board":null,"metadata":null,',
+        '"prompt":"","style":"","positive_prompt":"","negative_prompt":"","collection":[],"item":null,',
+        # Sessions and graphs
+        '"is_intermediate":true,"is_intermediate":false,"use_cache":true,"use_cache":false,',
+        '"source":{"node_id":"","field":"value"},"destination":{"node_id":"","field":"value"}},',
+        '"executed":[],"executed_history":[],"results":{},"errors":{},"prepared_source_mapping":{},',
+        '"source_prepared_mapping":{},"ready_order":[],"indegree":{},"execution_graph":{"id":"","nodes":{},',
+        '"edges":[]},"graph":{"id":"","nodes":{},"edges":[]},"field_name":"","node_path":"","value":"',
+        '"id":"","type":"',
+    ]
+).encode("utf-8")
+
+_FORMAT_ZLIB_V1 = b"\x01"
+
+
+def compress_json(value: str) -> bytes:
+    """Compresses a JSON string for storage in a BLOB column."""
+    compressor = zlib.compressobj(COMPRESSION_LEVEL, zlib.DEFLATED, -zlib.MAX_WBITS, zdict=_JSON_DICTIONARY_V1)
+    return _FORMAT_ZLIB_V1 + compressor.compress(value.encode("utf-8")) + compressor.flush()
+
+
+def compress_json_or_none(value: Optional[str]) -> Optional[bytes]:
+    """Compresses a JSON string, passing through None."""
+    return compress_json(value) if value is not None else None
+
+
+def decompress_json(value: Union[str, bytes, None]) -> Optional[str]:
+    """Decompresses a value read from a column that may hold compressed JSON.
+
+    Legacy values, stored as TEXT, and None are returned as-is.
+    """
+    if not isinstance(value, bytes):
+        return value
+    if value[:1] != _FORMAT_ZLIB_V1:
+        raise ValueError(f"Unknown compressed JSON format {value[:1]!r}")
+    decompressor = zlib.decompressobj(-zlib.MAX_WBITS, zdict=_JSON_DICTIONARY_V1)
+    return (decompressor.decompress(value[1:]) + decompressor.flush()).decode("utf-8")
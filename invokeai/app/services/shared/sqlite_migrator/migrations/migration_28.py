@@ -0,0 +1,62 @@
+import sqlite3
+
+from invokeai.app.services.shared.sqlite_migrator.sqlite_migrator_common import Migration
+
+
+class Migration28Callback:
+    def __call__(self, cursor: sqlite3.Cursor) -> None:
+        self._create_session_queue_templates(cursor)
+
+    def _create_session_queue_templates(self, cursor: sqlite3.Cursor) -> None:
+        """
+        - Creates the `session_queue_templates` table, which stores the session template of each batch once. Queue
+          items with an empty `session` store only their field values, and their sessions are materialized from the
+          template.
+        - Adds a partial index of the queue items whose sessions are materialized from a template.
+        - Adds a trigger that deletes a batch's session template when no queue item needs it anymore.
+        """
+
+        cursor.execute(
+            """--sql
+            CREATE TABLE IF NOT EXISTS session_queue_templates (
+                batch_id TEXT NOT NULL PRIMARY KEY,
+                session TEXT NOT NULL -- the session, with the batch's graph before field values are substituted
+            );
+            """
+        )
+
+        cursor.execute(
+            """--sql
+            CREATE INDEX IF NOT EXISTS idx_session_queue_templated_batch_id
+            ON session_queue(batch_id) WHERE session = '';
+            """
+        )
+
+        cursor.execute(
+            """--sql
+            CREATE TRIGGER IF NOT EXISTS tg_session_queue_templates_cleanup
+            AFTER DELETE ON session_queue FOR EACH ROW
+            WHEN NOT EXISTS (SELECT 1 FROM session_queue WHERE batch_id = OLD.batch_id AND session = '')
+            BEGIN
+                DELETE FROM session_queue_templates WHERE batch_id = OLD.batch_id;
+            END;
+            """
+        )
+
+
+def build_migration_28() -> Migration:
+    """
+    Build the migration from database version 27 to 28.
+
+    This migration does the following:
+        - Creates the `session_queue_templates` table.
+        - Adds a partial index of the queue items whose sessions are materialized from a template.
+        - Adds a trigger that deletes a batch's session template when no queue item needs it anymore.
+    """
+    migration_28 = Migration(
+        from_version=27,
+        to_version=28,
+        callback=Migration28Callback(),
+    )
+
+    return migration_28
@@ -0,0 +1,103 @@
+import sqlite3
+
+from invokeai.app.services.shared.sqlite_migrator.sqlite_migrator_common import Migration
+
+
+class Migration29Callback:
+    def __call__(self, cursor: sqlite3.Cursor) -> None:
+        self._add_session_queue_status_priority_index(cursor)
+        self._create_session_queue_counts(cursor)
+
+    def _add_session_queue_status_priority_index(self, cursor: sqlite3.Cursor) -> None:
+        """
+        - Adds a composite index matching the order in which pending queue items are dequeued and listed.
+        """
+
+        cursor.execute(
+            """--sql
+            CREATE INDEX IF NOT EXISTS idx_session_queue_queue_id_status_priority_item_id
+            ON session_queue(queue_id, status, priority DESC, item_id);
+            """
+        )
+
+    def _create_session_queue_counts(self, cursor: sqlite3.Cursor) -> None:
+        """
+        - Creates the `session_queue_counts` table, which holds the number of queue items with each status in each
+          queue, so the queue status does not need to be counted.
+        - Adds triggers that maintain the counts when queue items are inserted, deleted or change status.
+        - Populates the counts from the existing queue items.
+        """
+
+        cursor.execute(
+            """--sql
+            CREATE TABLE IF NOT EXISTS session_queue_counts (
+                queue_id TEXT NOT NULL,
+                status TEXT NOT NULL,
+                count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (queue_id, status)
+            );
+            """
+        )
+
+        cursor.execute(
+            """--sql
+            CREATE TRIGGER IF NOT EXISTS tg_session_queue_counts_insert
+            AFTER INSERT ON session_queue FOR EACH ROW
+            BEGIN
+                INSERT INTO session_queue_counts (queue_id, status, count) VALUES (NEW.queue_id, NEW.status, 1)
+                ON CONFLICT (queue_id, status) DO UPDATE SET count = count + 1;
+            END;
+            """
+        )
+
+        cursor.execute(
+            """--sql
+            CREATE TRIGGER IF NOT EXISTS tg_session_queue_counts_delete
+            AFTER DELETE ON session_queue FOR EACH ROW
+            BEGIN
+                UPDATE session_queue_counts SET count = count - 1
+                WHERE queue_id = OLD.queue_id AND status = OLD.status;
+            END;
+            """
+        )
+
+        cursor.execute(
+            """--sql
+            CREATE TRIGGER IF NOT EXISTS tg_session_queue_counts_update
+            AFTER UPDATE OF status ON session_queue FOR EACH ROW
+            WHEN OLD.status != NEW.status
+            BEGIN
+                UPDATE session_queue_counts SET count = count - 1
+                WHERE queue_id = OLD.queue_id AND status = OLD.status;
+                INSERT INTO session_queue_counts (queue_id, status, count) VALUES (NEW.queue_id, NEW.status, 1)
+                ON CONFLICT (queue_id, status) DO UPDATE SET count = count + 1;
+            END;
+            """
+        )
+
+        cursor.execute("DELETE FROM session_queue_counts;")
+        cursor.execute(
+            """--sql
+            INSERT INTO session_queue_counts (queue_id, status, count)
+            SELECT queue_id, status, COUNT(*)
+            FROM session_queue
+            GROUP BY queue_id, status;
+            """
+        )
+
+
+def build_migration_29() -> Migration:
+    """
+    Build the migration from database version 28 to 29.
+
+    This migration does the following:
+        - Adds a composite (queue_id, status, priority DESC, item_id) index to the session queue table.
+        - Creates the `session_queue_counts` table, maintained by triggers, and populates it.
+    """
+    migration_29 = Migration(
+        from_version=28,
+        to_version=29,
+        callback=Migration29Callback(),
+    )
+
+    return migration_29
@@ -0,0 +1,86 @@
+import sqlite3
+from typing import Optional, Union
+
+from invokeai.app.services.shared.sqlite.sqlite_compression import compress_json
+from invokeai.app.services.shared.sqlite_migrator.sqlite_migrator_common import Migration
+
+# The number of queue items compressed at a time, to bound memory usage for large queues
+_CHUNK_SIZE = 100
+
+
+def _compress(value: Optional[Union[str, bytes]]) -> Optional[Union[str, bytes]]:
+    # Only legacy TEXT values are compressed. The templated session marker must stay as-is.
+    if isinstance(value, str) and value != "":
+        return compress_json(value)
+    return value
+
+
+class Migration30Callback:
+    def __call__(self, cursor: sqlite3.Cursor) -> None:
+        self._compress_session_queue(cursor)
+        self._compress_session_queue_templates(cursor)
+
+    def _compress_session_queue(self, cursor: sqlite3.Cursor) -> None:
+        """
+        - Compresses the `session`, `field_values` and `workflow` columns of existing queue items.
+        """
+
+        cursor.execute(
+            """--sql
+            SELECT item_id
+            FROM session_queue
+            WHERE
+                (typeof(session) = 'text' AND session != '')
+                OR typeof(field_values) = 'text'
+                OR typeof(workflow) = 'text';
+            """
+        )
+        item_ids = [row[0] for row in cursor.fetchall()]
+
+        for i in range(0, len(item_ids), _CHUNK_SIZE):
+            chunk = item_ids[i : i + _CHUNK_SIZE]
+            placeholders = ", ".join("?" * len(chunk))
+            cursor.execute(
+                f"SELECT item_id, session, field_values, workflow FROM session_queue WHERE item_id IN ({placeholders});",
+                chunk,
+            )
+            rows = cursor.fetchall()
+            cursor.executemany(
+                "UPDATE session_queue SET session = ?, field_values = ?, workflow = ? WHERE item_id = ?;",
+                [
+                    (_compress(session), _compress(field_values), _compress(workflow), item_id)
+                    for item_id, session, field_values, workflow in rows
+                ],
+            )
+
+    def _compress_session_queue_templates(self, cursor: sqlite3.Cursor) -> None:
+        """
+        - Compresses the `session` column of existing session templates.
+        """
+
+        cursor.execute("SELECT batch_id, session FROM session_queue_templates WHERE typeof(session) = 'text';")
+        rows = cursor.fetchall()
+        cursor.executemany(
+            "UPDATE session_queue_templates SET session = ? WHERE batch_id = ?;",
+            [(_compress(session), batch_id) for batch_id, session in rows],
+        )
+
+
+def build_migration_30() -> Migration:
+    """
+    Build the migration from database version 29 to 30.
+
+    This migration does the following:
+        - Compresses the `session`, `field_values` and `workflow` columns of existing queue items.
+        - Compresses the `session` column of existing session templates.
+
+    The session queue reads both compressed and uncompressed values, so this only reclaims space. The space is returned
+    to the OS the next time the database is vacuumed.
+    """
+    migration_30 = Migration(
+        from_version=29,
+        to_version=30,
+        callback=Migration30Callback(),
+    )
+
+    return migration_30
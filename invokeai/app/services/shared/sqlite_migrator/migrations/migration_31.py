@@ -0,0 +1,43 @@
+import sqlite3
+
+from invokeai.app.services.shared.sqlite_migrator.sqlite_migrator_common import Migration
+
+
+class Migration31Callback:
+    def __call__(self, cursor: sqlite3.Cursor) -> None:
+        self._create_model_scan_records(cursor)
+
+    def _create_model_scan_records(self, cursor: sqlite3.Cursor) -> None:
+        """
+        - Creates the `model_scan_records` table, which holds the size and modification time of each model found when
+          scanning the models directory, and the key of the model it was registered as, if any. Models that are
+          unchanged since they were last scanned are not probed or hashed again.
+        """
+
+        cursor.execute(
+            """--sql
+            CREATE TABLE IF NOT EXISTS model_scan_records (
+                path TEXT NOT NULL PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                model_key TEXT,
+                updated_at DATETIME NOT NULL DEFAULT(STRFTIME('%Y-%m-%d %H:%M:%f', 'NOW'))
+            );
+            """
+        )
+
+
+def build_migration_31() -> Migration:
+    """
+    Build the migration from database version 30 to 31.
+
+    This migration does the following:
+        - Creates the `model_scan_records` table.
+    """
+    migration_31 = Migration(
+        from_version=30,
+        to_version=31,
+        callback=Migration31Callback(),
+    )
+
+    return migration_31
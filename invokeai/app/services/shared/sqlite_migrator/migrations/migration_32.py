@@ -0,0 +1,44 @@
+import sqlite3
+
+from invokeai.app.services.shared.sqlite_migrator.sqlite_migrator_common import Migration
+
+
+class Migration32Callback:
+    def __call__(self, cursor: sqlite3.Cursor) -> None:
+        self._create_model_file_hashes(cursor)
+
+    def _create_model_file_hashes(self, cursor: sqlite3.Cursor) -> None:
+        """
+        - Creates the `model_file_hashes` table, a cache of the hashes of model files. Hashes are keyed by the inode,
+          size and modification time of the file, so a file is only hashed again when it changes.
+        """
+
+        cursor.execute(
+            """--sql
+            CREATE TABLE IF NOT EXISTS model_file_hashes (
+                inode INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                algorithm TEXT NOT NULL,
+                hash TEXT NOT NULL,
+                created_at DATETIME NOT NULL DEFAULT(STRFTIME('%Y-%m-%d %H:%M:%f', 'NOW')),
+                PRIMARY KEY (inode, size, mtime_ns, algorithm)
+            );
+            """
+        )
+
+
+def build_migration_32() -> Migration:
+    """
+    Build the migration from database version 31 to 32.
+
+    This migration does the following:
+        - Creates the `model_file_hashes` table.
+    """
+    migration_32 = Migration(
+        from_version=31,
+        to_version=32,
+        callback=Migration32Callback(),
+    )
+
+    return migration_32
@@ -1,3 +1,5 @@
+import time
+from functools import lru_cache
 from math import floor
 from typing import Callable, Optional, TypeAlias
 
@@ -134,6 +136,68 @@ FLUX2_LATENT_RGB_FACTORS = [
 FLUX2_LATENT_RGB_BIAS = [-0.0329, -0.0718, -0.0851]
 
 
+@lru_cache(maxsize=32)
+def get_latent_rgb_tensors(
+    base_model: BaseModelType, dtype: torch.dtype, device: torch.device
+) -> tuple[torch.Tensor, Optional[torch.Tensor], Optional[torch.Tensor]]:
+    """Gets the latent to RGB factors, smoothing matrix and bias for a base model, as tensors of the given dtype on the
+    given device.
+
+    The tensors are cached, so that they are not created anew for every denoising step. Callers must not modify them.
+    """
+
+    smooth_matrix: list[list[float]] | None = None
+    latent_rgb_bias: list[float] | None = None
+    if base_model in [BaseModelType.StableDiffusion1, BaseModelType.StableDiffusion2]:
+        latent_rgb_factors = SD1_5_LATENT_RGB_FACTORS
+    elif base_model in [BaseModelType.StableDiffusionXL, BaseModelType.StableDiffusionXLRefiner]:
+        latent_rgb_factors = SDXL_LATENT_RGB_FACTORS
+        smooth_matrix = SDXL_SMOOTH_MATRIX
+    elif base_model == BaseModelType.StableDiffusion3:
+        latent_rgb_factors = SD3_5_LATENT_RGB_FACTORS
+    elif base_model == BaseModelType.CogView4:
+        latent_rgb_factors = COGVIEW4_LATENT_RGB_FACTORS
+    elif base_model == BaseModelType.Flux:
+        latent_rgb_factors = FLUX_LATENT_RGB_FACTORS
+    elif base_model == BaseModelType.Flux2:
+        latent_rgb_factors = FLUX2_LATENT_RGB_FACTORS
+        latent_rgb_bias = FLUX2_LATENT_RGB_BIAS
+    elif base_model == BaseModelType.ZImage:
+        # Z-Image uses FLUX-compatible VAE with 16 latent channels
+        latent_rgb_factors = FLUX_LATENT_RGB_FACTORS
+    else:
+        raise ValueError(f"Unsupported base model: {base_model}")
+
+    return (
+        torch.tensor(latent_rgb_factors, dtype=dtype, device=device),
+        torch.tensor(smooth_matrix, dtype=dtype, device=device) if smooth_matrix else None,
+        torch.tensor(latent_rgb_bias, dtype=dtype, device=device) if latent_rgb_bias else None,
+    )
+
+
+class PreviewThrottle:
+    """Decides which denoising steps of an invocation get a preview image.
+
+    Rendering and encoding a preview image can take a noticeable share of a step on fast models. A step is previewed
+    only if it is a multiple of `every_n_steps` and at least `min_interval` seconds have passed since the last preview.
+    The first step and the final step are always previewed. Each invocation should get its own throttle.
+    """
+
+    def __init__(self, min_interval: float = 0.0, every_n_steps: int = 1) -> None:
+        self._min_interval = min_interval
+        self._every_n_steps = max(1, every_n_steps)
+        self._last_preview_time: Optional[float] = None
+
+    def should_preview(self, step: int, total_steps: int) -> bool:
+        """Checks if the given step should get a preview image, recording the preview if so."""
+        now = time.monotonic()
+        if self._last_preview_time is not None and step < total_steps:
+            if step % self._every_n_steps != 0 or now - self._last_preview_time < self._min_interval:
+                return False
+        self._last_preview_time = now
+        return True
+
+
 def sample_to_lowres_estimated_image(
     samples: torch.Tensor,
     latent_rgb_factors: torch.Tensor,
@@ -186,10 +250,19 @@ def diffusion_step_callback(
     intermediate_state: PipelineIntermediateState,
     base_model: BaseModelType,
     is_canceled: Callable[[], bool],
+    preview_throttle: Optional[PreviewThrottle] = None,
 ) -> None:
     if is_canceled():
         raise CanceledException
 
+    percentage = calc_percentage(intermediate_state)
+    if preview_throttle is not None and not preview_throttle.should_preview(
+        intermediate_state.step, intermediate_state.total_steps
+    ):
+        # Throttled steps still report their progress, without a preview image
+        signal_progress("Denoising", percentage, None, None)
+        return
+
     # Some schedulers report not only the noisy latents at the current timestep,
     # but also their estimate so far of what the de-noised latents will be. Use
     # that estimate if it is available.
@@ -198,44 +271,15 @@ def diffusion_step_callback(
     else:
         sample = intermediate_state.latents
 
-    smooth_matrix: list[list[float]] | None = None
-    latent_rgb_bias: list[float] | None = None
-    if base_model in [BaseModelType.StableDiffusion1, BaseModelType.StableDiffusion2]:
-        latent_rgb_factors = SD1_5_LATENT_RGB_FACTORS
-    elif base_model in [BaseModelType.StableDiffusionXL, BaseModelType.StableDiffusionXLRefiner]:
-        latent_rgb_factors = SDXL_LATENT_RGB_FACTORS
-        smooth_matrix = SDXL_SMOOTH_MATRIX
-    elif base_model == BaseModelType.StableDiffusion3:
-        latent_rgb_factors = SD3_5_LATENT_RGB_FACTORS
-    elif base_model == BaseModelType.CogView4:
-        latent_rgb_factors = COGVIEW4_LATENT_RGB_FACTORS
-    elif base_model == BaseModelType.Flux:
-        latent_rgb_factors = FLUX_LATENT_RGB_FACTORS
-    elif base_model == BaseModelType.Flux2:
-        latent_rgb_factors = FLUX2_LATENT_RGB_FACTORS
-        latent_rgb_bias = FLUX2_LATENT_RGB_BIAS
-    elif base_model == BaseModelType.ZImage:
-        # Z-Image uses FLUX-compatible VAE with 16 latent channels
-        latent_rgb_factors = FLUX_LATENT_RGB_FACTORS
-    else:
-        raise ValueError(f"Unsupported base model: {base_model}")
-
-    latent_rgb_factors_torch = torch.tensor(latent_rgb_factors, dtype=sample.dtype, device=sample.device)
-    smooth_matrix_torch = (
-        torch.tensor(smooth_matrix, dtype=sample.dtype, device=sample.device) if smooth_matrix else None
-    )
-    latent_rgb_bias_torch = (
-        torch.tensor(latent_rgb_bias, dtype=sample.dtype, device=sample.device) if latent_rgb_bias else None
-    )
+    latent_rgb_factors, smooth_matrix, latent_rgb_bias = get_latent_rgb_tensors(base_model, sample.dtype, sample.device)
     image = sample_to_lowres_estimated_image(
         samples=sample,
-        latent_rgb_factors=latent_rgb_factors_torch,
-        smooth_matrix=smooth_matrix_torch,
-        latent_rgb_bias=latent_rgb_bias_torch,
+        latent_rgb_factors=latent_rgb_factors,
+        smooth_matrix=smooth_matrix,
+        latent_rgb_bias=latent_rgb_bias,
     )
 
     width = image.width * 8
     height = image.height * 8
-    percentage = calc_percentage(intermediate_state)
 
     signal_progress("Denoising", percentage, image, (width, height))
@@ -1,9 +1,11 @@
 # Copyright (c) 2023 Lincoln D. Stein and the InvokeAI Development Team
 
 import hashlib
+import mmap
 import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Callable, Literal, Optional, Union
+from typing import Callable, Literal, NamedTuple, Optional, Protocol, Union
 
 from blake3 import blake3
 from tqdm import tqdm
@@ -32,6 +34,33 @@ HASHING_ALGORITHMS = Literal[
 MODEL_FILE_EXTENSIONS = (".ckpt", ".safetensors", ".bin", ".pt", ".pth")
 
 
+class FileHashKey(NamedTuple):
+    """Identifies the contents of a file, for caching its hash.
+
+    A file that is modified, or replaced by another file, gets a new modification time (and usually a new size and
+    inode), so its key changes with its contents. The key does not depend on the file's path, so moving or renaming a
+    model within a filesystem keeps its cached hashes.
+    """
+
+    inode: int
+    size: int
+    mtime_ns: int
+    algorithm: HASHING_ALGORITHMS
+
+    @classmethod
+    def from_path(cls, file_path: Path, algorithm: HASHING_ALGORITHMS) -> "FileHashKey":
+        stat = file_path.stat()
+        return cls(inode=stat.st_ino, size=stat.st_size, mtime_ns=stat.st_mtime_ns, algorithm=algorithm)
+
+
+class ModelHashCache(Protocol):
+    """A cache of file hashes, keyed by the identity of the files' contents."""
+
+    def get_file_hash(self, key: FileHashKey) -> Optional[str]: ...
+
+    def set_file_hash(self, key: FileHashKey, file_hash: str) -> None: ...
+
+
 class ModelHash:
     """
     Creates a hash of a model using a specified algorithm. The hash is prefixed by the algorithm used.
@@ -39,10 +68,16 @@ class ModelHash:
     Args:
         algorithm: Hashing algorithm to use. Defaults to BLAKE3.
         file_filter: A function that takes a file name and returns True if the file should be included in the hash.
+        hash_cache: An optional cache of file hashes. Files whose inode, size and modification time are unchanged
+            since they were last hashed are not read again.
+        max_workers: The number of files of a directory to hash concurrently. Defaults to 1 for "blake3_single",
+            which is meant for spinning disks that are slowed down by concurrent reads, and to the number of CPUs
+            (up to 8) for other algorithms.
 
     If the model is a single file, it is hashed directly using the provided algorithm.
 
-    If the model is a directory, each model weights file in the directory is hashed using the provided algorithm.
+    If the model is a directory, each model weights file in the directory is hashed using the provided algorithm,
+    several files at a time.
 
     Only files with the following extensions are hashed: .ckpt, .safetensors, .bin, .pt, .pth
 
@@ -61,7 +96,11 @@ class ModelHash:
     """
 
     def __init__(
-        self, algorithm: HASHING_ALGORITHMS = "blake3_single", file_filter: Optional[Callable[[str], bool]] = None
+        self,
+        algorithm: HASHING_ALGORITHMS = "blake3_single",
+        file_filter: Optional[Callable[[str], bool]] = None,
+        hash_cache: Optional[ModelHashCache] = None,
+        max_workers: Optional[int] = None,
     ) -> None:
         self.algorithm: HASHING_ALGORITHMS = algorithm
         if algorithm == "blake3_multi":
@@ -76,6 +115,11 @@ class ModelHash:
             raise ValueError(f"Algorithm {algorithm} not available")
 
         self._file_filter = file_filter or self._default_file_filter
+        # Random "hashes" must not be cached, or they would be the same for every model with the same file
+        self._hash_cache = hash_cache if algorithm != "random" else None
+        if max_workers is None:
+            max_workers = 1 if algorithm == "blake3_single" else min(8, os.cpu_count() or 1)
+        self._max_workers = max_workers
 
     def hash(self, model_path: Union[str, Path]) -> str:
         """
@@ -100,7 +144,7 @@ class ModelHash:
             pbar = tqdm([model_path], desc=f"Hashing {model_path.name}", unit="file")
             for component in pbar:
                 pbar.set_description(f"Hashing {component.name}")
-                hash_ = prefix + self._hash_file(model_path)
+                hash_ = prefix + self._hash_file_cached(model_path)
             assert hash_ is not None
             return hash_
         elif model_path.is_dir():
@@ -119,11 +163,17 @@ class ModelHash:
         """
         model_component_paths = self._get_file_paths(dir, self._file_filter)
 
-        component_hashes: list[str] = []
-        pbar = tqdm(sorted(model_component_paths), desc=f"Hashing {dir.name}", unit="file")
-        for component in pbar:
-            pbar.set_description(f"Hashing {component.name}")
-            component_hashes.append(self._hash_file(component))
+        component_paths = sorted(model_component_paths)
+        with ThreadPoolExecutor(max_workers=self._max_workers) as executor:
+            # Hashes are returned in the order of the paths, so the composite hash does not depend on the timing
+            component_hashes = list(
+                tqdm(
+                    executor.map(self._hash_file_cached, component_paths),
+                    total=len(component_paths),
+                    desc=f"Hashing {dir.name}",
+                    unit="file",
+                )
+            )
 
         # BLAKE3 is cryptographically secure. We may as well fall back on a secure algorithm
         # for the composite hash
@@ -133,6 +183,24 @@ class ModelHash:
 
         return composite_hasher.hexdigest()
 
+    def _hash_file_cached(self, file_path: Path) -> str:
+        """Hashes a file, using the hash cache if there is one.
+
+        Args:
+            file_path: Path to the file to hash
+
+        Returns:
+            Hexdigest of the hash of the file
+        """
+        if self._hash_cache is None:
+            return self._hash_file(file_path)
+        key = FileHashKey.from_path(file_path, self.algorithm)
+        file_hash = self._hash_cache.get_file_hash(key)
+        if file_hash is None:
+            file_hash = self._hash_file(file_path)
+            self._hash_cache.set_file_hash(key, file_hash)
+        return file_hash
+
     @staticmethod
     def _get_file_paths(model_path: Path, file_filter: Callable[[str], bool]) -> list[Path]:
         """Return a list of all model files in the directory.
@@ -192,13 +260,18 @@ class ModelHash:
         """
 
         def hashlib_hasher(file_path: Path) -> str:
-            """Hashes a file using a hashlib algorithm. Uses `memoryview` to avoid reading the entire file into memory."""
+            """Hashes a file using a hashlib algorithm. Uses memory-mapped I/O to avoid copying the file into memory.
+
+            hashlib releases the GIL while it hashes the mapped chunks, so several files can be hashed concurrently.
+            """
             hasher = hashlib.new(algorithm)
-            buffer = bytearray(128 * 1024)
-            mv = memoryview(buffer)
+            chunk_size = 16 * 2**20
             with open(file_path, "rb", buffering=0) as f:
-                while n := f.readinto(mv):
-                    hasher.update(mv[:n])
+                # Empty files can't be mapped
+                if os.fstat(f.fileno()).st_size > 0:
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, memoryview(mm) as mv:
+                        for start in range(0, len(mv), chunk_size):
+                            hasher.update(mv[start : start + chunk_size])
             return hasher.hexdigest()
 
         return hashlib_hasher
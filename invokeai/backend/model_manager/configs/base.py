@@ -200,6 +200,17 @@ class Config_Base(ABC, BaseModel):
         Implementations should raise a NotAMatchError if the model does not match this config class."""
         raise NotImplementedError(f"from_model_on_disk not implemented for {cls.__name__}")
 
+    @classmethod
+    def could_match(cls, mod: ModelOnDisk) -> bool:
+        """Cheaply check whether the model on disk could match this config class, before calling `from_model_on_disk`.
+
+        Matching often loads the model's state dict, or even the model itself. Classes can rule a model out early by
+        overriding this method, using only the model's layout on disk and its header (see `ModelOnDisk.header`).
+        Implementations must never return False for a model that `from_model_on_disk` would match.
+
+        The default is to always try matching."""
+        return True
+
 
 class Checkpoint_Config_Base(ABC, BaseModel):
     """Base class for checkpoint-style models."""
@@ -14,6 +14,7 @@ from invokeai.backend.model_manager.configs.base import Checkpoint_Config_Base,
 from invokeai.backend.model_manager.configs.identification_utils import (
     NotAMatchError,
     common_config_paths,
+    file_could_match,
     get_config_dict_or_raise,
     raise_for_class_name,
     raise_for_override_fields,
@@ -145,6 +146,10 @@ class ControlNet_Checkpoint_Config_Base(Checkpoint_Config_Base):
     format: Literal[ModelFormat.Checkpoint] = Field(default=ModelFormat.Checkpoint)
     default_settings: ControlAdapterDefaultSettings | None = Field(None)
 
+    @classmethod
+    def could_match(cls, mod: ModelOnDisk) -> bool:
+        return file_could_match(mod, lambda h: cls._has_controlnet_keys(h.tensors))
+
     @classmethod
     def from_model_on_disk(cls, mod: ModelOnDisk, override_fields: dict[str, Any]) -> Self:
         raise_if_not_file(mod)
@@ -167,8 +172,13 @@ class ControlNet_Checkpoint_Config_Base(Checkpoint_Config_Base):
 
     @classmethod
     def _validate_looks_like_controlnet(cls, mod: ModelOnDisk) -> None:
-        if not state_dict_has_any_keys_starting_with(
-            mod.load_state_dict(),
+        if not cls._has_controlnet_keys(mod.load_state_dict()):
+            raise NotAMatchError("state dict does not look like a ControlNet checkpoint")
+
+    @classmethod
+    def _has_controlnet_keys(cls, state_dict: dict[str | int, Any]) -> bool:
+        return state_dict_has_any_keys_starting_with(
+            state_dict,
             {
                 "controlnet",
                 "control_model",
@@ -180,8 +190,7 @@ class ControlNet_Checkpoint_Config_Base(Checkpoint_Config_Base):
                 # delicate.
                 "controlnet_blocks",
             },
-        ):
-            raise NotAMatchError("state dict does not look like a ControlNet checkpoint")
+        )
 
     @classmethod
     def _get_base_or_raise(cls, mod: ModelOnDisk) -> BaseModelType:
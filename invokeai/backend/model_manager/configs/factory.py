@@ -480,6 +480,10 @@ class ModelConfigFactory:
         for candidate_class in filter(lambda x: x is not Unknown_Config, Config_Base.CONFIG_CLASSES):
             candidate_name = candidate_class.__name__
             try:
+                # Rule out implausible candidates using only the model's header, so that matching doesn't load the
+                # model's state dict (or the model itself) for classes that can't match.
+                if not candidate_class.could_match(mod):
+                    raise NotAMatchError("ruled out by the model's layout or header")
                 # Technically, from_model_on_disk returns a Config_Base, but in practice it will always be a member of
                 # the AnyModelConfig union.
                 details[candidate_name] = candidate_class.from_model_on_disk(mod, fields)  # type: ignore
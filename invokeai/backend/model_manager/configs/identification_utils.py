@@ -1,12 +1,13 @@
 import json
 from functools import cache
 from pathlib import Path
+from typing import Callable
 
 from pydantic import BaseModel, ValidationError
 from pydantic_core import CoreSchema, SchemaValidator
 from typing_extensions import Any
 
-from invokeai.backend.model_manager.model_on_disk import ModelOnDisk
+from invokeai.backend.model_manager.model_on_disk import ModelOnDisk, WeightFileHeader
 
 
 class NotAMatchError(Exception):
@@ -143,6 +144,18 @@ def raise_if_not_dir(mod: ModelOnDisk) -> None:
         raise NotAMatchError("model path is not a directory")
 
 
+def file_could_match(mod: ModelOnDisk, predicate: Callable[[WeightFileHeader], bool]) -> bool:
+    """Helper for the `could_match` method of config classes for single-file models.
+
+    Returns False if the model is not a file, and True if its header can't be read (so it must be matched in full).
+    Otherwise, returns the result of the predicate on the header.
+    """
+    if not mod.path.is_file():
+        return False
+    header = mod.header()
+    return header is None or predicate(header)
+
+
 def state_dict_has_any_keys_exact(state_dict: dict[str | int, Any], keys: str | set[str]) -> bool:
     """Returns true if the state dict has any of the specified keys."""
     _keys = {keys} if isinstance(keys, str) else keys
@@ -11,6 +11,7 @@ from invokeai.backend.flux.ip_adapter.state_dict_utils import is_state_dict_xlab
 from invokeai.backend.model_manager.configs.base import Config_Base
 from invokeai.backend.model_manager.configs.identification_utils import (
     NotAMatchError,
+    file_could_match,
     raise_for_override_fields,
     raise_if_not_dir,
     raise_if_not_file,
@@ -108,6 +109,10 @@ class IPAdapter_Checkpoint_Config_Base(IPAdapter_Config_Base):
 
     format: Literal[ModelFormat.Checkpoint] = Field(default=ModelFormat.Checkpoint)
 
+    @classmethod
+    def could_match(cls, mod: ModelOnDisk) -> bool:
+        return file_could_match(mod, lambda h: cls._has_ip_adapter_keys(h.tensors))
+
     @classmethod
     def from_model_on_disk(cls, mod: ModelOnDisk, override_fields: dict[str, Any]) -> Self:
         raise_if_not_file(mod)
@@ -130,16 +135,20 @@ class IPAdapter_Checkpoint_Config_Base(IPAdapter_Config_Base):
 
     @classmethod
     def _validate_looks_like_ip_adapter(cls, mod: ModelOnDisk) -> None:
-        if not state_dict_has_any_keys_starting_with(
-            mod.load_state_dict(),
+        if not cls._has_ip_adapter_keys(mod.load_state_dict()):
+            raise NotAMatchError("model does not match Checkpoint IP Adapter heuristics")
+
+    @classmethod
+    def _has_ip_adapter_keys(cls, state_dict: dict[str | int, Any]) -> bool:
+        return state_dict_has_any_keys_starting_with(
+            state_dict,
             {
                 "image_proj.",
                 "ip_adapter.",
                 # XLabs FLUX IP-Adapter models have keys startinh with "ip_adapter_proj_model.".
                 "ip_adapter_proj_model.",
             },
-        ):
-            raise NotAMatchError("model does not match Checkpoint IP Adapter heuristics")
+        )
 
     @classmethod
     def _get_base_or_raise(cls, mod: ModelOnDisk) -> BaseModelType:
@@ -13,6 +13,7 @@ from invokeai.backend.model_manager.configs.clip_embed import get_clip_variant_t
 from invokeai.backend.model_manager.configs.identification_utils import (
     NotAMatchError,
     common_config_paths,
+    file_could_match,
     get_config_dict_or_raise,
     raise_for_class_name,
     raise_for_override_fields,
@@ -20,7 +21,7 @@ from invokeai.backend.model_manager.configs.identification_utils import (
     raise_if_not_file,
     state_dict_has_any_keys_exact,
 )
-from invokeai.backend.model_manager.model_on_disk import ModelOnDisk
+from invokeai.backend.model_manager.model_on_disk import LazyStateDict, ModelOnDisk
 from invokeai.backend.model_manager.taxonomy import (
     BaseModelType,
     Flux2VariantType,
@@ -110,6 +111,9 @@ def _has_bnb_nf4_keys(state_dict: dict[str | int, Any]) -> bool:
 
 
 def _has_ggml_tensors(state_dict: dict[str | int, Any]) -> bool:
+    if isinstance(state_dict, LazyStateDict):
+        # Every tensor of a GGUF file is loaded as a GGMLTensor, so the header answers without loading any tensors
+        return state_dict.header.format == "gguf" and len(state_dict) > 0
     return any(isinstance(v, GGMLTensor) for v in state_dict.values())
 
 
@@ -176,6 +180,26 @@ def _has_z_image_keys(state_dict: dict[str | int, Any]) -> bool:
     return False
 
 
+def _get_sd_checkpoint_base(state_dict: dict[str | int, Any]) -> BaseModelType | None:
+    """Get the base of a SD main checkpoint from the shapes of its cross-attention weights.
+
+    Only the shapes of the values are used, so this works on a `WeightFileHeader`'s tensors too.
+    """
+    key_name = "model.diffusion_model.input_blocks.2.1.transformer_blocks.0.attn2.to_k.weight"
+    if key_name in state_dict and state_dict[key_name].shape[-1] == 768:
+        return BaseModelType.StableDiffusion1
+    if key_name in state_dict and state_dict[key_name].shape[-1] == 1024:
+        return BaseModelType.StableDiffusion2
+
+    key_name = "model.diffusion_model.input_blocks.4.1.transformer_blocks.0.attn2.to_k.weight"
+    if key_name in state_dict and state_dict[key_name].shape[-1] == 2048:
+        return BaseModelType.StableDiffusionXL
+    elif key_name in state_dict and state_dict[key_name].shape[-1] == 1280:
+        return BaseModelType.StableDiffusionXLRefiner
+
+    return None
+
+
 class Main_SD_Checkpoint_Config_Base(Checkpoint_Config_Base, Main_Config_Base):
     """Model config for main checkpoint models."""
 
@@ -184,6 +208,11 @@ class Main_SD_Checkpoint_Config_Base(Checkpoint_Config_Base, Main_Config_Base):
     prediction_type: SchedulerPredictionType = Field()
     variant: ModelVariantType = Field()
 
+    @classmethod
+    def could_match(cls, mod: ModelOnDisk) -> bool:
+        expected_base = cls.model_fields["base"].default
+        return file_could_match(mod, lambda h: _get_sd_checkpoint_base(h.tensors) is expected_base)
+
     @classmethod
     def from_model_on_disk(cls, mod: ModelOnDisk, override_fields: dict[str, Any]) -> Self:
         raise_if_not_file(mod)
@@ -210,21 +239,10 @@ class Main_SD_Checkpoint_Config_Base(Checkpoint_Config_Base, Main_Config_Base):
 
     @classmethod
     def _get_base_or_raise(cls, mod: ModelOnDisk) -> BaseModelType:
-        state_dict = mod.load_state_dict()
-
-        key_name = "model.diffusion_model.input_blocks.2.1.transformer_blocks.0.attn2.to_k.weight"
-        if key_name in state_dict and state_dict[key_name].shape[-1] == 768:
-            return BaseModelType.StableDiffusion1
-        if key_name in state_dict and state_dict[key_name].shape[-1] == 1024:
-            return BaseModelType.StableDiffusion2
-
-        key_name = "model.diffusion_model.input_blocks.4.1.transformer_blocks.0.attn2.to_k.weight"
-        if key_name in state_dict and state_dict[key_name].shape[-1] == 2048:
-            return BaseModelType.StableDiffusionXL
-        elif key_name in state_dict and state_dict[key_name].shape[-1] == 1280:
-            return BaseModelType.StableDiffusionXLRefiner
-
-        raise NotAMatchError("unable to determine base type from state dict")
+        base = _get_sd_checkpoint_base(mod.load_state_dict())
+        if base is None:
+            raise NotAMatchError("unable to determine base type from state dict")
+        return base
 
     @classmethod
     def _get_scheduler_prediction_type_or_raise(cls, mod: ModelOnDisk) -> SchedulerPredictionType:
@@ -445,6 +463,23 @@ class Main_Checkpoint_FLUX_Config(Checkpoint_Config_Base, Main_Config_Base, Conf
 
     variant: FluxVariantType = Field()
 
+    @classmethod
+    def could_match(cls, mod: ModelOnDisk) -> bool:
+        return file_could_match(
+            mod,
+            lambda h: h.format != "gguf"
+            and _has_main_keys(h.tensors)
+            and not _has_bnb_nf4_keys(h.tensors)
+            and state_dict_has_any_keys_exact(
+                h.tensors,
+                {
+                    "double_blocks.0.img_attn.norm.key_norm.scale",
+                    "model.diffusion_model.double_blocks.0.img_attn.norm.key_norm.scale",
+                },
+            )
+            and not _is_flux2_model(h.tensors),
+        )
+
     @classmethod
     def from_model_on_disk(cls, mod: ModelOnDisk, override_fields: dict[str, Any]) -> Self:
         raise_if_not_file(mod)
@@ -520,6 +555,16 @@ class Main_Checkpoint_Flux2_Config(Checkpoint_Config_Base, Main_Config_Base, Con
 
     variant: Flux2VariantType = Field()
 
+    @classmethod
+    def could_match(cls, mod: ModelOnDisk) -> bool:
+        return file_could_match(
+            mod,
+            lambda h: h.format != "gguf"
+            and _has_main_keys(h.tensors)
+            and not _has_bnb_nf4_keys(h.tensors)
+            and _is_flux2_model(h.tensors),
+        )
+
     @classmethod
     def from_model_on_disk(cls, mod: ModelOnDisk, override_fields: dict[str, Any]) -> Self:
         raise_if_not_file(mod)
@@ -582,6 +627,10 @@ class Main_BnBNF4_FLUX_Config(Checkpoint_Config_Base, Main_Config_Base, Config_B
 
     variant: FluxVariantType = Field()
 
+    @classmethod
+    def could_match(cls, mod: ModelOnDisk) -> bool:
+        return file_could_match(mod, lambda h: _has_main_keys(h.tensors) and _has_bnb_nf4_keys(h.tensors))
+
     @classmethod
     def from_model_on_disk(cls, mod: ModelOnDisk, override_fields: dict[str, Any]) -> Self:
         raise_if_not_file(mod)
@@ -631,6 +680,10 @@ class Main_GGUF_FLUX_Config(Checkpoint_Config_Base, Main_Config_Base, Config_Bas
 
     variant: FluxVariantType = Field()
 
+    @classmethod
+    def could_match(cls, mod: ModelOnDisk) -> bool:
+        return file_could_match(mod, lambda h: h.format == "gguf" and _has_main_keys(h.tensors))
+
     @classmethod
     def from_model_on_disk(cls, mod: ModelOnDisk, override_fields: dict[str, Any]) -> Self:
         raise_if_not_file(mod)
@@ -689,6 +742,10 @@ class Main_GGUF_Flux2_Config(Checkpoint_Config_Base, Main_Config_Base, Config_Ba
 
     variant: Flux2VariantType = Field()
 
+    @classmethod
+    def could_match(cls, mod: ModelOnDisk) -> bool:
+        return file_could_match(mod, lambda h: h.format == "gguf" and _has_main_keys(h.tensors))
+
     @classmethod
     def from_model_on_disk(cls, mod: ModelOnDisk, override_fields: dict[str, Any]) -> Self:
         raise_if_not_file(mod)
@@ -1140,6 +1197,10 @@ class Main_Checkpoint_ZImage_Config(Checkpoint_Config_Base, Main_Config_Base, Co
     format: Literal[ModelFormat.Checkpoint] = Field(default=ModelFormat.Checkpoint)
     variant: ZImageVariantType = Field()
 
+    @classmethod
+    def could_match(cls, mod: ModelOnDisk) -> bool:
+        return file_could_match(mod, lambda h: h.format != "gguf" and _has_z_image_keys(h.tensors))
+
     @classmethod
     def from_model_on_disk(cls, mod: ModelOnDisk, override_fields: dict[str, Any]) -> Self:
         raise_if_not_file(mod)
@@ -1174,6 +1235,10 @@ class Main_GGUF_ZImage_Config(Checkpoint_Config_Base, Main_Config_Base, Config_B
     format: Literal[ModelFormat.GGUFQuantized] = Field(default=ModelFormat.GGUFQuantized)
     variant: ZImageVariantType = Field()
 
+    @classmethod
+    def could_match(cls, mod: ModelOnDisk) -> bool:
+        return file_could_match(mod, lambda h: h.format == "gguf" and _has_z_image_keys(h.tensors))
+
     @classmethod
     def from_model_on_disk(cls, mod: ModelOnDisk, override_fields: dict[str, Any]) -> Self:
         raise_if_not_file(mod)
@@ -6,12 +6,13 @@ from pydantic import Field
 from invokeai.backend.model_manager.configs.base import Checkpoint_Config_Base, Config_Base
 from invokeai.backend.model_manager.configs.identification_utils import (
     NotAMatchError,
+    file_could_match,
     raise_for_class_name,
     raise_for_override_fields,
     raise_if_not_dir,
     raise_if_not_file,
 )
-from invokeai.backend.model_manager.model_on_disk import ModelOnDisk
+from invokeai.backend.model_manager.model_on_disk import LazyStateDict, ModelOnDisk
 from invokeai.backend.model_manager.taxonomy import BaseModelType, ModelFormat, ModelType, Qwen3VariantType
 from invokeai.backend.quantization.gguf.ggml_tensor import GGMLTensor
 
@@ -43,6 +44,9 @@ def _has_qwen3_keys(state_dict: dict[str | int, Any]) -> bool:
 
 def _has_ggml_tensors(state_dict: dict[str | int, Any]) -> bool:
     """Check if state dict contains GGML tensors (GGUF quantized)."""
+    if isinstance(state_dict, LazyStateDict):
+        # Every tensor of a GGUF file is loaded as a GGMLTensor, so the header answers without loading any tensors
+        return state_dict.header.format == "gguf" and len(state_dict) > 0
     return any(isinstance(v, GGMLTensor) for v in state_dict.values())
 
 
@@ -109,6 +113,10 @@ class Qwen3Encoder_Checkpoint_Config(Checkpoint_Config_Base, Config_Base):
     cpu_only: bool | None = Field(default=None, description="Whether this model should run on CPU only")
     variant: Qwen3VariantType = Field(description="Qwen3 model size variant (4B or 8B)")
 
+    @classmethod
+    def could_match(cls, mod: ModelOnDisk) -> bool:
+        return file_could_match(mod, lambda h: h.format != "gguf" and _has_qwen3_keys(h.tensors))
+
     @classmethod
     def from_model_on_disk(cls, mod: ModelOnDisk, override_fields: dict[str, Any]) -> Self:
         raise_if_not_file(mod)
@@ -233,6 +241,10 @@ class Qwen3Encoder_GGUF_Config(Checkpoint_Config_Base, Config_Base):
     cpu_only: bool | None = Field(default=None, description="Whether this model should run on CPU only")
     variant: Qwen3VariantType = Field(description="Qwen3 model size variant (4B or 8B)")
 
+    @classmethod
+    def could_match(cls, mod: ModelOnDisk) -> bool:
+        return file_could_match(mod, lambda h: h.format == "gguf" and _has_qwen3_keys(h.tensors))
+
     @classmethod
     def from_model_on_disk(cls, mod: ModelOnDisk, override_fields: dict[str, Any]) -> Self:
         raise_if_not_file(mod)
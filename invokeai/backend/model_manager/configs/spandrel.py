@@ -3,16 +3,19 @@ from typing import (
     Self,
 )
 
+import torch
 from pydantic import Field
+from spandrel import MAIN_REGISTRY, canonicalize_state_dict
 from typing_extensions import Any
 
 from invokeai.backend.model_manager.configs.base import Config_Base
 from invokeai.backend.model_manager.configs.identification_utils import (
     NotAMatchError,
+    file_could_match,
     raise_for_override_fields,
     raise_if_not_file,
 )
-from invokeai.backend.model_manager.model_on_disk import ModelOnDisk
+from invokeai.backend.model_manager.model_on_disk import ModelOnDisk, WeightFileHeader
 from invokeai.backend.model_manager.taxonomy import (
     BaseModelType,
     ModelFormat,
@@ -20,6 +23,27 @@ from invokeai.backend.model_manager.taxonomy import (
 )
 from invokeai.backend.spandrel_image_to_image_model import SpandrelImageToImageModel
 
+# The file extensions that spandrel loads models from
+_SPANDREL_FILE_EXTENSIONS = {".pt", ".pth", ".ckpt", ".safetensors"}
+
+
+def _spandrel_detects_architecture(header: WeightFileHeader) -> bool:
+    """Runs spandrel's architecture detection on a state dict of meta tensors built from the header.
+
+    Spandrel only loads a model if one of its architectures detects the state dict, and detection has no false
+    negatives, so a header that no architecture detects can't be loaded."""
+    state_dict = canonicalize_state_dict(
+        {key: torch.empty(info.shape, device="meta") for key, info in header.tensors.items()}
+    )
+    for arch in MAIN_REGISTRY.architectures("detection"):
+        try:
+            if arch.detect(state_dict):
+                return True
+        except Exception:
+            # Detection needed more than the header holds, so the model must be matched in full
+            return True
+    return False
+
 
 class Spandrel_Checkpoint_Config(Config_Base):
     """Model config for Spandrel Image to Image models."""
@@ -28,6 +52,12 @@ class Spandrel_Checkpoint_Config(Config_Base):
     type: Literal[ModelType.SpandrelImageToImage] = Field(default=ModelType.SpandrelImageToImage)
     format: Literal[ModelFormat.Checkpoint] = Field(default=ModelFormat.Checkpoint)
 
+    @classmethod
+    def could_match(cls, mod: ModelOnDisk) -> bool:
+        if mod.path.suffix.lower() not in _SPANDREL_FILE_EXTENSIONS:
+            return False
+        return file_could_match(mod, _spandrel_detects_architecture)
+
     @classmethod
     def from_model_on_disk(cls, mod: ModelOnDisk, override_fields: dict[str, Any]) -> Self:
         raise_if_not_file(mod)
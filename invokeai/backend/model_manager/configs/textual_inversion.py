@@ -12,6 +12,7 @@ from typing_extensions import Any
 from invokeai.backend.model_manager.configs.base import Config_Base
 from invokeai.backend.model_manager.configs.identification_utils import (
     NotAMatchError,
+    file_could_match,
     raise_for_override_fields,
     raise_if_not_dir,
     raise_if_not_file,
@@ -99,6 +100,15 @@ class TI_File_Config_Base(TI_Config_Base):
 
     format: Literal[ModelFormat.EmbeddingFile] = Field(default=ModelFormat.EmbeddingFile)
 
+    @classmethod
+    def could_match(cls, mod: ModelOnDisk) -> bool:
+        # Mirrors the key and size heuristics of _file_looks_like_embedding
+        return file_could_match(
+            mod,
+            lambda h: len(h.tensors) < 10
+            or any(key in {"string_to_param", "emb_params", "clip_g"} for key in h.tensors.keys()),
+        )
+
     @classmethod
     def from_model_on_disk(cls, mod: ModelOnDisk, override_fields: dict[str, Any]) -> Self:
         raise_if_not_file(mod)
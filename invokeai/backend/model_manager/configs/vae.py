@@ -11,6 +11,7 @@ from invokeai.backend.model_manager.configs.base import Checkpoint_Config_Base,
 from invokeai.backend.model_manager.configs.identification_utils import (
     NotAMatchError,
     common_config_paths,
+    file_could_match,
     get_config_dict_or_raise,
     raise_for_class_name,
     raise_for_override_fields,
@@ -52,12 +53,26 @@ def _is_flux2_vae(state_dict: dict[str | int, Any]) -> bool:
     return has_bn or has_32_latent_channels
 
 
+def _has_vae_keys(state_dict: dict[str | int, Any]) -> bool:
+    return state_dict_has_any_keys_starting_with(
+        state_dict,
+        {
+            "encoder.conv_in",
+            "decoder.conv_in",
+        },
+    )
+
+
 class VAE_Checkpoint_Config_Base(Checkpoint_Config_Base):
     """Model config for standalone VAE models."""
 
     type: Literal[ModelType.VAE] = Field(default=ModelType.VAE)
     format: Literal[ModelFormat.Checkpoint] = Field(default=ModelFormat.Checkpoint)
 
+    @classmethod
+    def could_match(cls, mod: ModelOnDisk) -> bool:
+        return file_could_match(mod, lambda h: _has_vae_keys(h.tensors) and not _is_flux2_vae(h.tensors))
+
     @classmethod
     def from_model_on_disk(cls, mod: ModelOnDisk, override_fields: dict[str, Any]) -> Self:
         raise_if_not_file(mod)
@@ -81,13 +96,7 @@ class VAE_Checkpoint_Config_Base(Checkpoint_Config_Base):
     @classmethod
     def _validate_looks_like_vae(cls, mod: ModelOnDisk) -> None:
         state_dict = mod.load_state_dict()
-        if not state_dict_has_any_keys_starting_with(
-            state_dict,
-            {
-                "encoder.conv_in",
-                "decoder.conv_in",
-            },
-        ):
+        if not _has_vae_keys(state_dict):
             raise NotAMatchError("model does not match Checkpoint VAE heuristics")
 
         # Exclude FLUX.2 VAEs - they have their own config class
@@ -144,6 +153,10 @@ class VAE_Checkpoint_Flux2_Config(Checkpoint_Config_Base, Config_Base):
     format: Literal[ModelFormat.Checkpoint] = Field(default=ModelFormat.Checkpoint)
     base: Literal[BaseModelType.Flux2] = Field(default=BaseModelType.Flux2)
 
+    @classmethod
+    def could_match(cls, mod: ModelOnDisk) -> bool:
+        return file_could_match(mod, lambda h: _has_vae_keys(h.tensors) and _is_flux2_vae(h.tensors))
+
     @classmethod
     def from_model_on_disk(cls, mod: ModelOnDisk, override_fields: dict[str, Any]) -> Self:
         raise_if_not_file(mod)
@@ -158,13 +171,7 @@ class VAE_Checkpoint_Flux2_Config(Checkpoint_Config_Base, Config_Base):
 
     @classmethod
     def _validate_looks_like_vae(cls, mod: ModelOnDisk) -> None:
-        if not state_dict_has_any_keys_starting_with(
-            mod.load_state_dict(),
-            {
-                "encoder.conv_in",
-                "decoder.conv_in",
-            },
-        ):
+        if not _has_vae_keys(mod.load_state_dict()):
             raise NotAMatchError("model does not match Checkpoint VAE heuristics")
 
     @classmethod
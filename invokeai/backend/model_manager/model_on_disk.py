@@ -1,15 +1,21 @@
+import json
+import mmap
+import struct
+from collections.abc import ItemsView, Iterator, ValuesView
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any, Optional, TypeAlias
+from typing import Any, Literal, NamedTuple, Optional, TypeAlias
 
-import safetensors.torch
+import gguf
+import numpy as np
 import torch
 from picklescan.scanner import scan_file_path
 from safetensors import safe_open
 
 from invokeai.app.services.config.config_default import get_config
-from invokeai.backend.model_hash.model_hash import HASHING_ALGORITHMS, ModelHash
+from invokeai.backend.model_hash.model_hash import HASHING_ALGORITHMS, ModelHash, ModelHashCache
 from invokeai.backend.model_manager.taxonomy import ModelRepoVariant
-from invokeai.backend.quantization.gguf.loaders import gguf_sd_loader
+from invokeai.backend.quantization.gguf.ggml_tensor import GGMLTensor
 from invokeai.backend.util.logging import InvokeAILogger
 from invokeai.backend.util.silence_warnings import SilenceWarnings
 
@@ -17,24 +23,243 @@ StateDict: TypeAlias = dict[str | int, Any]  # When are the keys int?
 
 logger = InvokeAILogger.get_logger()
 
+# Safetensors headers are small JSON documents; anything larger than this is not a valid file.
+_MAX_SAFETENSORS_HEADER_SIZE = 100 * 2**20
+
+# The default of `LazyStateDict.pop`, so that None can be given as a default
+_MISSING = object()
+
+
+class TensorInfo(NamedTuple):
+    """The shape and dtype of a tensor, as recorded in a weight file's header.
+
+    `data_offsets` are the offsets in the file of the first byte of the tensor's data and of the byte after its last,
+    when the header records where the data is.
+    """
+
+    shape: tuple[int, ...]
+    dtype: str
+    data_offsets: Optional[tuple[int, int]] = None
+
+
+@dataclass
+class WeightFileHeader:
+    """What a weight file holds, read from its header without loading any tensors.
+
+    `tensors` is keyed like the file's state dict, so the state dict helpers that only look at keys work on it too.
+    """
+
+    format: Literal["safetensors", "gguf"]
+    tensors: dict[str | int, TensorInfo]
+    metadata: dict[str, str] = field(default_factory=dict)
+
+
+def read_weight_file_header(path: Path) -> Optional[WeightFileHeader]:
+    """Read the header of a safetensors or GGUF file. Returns None for other formats.
+
+    Pickled checkpoints (.ckpt, .pt, .bin...) have no header: they must be unpickled to see what they hold.
+    """
+    if path.suffix == ".safetensors":
+        with open(path, "rb") as f:
+            (header_size,) = struct.unpack("<Q", f.read(8))
+            if header_size > _MAX_SAFETENSORS_HEADER_SIZE:
+                raise ValueError(f"Invalid safetensors header size {header_size}")
+            header = json.loads(f.read(header_size))
+        metadata = header.pop("__metadata__", None) or {}
+        # The header's data offsets are relative to the end of the header. Tensors are kept in the order of their data,
+        # which is the order `safetensors.torch.load_file` returns them in.
+        data_start = 8 + header_size
+        tensors: dict[str | int, TensorInfo] = {
+            k: TensorInfo(
+                shape=tuple(v["shape"]),
+                dtype=v["dtype"],
+                data_offsets=(data_start + v["data_offsets"][0], data_start + v["data_offsets"][1]),
+            )
+            for k, v in sorted(header.items(), key=lambda item: item[1]["data_offsets"][0])
+        }
+        return WeightFileHeader(format="safetensors", tensors=tensors, metadata=metadata)
+    if path.suffix == ".gguf":
+        # The reader memory-maps the file and parses the tensor infos only; tensor data is not read.
+        reader = gguf.GGUFReader(path)
+        tensors = {
+            t.name: TensorInfo(
+                shape=tuple(int(v) for v in reversed(t.shape)),
+                dtype=t.tensor_type.name,
+                data_offsets=(t.data_offset, t.data_offset + t.n_bytes),
+            )
+            for t in reader.tensors
+        }
+        return WeightFileHeader(format="gguf", tensors=tensors)
+    return None
+
+
+_SAFETENSORS_DTYPES = {
+    "BOOL": torch.bool,
+    "U8": torch.uint8,
+    "I8": torch.int8,
+    "I16": torch.int16,
+    "I32": torch.int32,
+    "I64": torch.int64,
+    "F16": torch.float16,
+    "BF16": torch.bfloat16,
+    "F32": torch.float32,
+    "F64": torch.float64,
+    "F8_E4M3": torch.float8_e4m3fn,
+    "F8_E5M2": torch.float8_e5m2,
+}
+
+# GGUF tensors of these types are stored as plain arrays. Tensors of other (quantized) types are stored as blocks of
+# bytes, and are loaded as uint8 tensors, like `gguf_sd_loader` does.
+_GGUF_DTYPES = {
+    gguf.GGMLQuantizationType.F16: torch.float16,
+    gguf.GGMLQuantizationType.F32: torch.float32,
+    gguf.GGMLQuantizationType.F64: torch.float64,
+    gguf.GGMLQuantizationType.I8: torch.int8,
+    gguf.GGMLQuantizationType.I16: torch.int16,
+    gguf.GGMLQuantizationType.I32: torch.int32,
+    gguf.GGMLQuantizationType.I64: torch.int64,
+}
+
+
+class LazyStateDict(dict[str | int, Any]):
+    """A state dict of a safetensors or GGUF file that loads its tensors only when they are accessed.
+
+    The keys, shapes, dtypes and data offsets of the tensors come from the file's header (see `info`), so checking
+    which keys a model has, or the shape of a tensor, does not read any weights. A tensor is read from a memory map of
+    the file when its value is first accessed, and kept. GGUF tensors are loaded as `GGMLTensor`s, like
+    `gguf_sd_loader` loads them.
+
+    This is a dict, so that it can be used wherever a state dict is, but only the tensors that were accessed are
+    actually stored in it. All reads go through the keys, which start out as the header's. Setting, deleting, popping
+    and copying keep the keys and the stored tensors consistent; other dict methods that modify the dict are not
+    supported.
+    """
+
+    def __init__(self, path: Path, header: WeightFileHeader, compute_dtype: torch.dtype = torch.float32):
+        super().__init__()
+        self.path = path
+        self.header = header
+        self.compute_dtype = compute_dtype
+        # The keys of the state dict, in order. Tensors set on the dict are added, and popped ones removed.
+        self._keys: dict[str | int, None] = dict.fromkeys(header.tensors)
+
+    def info(self, key: str | int) -> TensorInfo:
+        """Return the shape, dtype and data offsets of a tensor, without loading it."""
+        return self.header.tensors[key]
+
+    def __missing__(self, key: str | int) -> Any:
+        if key not in self._keys:
+            raise KeyError(key)
+        tensor = self._load_tensor(key)
+        super().__setitem__(key, tensor)
+        return tensor
+
+    def __setitem__(self, key: str | int, value: Any) -> None:
+        self._keys[key] = None
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key: str | int) -> None:
+        del self._keys[key]
+        if dict.__contains__(self, key):
+            super().__delitem__(key)
+
+    def pop(self, key: str | int, default: Any = _MISSING) -> Any:  # type: ignore[override]
+        if key not in self._keys:
+            if default is _MISSING:
+                raise KeyError(key)
+            return default
+        value = self[key]
+        del self[key]
+        return value
+
+    def copy(self) -> "LazyStateDict":  # type: ignore[override]
+        """Return a shallow copy that shares the tensors loaded so far, and loads the rest lazily."""
+        copied = LazyStateDict(self.path, self.header, self.compute_dtype)
+        copied._keys = self._keys.copy()
+        dict.update(copied, dict.items(self))
+        return copied
+
+    def _load_tensor(self, key: str | int) -> Any:
+        info = self.header.tensors[key]
+        if info.data_offsets is None:
+            raise ValueError(f"The header of {self.path} does not record where the data of {key} is")
+        start, end = info.data_offsets
+        data = torch.empty(end - start, dtype=torch.uint8)
+        if end > start:
+            with open(self.path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                mapped = np.frombuffer(mm, dtype=np.uint8, count=end - start, offset=start)
+                data.numpy()[:] = mapped
+                # The map can't be closed while an array still refers to it
+                del mapped
+
+        if self.header.format == "safetensors":
+            if info.dtype not in _SAFETENSORS_DTYPES:
+                with safe_open(self.path, framework="pt", device="cpu") as f:
+                    return f.get_tensor(str(key))
+            return data.view(_SAFETENSORS_DTYPES[info.dtype]).reshape(info.shape)
+
+        quantization_type = gguf.GGMLQuantizationType[info.dtype]
+        if quantization_type in _GGUF_DTYPES:
+            torch_tensor = data.view(_GGUF_DTYPES[quantization_type]).reshape(info.shape)
+        else:
+            torch_tensor = data.reshape(gguf.quant_shape_to_byte_shape(info.shape, quantization_type))
+        return GGMLTensor(
+            torch_tensor,
+            ggml_quantization_type=quantization_type,
+            tensor_shape=torch.Size(info.shape),
+            compute_dtype=self.compute_dtype,
+        )
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._keys
+
+    def __iter__(self) -> Iterator[str | int]:
+        return iter(self._keys)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def keys(self):  # type: ignore[override]
+        return self._keys.keys()
+
+    def values(self):  # type: ignore[override]
+        return ValuesView(self)
+
+    def items(self):  # type: ignore[override]
+        return ItemsView(self)
+
+    def get(self, key: str | int, default: Any = None) -> Any:  # type: ignore[override]
+        return self[key] if key in self._keys else default
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.path}, {len(self)} tensors)"
+
 
 class ModelOnDisk:
     """A utility class representing a model stored on disk."""
 
-    def __init__(self, path: Path, hash_algo: HASHING_ALGORITHMS = "blake3_single"):
+    def __init__(
+        self,
+        path: Path,
+        hash_algo: HASHING_ALGORITHMS = "blake3_single",
+        hash_cache: Optional[ModelHashCache] = None,
+    ):
         self.path = path
         if self.path.suffix in {".safetensors", ".bin", ".pt", ".ckpt"}:
             self.name = path.stem
         else:
             self.name = path.name
         self.hash_algo = hash_algo
+        self.hash_cache = hash_cache
         # Having a cache helps users of ModelOnDisk (i.e. configs) to save state
         # This prevents redundant computations during matching and parsing
         self._state_dict_cache: dict[Path, Any] = {}
         self._metadata_cache: dict[Path, Any] = {}
+        self._header: Optional[WeightFileHeader] = None
+        self._header_read = False
 
     def hash(self) -> str:
-        return ModelHash(algorithm=self.hash_algo).hash(self.path)
+        return ModelHash(algorithm=self.hash_algo, hash_cache=self.hash_cache).hash(self.path)
 
     def size(self) -> int:
         if self.path.is_file():
@@ -61,6 +286,21 @@ class ModelOnDisk:
         self._metadata_cache[path] = metadata
         return metadata
 
+    def header(self) -> Optional[WeightFileHeader]:
+        """Return the header of a single-file model, read once and cached.
+
+        This is used to cheaply rule out config classes before trying to match them (see `Config_Base.could_match`).
+        Returns None if the model is a directory, or its header can't be read without loading the model.
+        """
+        if not self._header_read:
+            self._header_read = True
+            if self.path.is_file():
+                try:
+                    self._header = read_weight_file_header(self.path)
+                except Exception as e:
+                    logger.debug(f"Unable to read the header of {self.path}: {e}")
+        return self._header
+
     def repo_variant(self) -> Optional[ModelRepoVariant]:
         if self.path.is_file():
             return None
@@ -110,10 +350,12 @@ class ModelOnDisk:
                         raise RuntimeError(f"Error scanning the model at {path.stem} for malware. Aborting import.")
                 checkpoint = torch.load(path, map_location="cpu")
                 assert isinstance(checkpoint, dict)
-            elif path.suffix.endswith(".gguf"):
-                checkpoint = gguf_sd_loader(path, compute_dtype=torch.float32)
-            elif path.suffix.endswith(".safetensors"):
-                checkpoint = safetensors.torch.load_file(path)
+            elif path.suffix.endswith((".gguf", ".safetensors")):
+                # Tensors are only read when they are accessed. Identifying a model usually needs only its keys and
+                # the shapes of a few tensors.
+                header = (self.header() if path == self.path else None) or read_weight_file_header(path)
+                assert header is not None
+                checkpoint = LazyStateDict(path, header, compute_dtype=torch.float32)
             else:
                 raise ValueError(f"Unrecognized model extension: {path.suffix}")
 
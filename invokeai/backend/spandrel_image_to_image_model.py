@@ -131,6 +131,16 @@ class SpandrelImageToImageModel(RawModel):
         """The scale of the model (e.g. 1x, 2x, 4x, etc.)."""
         return self._spandrel_model.scale
 
+    def estimate_working_memory(self, tile_height: int, tile_width: int) -> int:
+        """Estimate the working memory required to run the model on a single tile, in bytes.
+
+        This is a rough, deliberately generous estimate: the peak working memory scales with the number of output
+        pixels and the element size, but the constant varies between architectures and has not been calibrated.
+        """
+        element_size = torch.finfo(self.dtype).bits // 8
+        output_pixels = tile_height * self.scale * tile_width * self.scale
+        return output_pixels * element_size * 256
+
     def calc_size(self) -> int:
         """Get size of the model in memory in bytes."""
         # HACK(ryand): Fix this issue with circular imports.
@@ -12,7 +12,11 @@ from invokeai.backend.stable_diffusion.diffusers_pipeline import (
     PipelineIntermediateState,
     StableDiffusionGeneratorPipeline,
 )
-from invokeai.backend.stable_diffusion.diffusion.conditioning_data import TextConditioningData
+from invokeai.backend.stable_diffusion.diffusion.conditioning_data import (
+    BasicConditioningInfo,
+    SDXLConditioningInfo,
+    TextConditioningData,
+)
 from invokeai.backend.tiles.utils import Tile
 
 
@@ -24,6 +28,28 @@ class MultiDiffusionRegionConditioning:
     control_data: list[ControlNetData]
 
 
+@dataclass
+class _RegionBatch:
+    """Regions that are denoised together, in a single UNet forward pass."""
+
+    regions: list[MultiDiffusionRegionConditioning]
+    # The text conditioning and ControlNet data of the regions, stacked along the batch dimension in region order.
+    text_conditioning_data: TextConditioningData
+    control_data: list[ControlNetData]
+
+
+def estimate_region_working_memory(region_height: int, region_width: int, dtype: torch.dtype) -> int:
+    """Estimates the working memory needed to denoise one region of the given size (in latent space) with CFG, in
+    bytes. Batching regions scales the working memory linearly.
+
+    This is a rough, deliberately generous estimate of the peak activations of SD1.5 and SDXL UNets, for both the
+    unconditioned and conditioned passes. It is used to bound the number of regions in a batch.
+    """
+    element_size = torch.finfo(dtype).bits // 8
+    scaling_constant = 50000
+    return region_height * region_width * element_size * scaling_constant
+
+
 class MultiDiffusionPipeline(StableDiffusionGeneratorPipeline):
     """A Stable Diffusion pipeline that uses Multi-Diffusion (https://arxiv.org/pdf/2302.08113) for denoising."""
 
@@ -36,6 +62,112 @@ class MultiDiffusionPipeline(StableDiffusionGeneratorPipeline):
             ):
                 raise NotImplementedError("Regional prompting is not yet supported in Multi-Diffusion.")
 
+    @staticmethod
+    def _get_region_weight(region: Tile, dtype: torch.dtype, device: torch.device) -> torch.Tensor:
+        """Builds a region_weight matrix that applies gradient blending to the edges of the region."""
+        region_height = region.coords.bottom - region.coords.top
+        region_width = region.coords.right - region.coords.left
+        region_weight = torch.ones((1, 1, region_height, region_width), dtype=dtype, device=device)
+        if region.overlap.left > 0:
+            left_grad = torch.linspace(0, 1, region.overlap.left, device=device, dtype=dtype).view((1, 1, 1, -1))
+            region_weight[:, :, :, : region.overlap.left] *= left_grad
+        if region.overlap.top > 0:
+            top_grad = torch.linspace(0, 1, region.overlap.top, device=device, dtype=dtype).view((1, 1, -1, 1))
+            region_weight[:, :, : region.overlap.top, :] *= top_grad
+        if region.overlap.right > 0:
+            right_grad = torch.linspace(1, 0, region.overlap.right, device=device, dtype=dtype).view((1, 1, 1, -1))
+            region_weight[:, :, :, -region.overlap.right :] *= right_grad
+        if region.overlap.bottom > 0:
+            bottom_grad = torch.linspace(1, 0, region.overlap.bottom, device=device, dtype=dtype).view((1, 1, -1, 1))
+            region_weight[:, :, -region.overlap.bottom :, :] *= bottom_grad
+        return region_weight
+
+    @staticmethod
+    def _can_batch(a: MultiDiffusionRegionConditioning, b: MultiDiffusionRegionConditioning) -> bool:
+        """Checks if two regions can be denoised in the same batch."""
+        a_coords, b_coords = a.region.coords, b.region.coords
+        if (a_coords.bottom - a_coords.top, a_coords.right - a_coords.left) != (
+            b_coords.bottom - b_coords.top,
+            b_coords.right - b_coords.left,
+        ):
+            return False
+        if a.text_conditioning_data is not b.text_conditioning_data or len(a.control_data) != len(b.control_data):
+            return False
+        # The ControlNets of the regions may only differ by their image
+        return all(
+            a_control.model is b_control.model
+            and a_control.weight == b_control.weight
+            and a_control.begin_step_percent == b_control.begin_step_percent
+            and a_control.end_step_percent == b_control.end_step_percent
+            and a_control.control_mode == b_control.control_mode
+            and a_control.image_tensor.shape == b_control.image_tensor.shape
+            for a_control, b_control in zip(a.control_data, b.control_data, strict=True)
+        )
+
+    def _batch_regions(
+        self, multi_diffusion_conditioning: list[MultiDiffusionRegionConditioning], max_batch_size: int
+    ) -> list[_RegionBatch]:
+        """Groups consecutive regions that can be denoised together into batches of up to `max_batch_size` regions."""
+        groups: list[list[MultiDiffusionRegionConditioning]] = []
+        for region_conditioning in multi_diffusion_conditioning:
+            if groups and len(groups[-1]) < max_batch_size and self._can_batch(groups[-1][0], region_conditioning):
+                groups[-1].append(region_conditioning)
+            else:
+                groups.append([region_conditioning])
+
+        region_batches: list[_RegionBatch] = []
+        for group in groups:
+            if len(group) == 1:
+                text_conditioning_data = group[0].text_conditioning_data
+                control_data = group[0].control_data
+            else:
+                text_conditioning_data = self._repeat_text_conditioning(group[0].text_conditioning_data, len(group))
+                control_data = [
+                    self._stack_control_data([region.control_data[i] for region in group])
+                    for i in range(len(group[0].control_data))
+                ]
+            region_batches.append(
+                _RegionBatch(regions=group, text_conditioning_data=text_conditioning_data, control_data=control_data)
+            )
+        return region_batches
+
+    @staticmethod
+    def _repeat_text_conditioning(text_conditioning_data: TextConditioningData, repeats: int) -> TextConditioningData:
+        """Repeats the text conditioning along the batch dimension, once for each region of a batch."""
+
+        def repeat(info: BasicConditioningInfo | SDXLConditioningInfo) -> BasicConditioningInfo | SDXLConditioningInfo:
+            if isinstance(info, SDXLConditioningInfo):
+                return SDXLConditioningInfo(
+                    embeds=info.embeds.repeat(repeats, 1, 1),
+                    pooled_embeds=info.pooled_embeds.repeat(repeats, 1),
+                    add_time_ids=info.add_time_ids.repeat(repeats, 1),
+                )
+            return BasicConditioningInfo(embeds=info.embeds.repeat(repeats, 1, 1))
+
+        return TextConditioningData(
+            uncond_text=repeat(text_conditioning_data.uncond_text),
+            cond_text=repeat(text_conditioning_data.cond_text),
+            uncond_regions=text_conditioning_data.uncond_regions,
+            cond_regions=text_conditioning_data.cond_regions,
+            guidance_scale=text_conditioning_data.guidance_scale,
+            guidance_rescale_multiplier=text_conditioning_data.guidance_rescale_multiplier,
+        )
+
+    @staticmethod
+    def _stack_control_data(region_control_data: list[ControlNetData]) -> ControlNetData:
+        """Stacks the images of the same ControlNet for each region of a batch along the batch dimension.
+
+        With CFG, a ControlNet image holds the unconditioned and conditioned images, and the UNet input holds the
+        unconditioned inputs of all regions followed by their conditioned inputs. The stacked image follows that order.
+        """
+        image_tensors = [control_data.image_tensor for control_data in region_control_data]
+        images_per_region = image_tensors[0].shape[0]
+        stacked_control_data = copy.copy(region_control_data[0])
+        stacked_control_data.image_tensor = torch.cat(
+            [image_tensor[i : i + 1] for i in range(images_per_region) for image_tensor in image_tensors]
+        )
+        return stacked_control_data
+
     def multi_diffusion_denoise(
         self,
         multi_diffusion_conditioning: list[MultiDiffusionRegionConditioning],
@@ -46,7 +178,16 @@ class MultiDiffusionPipeline(StableDiffusionGeneratorPipeline):
         timesteps: torch.Tensor,
         init_timestep: torch.Tensor,
         callback: Callable[[PipelineIntermediateState], None],
+        max_batch_size: int = 1,
     ) -> torch.Tensor:
+        """Denoises the latents with Multi-Diffusion.
+
+        Args:
+            max_batch_size: The maximum number of regions to denoise in a single UNet forward pass. Only consecutive
+                regions of the same size, with the same text conditioning and ControlNet models, are batched. Results
+                match denoising each region on its own, up to floating point error, except with schedulers that add
+                random noise, which draw different noise for a batch.
+        """
         self._check_regional_prompting(multi_diffusion_conditioning)
 
         if init_timestep.shape[0] == 0:
@@ -67,17 +208,31 @@ class MultiDiffusionPipeline(StableDiffusionGeneratorPipeline):
         # cropping into regions.
         self._adjust_memory_efficient_attention(latents)
 
+        # Regions of the same size and conditioning are denoised in batches, with one UNet forward pass per batch.
+        region_batches = self._batch_regions(multi_diffusion_conditioning, max_batch_size)
+
         # Many of the diffusers schedulers are stateful (i.e. they update internal state in each call to step()). Since
         # we are calling step() multiple times at the same timestep (once for each region batch), we must maintain a
-        # separate scheduler state for each region batch.
+        # separate scheduler state for each region batch. The regions of a batch stay the same for all timesteps, so a
+        # scheduler's state always holds the same regions in the same order.
         # TODO(ryand): This solution allows all schedulers to **run**, but does not fully solve the issue of scheduler
         # statefulness. Some schedulers store previous model outputs in their state, but these values become incorrect
         # as Multi-Diffusion blending is applied (e.g. the PNDMScheduler). This can result in a blurring effect when
         # multiple MultiDiffusion regions overlap. Solving this properly would require a case-by-case review of each
         # scheduler to determine how it's state needs to be updated for compatibilty with Multi-Diffusion.
-        region_batch_schedulers: list[SchedulerMixin] = [
-            copy.deepcopy(self.scheduler) for _ in multi_diffusion_conditioning
+        region_batch_schedulers: list[SchedulerMixin] = [copy.deepcopy(self.scheduler) for _ in region_batches]
+
+        # The blend weights of the regions do not change from step to step, so they are only computed once.
+        region_weights = [
+            self._get_region_weight(region_conditioning.region, dtype=latents.dtype, device=latents.device)
+            for region_conditioning in multi_diffusion_conditioning
         ]
+        merged_latents_weights = torch.zeros(
+            (1, 1, latent_height, latent_width), device=latents.device, dtype=latents.dtype
+        )
+        for region_conditioning, region_weight in zip(multi_diffusion_conditioning, region_weights, strict=True):
+            coords = region_conditioning.region.coords
+            merged_latents_weights[:, :, coords.top : coords.bottom, coords.left : coords.right] += region_weight
 
         callback(
             PipelineIntermediateState(
@@ -90,85 +245,58 @@ class MultiDiffusionPipeline(StableDiffusionGeneratorPipeline):
         )
 
         for i, t in enumerate(self.progress_bar(timesteps)):
-            batched_t = t.expand(batch_size)
-
             merged_latents = torch.zeros_like(latents)
-            merged_latents_weights = torch.zeros(
-                (1, 1, latent_height, latent_width), device=latents.device, dtype=latents.dtype
-            )
             merged_pred_original: torch.Tensor | None = None
-            for region_idx, region_conditioning in enumerate(multi_diffusion_conditioning):
+            region_idx = 0
+            for region_batch, scheduler in zip(region_batches, region_batch_schedulers, strict=True):
                 # Switch to the scheduler for the region batch.
-                self.scheduler = region_batch_schedulers[region_idx]
-
-                # Crop the inputs to the region.
-                region_latents = latents[
-                    :,
-                    :,
-                    region_conditioning.region.coords.top : region_conditioning.region.coords.bottom,
-                    region_conditioning.region.coords.left : region_conditioning.region.coords.right,
-                ]
+                self.scheduler = scheduler
 
-                # Run the denoising step on the region.
+                # Crop the inputs to the regions, and stack them along the batch dimension.
+                region_latents = torch.cat(
+                    [
+                        latents[:, :, coords.top : coords.bottom, coords.left : coords.right]
+                        for coords in (
+                            region_conditioning.region.coords for region_conditioning in region_batch.regions
+                        )
+                    ]
+                )
+
+                # Run the denoising step on the region batch.
                 step_output = self.step(
-                    t=batched_t,
+                    t=t.expand(region_latents.shape[0]),
                     latents=region_latents,
-                    conditioning_data=region_conditioning.text_conditioning_data,
+                    conditioning_data=region_batch.text_conditioning_data,
                     step_index=i,
                     total_step_count=len(timesteps),
                     scheduler_step_kwargs=scheduler_step_kwargs,
                     mask_guidance=None,
                     mask=None,
                     masked_latents=None,
-                    control_data=region_conditioning.control_data,
+                    control_data=region_batch.control_data,
                 )
 
-                # Build a region_weight matrix that applies gradient blending to the edges of the region.
-                region = region_conditioning.region
-                _, _, region_height, region_width = step_output.prev_sample.shape
-                region_weight = torch.ones(
-                    (1, 1, region_height, region_width),
-                    dtype=latents.dtype,
-                    device=latents.device,
+                # Update the merged results with the region results, applying gradient blending to the region edges.
+                region_samples = step_output.prev_sample.chunk(len(region_batch.regions))
+                pred_orig_sample = getattr(step_output, "pred_original_sample", None)
+                region_pred_orig_samples = (
+                    pred_orig_sample.chunk(len(region_batch.regions)) if pred_orig_sample is not None else None
                 )
-                if region.overlap.left > 0:
-                    left_grad = torch.linspace(
-                        0, 1, region.overlap.left, device=latents.device, dtype=latents.dtype
-                    ).view((1, 1, 1, -1))
-                    region_weight[:, :, :, : region.overlap.left] *= left_grad
-                if region.overlap.top > 0:
-                    top_grad = torch.linspace(
-                        0, 1, region.overlap.top, device=latents.device, dtype=latents.dtype
-                    ).view((1, 1, -1, 1))
-                    region_weight[:, :, : region.overlap.top, :] *= top_grad
-                if region.overlap.right > 0:
-                    right_grad = torch.linspace(
-                        1, 0, region.overlap.right, device=latents.device, dtype=latents.dtype
-                    ).view((1, 1, 1, -1))
-                    region_weight[:, :, :, -region.overlap.right :] *= right_grad
-                if region.overlap.bottom > 0:
-                    bottom_grad = torch.linspace(
-                        1, 0, region.overlap.bottom, device=latents.device, dtype=latents.dtype
-                    ).view((1, 1, -1, 1))
-                    region_weight[:, :, -region.overlap.bottom :, :] *= bottom_grad
-
-                # Update the merged results with the region results.
-                merged_latents[
-                    :, :, region.coords.top : region.coords.bottom, region.coords.left : region.coords.right
-                ] += step_output.prev_sample * region_weight
-                merged_latents_weights[
-                    :, :, region.coords.top : region.coords.bottom, region.coords.left : region.coords.right
-                ] += region_weight
+                for batch_idx, region_conditioning in enumerate(region_batch.regions):
+                    coords = region_conditioning.region.coords
+                    merged_latents[:, :, coords.top : coords.bottom, coords.left : coords.right] += (
+                        region_samples[batch_idx] * region_weights[region_idx]
+                    )
+                    region_idx += 1
 
-                pred_orig_sample = getattr(step_output, "pred_original_sample", None)
-                if pred_orig_sample is not None:
-                    # If one region has pred_original_sample, then we can assume that all regions will have it, because
-                    # they all use the same scheduler.
-                    if merged_pred_original is None:
-                        merged_pred_original = torch.zeros_like(latents)
-                    merged_pred_original[
-                        :, :, region.coords.top : region.coords.bottom, region.coords.left : region.coords.right
-                    ] += pred_orig_sample
+                    if region_pred_orig_samples is not None:
+                        # If one region has pred_original_sample, then we can assume that all regions will have it,
+                        # because they all use the same scheduler.
+                        if merged_pred_original is None:
+                            merged_pred_original = torch.zeros_like(latents)
+                        merged_pred_original[:, :, coords.top : coords.bottom, coords.left : coords.right] += (
+                            region_pred_orig_samples[batch_idx]
+                        )
 
             # Normalize the merged results.
             latents = torch.where(merged_latents_weights > 0, merged_latents / merged_latents_weights, merged_latents)
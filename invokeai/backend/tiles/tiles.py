@@ -1,10 +1,10 @@
 import math
-from typing import Union
+from typing import Literal, Optional, Union
 
 import numpy as np
 
 from invokeai.app.invocations.constants import LATENT_SCALE_FACTOR
-from invokeai.backend.tiles.utils import TBLR, Tile, paste, seam_blend
+from invokeai.backend.tiles.utils import TBLR, Tile, seam_blend
 
 
 def calc_overlap(tiles: list[Tile], num_tiles_x: int, num_tiles_y: int) -> list[Tile]:
@@ -227,115 +227,160 @@ def calc_tiles_min_overlap(
     return calc_overlap(tiles, num_tiles_x, num_tiles_y)
 
 
-def merge_tiles_with_linear_blending(
-    dst_image: np.ndarray, tiles: list[Tile], tile_images: list[np.ndarray], blend_amount: int
-):
-    """Merge a set of image tiles into `dst_image` with linear blending between the tiles.
+class TileMerger:
+    """Merges tile images into a destination image, one tile at a time.
+
+    Tiles must be added in row-major order: top-to-bottom, and left-to-right within a row of tiles. A row of tiles is
+    blended into a buffer that spans the width of the destination image, and the buffer is blended into the
+    destination image when the next row starts or when `finish()` is called. Only one row of tiles is buffered, so
+    tile images can be loaded as they are added.
 
     We expect every tile edge to either:
     1) have an overlap of 0, because it is aligned with the image edge, or
     2) have an overlap >= blend_amount.
     If neither of these conditions are satisfied, we raise an exception.
 
-    The linear blending is centered at the halfway point of the overlap between adjacent tiles.
+    With "Linear" blending, the linear blending is centered at the halfway point of the overlap between adjacent tiles.
+    With "Seam" blending, the blending is centered on a seam of least energy of the overlap between adjacent tiles.
 
     Args:
         dst_image (np.ndarray): The destination image. Shape: (H, W, C).
-        tiles (list[Tile]): The list of tiles describing the locations of the respective `tile_images`.
-        tile_images (list[np.ndarray]): The tile images to merge into `dst_image`.
+        blend_mode (Literal["Linear", "Seam"]): How to blend adjacent overlapping tiles.
         blend_amount (int): The amount of blending (in px) between adjacent overlapping tiles.
     """
+
+    def __init__(self, dst_image: np.ndarray, blend_mode: Literal["Linear", "Seam"], blend_amount: int):
+        if blend_mode not in ("Linear", "Seam"):
+            raise ValueError(f"Unsupported blend mode: '{blend_mode}'.")
+        self._dst_image = dst_image
+        self._blend_mode = blend_mode
+        self._blend_amount = blend_amount
+
+        # The first tile of the current row, and the row's buffer.
+        self._row_tile: Optional[Tile] = None
+        self._row_image: Optional[np.ndarray] = None
+
+        # Linear blending only does arithmetic on the blended part of the overlaps; the rest of each tile is copied. The
+        # gradients only depend on the blend amount, so they are prepared once.
+        # Shape: (blend_amount, ) -> (1, blend_amount, 1), to blend columns left-to-right. Rows are blended by
+        # transposing the images.
+        gradient = np.linspace(start=0.0, stop=1.0, num=blend_amount)
+        self._gradient = gradient.reshape(1, -1, 1)
+        self._inverse_gradient = 1.0 - self._gradient
+
+    def add_tile(self, tile: Tile, tile_image: np.ndarray) -> None:
+        """Blend a tile image into the current row of tiles, starting a new row if the tile is not in it."""
+        dst_height, dst_width, _ = self._dst_image.shape
+        if tile.coords.bottom > dst_height or tile.coords.right > dst_width:
+            raise ValueError(f"Tile {tile.coords} overflows the destination image of size {dst_width}x{dst_height}.")
+        if tile_image.shape[:2] != (tile.coords.bottom - tile.coords.top, tile.coords.right - tile.coords.left):
+            raise ValueError(f"Tile image of shape {tile_image.shape} does not match tile {tile.coords}.")
+
+        if self._row_tile is None or not (
+            tile.coords.top == self._row_tile.coords.top and tile.coords.bottom == self._row_tile.coords.bottom
+        ):
+            if self._row_tile is not None and tile.coords.top < self._row_tile.coords.top:
+                raise ValueError("Tiles must be added top-to-bottom.")
+            self._merge_row()
+            self._row_tile = tile
+            row_height = tile.coords.bottom - tile.coords.top
+            self._row_image = np.zeros((row_height, dst_width, self._dst_image.shape[2]), dtype=self._dst_image.dtype)
+
+        assert self._row_image is not None
+        # We expect the tiles to be ordered left-to-right, so each tile is blended with the tiles to its left.
+        self._blend(
+            dst_image=self._row_image[:, tile.coords.left : tile.coords.right],
+            src_image=tile_image,
+            overlap=tile.overlap.left,
+            x_seam=False,
+        )
+
+    def finish(self) -> None:
+        """Blend the last row of tiles into the destination image."""
+        self._merge_row()
+
+    def _merge_row(self) -> None:
+        if self._row_tile is None or self._row_image is None:
+            return
+        # We assume that the entire row has the same vertical overlaps as the first tile in the row.
+        self._blend(
+            dst_image=self._dst_image[self._row_tile.coords.top : self._row_tile.coords.bottom],
+            src_image=self._row_image,
+            overlap=self._row_tile.overlap.top,
+            x_seam=True,
+        )
+        self._row_tile = None
+        self._row_image = None
+
+    def _blend(self, dst_image: np.ndarray, src_image: np.ndarray, overlap: int, x_seam: bool) -> None:
+        """Blend `src_image` over `dst_image`, which has the same shape. The leading `overlap` columns (or rows if
+        `x_seam` is set) are blended with the existing contents of `dst_image`.
+        """
+        if overlap == 0:
+            dst_image[:] = src_image
+            return
+        assert overlap >= self._blend_amount
+
+        if self._blend_mode == "Seam":
+            overlap_region = (slice(0, overlap),) if x_seam else (slice(None), slice(0, overlap))
+            rest_region = (slice(overlap, None),) if x_seam else (slice(None), slice(overlap, None))
+            dst_image[overlap_region] = seam_blend(
+                dst_image[overlap_region], src_image[overlap_region], self._blend_amount, x_seam=x_seam
+            )
+            dst_image[rest_region] = src_image[rest_region]
+            return
+
+        if x_seam:
+            # Blend rows the same way as columns, by transposing the height and width of the images.
+            dst_image = dst_image.transpose(1, 0, 2)
+            src_image = src_image.transpose(1, 0, 2)
+        # Center the blending gradient in the middle of the overlap. The region before the blending region keeps the
+        # existing contents of dst_image, and the region after it is copied from src_image.
+        blend_start = overlap // 2 - self._blend_amount // 2
+        blend_end = blend_start + self._blend_amount
+        blend_region = dst_image[:, blend_start:blend_end]
+        blend_region[:] = src_image[:, blend_start:blend_end] * self._gradient + blend_region * self._inverse_gradient
+        dst_image[:, blend_end:] = src_image[:, blend_end:]
+
+
+def _merge_tiles(
+    dst_image: np.ndarray,
+    tiles: list[Tile],
+    tile_images: list[np.ndarray],
+    blend_mode: Literal["Linear", "Seam"],
+    blend_amount: int,
+):
     # Sort tiles and images first by left x coordinate, then by top y coordinate. During tile processing, we want to
     # iterate over tiles left-to-right, top-to-bottom.
     tiles_and_images = list(zip(tiles, tile_images, strict=True))
     tiles_and_images = sorted(tiles_and_images, key=lambda x: x[0].coords.left)
     tiles_and_images = sorted(tiles_and_images, key=lambda x: x[0].coords.top)
 
-    # Organize tiles into rows.
-    tile_and_image_rows: list[list[tuple[Tile, np.ndarray]]] = []
-    cur_tile_and_image_row: list[tuple[Tile, np.ndarray]] = []
-    first_tile_in_cur_row, _ = tiles_and_images[0]
-    for tile_and_image in tiles_and_images:
-        tile, _ = tile_and_image
-        if not (
-            tile.coords.top == first_tile_in_cur_row.coords.top
-            and tile.coords.bottom == first_tile_in_cur_row.coords.bottom
-        ):
-            # Store the previous row, and start a new one.
-            tile_and_image_rows.append(cur_tile_and_image_row)
-            cur_tile_and_image_row = []
-            first_tile_in_cur_row, _ = tile_and_image
-
-        cur_tile_and_image_row.append(tile_and_image)
-    tile_and_image_rows.append(cur_tile_and_image_row)
-
-    # Prepare 1D linear gradients for blending.
-    gradient_left_x = np.linspace(start=0.0, stop=1.0, num=blend_amount)
-    gradient_top_y = np.linspace(start=0.0, stop=1.0, num=blend_amount)
-    # Convert shape: (blend_amount, ) -> (blend_amount, 1). The extra dimension enables the gradient to be applied
-    # to a 2D image via broadcasting. Note that no additional dimension is needed on gradient_left_x for
-    # broadcasting to work correctly.
-    gradient_top_y = np.expand_dims(gradient_top_y, axis=1)
-
-    for tile_and_image_row in tile_and_image_rows:
-        first_tile_in_row, _ = tile_and_image_row[0]
-        row_height = first_tile_in_row.coords.bottom - first_tile_in_row.coords.top
-        row_image = np.zeros((row_height, dst_image.shape[1], dst_image.shape[2]), dtype=dst_image.dtype)
-
-        # Blend the tiles in the row horizontally.
-        for tile, tile_image in tile_and_image_row:
-            # We expect the tiles to be ordered left-to-right. For each tile, we construct a mask that applies linear
-            # blending to the left of the current tile. The inverse linear blending is automatically applied to the
-            # right of the tiles that have already been pasted by the paste(...) operation.
-            tile_height, tile_width, _ = tile_image.shape
-            mask = np.ones(shape=(tile_height, tile_width), dtype=np.float64)
-
-            # Left blending:
-            if tile.overlap.left > 0:
-                assert tile.overlap.left >= blend_amount
-                # Center the blending gradient in the middle of the overlap.
-                blend_start_left = tile.overlap.left // 2 - blend_amount // 2
-                # The region left of the blending region is masked completely.
-                mask[:, :blend_start_left] = 0.0
-                # Apply the blend gradient to the mask.
-                mask[:, blend_start_left : blend_start_left + blend_amount] = gradient_left_x
-                # For visual debugging:
-                # tile_image[:, blend_start_left : blend_start_left + blend_amount] = 0
-
-            paste(
-                dst_image=row_image,
-                src_image=tile_image,
-                box=TBLR(
-                    top=0, bottom=tile.coords.bottom - tile.coords.top, left=tile.coords.left, right=tile.coords.right
-                ),
-                mask=mask,
-            )
+    merger = TileMerger(dst_image=dst_image, blend_mode=blend_mode, blend_amount=blend_amount)
+    for tile, tile_image in tiles_and_images:
+        merger.add_tile(tile, tile_image)
+    merger.finish()
 
-        # Blend the row into the dst_image vertically.
-        # We construct a mask that applies linear blending to the top of the current row. The inverse linear blending is
-        # automatically applied to the bottom of the tiles that have already been pasted by the paste(...) operation.
-        mask = np.ones(shape=(row_image.shape[0], row_image.shape[1]), dtype=np.float64)
-        # Top blending:
-        # (See comments under 'Left blending' for an explanation of the logic.)
-        # We assume that the entire row has the same vertical overlaps as the first_tile_in_row.
-        if first_tile_in_row.overlap.top > 0:
-            assert first_tile_in_row.overlap.top >= blend_amount
-            blend_start_top = first_tile_in_row.overlap.top // 2 - blend_amount // 2
-            mask[:blend_start_top, :] = 0.0
-            mask[blend_start_top : blend_start_top + blend_amount, :] = gradient_top_y
-            # For visual debugging:
-            # row_image[blend_start_top : blend_start_top + blend_amount, :] = 0
-        paste(
-            dst_image=dst_image,
-            src_image=row_image,
-            box=TBLR(
-                top=first_tile_in_row.coords.top,
-                bottom=first_tile_in_row.coords.bottom,
-                left=0,
-                right=row_image.shape[1],
-            ),
-            mask=mask,
-        )
+
+def merge_tiles_with_linear_blending(
+    dst_image: np.ndarray, tiles: list[Tile], tile_images: list[np.ndarray], blend_amount: int
+):
+    """Merge a set of image tiles into `dst_image` with linear blending between the tiles.
+
+    We expect every tile edge to either:
+    1) have an overlap of 0, because it is aligned with the image edge, or
+    2) have an overlap >= blend_amount.
+    If neither of these conditions are satisfied, we raise an exception.
+
+    The linear blending is centered at the halfway point of the overlap between adjacent tiles.
+
+    Args:
+        dst_image (np.ndarray): The destination image. Shape: (H, W, C).
+        tiles (list[Tile]): The list of tiles describing the locations of the respective `tile_images`.
+        tile_images (list[np.ndarray]): The tile images to merge into `dst_image`.
+        blend_amount (int): The amount of blending (in px) between adjacent overlapping tiles.
+    """
+    _merge_tiles(dst_image, tiles, tile_images, "Linear", blend_amount)
 
 
 def merge_tiles_with_seam_blending(
@@ -356,71 +401,4 @@ def merge_tiles_with_seam_blending(
         tile_images (list[np.ndarray]): The tile images to merge into `dst_image`.
         blend_amount (int): The amount of blending (in px) between adjacent overlapping tiles.
     """
-    # Sort tiles and images first by left x coordinate, then by top y coordinate. During tile processing, we want to
-    # iterate over tiles left-to-right, top-to-bottom.
-    tiles_and_images = list(zip(tiles, tile_images, strict=True))
-    tiles_and_images = sorted(tiles_and_images, key=lambda x: x[0].coords.left)
-    tiles_and_images = sorted(tiles_and_images, key=lambda x: x[0].coords.top)
-
-    # Organize tiles into rows.
-    tile_and_image_rows: list[list[tuple[Tile, np.ndarray]]] = []
-    cur_tile_and_image_row: list[tuple[Tile, np.ndarray]] = []
-    first_tile_in_cur_row, _ = tiles_and_images[0]
-    for tile_and_image in tiles_and_images:
-        tile, _ = tile_and_image
-        if not (
-            tile.coords.top == first_tile_in_cur_row.coords.top
-            and tile.coords.bottom == first_tile_in_cur_row.coords.bottom
-        ):
-            # Store the previous row, and start a new one.
-            tile_and_image_rows.append(cur_tile_and_image_row)
-            cur_tile_and_image_row = []
-            first_tile_in_cur_row, _ = tile_and_image
-
-        cur_tile_and_image_row.append(tile_and_image)
-    tile_and_image_rows.append(cur_tile_and_image_row)
-
-    for tile_and_image_row in tile_and_image_rows:
-        first_tile_in_row, _ = tile_and_image_row[0]
-        row_height = first_tile_in_row.coords.bottom - first_tile_in_row.coords.top
-        row_image = np.zeros((row_height, dst_image.shape[1], dst_image.shape[2]), dtype=dst_image.dtype)
-
-        # Blend the tiles in the row horizontally.
-        for tile, tile_image in tile_and_image_row:
-            # We expect the tiles to be ordered left-to-right.
-            # For each tile:
-            # - extract the overlap regions and pass to seam_blend()
-            # - apply blended region to the row_image
-            # - apply the un-blended region to the row_image
-            tile_height, tile_width, _ = tile_image.shape
-            overlap_size = tile.overlap.left
-            # Left blending:
-            if overlap_size > 0:
-                assert overlap_size >= blend_amount
-
-                overlap_coord_right = tile.coords.left + overlap_size
-                src_overlap = row_image[:, tile.coords.left : overlap_coord_right]
-                dst_overlap = tile_image[:, :overlap_size]
-                blended_overlap = seam_blend(src_overlap, dst_overlap, blend_amount, x_seam=False)
-                row_image[:, tile.coords.left : overlap_coord_right] = blended_overlap
-                row_image[:, overlap_coord_right : tile.coords.right] = tile_image[:, overlap_size:]
-            else:
-                # no overlap just paste the tile
-                row_image[:, tile.coords.left : tile.coords.right] = tile_image
-
-        # Blend the row into the dst_image
-        # We assume that the entire row has the same vertical overlaps as the first_tile_in_row.
-        # Rows are processed in the same way as tiles (extract overlap, blend, apply)
-        row_overlap_size = first_tile_in_row.overlap.top
-        if row_overlap_size > 0:
-            assert row_overlap_size >= blend_amount
-
-            overlap_coords_bottom = first_tile_in_row.coords.top + row_overlap_size
-            src_overlap = dst_image[first_tile_in_row.coords.top : overlap_coords_bottom, :]
-            dst_overlap = row_image[:row_overlap_size, :]
-            blended_overlap = seam_blend(src_overlap, dst_overlap, blend_amount, x_seam=True)
-            dst_image[first_tile_in_row.coords.top : overlap_coords_bottom, :] = blended_overlap
-            dst_image[overlap_coords_bottom : first_tile_in_row.coords.bottom, :] = row_image[row_overlap_size:, :]
-        else:
-            # no overlap just paste the row
-            dst_image[first_tile_in_row.coords.top : first_tile_in_row.coords.bottom, :] = row_image
+    _merge_tiles(dst_image, tiles, tile_images, "Seam", blend_amount)
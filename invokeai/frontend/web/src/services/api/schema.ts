@@ -1268,6 +1268,26 @@ export type paths = {
         patch?: never;
         trace?: never;
     };
+    "/api/v1/app/events/stats": {
+        parameters: {
+            query?: never;
+            header?: never;
+            path?: never;
+            cookie?: never;
+        };
+        /**
+         * Get Event Queue Stats
+         * @description Gets the number of events waiting to be sent to clients, sent and coalesced, by event name
+         */
+        get: operations["get_event_queue_stats"];
+        put?: never;
+        post?: never;
+        delete?: never;
+        options?: never;
+        head?: never;
+        patch?: never;
+        trace?: never;
+    };
     "/api/v1/queue/{queue_id}/enqueue_batch": {
         parameters: {
             query?: never;
@@ -2375,6 +2395,43 @@ export type components = {
              */
             items?: (string | number | components["schemas"]["ImageField"])[];
         };
+        /**
+         * BatchEnqueueProgressEvent
+         * @description Event model for batch_enqueue_progress
+         */
+        BatchEnqueueProgressEvent: {
+            /**
+             * Timestamp
+             * @description The timestamp of the event
+             */
+            timestamp: number;
+            /**
+             * Queue Id
+             * @description The ID of the queue
+             */
+            queue_id: string;
+            /**
+             * Batch Id
+             * @description The ID of the batch
+             */
+            batch_id: string;
+            /**
+             * Enqueued
+             * @description The number of invocations enqueued so far
+             */
+            enqueued: number;
+            /**
+             * Total
+             * @description The number of invocations that will be enqueued
+             */
+            total: number;
+            /**
+             * Origin
+             * @description The origin of the batch
+             * @default null
+             */
+            origin: string | null;
+        };
         /**
          * BatchEnqueuedEvent
          * @description Event model for batch_enqueued
@@ -7347,6 +7404,40 @@ export type components = {
              */
             item_ids: number[];
         };
+        /**
+         * EventQueueStats
+         * @description Statistics of the queue of events waiting to be sent to clients, by event name
+         */
+        EventQueueStats: {
+            /**
+             * Pending
+             * @description The number of events waiting to be sent
+             */
+            pending?: {
+                [key: string]: number;
+            };
+            /**
+             * Max Pending
+             * @description The largest number of events that were waiting to be sent at once
+             */
+            max_pending?: {
+                [key: string]: number;
+            };
+            /**
+             * Dispatched
+             * @description The number of events sent
+             */
+            dispatched?: {
+                [key: string]: number;
+            };
+            /**
+             * Coalesced
+             * @description The number of events dropped without being sent, because a newer event of the same kind (e.g. progress of the same queue item) superseded them
+             */
+            coalesced?: {
+                [key: string]: number;
+            };
+        };
         /**
          * Expand Mask with Fade
          * @description Expands a mask with a fade effect. The mask uses black to indicate areas to keep from the generated image and white for areas to discard.
@@ -13182,6 +13273,54 @@ export type components = {
              * @description The maximum size of the invocation cache
              */
             max_size: number;
+            /**
+             * @description The status of the in-memory cache tier
+             * @default null
+             */
+            memory_tier?: components["schemas"]["InvocationCacheTierStatus"] | null;
+            /**
+             * @description The status of the persistent on-disk cache tier, if enabled
+             * @default null
+             */
+            disk_tier?: components["schemas"]["InvocationCacheTierStatus"] | null;
+        };
+        /** InvocationCacheTierStatus */
+        InvocationCacheTierStatus: {
+            /**
+             * Size
+             * @description The number of items in this cache tier
+             */
+            size: number;
+            /**
+             * Size Bytes
+             * @description The approximate size of the items in this cache tier, in bytes
+             */
+            size_bytes: number;
+            /**
+             * Max Size
+             * @description The maximum number of items in this cache tier, or 0 if not limited by count
+             */
+            max_size: number;
+            /**
+             * Max Size Bytes
+             * @description The maximum size of this cache tier in bytes, or 0 if not limited by size
+             */
+            max_size_bytes: number;
+            /**
+             * Hits
+             * @description The number of cache hits served by this tier
+             */
+            hits: number;
+            /**
+             * Misses
+             * @description The number of lookups this tier could not serve
+             */
+            misses: number;
+            /**
+             * Evictions
+             * @description The number of items evicted from this tier to make room for new items
+             */
+            evictions: number;
         };
         /**
          * InvocationCompleteEvent
@@ -30432,6 +30571,26 @@ export interface operations {
             };
         };
     };
+    get_event_queue_stats: {
+        parameters: {
+            query?: never;
+            header?: never;
+            path?: never;
+            cookie?: never;
+        };
+        requestBody?: never;
+        responses: {
+            /** @description Successful Response */
+            200: {
+                headers: {
+                    [name: string]: unknown;
+                };
+                content: {
+                    "application/json": components["schemas"]["EventQueueStats"];
+                };
+            };
+        };
+    };
     enqueue_batch: {
         parameters: {
             query?: never;
@@ -135,7 +135,8 @@ export const setEventListeners = ({ socket, store, setIsConnected }: SetEventLis
       if (nes) {
         nes.status = zNodeStatus.enum.IN_PROGRESS;
         nes.progress = percentage;
-        nes.progressImage = image ?? null;
+        // Throttled denoising steps report progress without an image - keep showing the last one
+        nes.progressImage = image ?? nes.progressImage;
         upsertExecutionState(nes.nodeId, nes);
       }
     }
@@ -470,6 +471,10 @@ export const setEventListeners = ({ socket, store, setIsConnected }: SetEventLis
     log.debug({ data }, 'Batch enqueued');
   });
 
+  socket.on('batch_enqueue_progress', (data) => {
+    log.debug({ data }, 'Batch enqueue progress');
+  });
+
   socket.on('queue_items_retried', (data) => {
     log.debug({ data }, 'Queue items retried');
   });
@@ -28,6 +28,7 @@ export type ServerToClientEvents = {
   queue_item_status_changed: (payload: S['QueueItemStatusChangedEvent']) => void;
   queue_cleared: (payload: S['QueueClearedEvent']) => void;
   batch_enqueued: (payload: S['BatchEnqueuedEvent']) => void;
+  batch_enqueue_progress: (payload: S['BatchEnqueueProgressEvent']) => void;
   queue_items_retried: (payload: S['QueueItemsRetriedEvent']) => void;
   recall_parameters_updated: (payload: S['RecallParametersUpdatedEvent']) => void;
   bulk_download_started: (payload: S['BulkDownloadStartedEvent']) => void;
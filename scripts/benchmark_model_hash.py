@@ -0,0 +1,80 @@
+"""Benchmarks hashing a directory model with `ModelHash`.
+
+Creates a directory of synthetic, sparse model files (so they take no space on disk, and read back as zeros without
+touching the disk) and times hashing it:
+- one file at a time
+- several files at a time
+- with a hash cache backed by the model records database, on the first run (every file is hashed and its hash is
+  stored) and on a later run (every hash is read from the cache)
+
+Sparse files measure the hashing itself rather than the disk. Pass --dir to hash a real model directory instead.
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+from typing import get_args
+from unittest.mock import Mock
+
+from invokeai.app.services.config.config_default import InvokeAIAppConfig
+from invokeai.app.services.image_files.image_files_base import ImageFileStorageBase
+from invokeai.app.services.model_records.model_records_sql import ModelRecordServiceSQL
+from invokeai.app.services.shared.sqlite.sqlite_util import init_db
+from invokeai.backend.model_hash.model_hash import HASHING_ALGORITHMS, ModelHash
+from invokeai.backend.util.logging import InvokeAILogger
+
+
+def make_sparse_model(model_dir: Path, files: int, size_gb: float) -> None:
+    for i in range(files):
+        with open(model_dir / f"model-{i:05d}-of-{files:05d}.safetensors", "wb") as f:
+            f.truncate(int(size_gb * 2**30))
+
+
+def time_hash(model_hash: ModelHash, model_dir: Path) -> tuple[str, float]:
+    start = time.perf_counter()
+    hash_ = model_hash.hash(model_dir)
+    return hash_, time.perf_counter() - start
+
+
+def benchmark(model_dir: Path, algorithm: HASHING_ALGORITHMS, workers: int) -> None:
+    config = InvokeAIAppConfig(use_memory_db=True)
+    logger = InvokeAILogger.get_logger()
+    db = init_db(config=config, logger=logger, image_files=Mock(spec=ImageFileStorageBase))
+    store = ModelRecordServiceSQL(db, logger)
+
+    total_size = sum(f.stat().st_size for f in model_dir.iterdir() if f.is_file())
+    print(f"hashing {total_size / 2**30:.1f}GB in {model_dir} with {algorithm}")
+
+    results = {
+        "sequential": time_hash(ModelHash(algorithm, max_workers=1), model_dir),
+        f"{workers} workers": time_hash(ModelHash(algorithm, max_workers=workers), model_dir),
+        "cache, cold": time_hash(ModelHash(algorithm, hash_cache=store, max_workers=workers), model_dir),
+        "cache, warm": time_hash(ModelHash(algorithm, hash_cache=store, max_workers=workers), model_dir),
+    }
+    hashes = {hash_ for hash_, _ in results.values()}
+    for name, (_, seconds) in results.items():
+        print(f"{name:<14} {seconds:8.3f}s  {total_size / 2**30 / seconds:8.2f}GB/s")
+    if len(hashes) != 1:
+        print(f"MISMATCH: {hashes}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dir", type=Path, help="Model directory to hash (default: synthetic sparse files)")
+    parser.add_argument("--files", type=int, default=4, help="Number of synthetic model files")
+    parser.add_argument("--size-gb", type=float, default=2.0, help="Size of each synthetic model file, in GB")
+    parser.add_argument("--algorithm", default="sha256", choices=get_args(HASHING_ALGORITHMS), help="Hash algorithm")
+    parser.add_argument("--workers", type=int, default=4, help="Number of files to hash at a time")
+    args = parser.parse_args()
+
+    if args.dir:
+        benchmark(args.dir, args.algorithm, args.workers)
+        return
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        make_sparse_model(Path(tmp_dir), args.files, args.size_gb)
+        benchmark(Path(tmp_dir), args.algorithm, args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Benchmarks model identification with `ModelConfigFactory.from_model_on_disk`.
+
+Identifies each model twice: once as usual, where config classes rule out models by their header before trying to
+match them (see `Config_Base.could_match`), and once with every config class tried in full. Prints the time taken for
+each model, how many candidate classes were ruled out by the header, and whether both runs identified the model the
+same way.
+
+By default, the stripped models in tests/model_identification are identified. These are JSON files that stand in for
+the real models, so header reads and state dict loads are much cheaper than they are for real models. Pass model
+paths to identify real models instead.
+"""
+
+import argparse
+import json
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional
+
+from invokeai.backend.model_manager.configs.base import Config_Base
+from invokeai.backend.model_manager.configs.factory import ModelClassificationResult, ModelConfigFactory
+from invokeai.backend.model_manager.model_on_disk import ModelOnDisk
+from tests.model_identification.stripped_model_on_disk import StrippedModelOnDisk
+
+STRIPPED_MODELS_DIR = Path(__file__).parent.parent / "tests" / "model_identification" / "stripped_models"
+
+
+@contextmanager
+def all_candidates_tried() -> Iterator[None]:
+    """Temporarily disable the header checks of all config classes."""
+    originals = {
+        cls: cls.__dict__["could_match"] for cls in Config_Base.CONFIG_CLASSES if "could_match" in cls.__dict__
+    }
+    saved_base = Config_Base.__dict__["could_match"]
+    try:
+        Config_Base.could_match = classmethod(lambda cls, mod: True)  # type: ignore
+        for cls in originals:
+            delattr(cls, "could_match")
+        yield
+    finally:
+        Config_Base.could_match = saved_base  # type: ignore
+        for cls, could_match in originals.items():
+            cls.could_match = could_match  # type: ignore
+
+
+def get_stripped_models() -> list[tuple[str, ModelOnDisk, Optional[dict]]]:
+    models: list[tuple[str, ModelOnDisk, Optional[dict]]] = []
+    for model_dir in sorted(p for p in STRIPPED_MODELS_DIR.iterdir() if p.is_dir()):
+        try:
+            test_metadata = json.loads((model_dir / "__test_metadata__.json").read_text())
+        except Exception as e:
+            print(f"{model_dir.name}: skipped, unable to read test metadata ({e})")
+            continue
+        model_path = model_dir / test_metadata.get("file_name", "")
+        models.append((model_dir.name, StrippedModelOnDisk(model_path), test_metadata.get("override_fields")))
+    return models
+
+
+def identify(mod: ModelOnDisk, override_fields: Optional[dict]) -> tuple[ModelClassificationResult, float]:
+    # Each run gets a fresh ModelOnDisk, so that the state dict and header caches are cold
+    mod = type(mod)(mod.path, mod.hash_algo)
+    start = time.perf_counter()
+    result = ModelConfigFactory.from_model_on_disk(mod, override_fields, hash_algo="random")
+    return result, time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="*", type=Path, help="Paths of models to identify (default: stripped models)")
+    args = parser.parse_args()
+
+    if args.paths:
+        models = [(p.name, ModelOnDisk(p), None) for p in args.paths]
+    else:
+        models = get_stripped_models()
+
+    total_filtered = 0.0
+    total_unfiltered = 0.0
+    for name, mod, override_fields in models:
+        try:
+            # Warm up, so that neither run pays for the file being read into the page cache
+            identify(mod, override_fields)
+            filtered, filtered_time = identify(mod, override_fields)
+            with all_candidates_tried():
+                unfiltered, unfiltered_time = identify(mod, override_fields)
+        except Exception as e:
+            print(f"{name}: skipped, unable to identify ({e})")
+            continue
+        total_filtered += filtered_time
+        total_unfiltered += unfiltered_time
+        ruled_out = sum("ruled out" in str(d) for d in filtered.details.values())
+        same = type(filtered.config) is type(unfiltered.config)
+        print(
+            f"{name[:36]:<36} {type(filtered.config).__name__:<36} {ruled_out:3d} ruled out  "
+            f"{unfiltered_time * 1000:8.1f}ms -> {filtered_time * 1000:8.1f}ms{'' if same else '  MISMATCH'}"
+        )
+    print(f"total {total_unfiltered:.2f}s -> {total_filtered:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Benchmarks the "torch" and "safetensors" file formats of ObjectSerializerDisk.
+
+Saves and loads typical intermediate tensors and conditioning, and prints the mean time per operation.
+"""
+
+import argparse
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable
+
+import torch
+
+from invokeai.app.services.object_serializer.object_serializer_disk import OBJECT_FILE_FORMAT, ObjectSerializerDisk
+from invokeai.backend.stable_diffusion.diffusion.conditioning_data import (
+    ConditioningFieldData,
+    FLUXConditioningInfo,
+    SDXLConditioningInfo,
+)
+
+SAFE_GLOBALS: list[type] = [ConditioningFieldData, SDXLConditioningInfo, FLUXConditioningInfo]
+
+
+def make_objects() -> dict[str, Any]:
+    return {
+        "SDXL latents 1024x1024": torch.randn(1, 4, 128, 128),
+        "FLUX latents 1024x1024": torch.randn(1, 16, 128, 128, dtype=torch.bfloat16),
+        "4x batch latents 2048x2048": torch.randn(4, 16, 256, 256),
+        "SDXL conditioning": ConditioningFieldData(
+            conditionings=[
+                SDXLConditioningInfo(
+                    embeds=torch.randn(1, 77, 2048, dtype=torch.float16),
+                    pooled_embeds=torch.randn(1, 1280, dtype=torch.float16),
+                    add_time_ids=torch.randn(1, 6),
+                )
+            ]
+        ),
+        "FLUX conditioning": ConditioningFieldData(
+            conditionings=[
+                FLUXConditioningInfo(
+                    clip_embeds=torch.randn(1, 768, dtype=torch.bfloat16),
+                    t5_embeds=torch.randn(1, 512, 4096, dtype=torch.bfloat16),
+                )
+            ]
+        ),
+    }
+
+
+def time_op(op: Callable[[], Any], iterations: int) -> float:
+    times: list[float] = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        op()
+        times.append(time.perf_counter() - start)
+    return statistics.mean(times)
+
+
+def benchmark(iterations: int, output_dir: Path) -> None:
+    file_formats: list[OBJECT_FILE_FORMAT] = ["torch", "safetensors"]
+    print(f"{'object':<28} {'format':<12} {'save ms':>10} {'load ms':>10} {'load+clone ms':>14}")
+    for obj_name, obj in make_objects().items():
+        for file_format in file_formats:
+            serializer = ObjectSerializerDisk[type(obj)](
+                output_dir / file_format, safe_globals=SAFE_GLOBALS, file_format=file_format
+            )
+            names: list[str] = []
+            save_time = time_op(lambda: names.append(serializer.save(obj)), iterations)  # noqa: B023
+            load_time = time_op(lambda: serializer.load(names[0]), iterations)  # noqa: B023
+
+            def load_and_copy() -> None:
+                # The invocation context returns copies of loaded tensors, so include the copy for a fair comparison
+                loaded = serializer.load(names[0])  # noqa: B023
+                if isinstance(loaded, torch.Tensor):
+                    loaded.clone()
+
+            load_copy_time = time_op(load_and_copy, iterations)
+            for name in names:
+                serializer.delete(name)
+            print(
+                f"{obj_name:<28} {file_format:<12} {save_time * 1000:>10.2f} {load_time * 1000:>10.2f} "
+                f"{load_copy_time * 1000:>14.2f}"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks the file formats of ObjectSerializerDisk.")
+    parser.add_argument("--iterations", type=int, default=20, help="Number of iterations per operation.")
+    parser.add_argument(
+        "--output-dir",
+        type=Path,
+        default=None,
+        help="Directory to write the objects to. Defaults to a temporary directory.",
+    )
+    args = parser.parse_args()
+    if args.output_dir is not None:
+        benchmark(args.iterations, args.output_dir)
+        return
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        benchmark(args.iterations, Path(tmp_dir))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""Benchmarks the compression of the session queue's JSON columns on a synthetic database.
+
+Fills two databases with the same queue items, once with uncompressed JSON text (as legacy rows are stored) and once
+compressed, and prints the database size and the time taken to write the items, read them back (including parsing
+their sessions) and VACUUM the database.
+
+The queue holds pending items from a batch, stored in full (not from a session template), and completed items, whose
+sessions include the execution graph and results of an iterated graph.
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+from unittest.mock import MagicMock, Mock
+
+from invokeai.app.invocations.baseinvocation import InvocationContext
+from invokeai.app.invocations.collections import RangeInvocation
+from invokeai.app.invocations.math import AddInvocation
+from invokeai.app.services.config.config_default import InvokeAIAppConfig
+from invokeai.app.services.image_files.image_files_base import ImageFileStorageBase
+from invokeai.app.services.session_queue.session_queue_common import Batch, BatchDatum, iter_values_to_insert
+from invokeai.app.services.session_queue.session_queue_sqlite import SqliteSessionQueue
+from invokeai.app.services.shared.graph import (
+    CollectInvocation,
+    Edge,
+    EdgeConnection,
+    Graph,
+    GraphExecutionState,
+    IterateInvocation,
+)
+from invokeai.app.services.shared.sqlite.sqlite_compression import compress_json
+from invokeai.app.services.shared.sqlite.sqlite_util import init_db
+from invokeai.backend.util.logging import InvokeAILogger
+
+
+def make_batch(iterations: int, items: int) -> Batch:
+    def edge(source: str, source_field: str, destination: str, destination_field: str) -> Edge:
+        return Edge(
+            source=EdgeConnection(node_id=source, field=source_field),
+            destination=EdgeConnection(node_id=destination, field=destination_field),
+        )
+
+    graph = Graph()
+    graph.add_node(RangeInvocation(id="range", start=0, stop=iterations, step=1))
+    graph.add_node(IterateInvocation(id="iterate"))
+    graph.add_node(AddInvocation(id="add", b=1))
+    graph.add_node(CollectInvocation(id="collect"))
+    graph.add_edge(edge("range", "collection", "iterate", "collection"))
+    graph.add_edge(edge("iterate", "item", "add", "a"))
+    graph.add_edge(edge("add", "value", "collect", "item"))
+    # A workflow of a similar size to the UI's, as the UI sends one with every batch
+    workflow = {
+        "name": "Synthetic workflow",
+        "author": "",
+        "description": "",
+        "version": "",
+        "contact": "",
+        "tags": "",
+        "notes": "",
+        "exposedFields": [],
+        "meta": {"version": "3.0.0", "category": "user"},
+        "nodes": [
+            {
+                "id": f"node-{i}",
+                "type": "invocation",
+                "position": {"x": i * 10, "y": i * 20},
+                "data": {"id": f"node-{i}", "type": "add", "inputs": {"a": {"name": "a", "label": "", "value": i}}},
+            }
+            for i in range(50)
+        ],
+        "edges": [],
+    }
+    return Batch(
+        graph=graph,
+        data=[[BatchDatum(node_path="add", field_name="b", items=list(range(items)))]],
+        workflow=workflow,  # pyright: ignore[reportArgumentType]
+    )
+
+
+def make_completed_session(batch: Batch) -> str:
+    session = GraphExecutionState(graph=batch.graph)
+    while (invocation := session.next()) is not None:
+        session.complete(invocation.id, invocation.invoke(Mock(InvocationContext)))
+    return session.model_dump_json(warnings=False, exclude_none=True)
+
+
+def benchmark(items: int, completed: int, iterations: int) -> None:
+    logger = InvokeAILogger.get_logger()
+    batch = make_batch(iterations, items)
+    completed_session_json = make_completed_session(batch)
+
+    for compressed in (False, True):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            config = InvokeAIAppConfig(db_dir=Path(tmp_dir))
+            db = init_db(config=config, logger=logger, image_files=Mock(spec=ImageFileStorageBase))
+            invoker = MagicMock()
+            invoker.services.configuration = config
+            session_queue = SqliteSessionQueue(db=db)
+            session_queue.start(invoker)
+
+            start = time.perf_counter()
+            values = list(iter_values_to_insert("default", batch, 0, items, compressed=compressed))
+            session_value = compress_json(completed_session_json) if compressed else completed_session_json
+            with db.transaction() as cursor:
+                cursor.executemany(
+                    """--sql
+                    INSERT INTO session_queue (queue_id, session, session_id, batch_id, field_values, priority, workflow, origin, destination, retried_from_item_id)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    values,
+                )
+                cursor.execute(
+                    "UPDATE session_queue SET session = ?, status = 'completed' WHERE item_id <= ?;",
+                    (session_value, completed),
+                )
+            write_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            for item_id in range(1, items + 1):
+                session_queue.get_queue_item(item_id)
+            read_time = time.perf_counter() - start
+
+            db_size = config.db_path.stat().st_size
+            start = time.perf_counter()
+            db.clean()
+            vacuum_time = time.perf_counter() - start
+
+            label = "compressed" if compressed else "uncompressed"
+            print(
+                f"{label:<13} size {db_size / 2**20:8.2f}MB  write {write_time:6.2f}s  "
+                f"read {read_time:6.2f}s  vacuum {vacuum_time:6.2f}s"
+            )
+            db._conn.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=1000, help="Number of queue items")
+    parser.add_argument("--completed", type=int, default=200, help="Number of those items that are completed")
+    parser.add_argument("--iterations", type=int, default=100, help="Number of iterations in each session's graph")
+    args = parser.parse_args()
+    benchmark(args.items, args.completed, args.iterations)
+
+
+if __name__ == "__main__":
+    main()
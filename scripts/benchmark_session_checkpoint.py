@@ -0,0 +1,109 @@
+"""Benchmarks storing a large, completed session in the session queue.
+
+Runs an iterated graph (range -> iterate -> add -> collect) in memory, so that the session holds one prepared node and
+one result per iteration, then times:
+- serializing the session
+- storing it with `set_queue_item_session`, as the session processor does when a session completes or fails
+- reading the queue item back with `get_queue_item`, which parses the session
+- completing the queue item, right after its session was stored
+
+Storing a session and completing its queue item used to parse the stored session back, once each.
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from typing import Any, Callable
+from unittest.mock import MagicMock, Mock
+
+from invokeai.app.invocations.baseinvocation import InvocationContext
+from invokeai.app.invocations.collections import RangeInvocation
+from invokeai.app.invocations.math import AddInvocation
+from invokeai.app.services.config.config_default import InvokeAIAppConfig
+from invokeai.app.services.image_files.image_files_base import ImageFileStorageBase
+from invokeai.app.services.session_queue.session_queue_common import Batch
+from invokeai.app.services.session_queue.session_queue_sqlite import SqliteSessionQueue
+from invokeai.app.services.shared.graph import (
+    CollectInvocation,
+    Edge,
+    EdgeConnection,
+    Graph,
+    GraphExecutionState,
+    IterateInvocation,
+)
+from invokeai.app.services.shared.sqlite.sqlite_util import init_db
+from invokeai.backend.util.logging import InvokeAILogger
+
+
+def make_iterated_graph(iterations: int) -> Graph:
+    def edge(source: str, source_field: str, destination: str, destination_field: str) -> Edge:
+        return Edge(
+            source=EdgeConnection(node_id=source, field=source_field),
+            destination=EdgeConnection(node_id=destination, field=destination_field),
+        )
+
+    graph = Graph()
+    graph.add_node(RangeInvocation(id="range", start=0, stop=iterations, step=1))
+    graph.add_node(IterateInvocation(id="iterate"))
+    graph.add_node(AddInvocation(id="add", b=1))
+    graph.add_node(CollectInvocation(id="collect"))
+    graph.add_edge(edge("range", "collection", "iterate", "collection"))
+    graph.add_edge(edge("iterate", "item", "add", "a"))
+    graph.add_edge(edge("add", "value", "collect", "item"))
+    return graph
+
+
+def run_session(session: GraphExecutionState) -> None:
+    while (invocation := session.next()) is not None:
+        session.complete(invocation.id, invocation.invoke(Mock(InvocationContext)))
+
+
+def time_op(op: Callable[[], Any], repeats: int) -> float:
+    times: list[float] = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        op()
+        times.append(time.perf_counter() - start)
+    return statistics.mean(times)
+
+
+def benchmark(iterations: int, repeats: int) -> None:
+    config = InvokeAIAppConfig(use_memory_db=True)
+    logger = InvokeAILogger.get_logger()
+    db = init_db(config=config, logger=logger, image_files=Mock(spec=ImageFileStorageBase))
+    invoker = MagicMock()
+    invoker.services.configuration = config
+    session_queue = SqliteSessionQueue(db=db)
+    session_queue.start(invoker)
+
+    asyncio.run(session_queue.enqueue_batch("default", Batch(graph=make_iterated_graph(iterations)), prepend=False))
+    queue_item = session_queue.dequeue()
+    assert queue_item is not None
+    session = queue_item.session
+    run_session(session)
+    item_id = queue_item.item_id
+
+    session_json = session.model_dump_json(warnings=False, exclude_none=True)
+    print(f"{len(session.execution_graph.nodes)} executed nodes, session JSON is {len(session_json) / 2**20:.2f}MB")
+
+    results = {
+        "serialize session": time_op(lambda: session.model_dump_json(warnings=False, exclude_none=True), repeats),
+        "set_queue_item_session": time_op(lambda: session_queue.set_queue_item_session(item_id, session), repeats),
+        "get_queue_item": time_op(lambda: session_queue.get_queue_item(item_id), repeats),
+    }
+    results["complete_queue_item"] = time_op(lambda: session_queue.complete_queue_item(item_id), 1)
+    for name, seconds in results.items():
+        print(f"{name:<24} {seconds * 1000:8.2f}ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=500, help="Number of iterations of the iterated node")
+    parser.add_argument("--repeats", type=int, default=10, help="Number of times to repeat each operation")
+    args = parser.parse_args()
+    benchmark(args.iterations, args.repeats)
+
+
+if __name__ == "__main__":
+    main()
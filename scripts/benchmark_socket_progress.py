@@ -0,0 +1,91 @@
+"""Benchmarks sending denoising progress events with preview images to socket.io clients.
+
+Sends progress events at a fixed rate (30/s by default) to a number of connected clients (20 by default) that subscribed
+to the queue with data URL images (the default), with binary images (`binary_progress_images`), or half and half.
+Prints the CPU time the server spends per event, from the event's dump to its engine.io packets, and the bytes sent to
+each client per event.
+
+The clients are simulated in-process: each engine.io packet is encoded as a transport would, and then discarded. This
+measures the server's work per event rather than the network.
+"""
+
+import argparse
+import asyncio
+import time
+from unittest.mock import MagicMock
+
+import numpy as np
+from fastapi import FastAPI
+from PIL import Image
+
+from invokeai.app.api.sockets import SocketIO
+from invokeai.app.invocations.math import AddInvocation
+from invokeai.app.services.events.events_common import InvocationProgressEvent
+from invokeai.app.services.session_processor.session_processor_common import ProgressImage
+
+
+def make_progress_events(count: int, size: int) -> list[InvocationProgressEvent]:
+    queue_item = MagicMock()
+    queue_item.queue_id = "default"
+    queue_item.item_id = 1
+    queue_item.batch_id = "batch"
+    queue_item.origin = "canvas"
+    queue_item.destination = "canvas"
+    queue_item.session_id = "session"
+    queue_item.session.prepared_source_mapping = {"add": "add"}
+    rng = np.random.default_rng(0)
+    events: list[InvocationProgressEvent] = []
+    for i in range(count):
+        # Latent previews are smooth, so upscale a small noise image rather than using full-resolution noise
+        noise = Image.fromarray(rng.integers(0, 255, (size // 8, size // 8, 3), dtype=np.uint8))
+        image = ProgressImage.build(noise.resize((size, size), Image.Resampling.BICUBIC), (size * 8, size * 8))
+        events.append(InvocationProgressEvent.build(queue_item, AddInvocation(id="add"), "Denoising", i / count, image))
+    return events
+
+
+async def run(events: list[InvocationProgressEvent], clients: int, binary_clients: int, rate: float) -> None:
+    socket_io = SocketIO(FastAPI())
+    sent_bytes = 0
+
+    async def send_eio_packet(eio_sid: str, eio_pkt) -> None:
+        nonlocal sent_bytes
+        encoded = eio_pkt.encode()
+        sent_bytes += len(encoded)
+
+    socket_io._sio._send_eio_packet = send_eio_packet  # type: ignore
+    for i in range(clients):
+        sid = await socket_io._sio.manager.connect(f"eio-{i}", "/")
+        await socket_io._handle_sub_queue(sid, {"queue_id": "default", "binary_progress_images": i < binary_clients})
+
+    cpu_time = 0.0
+    start = time.perf_counter()
+    for i, event in enumerate(events):
+        cpu_start = time.process_time()
+        await socket_io._handle_queue_event(("invocation_progress", event))
+        cpu_time += time.process_time() - cpu_start
+        await asyncio.sleep(max(0.0, start + (i + 1) / rate - time.perf_counter()))
+
+    label = f"{clients - binary_clients} data URL, {binary_clients} binary"
+    print(
+        f"{label:<24} {cpu_time / len(events) * 1000:8.3f}ms CPU/event  "
+        f"{sent_bytes / len(events) / clients / 1024:8.1f}KB/client/event  "
+        f"{sent_bytes / (time.perf_counter() - start) / 2**20:8.2f}MB/s total"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=20, help="Number of connected clients")
+    parser.add_argument("--rate", type=float, default=30.0, help="Progress events per second")
+    parser.add_argument("--seconds", type=float, default=5.0, help="How long to send events for, per configuration")
+    parser.add_argument("--size", type=int, default=128, help="Width and height of the preview images")
+    args = parser.parse_args()
+
+    events = make_progress_events(int(args.rate * args.seconds), args.size)
+    print(f"{len(events)} events at {args.rate:g}/s to {args.clients} clients, {args.size}x{args.size} previews")
+    for binary_clients in (0, args.clients // 2, args.clients):
+        asyncio.run(run(events, args.clients, binary_clients, args.rate))
+
+
+if __name__ == "__main__":
+    main()
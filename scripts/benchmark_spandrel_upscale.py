@@ -0,0 +1,64 @@
+"""Benchmarks tiled spandrel upscaling with batched tiles.
+
+Upscales a random image with a small, randomly initialized ESRGAN model, once for each max batch size. Prints the time
+per tile, and the largest difference in output pixel values from the unbatched result.
+
+Runs on the default torch device. Batching is meant for GPUs with spare compute; on the CPU, where the model already
+keeps the cores busy, it is usually slower, and the invocation always runs one tile at a time.
+"""
+
+import argparse
+import time
+
+import numpy as np
+import torch
+from PIL import Image
+from spandrel.architectures.ESRGAN import ESRGAN
+
+from invokeai.app.invocations.spandrel_image_to_image import SpandrelImageToImageInvocation
+from invokeai.backend.spandrel_image_to_image_model import SpandrelImageToImageModel
+from invokeai.backend.util.devices import TorchDevice
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=384, help="Width and height of the input image")
+    parser.add_argument("--tile-size", type=int, default=96, help="Tile width and height")
+    parser.add_argument("--filters", type=int, default=32, help="Number of ESRGAN filters")
+    parser.add_argument("--blocks", type=int, default=2, help="Number of ESRGAN blocks")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 2, 4, 8], help="Max batch sizes to compare")
+    args = parser.parse_args()
+
+    torch.manual_seed(0)
+    state_dict = ESRGAN(num_filters=args.filters, num_blocks=args.blocks, scale=4).state_dict()
+    spandrel_model = SpandrelImageToImageModel.load_from_state_dict(state_dict)
+    spandrel_model.to(device=TorchDevice.choose_torch_device())
+    rng = np.random.default_rng(0)
+    image = Image.fromarray(rng.integers(0, 255, (args.size, args.size, 3), dtype=np.uint8))
+
+    tiles = 0
+
+    def step_callback(step: int, total_steps: int) -> None:
+        nonlocal tiles
+        tiles = total_steps
+
+    def upscale(max_batch_size: int) -> tuple[np.ndarray, float]:
+        start = time.perf_counter()
+        result = SpandrelImageToImageInvocation.upscale_image(
+            image, args.tile_size, spandrel_model, lambda: False, step_callback, max_batch_size
+        )
+        return np.array(result), time.perf_counter() - start
+
+    # Warm up
+    reference, _ = upscale(1)
+    print(
+        f"{tiles} {args.tile_size}x{args.tile_size} tiles on {spandrel_model.device}, {torch.get_num_threads()} threads"
+    )
+    for max_batch_size in args.batch_sizes:
+        result, elapsed = upscale(max_batch_size)
+        max_diff = np.abs(result.astype(int) - reference.astype(int)).max()
+        print(f"max_batch_size={max_batch_size:<3} {elapsed / tiles * 1000:8.1f}ms/tile  max diff {max_diff}")
+
+
+if __name__ == "__main__":
+    main()
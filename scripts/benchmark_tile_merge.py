@@ -0,0 +1,83 @@
+"""Benchmarks merging tiles into a large image.
+
+Merges tiles covering a large image (8192x8192 by default) in two ways:
+- streaming: each tile image is created just before it is added to a TileMerger, as MergeTilesToImageInvocation loads
+  each tile just before it is merged.
+- in-memory: all tile images are created first, and then merged with merge_tiles_with_linear_blending(...) or
+  merge_tiles_with_seam_blending(...).
+
+Prints the time taken and the peak memory allocated by numpy, as traced by tracemalloc, in addition to the output image.
+"""
+
+import argparse
+import time
+import tracemalloc
+from typing import Literal
+
+import numpy as np
+
+from invokeai.backend.tiles.tiles import (
+    TileMerger,
+    calc_tiles_min_overlap,
+    merge_tiles_with_linear_blending,
+    merge_tiles_with_seam_blending,
+)
+from invokeai.backend.tiles.utils import Tile
+
+
+def make_tile_image(tile: Tile) -> np.ndarray:
+    # A smooth, random tile, so that seam finding has some work to do
+    rng = np.random.default_rng(tile.coords.top * 100_000 + tile.coords.left)
+    small = rng.integers(0, 255, (8, 8, 3), dtype=np.uint8)
+    height = tile.coords.bottom - tile.coords.top
+    width = tile.coords.right - tile.coords.left
+    return np.repeat(np.repeat(small, -(-height // 8), axis=0), -(-width // 8), axis=1)[:height, :width]
+
+
+def merge(
+    size: int, tiles: list[Tile], blend_mode: Literal["Linear", "Seam"], blend_amount: int, streaming: bool
+) -> None:
+    output_bytes = size * size * 3
+    tracemalloc.start()
+    start = time.perf_counter()
+    dst_image = np.zeros((size, size, 3), dtype=np.uint8)
+    if streaming:
+        merger = TileMerger(dst_image=dst_image, blend_mode=blend_mode, blend_amount=blend_amount)
+        for tile in sorted(tiles, key=lambda t: (t.coords.top, t.coords.left)):
+            merger.add_tile(tile, make_tile_image(tile))
+        merger.finish()
+    else:
+        tile_images = [make_tile_image(tile) for tile in tiles]
+        merge_tiles = merge_tiles_with_linear_blending if blend_mode == "Linear" else merge_tiles_with_seam_blending
+        merge_tiles(dst_image=dst_image, tiles=tiles, tile_images=tile_images, blend_amount=blend_amount)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    label = f"{blend_mode}, {'streaming' if streaming else 'in-memory'}"
+    print(f"{label:<20} {elapsed:8.2f}s  peak {peak / 2**20:8.0f}MB ({(peak - output_bytes) / 2**20:.0f}MB + output)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=8192, help="Width and height of the output image")
+    parser.add_argument("--tile-size", type=int, default=1024, help="Tile width and height")
+    parser.add_argument("--overlap", type=int, default=128, help="Minimum tile overlap")
+    parser.add_argument("--blend-amount", type=int, default=64, help="Blend amount")
+    parser.add_argument("--blend-modes", nargs="+", default=["Linear", "Seam"], choices=["Linear", "Seam"])
+    args = parser.parse_args()
+
+    tiles = calc_tiles_min_overlap(
+        image_height=args.size,
+        image_width=args.size,
+        tile_height=args.tile_size,
+        tile_width=args.tile_size,
+        min_overlap=args.overlap,
+    )
+    print(f"{len(tiles)} {args.tile_size}x{args.tile_size} tiles, {args.size}x{args.size} output")
+    for blend_mode in args.blend_modes:
+        for streaming in (False, True):
+            merge(args.size, tiles, blend_mode, args.blend_amount, streaming)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+import torch
+from PIL import Image
+from spandrel.architectures.ESRGAN import ESRGAN
+
+from invokeai.app.invocations.spandrel_image_to_image import SpandrelImageToImageInvocation
+from invokeai.app.services.session_processor.session_processor_common import CanceledException
+from invokeai.backend.spandrel_image_to_image_model import SpandrelImageToImageModel
+from invokeai.backend.tiles.utils import TBLR, Tile
+
+
+@pytest.fixture(scope="module")
+def spandrel_model() -> SpandrelImageToImageModel:
+    torch.manual_seed(0)
+    return SpandrelImageToImageModel.load_from_state_dict(ESRGAN(num_filters=8, num_blocks=1, scale=2).state_dict())
+
+
+@pytest.fixture
+def image() -> Image.Image:
+    rng = np.random.default_rng(0)
+    return Image.fromarray(rng.integers(0, 255, (90, 130, 3), dtype=np.uint8))
+
+
+def upscale(image: Image.Image, tile_size: int, spandrel_model: SpandrelImageToImageModel, max_batch_size: int):
+    steps: list[tuple[int, int]] = []
+    result = SpandrelImageToImageInvocation.upscale_image(
+        image, tile_size, spandrel_model, lambda: False, lambda step, total: steps.append((step, total)), max_batch_size
+    )
+    return np.array(result), steps
+
+
+def test_upscale_image_without_tiling_matches_model_output(
+    image: Image.Image, spandrel_model: SpandrelImageToImageModel
+):
+    expected = SpandrelImageToImageModel.tensor_to_pil(
+        spandrel_model.run(SpandrelImageToImageModel.pil_to_tensor(image))
+    )
+    result, steps = upscale(image, 0, spandrel_model, max_batch_size=4)
+    assert np.array_equal(result, np.array(expected))
+    assert steps == [(0, 1), (1, 1)]
+
+
+def test_upscale_image_batched_matches_unbatched(image: Image.Image, spandrel_model: SpandrelImageToImageModel):
+    unbatched, unbatched_steps = upscale(image, 48, spandrel_model, max_batch_size=1)
+    batched, batched_steps = upscale(image, 48, spandrel_model, max_batch_size=4)
+    assert unbatched.shape == (180, 260, 3)
+    # Batching may change the rounding of a few values
+    assert np.abs(unbatched.astype(int) - batched.astype(int)).max() <= 1
+    # 3 rows of 4 tiles
+    assert unbatched_steps == [(step, 12) for step in range(13)]
+    assert batched_steps == [(0, 12), (4, 12), (8, 12), (12, 12)]
+
+
+def test_upscale_image_canceled(image: Image.Image, spandrel_model: SpandrelImageToImageModel):
+    steps: list[int] = []
+    with pytest.raises(CanceledException):
+        SpandrelImageToImageInvocation.upscale_image(
+            image, 48, spandrel_model, lambda: len(steps) > 2, lambda step, total: steps.append(step), 2
+        )
+    assert steps == [0, 2, 4]
+
+
+def test_batch_tiles_groups_tiles_of_the_same_size():
+    def tile(top: int, bottom: int, left: int, right: int) -> tuple[Tile, Tile]:
+        t = Tile(
+            coords=TBLR(top=top, bottom=bottom, left=left, right=right), overlap=TBLR(top=0, bottom=0, left=0, right=0)
+        )
+        return (t, t)
+
+    tiles = [tile(0, 32, 0, 32), tile(0, 32, 32, 64), tile(0, 32, 64, 96), tile(32, 48, 0, 32), tile(32, 48, 32, 64)]
+    batches = SpandrelImageToImageInvocation.batch_tiles(tiles, max_batch_size=2)
+    assert batches == [tiles[0:2], tiles[2:3], tiles[3:5]]
+
+
+def test_get_tile_batch_size(spandrel_model: SpandrelImageToImageModel):
+    tile_working_memory = spandrel_model.estimate_working_memory(64, 64)
+    get_tile_batch_size = SpandrelImageToImageInvocation.get_tile_batch_size
+    assert get_tile_batch_size(spandrel_model, 64, 8, 100 * tile_working_memory) == 8
+    assert get_tile_batch_size(spandrel_model, 64, 8, 3 * tile_working_memory) == 3
+    assert get_tile_batch_size(spandrel_model, 64, 8, tile_working_memory // 2) == 1
+    assert get_tile_batch_size(spandrel_model, 0, 8, 100 * tile_working_memory) == 1
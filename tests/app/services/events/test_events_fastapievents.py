@@ -0,0 +1,83 @@
+import asyncio
+from unittest.mock import MagicMock
+
+import pytest
+from PIL import Image
+
+from invokeai.app.invocations.math import AddInvocation
+from invokeai.app.services.events import events_fastapievents
+from invokeai.app.services.events.events_common import EventBase, InvocationProgressEvent, QueueClearedEvent
+from invokeai.app.services.events.events_fastapievents import FastAPIEventService
+from invokeai.app.services.session_processor.session_processor_common import ProgressImage
+
+
+@pytest.fixture
+def dispatched(monkeypatch: pytest.MonkeyPatch) -> list[EventBase]:
+    dispatched: list[EventBase] = []
+    monkeypatch.setattr(events_fastapievents, "dispatch", lambda event, **kwargs: dispatched.append(event))
+    return dispatched
+
+
+@pytest.fixture
+def loop():
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
+
+
+def make_queue_item(item_id: int) -> MagicMock:
+    queue_item = MagicMock()
+    queue_item.queue_id = "default"
+    queue_item.item_id = item_id
+    queue_item.batch_id = "batch"
+    queue_item.origin = None
+    queue_item.destination = None
+    queue_item.session_id = f"session-{item_id}"
+    queue_item.session.prepared_source_mapping = {"add": "add"}
+    return queue_item
+
+
+def drain(service: FastAPIEventService, loop: asyncio.AbstractEventLoop) -> None:
+    async def wait_until_sent():
+        while sum(service.get_stats().pending.values()) > 0:
+            await asyncio.sleep(0.01)
+
+    loop.run_until_complete(asyncio.wait_for(wait_until_sent(), timeout=5))
+    service.stop()
+    loop.run_until_complete(asyncio.sleep(0))
+
+
+def test_stale_progress_events_are_coalesced(dispatched: list[EventBase], loop: asyncio.AbstractEventLoop):
+    service = FastAPIEventService(0, loop)
+    invocation = AddInvocation(id="add")
+    image = Image.new("RGB", (8, 8))
+    for step in range(5):
+        service.emit_invocation_progress(make_queue_item(1), invocation, "Denoising", step / 4, image, (64, 64))
+    service.emit_invocation_progress(make_queue_item(2), invocation, "Denoising", 0.5, image, (64, 64))
+    drain(service, loop)
+
+    # Only the newest progress event of each queue item is sent, with its image
+    assert [(e.item_id, e.percentage) for e in dispatched] == [(1, 1.0), (2, 0.5)]  # pyright: ignore
+    progress_image = dispatched[0].image  # pyright: ignore
+    assert isinstance(progress_image, ProgressImage)
+    assert (progress_image.width, progress_image.height) == (64, 64)
+
+    stats = service.get_stats()
+    assert stats.pending == {"invocation_progress": 0}
+    assert stats.dispatched == {"invocation_progress": 2}
+    assert stats.coalesced == {"invocation_progress": 4}
+    assert stats.max_pending == {"invocation_progress": 6}
+
+
+def test_events_are_sent_in_order(dispatched: list[EventBase], loop: asyncio.AbstractEventLoop):
+    service = FastAPIEventService(0, loop)
+    image = Image.new("RGB", (8, 8))
+    service.emit_queue_cleared("first")
+    service.emit_invocation_progress(make_queue_item(1), AddInvocation(id="add"), "Denoising", 0.5, image)
+    service.emit_queue_cleared("second")
+    drain(service, loop)
+
+    # The progress event waits for its image to be encoded, and later events wait for the progress event
+    assert [type(e) for e in dispatched] == [QueueClearedEvent, InvocationProgressEvent, QueueClearedEvent]
+    assert dispatched[1].image is not None  # pyright: ignore
+    assert service.get_stats().coalesced == {}
@@ -1,8 +1,12 @@
 import platform
+import threading
 from pathlib import Path
+from unittest.mock import MagicMock
 
 import pytest
+from PIL import Image
 
+from invokeai.app.services.image_files.image_files_common import ImageFileNotFoundException
 from invokeai.app.services.image_files.image_files_disk import DiskImageFileStorage
 
 
@@ -49,3 +53,123 @@ def test_image_paths_relative_to_storage_dir(tmp_path: Path):
     image_files_disk = DiskImageFileStorage(tmp_path)
     path = image_files_disk.get_path("foo.png")
     assert path.is_relative_to(tmp_path)
+
+
+@pytest.fixture
+def image_files_disk(tmp_path: Path) -> DiskImageFileStorage:
+    # Room for two 64x64 RGB images (12KB each) and their thumbnails (~3KB each)
+    image_files_disk = DiskImageFileStorage(tmp_path, max_cache_bytes=32 * 1024)
+    invoker = MagicMock()
+    invoker.services.configuration.pil_compress_level = 1
+    image_files_disk.start(invoker)
+    return image_files_disk
+
+
+def test_image_cache_is_lru(image_files_disk: DiskImageFileStorage, tmp_path: Path):
+    image_files_disk.save(Image.new("RGB", (64, 64), "red"), "a.png", thumbnail_size=32)
+    image_files_disk.save(Image.new("RGB", (64, 64), "green"), "b.png", thumbnail_size=32)
+    image_files_disk.get("a.png")  # refresh a, so b is the least recently used
+    image_files_disk.save(Image.new("RGB", (64, 64), "blue"), "c.png", thumbnail_size=32)
+    stats = image_files_disk.get_cache_stats()
+    assert stats.hits == 1
+    assert stats.evictions > 0
+    assert stats.size_bytes <= 32 * 1024
+
+    # a is still cached, b must be decoded from disk
+    image_files_disk.get("a.png")
+    image = image_files_disk.get("b.png")
+    assert image.getpixel((0, 0)) == (0, 128, 0)
+    stats = image_files_disk.get_cache_stats()
+    assert stats.hits == 2
+    assert stats.misses == 1
+
+
+def test_image_cache_decodes_once(image_files_disk: DiskImageFileStorage, tmp_path: Path):
+    Image.new("L", (64, 64), 255).save(tmp_path / "a.png")
+    image = image_files_disk.get("a.png")
+    # The image is fully decoded, so its file is no longer needed
+    (tmp_path / "a.png").unlink()
+    assert image_files_disk.get("a.png") is image
+    assert image.getpixel((0, 0)) == 255
+
+
+def test_image_cache_skips_images_over_budget(image_files_disk: DiskImageFileStorage):
+    image_files_disk.save(Image.new("RGBA", (256, 256)), "a.png", thumbnail_size=32)
+    stats = image_files_disk.get_cache_stats()
+    # Only the thumbnail is cached
+    assert stats.size == 1
+    assert stats.size_bytes == 32 * 32 * 4
+
+
+def test_image_cache_delete_releases_memory(image_files_disk: DiskImageFileStorage):
+    image_files_disk.save(Image.new("RGB", (64, 64)), "a.png", thumbnail_size=32)
+    image_files_disk.delete("a.png")
+    stats = image_files_disk.get_cache_stats()
+    assert stats.size == 0
+    assert stats.size_bytes == 0
+    with pytest.raises(ImageFileNotFoundException):
+        image_files_disk.get("a.png")
+
+
+@pytest.fixture
+def image_files_disk_with_encoders(tmp_path: Path):
+    image_files_disk = DiskImageFileStorage(tmp_path, encoder_threads=2)
+    invoker = MagicMock()
+    invoker.services.configuration.pil_compress_level = 1
+    image_files_disk.start(invoker)
+    yield image_files_disk
+    image_files_disk.stop(invoker)
+
+
+def test_image_encoders_write_in_background(image_files_disk_with_encoders: DiskImageFileStorage, tmp_path: Path):
+    image = Image.new("RGB", (64, 64), "red")
+    image_files_disk_with_encoders.save(image, "a.png", workflow="{}")
+    # The in-flight image is served from memory
+    assert image_files_disk_with_encoders.get("a.png").tobytes() == image.tobytes()
+    assert image_files_disk_with_encoders.get_workflow("a.png") == "{}"
+    # Paths are only returned once the files are written
+    assert image_files_disk_with_encoders.get_path("a.png").exists()
+    assert image_files_disk_with_encoders.get_path("a.png", thumbnail=True).exists()
+    with Image.open(tmp_path / "a.png") as written_image:
+        assert written_image.info["invokeai_workflow"] == "{}"
+
+
+def test_image_encoders_serve_unwritten_images(image_files_disk_with_encoders: DiskImageFileStorage, tmp_path: Path):
+    # Hold the encoder threads, so the image cannot be written yet
+    resume_writes = threading.Event()
+    image_files_disk_with_encoders._DiskImageFileStorage__encoder_pool.submit(resume_writes.wait)  # pyright: ignore
+    image_files_disk_with_encoders._DiskImageFileStorage__encoder_pool.submit(resume_writes.wait)  # pyright: ignore
+    image = Image.new("RGB", (64, 64), "red")
+    image_files_disk_with_encoders.save(image, "a.png")
+    # Modifying the image after it is saved does not change what is written
+    image.paste("blue", (0, 0, 64, 64))
+    assert image_files_disk_with_encoders.get("a.png").getpixel((0, 0)) == (255, 0, 0)
+    assert not (tmp_path / "a.png").exists()
+    resume_writes.set()
+    image_files_disk_with_encoders.wait_for_write("a.png")
+    with Image.open(tmp_path / "a.png") as written_image:
+        assert written_image.getpixel((0, 0)) == (255, 0, 0)
+    assert (tmp_path / "thumbnails" / "a.webp").exists()
+
+
+def test_image_encoders_delete_after_write(image_files_disk_with_encoders: DiskImageFileStorage, tmp_path: Path):
+    for i in range(10):
+        image_files_disk_with_encoders.save(Image.new("RGB", (64, 64)), f"{i}.png")
+    for i in range(10):
+        image_files_disk_with_encoders.delete(f"{i}.png")
+    assert list(tmp_path.glob("*.png")) == []
+    assert list((tmp_path / "thumbnails").iterdir()) == []
+    with pytest.raises(ImageFileNotFoundException):
+        image_files_disk_with_encoders.get("0.png")
+
+
+def test_image_encoders_flush_on_stop(tmp_path: Path):
+    image_files_disk = DiskImageFileStorage(tmp_path, encoder_threads=1)
+    invoker = MagicMock()
+    invoker.services.configuration.pil_compress_level = 1
+    image_files_disk.start(invoker)
+    for i in range(5):
+        image_files_disk.save(Image.new("RGB", (256, 256)), f"{i}.png")
+    image_files_disk.stop(invoker)
+    assert len(list(tmp_path.glob("*.png"))) == 5
+    assert len(list((tmp_path / "thumbnails").iterdir())) == 5
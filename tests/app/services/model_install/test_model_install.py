@@ -244,6 +244,49 @@ def test_delete_register(
         store.get_model(key)
 
 
+def test_register_orphaned_models(
+    mm2_installer: ModelInstallServiceBase, embedding_file: Path, mm2_app_config: InvokeAIAppConfig
+) -> None:
+    store = mm2_installer.record_store
+    orphaned_dir = mm2_app_config.models_path / "orphaned"
+    orphaned_dir.mkdir()
+    model_path = orphaned_dir / embedding_file.name
+    model_path.write_bytes(embedding_file.read_bytes())
+    not_a_model_path = orphaned_dir / "not_a_model.safetensors"
+    not_a_model_path.write_bytes(b"not a model")
+
+    mm2_installer._register_orphaned_models()
+    scan_records = store.get_scan_records()
+    model_record = scan_records[model_path.resolve().as_posix()]
+    assert model_record.model_key is not None
+    assert store.get_model(model_record.model_key).name == "test_embedding"
+    assert model_record.size == model_path.stat().st_size
+    not_a_model_record = scan_records[not_a_model_path.resolve().as_posix()]
+    assert not_a_model_record.model_key is None
+    assert not_a_model_record.mtime_ns == not_a_model_path.stat().st_mtime_ns
+
+    # Unchanged files that could not be registered are not probed again
+    probed: list[Path] = []
+    probe = mm2_installer._probe
+
+    def record_probe(model_path: Path, config: Any = None) -> Any:
+        probed.append(model_path)
+        return probe(model_path, config)
+
+    mm2_installer._probe = record_probe  # type: ignore
+    mm2_installer._register_orphaned_models()
+    assert probed == []
+
+    not_a_model_path.write_bytes(b"still not a model")
+    mm2_installer._register_orphaned_models()
+    assert probed == [not_a_model_path]
+
+    # Records of files that are gone are removed
+    not_a_model_path.unlink()
+    mm2_installer._register_orphaned_models()
+    assert not_a_model_path.resolve().as_posix() not in store.get_scan_records()
+
+
 @pytest.mark.timeout(timeout=10, method="thread")
 def test_simple_download(mm2_installer: ModelInstallServiceBase, mm2_app_config: InvokeAIAppConfig) -> None:
     source = URLModelSource(url=Url("https://www.test.foo/download/test_embedding.safetensors"))
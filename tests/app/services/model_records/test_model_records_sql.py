@@ -16,6 +16,7 @@ from invokeai.app.services.model_records import (
     UnknownModelException,
 )
 from invokeai.app.services.model_records.model_records_base import ModelRecordChanges
+from invokeai.backend.model_hash.model_hash import FileHashKey
 from invokeai.backend.model_manager.configs.controlnet import ControlAdapterDefaultSettings
 from invokeai.backend.model_manager.configs.lora import LoRA_LyCORIS_SDXL_Config
 from invokeai.backend.model_manager.configs.main import (
@@ -153,6 +154,76 @@ def test_exists(store: ModelRecordServiceBase):
     assert not store.exists("key2")
 
 
+def test_config_cache(store: ModelRecordServiceSQL):
+    config = example_ti_config("key1")
+    store.add_model(config)
+    stats = store.cache_stats
+
+    # All lookups share the cache
+    store.get_model("key1")
+    store.get_model_by_hash("ABC123")
+    store.search_by_attr(model_name="old name")
+    store.search_by_path("/tmp/pokemon.bin")
+    store.search_by_hash("ABC123")
+    assert store.cache_stats.hits == stats.hits + 5
+    assert store.cache_stats.misses == stats.misses
+    assert store.cache_stats.hit_rate > 0
+
+    # Callers get their own configs
+    config1 = store.get_model("key1")
+    config1.name = "changed"
+    assert store.get_model("key1").name == "old name"
+
+    # Changes through the store invalidate the cache
+    store.update_model("key1", ModelRecordChanges(name="new name"))
+    assert store.get_model("key1").name == "new name"
+    assert store.cache_stats.invalidations == stats.invalidations + 1
+
+    # Changes made to the database from elsewhere are picked up
+    with store._db.transaction() as cursor:
+        cursor.execute("UPDATE models SET config=json_set(config, '$.name', 'other name') WHERE id='key1';")
+    assert store.get_model("key1").name == "other name"
+
+    store.del_model("key1")
+    with pytest.raises(UnknownModelException):
+        store.get_model("key1")
+
+
+def test_config_cache_returns_independent_configs(store: ModelRecordServiceSQL):
+    config = Main_Diffusers_SD1_Config(
+        key="key1",
+        path="/tmp/config1",
+        name="config1",
+        base=BaseModelType.StableDiffusion1,
+        type=ModelType.Main,
+        hash="CONFIG1HASH",
+        file_size=1001,
+        source="test/source",
+        source_type=ModelSourceType.Path,
+        variant=ModelVariantType.Normal,
+        prediction_type=SchedulerPredictionType.Epsilon,
+        default_settings=MainModelDefaultSettings(steps=30),
+    )
+    store.add_model(config)
+    config1 = store.get_model("key1")
+    assert isinstance(config1, Main_Diffusers_SD1_Config) and config1.default_settings is not None
+    config1.default_settings.steps = 10
+    config2 = store.get_model("key1")
+    assert isinstance(config2, Main_Diffusers_SD1_Config) and config2.default_settings is not None
+    assert config2.default_settings.steps == 30
+
+
+def test_file_hashes(store: ModelRecordServiceBase):
+    key = FileHashKey(inode=1234, size=4096, mtime_ns=1_700_000_000_000_000_000, algorithm="blake3_single")
+    assert store.get_file_hash(key) is None
+    store.set_file_hash(key, "abc")
+    assert store.get_file_hash(key) == "abc"
+    store.set_file_hash(key, "def")
+    assert store.get_file_hash(key) == "def"
+    assert store.get_file_hash(key._replace(mtime_ns=key.mtime_ns + 1)) is None
+    assert store.get_file_hash(key._replace(algorithm="sha256")) is None
+
+
 def test_filter(store: ModelRecordServiceBase):
     config1 = Main_Diffusers_SD1_Config(
         key="config1",
@@ -0,0 +1,210 @@
+import asyncio
+import threading
+from typing import Callable, Iterator, Optional
+from unittest.mock import MagicMock
+
+import pytest
+
+from invokeai.app.services.session_processor.session_processor_default import (
+    DefaultSessionProcessor,
+    DefaultSessionRunner,
+)
+from invokeai.app.services.shared.invocation_context import InvocationContext
+
+WAIT_TIMEOUT = 5
+
+
+class MockSession:
+    """A session that runs a fixed list of invocations in order."""
+
+    def __init__(self, invocations: list[MagicMock]) -> None:
+        self.id = f"session-{id(self)}"
+        self.prepared_source_mapping = {invocation.id: invocation.id for invocation in invocations}
+        self.errors: dict[str, str] = {}
+        self._pending = list(invocations)
+
+    def next(self) -> Optional[MagicMock]:
+        return self._pending[0] if self._pending else None
+
+    def complete(self, invocation_id: str, output: object) -> None:
+        self._pending.pop(0)
+
+    def is_complete(self) -> bool:
+        return not self._pending or bool(self.errors)
+
+    def set_node_error(self, invocation_id: str, error: str) -> None:
+        self.errors[invocation_id] = error
+
+
+def mock_invocation(invocation_id: str, invoke: Callable[[InvocationContext], None]) -> MagicMock:
+    invocation = MagicMock()
+    invocation.id = invocation_id
+    invocation.invoke_internal.side_effect = lambda context, services: invoke(context)
+    return invocation
+
+
+def load_model(context: InvocationContext) -> None:
+    context.models.load("model-key")
+
+
+class ProcessorHarness:
+    """Runs a `DefaultSessionProcessor` with two workers over a fixed list of queue items."""
+
+    def __init__(self, sessions: list[MockSession]) -> None:
+        self.queue_items = {
+            item_id: MagicMock(
+                item_id=item_id, session_id=session.id, queue_id="default", status="in_progress", session=session
+            )
+            for item_id, session in enumerate(sessions, start=1)
+        }
+        self.finished = {item_id: threading.Event() for item_id in self.queue_items}
+        pending_items = list(self.queue_items.values())
+        dequeue_lock = threading.Lock()
+
+        def dequeue() -> Optional[MagicMock]:
+            with dequeue_lock:
+                return pending_items.pop(0) if pending_items else None
+
+        services = MagicMock()
+        services.configuration.profile_graphs = False
+        services.configuration.progress_image_interval_ms = 0
+        services.configuration.progress_image_every_n_steps = 1
+        services.session_queue.dequeue.side_effect = dequeue
+        services.session_queue.set_queue_item_session.side_effect = lambda item_id, session: self.queue_items[item_id]
+        services.session_queue.complete_queue_item.side_effect = lambda item_id: self.queue_items[item_id]
+        services.session_queue.fail_queue_item.side_effect = lambda item_id, *args, **kwargs: self.queue_items[item_id]
+        self.services = services
+
+        session_runner = DefaultSessionRunner(
+            on_after_run_session_callbacks=[lambda queue_item: self.finished[queue_item.item_id].set()]
+        )
+        self.processor = DefaultSessionProcessor(session_runner=session_runner, thread_limit=2)
+        self.processor.start(MagicMock(services=services))
+
+    def cancel(self, item_id: int) -> None:
+        self.queue_items[item_id].status = "canceled"
+        status_changed = MagicMock(item_id=item_id, status="canceled")
+        asyncio.run(self.processor._on_queue_item_status_changed((None, status_changed)))  # pyright: ignore
+
+    def stop(self) -> None:
+        self.processor.stop()
+        # Runners left waiting for the device stage by a failed test stop waiting once canceled
+        for worker in self.processor._workers:
+            worker.cancel_event.set()
+        self.processor._poll_now()
+        for thread in self.processor._threads:
+            thread.join(WAIT_TIMEOUT)
+
+
+@pytest.fixture
+def make_harness() -> Iterator[Callable[[list[MockSession]], ProcessorHarness]]:
+    harnesses: list[ProcessorHarness] = []
+
+    def make(sessions: list[MockSession]) -> ProcessorHarness:
+        harness = ProcessorHarness(sessions)
+        harnesses.append(harness)
+        return harness
+
+    yield make
+    for harness in harnesses:
+        harness.stop()
+
+
+def test_concurrent_queue_items_overlap_outside_device_stage(make_harness):
+    release_first = threading.Event()
+    first_loaded = threading.Event()
+    second_prepared = threading.Event()
+    second_loaded = threading.Event()
+
+    def hold_device(context: InvocationContext) -> None:
+        load_model(context)
+        first_loaded.set()
+        assert release_first.wait(WAIT_TIMEOUT)
+
+    def prepare_second(context: InvocationContext) -> None:
+        # Only overlap once the first queue item holds the device stage
+        assert first_loaded.wait(WAIT_TIMEOUT)
+        second_prepared.set()
+
+    def load_second(context: InvocationContext) -> None:
+        load_model(context)
+        second_loaded.set()
+
+    harness = make_harness(
+        [
+            MockSession([mock_invocation("first", hold_device)]),
+            MockSession(
+                [
+                    mock_invocation("prepare", prepare_second),
+                    mock_invocation("load", load_second),
+                ]
+            ),
+        ]
+    )
+    # The second queue item's node that does not use models runs while the first holds the device stage...
+    assert second_prepared.wait(WAIT_TIMEOUT)
+    # ...but its node that loads a model waits for the first to leave the stage
+    assert not second_loaded.wait(0.3)
+    release_first.set()
+    assert harness.finished[1].wait(WAIT_TIMEOUT)
+    assert second_loaded.wait(WAIT_TIMEOUT)
+    assert harness.finished[2].wait(WAIT_TIMEOUT)
+    harness.services.session_queue.fail_queue_item.assert_not_called()
+
+
+def test_cancel_while_waiting_for_device_stage(make_harness):
+    release_first = threading.Event()
+    first_loaded = threading.Event()
+    second_loading = threading.Event()
+    second_loaded = threading.Event()
+
+    def hold_device(context: InvocationContext) -> None:
+        load_model(context)
+        first_loaded.set()
+        assert release_first.wait(WAIT_TIMEOUT)
+
+    def load_second(context: InvocationContext) -> None:
+        assert first_loaded.wait(WAIT_TIMEOUT)
+        second_loading.set()
+        load_model(context)
+        second_loaded.set()
+
+    harness = make_harness(
+        [MockSession([mock_invocation("first", hold_device)]), MockSession([mock_invocation("second", load_second)])]
+    )
+    assert second_loading.wait(WAIT_TIMEOUT)
+    harness.cancel(2)
+    # The canceled queue item stops waiting for the device stage while the first still holds it
+    assert harness.finished[2].wait(WAIT_TIMEOUT)
+    assert not second_loaded.is_set()
+    release_first.set()
+    assert harness.finished[1].wait(WAIT_TIMEOUT)
+    harness.services.session_queue.fail_queue_item.assert_not_called()
+
+
+def test_device_stage_released_on_node_error(make_harness):
+    first_loaded = threading.Event()
+    second_loaded = threading.Event()
+
+    def fail_after_load(context: InvocationContext) -> None:
+        load_model(context)
+        first_loaded.set()
+        raise RuntimeError("node failed")
+
+    def load_second(context: InvocationContext) -> None:
+        assert first_loaded.wait(WAIT_TIMEOUT)
+        load_model(context)
+        second_loaded.set()
+
+    harness = make_harness(
+        [
+            MockSession([mock_invocation("first", fail_after_load)]),
+            MockSession([mock_invocation("second", load_second)]),
+        ]
+    )
+    assert harness.finished[1].wait(WAIT_TIMEOUT)
+    # The failed node left the device stage, so the next queue item may load models
+    assert second_loaded.wait(WAIT_TIMEOUT)
+    assert harness.finished[2].wait(WAIT_TIMEOUT)
+    harness.services.session_queue.fail_queue_item.assert_called_once()
+    assert harness.services.session_queue.fail_queue_item.call_args.args[0] == 1
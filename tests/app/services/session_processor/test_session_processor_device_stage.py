@@ -0,0 +1,57 @@
+import threading
+import time
+
+import pytest
+
+from invokeai.app.services.session_processor.session_processor_common import CanceledException
+from invokeai.app.services.session_processor.session_processor_default import DeviceStage
+
+
+def test_device_stage_is_exclusive():
+    stage = DeviceStage()
+    stage.enter(0, lambda: False)
+    entered = threading.Event()
+
+    def enter_second():
+        stage.enter(1, lambda: False)
+        entered.set()
+        stage.leave()
+
+    thread = threading.Thread(target=enter_second)
+    thread.start()
+    assert not entered.wait(0.2)
+    stage.leave()
+    assert entered.wait(2)
+    thread.join()
+
+
+def test_device_stage_enters_in_dequeue_order():
+    stage = DeviceStage()
+    stage.enter(0, lambda: False)
+    order: list[int] = []
+
+    def enter(n: int):
+        stage.enter(n, lambda: False)
+        order.append(n)
+        stage.leave()
+
+    # Start the later queue item first; the earlier one must still enter first
+    threads = [threading.Thread(target=enter, args=(n,)) for n in (2, 1)]
+    for thread in threads:
+        thread.start()
+        time.sleep(0.05)
+    stage.leave()
+    for thread in threads:
+        thread.join(2)
+    assert order == [1, 2]
+
+
+def test_device_stage_cancels_waiting_runner():
+    stage = DeviceStage()
+    stage.enter(0, lambda: False)
+    with pytest.raises(CanceledException):
+        stage.enter(1, lambda: True)
+    stage.leave()
+    # The canceled runner is no longer waiting, so later runners are not blocked by it
+    stage.enter(2, lambda: False)
+    stage.leave()
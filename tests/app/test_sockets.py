@@ -0,0 +1,95 @@
+import asyncio
+from unittest.mock import MagicMock
+
+import pytest
+from fastapi import FastAPI
+from PIL import Image
+
+from invokeai.app.api.sockets import SocketIO
+from invokeai.app.invocations.math import AddInvocation
+from invokeai.app.services.events.events_common import InvocationProgressEvent, QueueClearedEvent
+from invokeai.app.services.session_processor.session_processor_common import ProgressImage
+
+
+class SocketIOClients:
+    """Fake clients connected to a SocketIO server, recording the socket.io packets sent to each of them."""
+
+    def __init__(self, socket_io: SocketIO) -> None:
+        self.socket_io = socket_io
+        self.sids: list[str] = []
+        self.packets: dict[str, list] = {}
+        socket_io._sio._send_eio_packet = self._send_eio_packet  # pyright: ignore
+
+    async def _send_eio_packet(self, eio_sid: str, eio_pkt) -> None:
+        self.packets[eio_sid].append(eio_pkt.data)
+
+    async def connect(self, subscription: dict) -> str:
+        eio_sid = f"eio-{len(self.sids)}"
+        self.packets[eio_sid] = []
+        sid = await self.socket_io._sio.manager.connect(eio_sid, "/")
+        await self.socket_io._handle_sub_queue(sid, subscription)
+        self.sids.append(eio_sid)
+        return eio_sid
+
+
+def make_progress_event() -> InvocationProgressEvent:
+    queue_item = MagicMock()
+    queue_item.queue_id = "default"
+    queue_item.item_id = 1
+    queue_item.batch_id = "batch"
+    queue_item.origin = None
+    queue_item.destination = None
+    queue_item.session_id = "session"
+    queue_item.session.prepared_source_mapping = {"add": "add"}
+    image = ProgressImage.build(Image.new("RGB", (16, 16), (255, 0, 0)), (128, 128))
+    return InvocationProgressEvent.build(queue_item, AddInvocation(id="add"), "Denoising", 0.5, image)
+
+
+@pytest.fixture
+def socket_io() -> SocketIO:
+    return SocketIO(FastAPI())
+
+
+def test_progress_image_bytes():
+    image = ProgressImage.build(Image.new("RGB", (16, 16)))
+    assert image.mime_type == "image/jpeg"
+    assert image.image_bytes[:2] == b"\xff\xd8"
+    # Images that were not built from a PIL image, e.g. parsed from JSON, decode their data URL
+    assert ProgressImage.model_validate_json(image.model_dump_json()).image_bytes == image.image_bytes
+
+
+def test_binary_progress_images(socket_io: SocketIO):
+    event = make_progress_event()
+    assert event.image is not None
+
+    async def run():
+        clients = SocketIOClients(socket_io)
+        json_client = await clients.connect({"queue_id": "default"})
+        binary_client = await clients.connect({"queue_id": "default", "binary_progress_images": True})
+        await socket_io._handle_queue_event(("invocation_progress", event))
+        return clients.packets[json_client], clients.packets[binary_client]
+
+    json_packets, binary_packets = asyncio.run(run())
+
+    # The JSON client gets the data URL in a single text packet
+    assert len(json_packets) == 1
+    assert event.image.dataURL in json_packets[0]
+    # The binary client gets the metadata as text and the image as a binary attachment
+    assert len(binary_packets) == 2
+    assert "dataURL" not in binary_packets[0] and '"_placeholder":true' in binary_packets[0]
+    assert '"mime_type":"image/jpeg"' in binary_packets[0]
+    assert binary_packets[1] == event.image.image_bytes
+
+
+def test_other_queue_events_reach_both_rooms(socket_io: SocketIO):
+    async def run():
+        clients = SocketIOClients(socket_io)
+        await clients.connect({"queue_id": "default"})
+        await clients.connect({"queue_id": "default", "binary_progress_images": True})
+        other = await clients.connect({"queue_id": "other"})
+        await socket_io._handle_queue_event(("queue_cleared", QueueClearedEvent.build("default")))
+        return clients.packets, other
+
+    packets, other = asyncio.run(run())
+    assert [len(p) for sid, p in packets.items() if sid != other] == [1, 1]
+    assert packets[other] == []
@@ -0,0 +1,60 @@
+from unittest.mock import MagicMock
+
+import torch
+
+from invokeai.app.util.step_callback import PreviewThrottle, diffusion_step_callback, get_latent_rgb_tensors
+from invokeai.backend.model_manager.taxonomy import BaseModelType
+from invokeai.backend.stable_diffusion.diffusers_pipeline import PipelineIntermediateState
+
+
+def make_intermediate_state(step: int) -> PipelineIntermediateState:
+    return PipelineIntermediateState(
+        step=step, order=1, total_steps=10, timestep=0, latents=torch.zeros(1, 4, 8, 8), predicted_original=None
+    )
+
+
+def test_latent_rgb_tensors_are_cached():
+    factors, smooth_matrix, bias = get_latent_rgb_tensors(
+        BaseModelType.StableDiffusionXL, torch.float32, torch.device("cpu")
+    )
+    assert factors.shape == (4, 3)
+    assert smooth_matrix is not None and smooth_matrix.shape == (3, 3)
+    assert bias is None
+    again = get_latent_rgb_tensors(BaseModelType.StableDiffusionXL, torch.float32, torch.device("cpu"))
+    assert again[0] is factors
+    # Each dtype gets its own tensors
+    assert get_latent_rgb_tensors(BaseModelType.StableDiffusionXL, torch.float16, torch.device("cpu"))[0].dtype == (
+        torch.float16
+    )
+
+
+def test_preview_throttle_every_n_steps():
+    throttle = PreviewThrottle(every_n_steps=3)
+    assert [step for step in range(1, 11) if throttle.should_preview(step, 10)] == [1, 3, 6, 9, 10]
+
+
+def test_preview_throttle_min_interval(monkeypatch):
+    now = 0.0
+    monkeypatch.setattr("invokeai.app.util.step_callback.time.monotonic", lambda: now)
+    throttle = PreviewThrottle(min_interval=0.1)
+    previewed: list[int] = []
+    for step in range(11):
+        if throttle.should_preview(step, 10):
+            previewed.append(step)
+        now += 0.04
+    assert previewed == [0, 3, 6, 9, 10]
+
+
+def test_diffusion_step_callback_reports_progress_of_throttled_steps():
+    signal_progress = MagicMock()
+    throttle = PreviewThrottle(every_n_steps=4)
+    for step in range(11):
+        diffusion_step_callback(
+            signal_progress, make_intermediate_state(step), BaseModelType.StableDiffusion1, lambda: False, throttle
+        )
+    calls = [call.args for call in signal_progress.call_args_list]
+    # Every step reports its progress, and the first, every 4th and final steps get a preview image
+    assert [args[1] for args in calls] == [step / 10 for step in range(11)]
+    assert [step for step, args in enumerate(calls) if args[2] is not None] == [0, 4, 8, 10]
+    assert calls[-1][3] == (64, 64)
+    assert all(args[2:] == (None, None) for step, args in enumerate(calls) if step not in (0, 4, 8, 10))
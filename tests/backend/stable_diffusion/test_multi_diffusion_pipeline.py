@@ -0,0 +1,131 @@
+import pytest
+import torch
+from diffusers.models.controlnets.controlnet import ControlNetModel
+from diffusers.models.unets.unet_2d_condition import UNet2DConditionModel
+from diffusers.schedulers.scheduling_ddim import DDIMScheduler
+from diffusers.schedulers.scheduling_euler_discrete import EulerDiscreteScheduler
+
+from invokeai.app.invocations.tiled_multi_diffusion_denoise_latents import (
+    TiledMultiDiffusionDenoiseLatents,
+    crop_controlnet_data,
+)
+from invokeai.backend.stable_diffusion.diffusers_pipeline import ControlNetData
+from invokeai.backend.stable_diffusion.diffusion.conditioning_data import BasicConditioningInfo, TextConditioningData
+from invokeai.backend.stable_diffusion.multi_diffusion_pipeline import MultiDiffusionRegionConditioning
+from invokeai.backend.tiles.tiles import calc_tiles_min_overlap
+from invokeai.backend.tiles.utils import TBLR, Tile
+
+
+def make_unet() -> UNet2DConditionModel:
+    torch.manual_seed(0)
+    return UNet2DConditionModel(
+        sample_size=16,
+        in_channels=4,
+        out_channels=4,
+        layers_per_block=1,
+        block_out_channels=(32, 64),
+        down_block_types=("CrossAttnDownBlock2D", "DownBlock2D"),
+        up_block_types=("UpBlock2D", "CrossAttnUpBlock2D"),
+        cross_attention_dim=32,
+        attention_head_dim=8,
+    ).eval()
+
+
+def make_conditioning(tiles: list[Tile], control_data: list[ControlNetData]) -> list[MultiDiffusionRegionConditioning]:
+    torch.manual_seed(1)
+    text_conditioning_data = TextConditioningData(
+        uncond_text=BasicConditioningInfo(embeds=torch.randn(1, 7, 32)),
+        cond_text=BasicConditioningInfo(embeds=torch.randn(1, 7, 32)),
+        uncond_regions=None,
+        cond_regions=None,
+        guidance_scale=5.0,
+    )
+    return [
+        MultiDiffusionRegionConditioning(
+            region=tile,
+            text_conditioning_data=text_conditioning_data,
+            control_data=[crop_controlnet_data(cn, tile.coords) for cn in control_data],
+        )
+        for tile in tiles
+    ]
+
+
+def denoise(unet, scheduler, conditioning, max_batch_size: int) -> torch.Tensor:
+    pipeline = TiledMultiDiffusionDenoiseLatents.create_pipeline(unet=unet, scheduler=scheduler)
+    scheduler.set_timesteps(4)
+    torch.manual_seed(2)
+    noise = torch.randn(1, 4, 32, 40)
+    with torch.no_grad():
+        return pipeline.multi_diffusion_denoise(
+            multi_diffusion_conditioning=conditioning,
+            target_overlap=4,
+            latents=torch.zeros(1, 4, 32, 40),
+            scheduler_step_kwargs={},
+            noise=noise,
+            timesteps=scheduler.timesteps,
+            init_timestep=scheduler.timesteps[:1],
+            callback=lambda state: None,
+            max_batch_size=max_batch_size,
+        )
+
+
+@pytest.mark.parametrize("scheduler_class", [DDIMScheduler, EulerDiscreteScheduler])
+def test_batched_regions_match_unbatched(scheduler_class):
+    unet = make_unet()
+    tiles = calc_tiles_min_overlap(image_height=32, image_width=40, tile_height=16, tile_width=16, min_overlap=4)
+    conditioning = make_conditioning(tiles, [])
+    unbatched = denoise(unet, scheduler_class(), conditioning, max_batch_size=1)
+    batched = denoise(unet, scheduler_class(), conditioning, max_batch_size=4)
+    assert torch.allclose(unbatched, batched, rtol=1e-3, atol=1e-3)
+
+
+def test_batched_regions_with_controlnet_match_unbatched():
+    unet = make_unet()
+    controlnet = ControlNetModel(
+        in_channels=4,
+        layers_per_block=1,
+        block_out_channels=(32, 64),
+        down_block_types=("CrossAttnDownBlock2D", "DownBlock2D"),
+        cross_attention_dim=32,
+        attention_head_dim=8,
+        conditioning_embedding_out_channels=(8, 16, 32, 32),
+    ).eval()
+    # ControlNet's image embedding and output convolutions are zero-initialized, which would make it ignore the image
+    zero_modules = [controlnet.controlnet_cond_embedding.conv_out, *controlnet.controlnet_down_blocks]
+    for module in [*zero_modules, controlnet.controlnet_mid_block]:
+        torch.nn.init.normal_(module.weight, std=0.1)
+    torch.manual_seed(3)
+    # Different unconditioned and conditioned images check that they are stacked in the order of the UNet inputs
+    control_image = torch.rand(2, 3, 32 * 8, 40 * 8)
+    control_data = [
+        ControlNetData(
+            model=controlnet,
+            image_tensor=control_image,
+            weight=1.0,
+            begin_step_percent=0.0,
+            end_step_percent=1.0,
+        )
+    ]
+    tiles = calc_tiles_min_overlap(image_height=32, image_width=40, tile_height=16, tile_width=16, min_overlap=4)
+    conditioning = make_conditioning(tiles, control_data)
+    unbatched = denoise(unet, DDIMScheduler(), conditioning, max_batch_size=1)
+    batched = denoise(unet, DDIMScheduler(), conditioning, max_batch_size=3)
+    assert torch.allclose(unbatched, batched, rtol=1e-3, atol=1e-3)
+
+
+def test_batch_regions_groups_compatible_regions():
+    unet = make_unet()
+    pipeline = TiledMultiDiffusionDenoiseLatents.create_pipeline(unet=unet, scheduler=DDIMScheduler())
+    tiles = [
+        Tile(coords=TBLR(top=0, bottom=16, left=0, right=16), overlap=TBLR(top=0, bottom=0, left=0, right=4)),
+        Tile(coords=TBLR(top=0, bottom=16, left=12, right=28), overlap=TBLR(top=0, bottom=0, left=4, right=4)),
+        Tile(coords=TBLR(top=0, bottom=16, left=24, right=40), overlap=TBLR(top=0, bottom=0, left=4, right=0)),
+        # A region of a different size starts a new batch
+        Tile(coords=TBLR(top=16, bottom=32, left=0, right=40), overlap=TBLR(top=0, bottom=0, left=0, right=0)),
+    ]
+    conditioning = make_conditioning(tiles, [])
+    batches = pipeline._batch_regions(conditioning, max_batch_size=2)
+    assert [[r.region for r in batch.regions] for batch in batches] == [tiles[:2], tiles[2:3], tiles[3:]]
+    # The text conditioning is repeated for each region of a batch
+    assert batches[0].text_conditioning_data.cond_text.embeds.shape == (2, 7, 32)
+    assert batches[1].text_conditioning_data is conditioning[2].text_conditioning_data
@@ -2,6 +2,7 @@ import numpy as np
 import pytest
 
 from invokeai.backend.tiles.tiles import (
+    TileMerger,
     calc_tiles_even_split,
     calc_tiles_min_overlap,
     calc_tiles_with_overlap,
@@ -623,3 +624,59 @@ def test_merge_tiles_with_linear_blending_mismatched_list_lengths():
 
     with pytest.raises(ValueError):
         merge_tiles_with_linear_blending(dst_image=dst_image, tiles=tiles, tile_images=tile_images, blend_amount=0)
+
+
+#############################################
+# Test TileMerger
+#############################################
+
+
+@pytest.mark.parametrize("blend_mode", ["Linear", "Seam"])
+def test_tile_merger_reassembles_image(blend_mode):
+    """Test that TileMerger reassembles an image from overlapping crops of it, when the tiles are added one at a time
+    over multiple rows.
+    """
+    rng = np.random.default_rng(0)
+    # A smooth image, so that blending identical overlaps only introduces rounding errors.
+    image = np.linspace(start=0, stop=255, num=300 * 400 * 3).reshape((300, 400, 3)).astype(np.uint8)
+    tiles = calc_tiles_min_overlap(image_height=300, image_width=400, tile_height=128, tile_width=128, min_overlap=48)
+    assert len({tile.coords.top for tile in tiles}) > 2
+
+    dst_image = np.zeros_like(image)
+    merger = TileMerger(dst_image=dst_image, blend_mode=blend_mode, blend_amount=32)
+    for tile in sorted(tiles, key=lambda t: (t.coords.top, t.coords.left)):
+        tile_image = image[tile.coords.top : tile.coords.bottom, tile.coords.left : tile.coords.right].copy()
+        merger.add_tile(tile, tile_image)
+        # Overwrite the tile image, to check that the merger doesn't hold on to it
+        tile_image[:] = rng.integers(0, 255, tile_image.shape)
+    merger.finish()
+
+    np.testing.assert_allclose(dst_image, image, atol=1)
+
+
+def test_tile_merger_tiles_out_of_order():
+    """Test that TileMerger raises an exception if the tiles are not added top-to-bottom."""
+    tiles = [
+        Tile(coords=TBLR(top=0, bottom=512, left=0, right=512), overlap=TBLR(top=0, bottom=64, left=0, right=0)),
+        Tile(coords=TBLR(top=448, bottom=960, left=0, right=512), overlap=TBLR(top=64, bottom=0, left=0, right=0)),
+    ]
+    merger = TileMerger(dst_image=np.zeros((960, 512, 3), dtype=np.uint8), blend_mode="Linear", blend_amount=32)
+    merger.add_tile(tiles[1], np.zeros((512, 512, 3)))
+
+    with pytest.raises(ValueError):
+        merger.add_tile(tiles[0], np.zeros((512, 512, 3)))
+
+
+def test_tile_merger_tile_image_does_not_match_tile():
+    """Test that TileMerger raises an exception if a tile image's size does not match its tile."""
+    tile = Tile(coords=TBLR(top=0, bottom=512, left=0, right=512), overlap=TBLR(top=0, bottom=0, left=0, right=0))
+    merger = TileMerger(dst_image=np.zeros((512, 512, 3), dtype=np.uint8), blend_mode="Linear", blend_amount=0)
+
+    with pytest.raises(ValueError):
+        merger.add_tile(tile, np.zeros((256, 512, 3)))
+
+
+def test_tile_merger_unsupported_blend_mode():
+    """Test that TileMerger raises an exception if the blend mode is not supported."""
+    with pytest.raises(ValueError):
+        TileMerger(dst_image=np.zeros((512, 512, 3), dtype=np.uint8), blend_mode="Fancy", blend_amount=0)  # type: ignore
@@ -1,11 +1,11 @@
 import json
 from pathlib import Path
-from typing import Any, Optional
+from typing import Any, Literal, Optional
 
 import gguf
 import torch
 
-from invokeai.backend.model_manager.model_on_disk import ModelOnDisk, StateDict
+from invokeai.backend.model_manager.model_on_disk import ModelOnDisk, StateDict, TensorInfo, WeightFileHeader
 from invokeai.backend.quantization.gguf.ggml_tensor import GGMLTensor
 
 
@@ -23,6 +23,23 @@ class StrippedModelOnDisk(ModelOnDisk):
             contents = json.load(f)
         return contents.get(self.METADATA_KEY, {})
 
+    def header(self) -> Optional[WeightFileHeader]:
+        # Like the real thing, only safetensors and GGUF files have a header
+        if not self.path.is_file() or self.path.suffix not in {".safetensors", ".gguf"}:
+            return None
+        with open(self.path, "r") as f:
+            contents = json.load(f)
+        metadata = contents.pop(self.METADATA_KEY, {})
+        tensors: dict[str | int, TensorInfo] = {}
+        file_format: Literal["safetensors", "gguf"] = "safetensors"
+        for key, value in contents.items():
+            if value.get("fakeGGMLTensor"):
+                file_format = "gguf"
+                tensors[key] = TensorInfo(shape=tuple(value["tensor_shape"]), dtype=value["ggml_quantization_type"])
+            else:
+                tensors[key] = TensorInfo(shape=tuple(value["shape"]), dtype=value["dtype"].removeprefix("torch."))
+        return WeightFileHeader(format=file_format, tensors=tensors, metadata=metadata)
+
     @classmethod
     def strip(cls, v: Any):
         match v:
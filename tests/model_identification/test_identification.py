@@ -5,16 +5,35 @@ from pathlib import Path
 from pprint import pformat
 from typing import Any
 
+import gguf
+import numpy as np
 import pytest
+import safetensors.torch
+import torch
+from spandrel.architectures.Compact import Compact
 
 from invokeai.backend.model_manager.configs.controlnet import ControlAdapterDefaultSettings
 from invokeai.backend.model_manager.configs.factory import (
     ModelConfigFactory,
 )
-from invokeai.backend.model_manager.configs.main import MainModelDefaultSettings
+from invokeai.backend.model_manager.configs.identification_utils import NotAMatchError
+from invokeai.backend.model_manager.configs.lora import LoRA_LyCORIS_SD1_Config
+from invokeai.backend.model_manager.configs.main import (
+    Main_Checkpoint_SD1_Config,
+    Main_Checkpoint_ZImage_Config,
+    MainModelDefaultSettings,
+)
+from invokeai.backend.model_manager.configs.spandrel import Spandrel_Checkpoint_Config
+from invokeai.backend.model_manager.configs.vae import VAE_Checkpoint_SD1_Config
+from invokeai.backend.model_manager.model_on_disk import (
+    LazyStateDict,
+    ModelOnDisk,
+    read_weight_file_header,
+)
 from invokeai.backend.model_manager.taxonomy import (
     BaseModelType,
 )
+from invokeai.backend.quantization.gguf.loaders import gguf_sd_loader
 from invokeai.backend.util.logging import InvokeAILogger
 from tests.model_identification.stripped_model_on_disk import StrippedModelOnDisk
 
@@ -107,3 +126,149 @@ def test_model_identification(model_path: Path):
     if mismatched_attrs:
         msg = "; ".join(str(m) for m in mismatched_attrs)
         pytest.fail(f"{id}: {msg}")
+
+
+def test_read_weight_file_header(tmp_path: Path):
+    path = tmp_path / "model.safetensors"
+    state_dict = {"a.weight": torch.ones(2, 3, dtype=torch.float16), "b.bias": torch.arange(4, dtype=torch.float32)}
+    safetensors.torch.save_file(state_dict, path, metadata={"foo": "bar"})
+
+    header = read_weight_file_header(path)
+
+    assert header is not None
+    assert header.format == "safetensors"
+    assert {k: (v.shape, v.dtype) for k, v in header.tensors.items()} == {
+        "a.weight": ((2, 3), "F16"),
+        "b.bias": ((4,), "F32"),
+    }
+    file_bytes = path.read_bytes()
+    for key, info in header.tensors.items():
+        assert info.data_offsets is not None
+        start, end = info.data_offsets
+        assert file_bytes[start:end] == state_dict[key].numpy().tobytes()
+    assert header.metadata == {"foo": "bar"}
+    assert read_weight_file_header(tmp_path / "model.ckpt") is None
+
+
+def test_lazy_state_dict_safetensors(tmp_path: Path):
+    path = tmp_path / "model.safetensors"
+    state_dict = {
+        "a.weight": torch.randn(2, 3, dtype=torch.bfloat16),
+        "b.bias": torch.arange(4),
+        "c.empty": torch.zeros(0, 4),
+    }
+    safetensors.torch.save_file(state_dict, path)
+
+    lazy = ModelOnDisk(path).load_state_dict()
+    assert isinstance(lazy, LazyStateDict)
+    assert set(lazy.keys()) == set(state_dict)
+    assert "a.weight" in lazy and "missing" not in lazy
+    assert lazy.get("missing") is None
+    assert lazy.info("a.weight").shape == (2, 3)
+    # Nothing was read so far
+    assert dict.__len__(lazy) == 0
+
+    assert lazy["a.weight"].shape == (2, 3)
+    assert dict.__len__(lazy) == 1
+    assert list(lazy) == list(safetensors.torch.load_file(path))
+    for key, tensor in lazy.items():
+        assert tensor.dtype == state_dict[key].dtype
+        assert torch.equal(tensor, state_dict[key])
+    with pytest.raises(KeyError):
+        lazy["missing"]
+
+
+def test_lazy_state_dict_gguf(tmp_path: Path):
+    path = tmp_path / "model.gguf"
+    data = np.random.randn(32, 64).astype(np.float32)
+    writer = gguf.GGUFWriter(path, "flux")
+    writer.add_tensor("f32", data)
+    writer.add_tensor("f16", data.astype(np.float16))
+    quantized = gguf.quants.quantize(data, gguf.GGMLQuantizationType.Q8_0)
+    writer.add_tensor("q8_0", quantized, raw_dtype=gguf.GGMLQuantizationType.Q8_0)
+    writer.write_header_to_file()
+    writer.write_kv_data_to_file()
+    writer.write_tensors_to_file()
+    writer.close()
+
+    expected = gguf_sd_loader(path, compute_dtype=torch.float32)
+    lazy = ModelOnDisk(path).load_state_dict()
+    assert isinstance(lazy, LazyStateDict)
+    assert list(lazy) == list(expected)
+    for key, tensor in lazy.items():
+        assert tensor.shape == expected[key].shape
+        assert tensor.quantized_data.shape == expected[key].quantized_data.shape
+        assert torch.equal(tensor.quantized_data, expected[key].quantized_data)
+        assert torch.equal(tensor.get_dequantized_tensor(), expected[key].get_dequantized_tensor())
+
+
+def test_lazy_state_dict_pop_and_copy(tmp_path: Path):
+    path = tmp_path / "model.safetensors"
+    state_dict = {"a.weight": torch.randn(2, 3), "b.bias": torch.arange(4), "c.weight": torch.ones(2)}
+    safetensors.torch.save_file(state_dict, path)
+    lazy = ModelOnDisk(path).load_state_dict()
+    assert isinstance(lazy, LazyStateDict)
+
+    assert torch.equal(lazy.pop("a.weight"), state_dict["a.weight"])
+    assert "a.weight" not in lazy and list(lazy) == ["b.bias", "c.weight"]
+    assert lazy.pop("a.weight", None) is None
+    with pytest.raises(KeyError):
+        lazy.pop("a.weight")
+
+    lazy["d.weight"] = torch.zeros(1)
+    copied = lazy.copy()
+    assert isinstance(copied, LazyStateDict)
+    # Copying shares the tensors loaded so far and loads nothing else
+    assert dict.__len__(copied) == 1
+    del copied["b.bias"]
+    assert list(copied) == ["c.weight", "d.weight"]
+    assert list(lazy) == ["b.bias", "c.weight", "d.weight"]
+    assert torch.equal(copied["c.weight"], state_dict["c.weight"])
+
+
+def test_identifying_safetensors_checkpoint_loads_no_tensors(tmp_path: Path):
+    path = tmp_path / "z_image.safetensors"
+    state_dict = {f"context_refiner.{i}.attention.qkv.weight": torch.zeros(4, 4) for i in range(12)}
+    state_dict["cap_embedder.0.weight"] = torch.zeros(4)
+    safetensors.torch.save_file(state_dict, path)
+
+    mod = ModelOnDisk(path)
+    result = ModelConfigFactory.from_model_on_disk(mod)
+
+    assert isinstance(result.config, Main_Checkpoint_ZImage_Config)
+    # Ruling out GGUF quantization is answered by the header, without loading any tensors
+    assert dict.__len__(mod.load_state_dict()) == 0
+
+
+def test_from_model_on_disk_rules_out_candidates_by_header(tmp_path: Path):
+    path = tmp_path / "lora.safetensors"
+    safetensors.torch.save_file(
+        {"lora_unet_down_blocks_0_attentions_0_proj_in.lora_down.weight": torch.zeros(4, 8)}, path
+    )
+
+    result = ModelConfigFactory.from_model_on_disk(path)
+
+    for candidate in (Spandrel_Checkpoint_Config, Main_Checkpoint_SD1_Config, VAE_Checkpoint_SD1_Config):
+        detail = result.details[candidate.__name__]
+        assert isinstance(detail, NotAMatchError)
+        assert "ruled out" in str(detail)
+    # LoRAs can't be ruled out by their header, so they are matched in full
+    assert "ruled out" not in str(result.details[LoRA_LyCORIS_SD1_Config.__name__])
+
+
+def test_spandrel_could_match_uses_spandrel_detection(tmp_path: Path):
+    spandrel_path = tmp_path / "compact.safetensors"
+    state_dict = Compact(num_feat=8, num_conv=2, upscale=2).state_dict()
+    safetensors.torch.save_file(state_dict, spandrel_path)
+    assert Spandrel_Checkpoint_Config.could_match(ModelOnDisk(spandrel_path))
+    assert isinstance(ModelConfigFactory.from_model_on_disk(spandrel_path).config, Spandrel_Checkpoint_Config)
+
+    # Spandrel only loads files with known extensions
+    unsupported_path = tmp_path / "compact.bin"
+    unsupported_path.write_bytes(spandrel_path.read_bytes())
+    assert not Spandrel_Checkpoint_Config.could_match(ModelOnDisk(unsupported_path))
+
+    # No spandrel architecture detects the keys of a diffusion model
+    unet_path = tmp_path / "unet.safetensors"
+    safetensors.torch.save_file({"model.diffusion_model.input_blocks.0.0.weight": torch.zeros(8, 4, 3, 3)}, unet_path)
+    assert not Spandrel_Checkpoint_Config.could_match(ModelOnDisk(unet_path))
@@ -0,0 +1,131 @@
+# pyright: reportPrivateUsage=false
+import logging
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import pytest
+
+from invokeai.app.invocations.fields import ImageField, LatentsField
+from invokeai.app.invocations.primitives import ImageOutput, LatentsOutput
+from invokeai.app.services.invocation_cache.invocation_cache_disk import DiskInvocationCacheStore
+from invokeai.app.services.invocation_cache.invocation_cache_memory import MemoryInvocationCache
+
+logger = logging.getLogger(__name__)
+
+
+@pytest.fixture
+def db_path(tmp_path: Path) -> Path:
+    return tmp_path / "invocation_cache.db"
+
+
+def test_invocation_cache_disk_survives_restart(db_path: Path):
+    output_1 = ImageOutput(image=ImageField(image_name="foo"), width=512, height=512)
+    cache = MemoryInvocationCache(max_cache_size=5, disk_store=DiskInvocationCacheStore(db_path, 2**20, logger))
+    cache.save("a", output_1)
+
+    # A new cache instance starts with an empty memory tier but the same disk tier
+    cache = MemoryInvocationCache(max_cache_size=5, disk_store=DiskInvocationCacheStore(db_path, 2**20, logger))
+    assert len(cache._cache) == 0
+    assert cache.get("a") == output_1
+    assert "a" in cache._cache  # promoted to the memory tier
+    status = cache.get_status()
+    assert status.hits == 1
+    assert status.memory_tier is not None and status.memory_tier.misses == 1
+    assert status.disk_tier is not None and status.disk_tier.hits == 1
+
+
+def test_invocation_cache_disk_serves_memory_evictions(db_path: Path):
+    output_1 = ImageOutput(image=ImageField(image_name="foo"), width=512, height=512)
+    output_2 = ImageOutput(image=ImageField(image_name="bar"), width=512, height=512)
+    cache = MemoryInvocationCache(max_cache_size=1, disk_store=DiskInvocationCacheStore(db_path, 2**20, logger))
+    cache.save(1, output_1)
+    cache.save(2, output_2)
+    assert list(cache._cache.keys()) == [2]
+    assert cache.get(1) == output_1
+    status = cache.get_status()
+    assert status.memory_tier is not None and status.memory_tier.evictions == 2
+    assert status.disk_tier is not None and status.disk_tier.size == 2
+
+
+def test_invocation_cache_disk_evicts_by_size(db_path: Path):
+    output_1 = ImageOutput(image=ImageField(image_name="foo"), width=512, height=512)
+    output_2 = ImageOutput(image=ImageField(image_name="bar"), width=512, height=512)
+    output_3 = ImageOutput(image=ImageField(image_name="baz"), width=512, height=512)
+    item_size = len(output_1.model_dump_json(warnings=False).encode("utf-8"))
+    store = DiskInvocationCacheStore(db_path, item_size * 2, logger)
+    store.save(1, output_1.model_dump_json(warnings=False), ["foo"], ephemeral=False)
+    store.save(2, output_2.model_dump_json(warnings=False), ["bar"], ephemeral=False)
+    store.get(1)  # refresh 1, so 2 is the least recently used
+    store.save(3, output_3.model_dump_json(warnings=False), ["baz"], ephemeral=False)
+    assert store.get(1) == output_1
+    assert store.get(2) is None
+    assert store.get(3) == output_3
+    status = store.get_status()
+    assert status.size == 2
+    assert status.size_bytes <= item_size * 2
+    assert status.evictions == 1
+
+
+def test_invocation_cache_disk_purges_orphaned_outputs(db_path: Path):
+    output_1 = ImageOutput(image=ImageField(image_name="foo"), width=512, height=512)
+    output_2 = LatentsOutput(latents=LatentsField(latents_name="bar"), width=64, height=64)
+    owner_store = DiskInvocationCacheStore(db_path, 2**20, logger)
+    cache = MemoryInvocationCache(max_cache_size=5, disk_store=owner_store)
+    cache.save(1, output_1)
+    cache.save(2, output_2)
+
+    store = DiskInvocationCacheStore(db_path, 2**20, logger)
+    assert store.get_status().size == 2
+    # The owner is still running, so its ephemeral outputs are kept
+    store.purge_orphaned()
+    assert store.get_status().size == 2
+    assert owner_store.get(2) == output_2
+
+    # Simulate the owner's process exiting without releasing its outputs
+    with owner_store._db.transaction() as cursor:
+        cursor.execute(
+            "UPDATE invocation_cache_owners SET process_created_at = 0 WHERE owner = ?;", (owner_store._owner,)
+        )
+    store.purge_orphaned()
+    assert store.get(1) == output_1
+    assert store.get_status().size == 1
+
+
+def test_invocation_cache_disk_release_deletes_owned_outputs(db_path: Path):
+    output_1 = LatentsOutput(latents=LatentsField(latents_name="foo"), width=64, height=64)
+    output_2 = LatentsOutput(latents=LatentsField(latents_name="bar"), width=64, height=64)
+    store_1 = DiskInvocationCacheStore(db_path, 2**20, logger)
+    store_2 = DiskInvocationCacheStore(db_path, 2**20, logger)
+    MemoryInvocationCache(max_cache_size=5, disk_store=store_1).save(1, output_1)
+    MemoryInvocationCache(max_cache_size=5, disk_store=store_2).save(2, output_2)
+
+    store_1.release()
+    assert store_1.get_status().size == 1
+    assert store_2.get(2) == output_2
+
+
+def test_invocation_cache_disk_deletes_by_references(db_path: Path):
+    output_1 = ImageOutput(image=ImageField(image_name="foo"), width=512, height=512)
+    output_2 = ImageOutput(image=ImageField(image_name="bar"), width=512, height=512)
+    cache = MemoryInvocationCache(max_cache_size=1, disk_store=DiskInvocationCacheStore(db_path, 2**20, logger))
+    cache.save(1, output_1)
+    cache.save(2, output_2)
+    # output_1 is only in the disk tier now
+    cache._invoker = MagicMock()
+    cache._delete_by_references(["foo"])
+    assert cache.get(1) is None
+    assert cache.get(2) == output_2
+    status = cache.get_status()
+    assert status.disk_tier is not None and status.disk_tier.size == 1
+
+
+def test_invocation_cache_disk_clears(db_path: Path):
+    output_1 = ImageOutput(image=ImageField(image_name="foo"), width=512, height=512)
+    cache = MemoryInvocationCache(max_cache_size=5, disk_store=DiskInvocationCacheStore(db_path, 2**20, logger))
+    cache.save(1, output_1)
+    cache.clear()
+    assert cache.get(1) is None
+    status = cache.get_status()
+    assert status.disk_tier is not None
+    assert status.disk_tier.size == 0
+    assert status.disk_tier.size_bytes == 0
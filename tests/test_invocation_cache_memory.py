@@ -1,9 +1,21 @@
 # pyright: reportPrivateUsage=false
 from contextlib import suppress
+from unittest.mock import MagicMock
 
-from invokeai.app.invocations.fields import ImageField
-from invokeai.app.invocations.primitives import ImageOutput
+import pytest
+
+from invokeai.app.invocations.fields import ImageField, LatentsField
+from invokeai.app.invocations.primitives import (
+    ImageOutput,
+    IntegerInvocation,
+    LatentsOutput,
+    StringInvocation,
+    StringOutput,
+)
+from invokeai.app.invocations.strings import StringJoinInvocation
+from invokeai.app.services.invocation_cache.invocation_cache_common import estimate_size_bytes
 from invokeai.app.services.invocation_cache.invocation_cache_memory import MemoryInvocationCache
+from tests.dangerously_run_function_in_subprocess import dangerously_run_function_in_subprocess
 from tests.test_nodes import PromptTestInvocation
 
 
@@ -27,6 +39,43 @@ def test_invocation_cache_memory_creates_deterministic_keys():
     assert hash1 != hash3
 
 
+def test_invocation_cache_memory_keys_ignore_id():
+    hash1 = MemoryInvocationCache.create_key(PromptTestInvocation(id="1", prompt="foo"))
+    hash2 = MemoryInvocationCache.create_key(PromptTestInvocation(id="2", prompt="foo"))
+    assert hash1 == hash2
+
+
+def test_invocation_cache_memory_keys_distinguish_types():
+    # An int and a string with the same repr, and a bool and an int with the same value, must not collide
+    hash1 = MemoryInvocationCache.create_key(StringInvocation(value="1"))
+    hash2 = MemoryInvocationCache.create_key(StringInvocation(value="True"))
+    hash3 = MemoryInvocationCache.create_key(IntegerInvocation(value=1))
+    assert len({hash1, hash2, hash3}) == 3
+
+
+def test_invocation_cache_memory_keys_distinguish_field_boundaries():
+    # Values that spell out the encoding of the next field must not shift the boundary between fields
+    hash1 = MemoryInvocationCache.create_key(StringJoinInvocation(string_left="a\0string_right=sb", string_right=""))
+    hash2 = MemoryInvocationCache.create_key(StringJoinInvocation(string_left="a", string_right="b\0string_right=s"))
+    hash3 = MemoryInvocationCache.create_key(StringJoinInvocation(string_left="ab", string_right=""))
+    hash4 = MemoryInvocationCache.create_key(StringJoinInvocation(string_left="a", string_right="b"))
+    assert len({hash1, hash2, hash3, hash4}) == 4
+
+
+@pytest.mark.slow
+def test_invocation_cache_memory_keys_are_stable_across_processes():
+    def get_key():
+        from invokeai.app.invocations.primitives import IntegerCollectionInvocation
+        from invokeai.app.services.invocation_cache.invocation_cache_memory import MemoryInvocationCache
+
+        print(MemoryInvocationCache.create_key(IntegerCollectionInvocation(id="1", collection=[1, 2, 3])))
+
+    stdout_1, _, returncode_1 = dangerously_run_function_in_subprocess(get_key)
+    stdout_2, _, returncode_2 = dangerously_run_function_in_subprocess(get_key)
+    assert returncode_1 == 0 and returncode_2 == 0
+    assert stdout_1.strip().splitlines()[-1] == stdout_2.strip().splitlines()[-1]
+
+
 def test_invocation_cache_memory_adds_invocation():
     output_1 = ImageOutput(image=ImageField(image_name="foo"), width=512, height=512)
     output_2 = ImageOutput(image=ImageField(image_name="bar"), width=512, height=512)
@@ -67,6 +116,34 @@ def test_invocation_cache_memory_is_lru():
     assert list(cache._cache.keys()) == [3, 2]
 
 
+def test_invocation_cache_memory_evicts_by_size():
+    output_1 = ImageOutput(image=ImageField(image_name="foo"), width=512, height=512)
+    output_2 = ImageOutput(image=ImageField(image_name="bar"), width=512, height=512)
+    output_3 = ImageOutput(image=ImageField(image_name="baz"), width=512, height=512)
+    item_size = estimate_size_bytes(output_1)
+    cache = MemoryInvocationCache(max_cache_size=5, max_size_bytes=item_size * 2)
+    cache.save(1, output_1)
+    cache.save(2, output_2)
+    cache.get(1)  # refresh 1, so 2 is the least recently used
+    cache.save(3, output_3)
+    assert list(cache._cache.keys()) == [1, 3]
+    assert "bar" not in cache._references
+    status = cache.get_status()
+    assert status.memory_tier is not None
+    assert status.memory_tier.size_bytes == item_size * 2
+    assert status.memory_tier.max_size_bytes == item_size * 2
+    assert status.memory_tier.evictions == 1
+
+
+def test_invocation_cache_memory_skips_outputs_larger_than_budget():
+    output = StringOutput(value="x" * 10000)
+    cache = MemoryInvocationCache(max_cache_size=5, max_size_bytes=5000)
+    cache.save(1, ImageOutput(image=ImageField(image_name="foo"), width=512, height=512))
+    cache.save(2, output)
+    assert list(cache._cache.keys()) == [1]
+    assert cache.get_status().memory_tier.size_bytes < 5000  # type: ignore
+
+
 def test_invocation_cache_memory_disables_and_enables():
     output_1 = ImageOutput(image=ImageField(image_name="foo"), width=512, height=512)
     output_2 = ImageOutput(image=ImageField(image_name="bar"), width=512, height=512)
@@ -87,8 +164,8 @@ def test_invocation_cache_memory_disables_and_enables():
     assert cache._misses == 0
 
 
-def test_invocation_cache_memory_deletes_by_match():
-    # The _delete_by_match method attempts to log but the logger is not set up in the test environment
+def test_invocation_cache_memory_deletes_by_reference():
+    # The _delete_by_references method attempts to log but the logger is not set up in the test environment
     with suppress(AttributeError):
         cache = MemoryInvocationCache(max_cache_size=5)
         output_1 = ImageOutput(image=ImageField(image_name="foo"), width=512, height=512)
@@ -97,26 +174,55 @@ def test_invocation_cache_memory_deletes_by_match():
         cache.save(1, output_1)
         cache.save(2, output_2)
         cache.save(3, output_3)
-        cache._delete_by_match("bar")
+        cache._delete_by_reference("bar")
         assert cache.get(1) == output_1
         assert cache.get(2) is None
         assert cache.get(3) == output_3
         assert len(cache._cache) == 2
         assert list(cache._cache.keys()) == [1, 3]
-        cache._delete_by_match("foo")
+        cache._delete_by_reference("foo")
         assert cache.get(1) is None
         assert cache.get(2) is None
         assert cache.get(3) == output_3
         assert len(cache._cache) == 1
         assert list(cache._cache.keys()) == [3]
-        cache._delete_by_match("baz")
+        cache._delete_by_reference("baz")
         assert cache.get(1) is None
         assert cache.get(2) is None
         assert cache.get(3) is None
         assert len(cache._cache) == 0
         assert list(cache._cache.keys()) == []
         # shouldn't raise on empty cache
-        cache._delete_by_match("foo")
+        cache._delete_by_reference("foo")
+
+
+def test_invocation_cache_memory_deletes_by_references_in_bulk():
+    cache = MemoryInvocationCache(max_cache_size=5)
+    cache._invoker = MagicMock()
+    output_1 = ImageOutput(image=ImageField(image_name="foo"), width=512, height=512)
+    output_2 = ImageOutput(image=ImageField(image_name="bar"), width=512, height=512)
+    output_3 = LatentsOutput(latents=LatentsField(latents_name="baz"), width=64, height=64)
+    cache.save(1, output_1)
+    cache.save(2, output_2)
+    cache.save(3, output_3)
+    assert cache._references == {"foo": {1}, "bar": {2}, "baz": {3}}
+    # Only exact names are matched
+    cache._delete_by_references(["fo", "ba"])
+    assert len(cache._cache) == 3
+    cache._delete_by_references(["foo", "baz"])
+    assert list(cache._cache.keys()) == [2]
+    assert cache._references == {"bar": {2}}
+
+
+def test_invocation_cache_memory_evictions_update_references():
+    cache = MemoryInvocationCache(max_cache_size=1)
+    output_1 = ImageOutput(image=ImageField(image_name="foo"), width=512, height=512)
+    output_2 = ImageOutput(image=ImageField(image_name="bar"), width=512, height=512)
+    cache.save(1, output_1)
+    cache.save(2, output_2)
+    assert cache._references == {"bar": {2}}
+    cache.delete(2)
+    assert cache._references == {}
 
 
 def test_invocation_cache_memory_clears():
@@ -0,0 +1,80 @@
+# pyright: reportPrivateUsage=false
+import logging
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import pytest
+
+from invokeai.app.invocations.fields import ImageField, LatentsField
+from invokeai.app.invocations.primitives import ImageOutput, LatentsOutput
+from invokeai.app.services.invocation_cache.invocation_cache_disk import DiskInvocationCacheStore
+from invokeai.app.services.invocation_cache.invocation_cache_shared import SharedInvocationCache
+
+logger = logging.getLogger(__name__)
+
+
+@pytest.fixture
+def db_path(tmp_path: Path) -> Path:
+    return tmp_path / "invocation_cache.db"
+
+
+def create_shared_cache(db_path: Path, max_size: int = 5) -> SharedInvocationCache:
+    cache = SharedInvocationCache(DiskInvocationCacheStore(db_path, 2**20, logger, max_size=max_size))
+    cache._invoker = MagicMock()
+    return cache
+
+
+def test_invocation_cache_shared_serves_other_processes(db_path: Path):
+    output_1 = ImageOutput(image=ImageField(image_name="foo"), width=512, height=512)
+    cache_1 = create_shared_cache(db_path)
+    cache_2 = create_shared_cache(db_path)
+    cache_1.save("a", output_1)
+    assert cache_2.get("a") == output_1
+    assert cache_2.get_status().size == 1
+
+
+def test_invocation_cache_shared_scopes_ephemeral_outputs_to_owner(db_path: Path):
+    output_1 = LatentsOutput(latents=LatentsField(latents_name="foo"), width=64, height=64)
+    cache_1 = create_shared_cache(db_path)
+    cache_2 = create_shared_cache(db_path)
+    cache_1.save("a", output_1)
+    assert cache_1.get("a") == output_1
+    assert cache_2.get("a") is None
+
+    cache_1.stop(MagicMock())
+    assert cache_1.get("a") is None
+    assert cache_2.get_status().size == 0
+
+
+def test_invocation_cache_shared_deletes_by_references_across_processes(db_path: Path):
+    output_1 = ImageOutput(image=ImageField(image_name="foo"), width=512, height=512)
+    output_2 = ImageOutput(image=ImageField(image_name="bar"), width=512, height=512)
+    cache_1 = create_shared_cache(db_path)
+    cache_2 = create_shared_cache(db_path)
+    cache_1.save(1, output_1)
+    cache_1.save(2, output_2)
+    cache_2._delete_by_references(["foo"])
+    assert cache_1.get(1) is None
+    assert cache_1.get(2) == output_2
+
+
+def test_invocation_cache_shared_evicts_by_count(db_path: Path):
+    output_1 = ImageOutput(image=ImageField(image_name="foo"), width=512, height=512)
+    output_2 = ImageOutput(image=ImageField(image_name="bar"), width=512, height=512)
+    cache_1 = create_shared_cache(db_path, max_size=1)
+    cache_2 = create_shared_cache(db_path, max_size=1)
+    cache_1.save(1, output_1)
+    cache_2.save(2, output_2)
+    assert cache_1.get(1) is None
+    assert cache_1.get(2) == output_2
+    status = cache_2.get_status()
+    assert status.size == 1
+    assert status.disk_tier is not None and status.disk_tier.evictions == 1
+
+
+def test_invocation_cache_shared_disabled_with_max_size_0(db_path: Path):
+    output_1 = ImageOutput(image=ImageField(image_name="foo"), width=512, height=512)
+    cache = create_shared_cache(db_path, max_size=0)
+    cache.save(1, output_1)
+    assert cache.get(1) is None
+    assert cache.get_status().enabled is False
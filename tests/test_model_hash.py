@@ -1,12 +1,17 @@
 # pyright:reportPrivateUsage=false
 
 from pathlib import Path
-from typing import Iterable
+from typing import Iterable, Optional
 
 import pytest
 from blake3 import blake3
 
-from invokeai.backend.model_hash.model_hash import HASHING_ALGORITHMS, MODEL_FILE_EXTENSIONS, ModelHash
+from invokeai.backend.model_hash.model_hash import (
+    HASHING_ALGORITHMS,
+    MODEL_FILE_EXTENSIONS,
+    FileHashKey,
+    ModelHash,
+)
 
 test_cases: list[tuple[HASHING_ALGORITHMS, str]] = [
     ("md5", "md5:a0cd925fc063f98dbf029eee315060c3"),
@@ -84,6 +89,65 @@ def test_model_hash_random_algorithm(tmp_path: Path):
     assert model_hash.hash(file) != model_hash.hash(file)
 
 
+@pytest.mark.parametrize("algorithm", ["md5", "sha256", "blake3_multi", "blake3_single"])
+def test_model_hash_dir_concurrency_does_not_change_hash(tmp_path: Path, algorithm: HASHING_ALGORITHMS):
+    for i in range(10):
+        Path(tmp_path, f"{i}.safetensors").write_bytes(bytes([i]) * (i * 1000))
+
+    assert ModelHash(algorithm, max_workers=1).hash(tmp_path) == ModelHash(algorithm, max_workers=4).hash(tmp_path)
+
+
+class DictHashCache:
+    def __init__(self) -> None:
+        self.hashes: dict[FileHashKey, str] = {}
+        self.hits = 0
+
+    def get_file_hash(self, key: FileHashKey) -> Optional[str]:
+        file_hash = self.hashes.get(key)
+        self.hits += file_hash is not None
+        return file_hash
+
+    def set_file_hash(self, key: FileHashKey, file_hash: str) -> None:
+        self.hashes[key] = file_hash
+
+
+def test_model_hash_uses_hash_cache(tmp_path: Path):
+    cache = DictHashCache()
+    files = [Path(tmp_path, f"{i}.bin") for i in range(3)]
+    for i, f in enumerate(files):
+        f.write_text(f"data{i}")
+
+    hash_ = ModelHash("sha256", hash_cache=cache).hash(tmp_path)
+    assert hash_ == ModelHash("sha256").hash(tmp_path)
+    assert len(cache.hashes) == 3
+    assert cache.hits == 0
+
+    # Unchanged files are not hashed again
+    assert ModelHash("sha256", hash_cache=cache).hash(tmp_path) == hash_
+    assert cache.hits == 3
+
+    # Changed files are
+    files[0].write_text("new data")
+    new_hash = ModelHash("sha256", hash_cache=cache).hash(tmp_path)
+    assert new_hash == ModelHash("sha256").hash(tmp_path)
+    assert new_hash != hash_
+    assert cache.hits == 5
+
+    # Hashes of one algorithm are not used for another
+    ModelHash("md5", hash_cache=cache).hash(tmp_path)
+    assert cache.hits == 5
+
+
+def test_model_hash_random_algorithm_is_not_cached(tmp_path: Path):
+    cache = DictHashCache()
+    file = tmp_path / "test.bin"
+    file.write_text("model data")
+
+    model_hash = ModelHash("random", hash_cache=cache)
+    assert model_hash.hash(file) != model_hash.hash(file)
+    assert cache.hashes == {}
+
+
 def test_model_hash_raises_error_on_invalid_algorithm():
     with pytest.raises(ValueError, match="Algorithm invalid_algorithm not available"):
         ModelHash("invalid_algorithm")  # pyright: ignore [reportArgumentType]
@@ -1,6 +1,8 @@
 from typing import Any, Callable, Union
 from unittest.mock import MagicMock
 
+from PIL.Image import Image
+
 from invokeai.app.invocations.baseinvocation import (
     BaseInvocation,
     BaseInvocationOutput,
@@ -142,7 +144,8 @@ class TestEventService(EventServiceBase):
         invocation: "BaseInvocation",
         message: str,
         percentage: float | None = None,
-        image: "ProgressImage | None" = None,
+        image: "ProgressImage | Image | None" = None,
+        image_size: tuple[int, int] | None = None,
     ) -> None:
         pass
 
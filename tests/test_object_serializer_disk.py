@@ -1,13 +1,18 @@
 import tempfile
+import threading
 from dataclasses import dataclass
 from pathlib import Path
+from typing import Optional
 
 import pytest
 import torch
 
 from invokeai.app.services.object_serializer.object_serializer_common import ObjectNotFoundError
 from invokeai.app.services.object_serializer.object_serializer_disk import ObjectSerializerDisk
-from invokeai.app.services.object_serializer.object_serializer_forward_cache import ObjectSerializerForwardCache
+from invokeai.app.services.object_serializer.object_serializer_forward_cache import (
+    ObjectSerializerForwardCache,
+    calc_object_size,
+)
 
 
 @dataclass
@@ -170,8 +175,64 @@ def test_obj_serializer_fwd_cache_respects_cache_size(fwd_cache: ObjectSerialize
     assert obj_1_name not in fwd_cache._cache
     assert obj_2_name in fwd_cache._cache
     assert obj_3_name in fwd_cache._cache
-    # apparently qsize is "not reliable"?
-    assert fwd_cache._cache_ids.qsize() == 2
+    assert len(fwd_cache._cache) == 2
+
+
+def test_obj_serializer_fwd_cache_evicts_least_recently_used(fwd_cache: ObjectSerializerForwardCache[MockDataclass]):
+    obj_1_name = fwd_cache.save(MockDataclass(foo="bar"))
+    obj_2_name = fwd_cache.save(MockDataclass(foo="baz"))
+    fwd_cache.load(obj_1_name)  # refresh obj_1, so obj_2 is the least recently used
+    obj_3_name = fwd_cache.save(MockDataclass(foo="qux"))
+    assert list(fwd_cache._cache.keys()) == [obj_1_name, obj_3_name]
+    assert obj_2_name not in fwd_cache._cache
+    stats = fwd_cache.get_stats()
+    assert stats.hits == 1
+    assert stats.evictions == 1
+
+
+def test_obj_serializer_fwd_cache_respects_memory_budget(tmp_path: Path):
+    fwd_cache = ObjectSerializerForwardCache(
+        ObjectSerializerDisk[torch.Tensor](tmp_path, safe_globals=[torch.Tensor]),
+        max_cache_size=0,
+        max_cache_bytes=1024,
+    )
+    # 400 bytes each
+    obj_1_name = fwd_cache.save(torch.zeros(100, dtype=torch.float32))
+    obj_2_name = fwd_cache.save(torch.zeros(100, dtype=torch.float32))
+    obj_3_name = fwd_cache.save(torch.zeros(100, dtype=torch.float32))
+    assert list(fwd_cache._cache.keys()) == [obj_2_name, obj_3_name]
+    # Objects larger than the whole budget are written through but not cached
+    obj_4_name = fwd_cache.save(torch.zeros(1000, dtype=torch.float32))
+    assert obj_4_name not in fwd_cache._cache
+    assert fwd_cache.load(obj_1_name).shape == (100,)
+    stats = fwd_cache.get_stats()
+    assert stats.size == 2
+    assert stats.size_bytes == 800
+    assert stats.evictions == 2
+    assert stats.evicted_bytes == 800
+    assert stats.misses == 1
+
+
+def test_obj_serializer_fwd_cache_delete_releases_memory(tmp_path: Path):
+    fwd_cache = ObjectSerializerForwardCache(
+        ObjectSerializerDisk[torch.Tensor](tmp_path, safe_globals=[torch.Tensor]), max_cache_bytes=1024
+    )
+    obj_1_name = fwd_cache.save(torch.zeros(100, dtype=torch.float32))
+    fwd_cache.delete(obj_1_name)
+    assert fwd_cache.get_stats().size_bytes == 0
+
+
+def test_calc_object_size():
+    @dataclass
+    class Nested:
+        tensors: list[torch.Tensor]
+        mask: Optional[torch.Tensor]
+        name: str
+
+    obj = Nested(tensors=[torch.zeros(10, dtype=torch.float16), torch.zeros(10)], mask=None, name="foo")
+    assert calc_object_size(obj) == 60
+    assert calc_object_size({"a": (obj, torch.zeros(2, dtype=torch.int64))}) == 76
+    assert calc_object_size("foo") == 0
 
 
 def test_obj_serializer_fwd_cache_calls_delete_callback(fwd_cache: ObjectSerializerForwardCache[MockDataclass]):
@@ -186,3 +247,123 @@ def test_obj_serializer_fwd_cache_calls_delete_callback(fwd_cache: ObjectSeriali
     obj_1_name = fwd_cache.save(obj_1)
     fwd_cache.delete(obj_1_name)
     assert called_name == obj_1_name
+
+
+@dataclass
+class MockTensorDataclass:
+    embeds: torch.Tensor
+    mask: Optional[torch.Tensor]
+    scale: float
+
+
+def test_obj_serializer_disk_safetensors_saves_and_loads_tensors(tmp_path: Path):
+    obj_serializer = ObjectSerializerDisk[torch.Tensor](tmp_path, safe_globals=[], file_format="safetensors")
+    tensor = torch.randn(1, 4, 8, 8, dtype=torch.float16)
+    name = obj_serializer.save(tensor)
+    assert (tmp_path / f"{name}.safetensors").exists()
+    loaded = obj_serializer.load(name)
+    assert loaded.dtype == torch.float16
+    assert torch.equal(loaded, tensor)
+    # The loaded tensor is a private copy-on-write mapping of the file
+    loaded.add_(1)
+    assert torch.equal(obj_serializer.load(name), tensor)
+    obj_serializer.delete(name)
+    with pytest.raises(ObjectNotFoundError):
+        obj_serializer.load(name)
+
+
+def test_obj_serializer_disk_safetensors_saves_and_loads_dataclasses(tmp_path: Path):
+    obj_serializer = ObjectSerializerDisk[list[MockTensorDataclass]](
+        tmp_path, safe_globals=[MockTensorDataclass], file_format="safetensors"
+    )
+    embeds = torch.randn(2, 3)
+    obj = [MockTensorDataclass(embeds=embeds, mask=None, scale=0.5), MockTensorDataclass(embeds[:1], embeds, 1.0)]
+    loaded = obj_serializer.load(obj_serializer.save(obj))
+    assert len(loaded) == 2
+    assert all(isinstance(o, MockTensorDataclass) for o in loaded)
+    assert torch.equal(loaded[0].embeds, embeds)
+    assert loaded[0].mask is None
+    assert loaded[0].scale == 0.5
+    assert torch.equal(loaded[1].embeds, embeds[:1])
+    assert torch.equal(loaded[1].mask, embeds)
+
+
+def test_obj_serializer_disk_safetensors_falls_back_to_torch(tmp_path: Path):
+    # MockDataclass is not a safe global for this serializer, so it cannot be decoded from safetensors
+    obj_serializer = ObjectSerializerDisk[MockDataclass](tmp_path, safe_globals=[], file_format="safetensors")
+    torch.serialization.add_safe_globals([MockDataclass])
+    name = obj_serializer.save(MockDataclass(foo="bar"))
+    assert (tmp_path / name).exists()
+    assert obj_serializer.load(name).foo == "bar"
+
+
+def test_obj_serializer_disk_write_behind_saves_and_loads(tmp_path: Path):
+    obj_serializer = ObjectSerializerDisk[torch.Tensor](tmp_path, safe_globals=[], write_behind=True)
+    tensor = torch.randn(4, 4)
+    name = obj_serializer.save(tensor)
+    assert torch.equal(obj_serializer.load(name), tensor)
+    obj_serializer.flush()
+    assert obj_serializer._pending == {}
+    assert (tmp_path / name).exists()
+    assert torch.equal(obj_serializer.load(name), tensor)
+    obj_serializer.stop(None)  # pyright: ignore [reportArgumentType]
+
+
+def test_obj_serializer_disk_write_behind_loads_unwritten_objects(tmp_path: Path):
+    obj_serializer = ObjectSerializerDisk[torch.Tensor](tmp_path, safe_globals=[], write_behind=True)
+    # Hold the writer thread, so objects cannot be written yet
+    resume_writes = threading.Event()
+    write = obj_serializer._write
+
+    def blocked_write(name: str, obj: torch.Tensor) -> None:
+        resume_writes.wait()
+        write(name, obj)
+
+    obj_serializer._write = blocked_write
+    tensor = torch.randn(4, 4)
+    name = obj_serializer.save(tensor)
+    assert obj_serializer.load(name) is tensor
+    assert count_files(tmp_path) == 0
+    resume_writes.set()
+    obj_serializer.stop(None)  # pyright: ignore [reportArgumentType]
+    assert (tmp_path / name).exists()
+
+
+def test_obj_serializer_disk_write_behind_orders_deletes(tmp_path: Path):
+    obj_serializer = ObjectSerializerDisk[torch.Tensor](tmp_path, safe_globals=[], write_behind=True)
+    names = [obj_serializer.save(torch.randn(4, 4)) for _ in range(10)]
+    for name in names:
+        obj_serializer.delete(name)
+    obj_serializer.flush()
+    assert count_files(tmp_path) == 0
+    for name in names:
+        with pytest.raises(ObjectNotFoundError):
+            obj_serializer.load(name)
+    with pytest.raises(FileNotFoundError):
+        obj_serializer.delete(names[0])
+    obj_serializer.stop(None)  # pyright: ignore [reportArgumentType]
+
+
+def test_obj_serializer_disk_write_behind_flushes_on_stop(tmp_path: Path):
+    obj_serializer = ObjectSerializerDisk[torch.Tensor](
+        tmp_path, safe_globals=[], file_format="safetensors", write_behind=True
+    )
+    names = [obj_serializer.save(torch.randn(64, 64)) for _ in range(10)]
+    obj_serializer.stop(None)  # pyright: ignore [reportArgumentType]
+    assert obj_serializer._pending == {}
+    assert all((tmp_path / f"{name}.safetensors").exists() for name in names)
+
+
+def test_obj_serializer_disk_write_behind_drops_failed_writes(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    obj_serializer = ObjectSerializerDisk[torch.Tensor](tmp_path, safe_globals=[], write_behind=True)
+
+    def failing_write(name: str, obj: torch.Tensor) -> None:
+        raise OSError("disk full")
+
+    monkeypatch.setattr(obj_serializer, "_write", failing_write)
+    name = obj_serializer.save(torch.randn(4, 4))
+    obj_serializer.flush()
+    assert obj_serializer._pending == {}
+    with pytest.raises(ObjectNotFoundError):
+        obj_serializer.load(name)
+    obj_serializer.stop(None)  # pyright: ignore [reportArgumentType]
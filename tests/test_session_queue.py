@@ -1,18 +1,29 @@
+import asyncio
 import json
+from unittest.mock import MagicMock
 
 import pytest
 from pydantic import TypeAdapter, ValidationError
 
+from invokeai.app.services.config.config_default import InvokeAIAppConfig
 from invokeai.app.services.session_queue.session_queue_common import (
+    TEMPLATED_SESSION,
     Batch,
     BatchDataCollection,
     BatchDatum,
+    EnqueueBatchResult,
     NodeFieldValue,
     calc_session_count,
     create_session_nfv_tuples,
+    create_session_template,
+    materialize_session,
     prepare_values_to_insert,
 )
+from invokeai.app.services.session_queue.session_queue_sqlite import SqliteSessionQueue
 from invokeai.app.services.shared.graph import Graph, GraphExecutionState
+from invokeai.app.services.shared.sqlite_migrator.migrations.migration_30 import Migration30Callback
+from invokeai.backend.util.logging import InvokeAILogger
+from tests.fixtures.sqlite_database import create_mock_sqlite_database
 from tests.test_nodes import PromptTestInvocation
 
 
@@ -40,6 +51,26 @@ def batch_graph() -> Graph:
     return g
 
 
+@pytest.fixture
+def configuration() -> InvokeAIAppConfig:
+    return InvokeAIAppConfig(use_memory_db=True)
+
+
+@pytest.fixture
+def invoker(configuration: InvokeAIAppConfig) -> MagicMock:
+    invoker = MagicMock()
+    invoker.services.configuration = configuration
+    return invoker
+
+
+@pytest.fixture
+def sqlite_session_queue(configuration: InvokeAIAppConfig, invoker: MagicMock) -> SqliteSessionQueue:
+    db = create_mock_sqlite_database(configuration, InvokeAILogger.get_logger())
+    session_queue = SqliteSessionQueue(db=db)
+    session_queue.start(invoker)
+    return session_queue
+
+
 def test_create_sessions_from_batch_with_runs(batch_data_collection, batch_graph):
     b = Batch(graph=batch_graph, data=batch_data_collection, runs=2)
     t = list(create_session_nfv_tuples(batch=b, maximum=1000))
@@ -116,6 +147,13 @@ def test_create_sessions_from_batch_with_runs_and_max(batch_data_collection, bat
     assert len(t) == 5
 
 
+@pytest.mark.parametrize("runs", [1, 3])
+def test_calc_session_count_matches_created_sessions(batch_data_collection, batch_graph, runs: int):
+    extra_data = [BatchDatum(node_path="4", field_name="prompt", items=["Honda", "Mazda", "Kia"])]
+    b = Batch(graph=batch_graph, data=batch_data_collection + [extra_data], runs=runs)
+    assert calc_session_count(batch=b) == len(list(create_session_nfv_tuples(batch=b, maximum=1000)))
+
+
 def test_calc_session_count(batch_data_collection, batch_graph):
     b = Batch(graph=batch_graph, data=batch_data_collection, runs=2)
     # 2 list[BatchDatum] * length 2 * 2 runs = 8
@@ -252,3 +290,266 @@ def test_cannot_create_bad_batch_fields_exist(
                 ],
             ],
         )
+
+
+def test_materialize_session_matches_full_session(batch_data_collection, batch_graph):
+    b = Batch(graph=batch_graph, data=batch_data_collection, runs=2)
+    session_template = create_session_template(b)
+    for session_id, session_json, field_values_json in create_session_nfv_tuples(batch=b, maximum=1000):
+        materialized = json.loads(materialize_session(session_template, session_id, field_values_json))
+        expected = json.loads(session_json)
+        # The placeholder execution graph's ID differs between the template and the generated sessions
+        materialized["execution_graph"].pop("id")
+        expected["execution_graph"].pop("id")
+        assert materialized == expected
+
+
+def test_prepare_values_to_insert_templated(batch_data_collection, batch_graph):
+    b = Batch(graph=batch_graph, data=batch_data_collection, runs=2)
+    values = prepare_values_to_insert(queue_id="default", batch=b, priority=0, max_new_queue_items=1000, templated=True)
+    assert len(values) == 8
+    assert all(v[1] == TEMPLATED_SESSION for v in values)
+    assert all(v[4] is not None for v in values)
+
+
+@pytest.mark.parametrize("queue_session_templates", [True, False])
+def test_session_queue_materializes_templated_sessions(
+    batch_data_collection,
+    batch_graph,
+    configuration: InvokeAIAppConfig,
+    sqlite_session_queue: SqliteSessionQueue,
+    queue_session_templates: bool,
+):
+    configuration.queue_session_templates = queue_session_templates
+    b = Batch(graph=batch_graph, data=batch_data_collection, runs=2)
+    result = asyncio.run(sqlite_session_queue.enqueue_batch(queue_id="default", batch=b, prepend=False))
+    assert result.enqueued == 8
+
+    with sqlite_session_queue._db.transaction() as cursor:
+        cursor.execute("SELECT COUNT(*) FROM session_queue_templates;")
+        assert cursor.fetchone()[0] == (1 if queue_session_templates else 0)
+
+    queue_item = sqlite_session_queue.dequeue()
+    assert queue_item is not None
+    assert queue_item.session.id == queue_item.session_id
+    assert queue_item.session.graph.get_node("1").prompt == "Banana sushi"
+    assert queue_item.session.graph.get_node("4").prompt == "Nissan"
+    assert sqlite_session_queue.get_queue_item(queue_item.item_id).session == queue_item.session
+
+    # The template is deleted along with the last queue item that needs it
+    sqlite_session_queue.clear("default")
+    with sqlite_session_queue._db.transaction() as cursor:
+        cursor.execute("SELECT COUNT(*) FROM session_queue_templates;")
+        assert cursor.fetchone()[0] == 0
+
+
+def test_session_queue_enqueues_in_chunks(
+    batch_data_collection, batch_graph, invoker: MagicMock, sqlite_session_queue: SqliteSessionQueue
+):
+    sqlite_session_queue._enqueue_chunk_size = 3
+    b = Batch(graph=batch_graph, data=batch_data_collection, runs=2)
+    result = asyncio.run(sqlite_session_queue.enqueue_batch(queue_id="default", batch=b, prepend=False))
+    assert result.requested == 8
+    assert result.enqueued == 8
+
+    # The item IDs are reported newest first, and match the inserted queue items
+    with sqlite_session_queue._db.transaction() as cursor:
+        cursor.execute("SELECT item_id FROM session_queue WHERE batch_id = ? ORDER BY item_id DESC;", (b.batch_id,))
+        assert result.item_ids == [row[0] for row in cursor.fetchall()]
+
+    progress = [c.kwargs for c in invoker.services.events.emit_batch_enqueue_progress.call_args_list]
+    assert [p["enqueued"] for p in progress] == [3, 6, 8]
+    assert all(p["total"] == 8 for p in progress)
+    invoker.services.events.emit_batch_enqueued.assert_called_once()
+
+
+def test_session_queue_concurrent_enqueues_respect_max_queue_size(
+    batch_data_collection, batch_graph, configuration: InvokeAIAppConfig, sqlite_session_queue: SqliteSessionQueue
+):
+    configuration.max_queue_size = 10
+    sqlite_session_queue._enqueue_chunk_size = 2
+
+    async def enqueue_concurrently() -> list[EnqueueBatchResult]:
+        # Both batches fit in the empty queue when they start, but not together
+        batches = [Batch(graph=batch_graph, data=batch_data_collection, runs=2) for _ in range(2)]
+        return await asyncio.gather(
+            *(sqlite_session_queue.enqueue_batch(queue_id="default", batch=b, prepend=False) for b in batches)
+        )
+
+    results = asyncio.run(enqueue_concurrently())
+    assert sum(r.enqueued for r in results) == 10
+    assert sum(len(r.item_ids) for r in results) == 10
+    assert sqlite_session_queue._get_current_queue_size("default") == 10
+
+
+def assert_counts_match_items(session_queue: SqliteSessionQueue, queue_id: str) -> None:
+    with session_queue._db.transaction() as cursor:
+        cursor.execute("SELECT status, COUNT(*) FROM session_queue WHERE queue_id = ? GROUP BY status;", (queue_id,))
+        expected = {row[0]: row[1] for row in cursor.fetchall()}
+    counts = {status: count for status, count in session_queue._get_counts(queue_id).items() if count > 0}
+    assert counts == expected
+
+
+def test_session_queue_dequeues_by_priority(batch_graph, sqlite_session_queue: SqliteSessionQueue):
+    first = asyncio.run(sqlite_session_queue.enqueue_batch("default", Batch(graph=batch_graph, runs=2), prepend=False))
+    prepended = asyncio.run(sqlite_session_queue.enqueue_batch("default", Batch(graph=batch_graph), prepend=True))
+
+    dequeued = [sqlite_session_queue.dequeue() for _ in range(3)]
+    assert [q.item_id for q in dequeued if q] == prepended.item_ids + sorted(first.item_ids)
+    assert all(q is not None and q.status == "in_progress" for q in dequeued)
+    assert sqlite_session_queue.dequeue() is None
+    assert_counts_match_items(sqlite_session_queue, "default")
+
+
+def test_session_queue_dequeues_items_missing_from_heap(batch_graph, sqlite_session_queue: SqliteSessionQueue):
+    result = asyncio.run(sqlite_session_queue.enqueue_batch("default", Batch(graph=batch_graph, runs=2), prepend=False))
+    # A higher priority item inserted by another process is dequeued first, though the heap holds other items
+    session = sqlite_session_queue.get_queue_item(result.item_ids[0]).session
+    with sqlite_session_queue._db.transaction() as cursor:
+        cursor.execute(
+            """--sql
+            INSERT INTO session_queue (queue_id, session, session_id, batch_id, priority)
+            VALUES ('default', ?, ?, 'other', 1);
+            """,
+            (session.model_dump_json(warnings=False, exclude_none=True), session.id + "-other"),
+        )
+        other_item_id = cursor.lastrowid
+
+    queue_item = sqlite_session_queue.dequeue()
+    assert queue_item is not None and queue_item.item_id == other_item_id
+    status = sqlite_session_queue.get_queue_status("default")
+    assert (status.item_id, status.session_id, status.batch_id) == (
+        queue_item.item_id,
+        queue_item.session_id,
+        queue_item.batch_id,
+    )
+
+    # Items whose heap entries were lost are dequeued too
+    sqlite_session_queue._pending.clear()
+    sqlite_session_queue._pending_ids.clear()
+    dequeued = [sqlite_session_queue.dequeue() for _ in range(2)]
+    assert [q.item_id for q in dequeued if q] == sorted(result.item_ids)
+    assert sqlite_session_queue.dequeue() is None
+
+
+def test_session_queue_prunes_heap_on_bulk_cancel(batch_graph, sqlite_session_queue: SqliteSessionQueue):
+    batch = Batch(graph=batch_graph, runs=3)
+    asyncio.run(sqlite_session_queue.enqueue_batch("default", batch, prepend=False))
+    asyncio.run(sqlite_session_queue.enqueue_batch("default", Batch(graph=batch_graph), prepend=False))
+    sqlite_session_queue.cancel_by_batch_ids("default", [batch.batch_id])
+    # The canceled items' entries are removed from the heap, instead of being claimed and discarded by dequeue
+    assert len(sqlite_session_queue._pending) == len(sqlite_session_queue._pending_ids) == 1
+
+    sqlite_session_queue.cancel_by_queue_id("default")
+    assert sqlite_session_queue._pending == []
+    assert sqlite_session_queue.dequeue() is None
+
+
+def test_session_queue_skips_canceled_items(batch_graph, sqlite_session_queue: SqliteSessionQueue):
+    batch_1 = Batch(graph=batch_graph, runs=2)
+    batch_2 = Batch(graph=batch_graph, runs=2)
+    result_1 = asyncio.run(sqlite_session_queue.enqueue_batch("default", batch_1, prepend=False))
+    result_2 = asyncio.run(sqlite_session_queue.enqueue_batch("default", batch_2, prepend=False))
+
+    sqlite_session_queue.cancel_queue_item(min(result_1.item_ids))
+    sqlite_session_queue.cancel_by_batch_ids("default", [batch_2.batch_id])
+    assert_counts_match_items(sqlite_session_queue, "default")
+
+    queue_item = sqlite_session_queue.dequeue()
+    assert queue_item is not None and queue_item.item_id == max(result_1.item_ids)
+    assert sqlite_session_queue.dequeue() is None
+
+    # Retried items are dequeued
+    sqlite_session_queue.retry_items_by_id("default", result_2.item_ids)
+    retried = sqlite_session_queue.dequeue()
+    assert retried is not None and retried.retried_from_item_id == result_2.item_ids[0]
+    assert_counts_match_items(sqlite_session_queue, "default")
+
+    status = sqlite_session_queue.get_queue_status("default")
+    assert (status.pending, status.in_progress, status.canceled, status.total) == (1, 2, 3, 6)
+
+    sqlite_session_queue.clear("default")
+    assert sqlite_session_queue.is_empty("default").is_empty
+    assert sqlite_session_queue.dequeue() is None
+
+
+@pytest.mark.parametrize(
+    "cancel",
+    [
+        lambda queue, batch: queue.cancel_by_queue_id("default"),
+        lambda queue, batch: queue.cancel_by_batch_ids("default", [batch.batch_id]),
+        lambda queue, batch: queue.cancel_by_destination("default", "canvas"),
+        lambda queue, batch: queue.delete_by_destination("default", "canvas"),
+    ],
+    ids=["cancel_by_queue_id", "cancel_by_batch_ids", "cancel_by_destination", "delete_by_destination"],
+)
+def test_session_queue_bulk_cancel_cancels_every_in_progress_item(
+    batch_graph, invoker: MagicMock, sqlite_session_queue: SqliteSessionQueue, cancel
+):
+    batch = Batch(graph=batch_graph, runs=3, destination="canvas")
+    asyncio.run(sqlite_session_queue.enqueue_batch("default", batch, prepend=False))
+    # Two workers each run a queue item
+    in_progress = [sqlite_session_queue.dequeue() for _ in range(2)]
+    invoker.services.events.emit_queue_item_status_changed.reset_mock()
+
+    cancel(sqlite_session_queue, batch)
+
+    canceled = [c.args[0] for c in invoker.services.events.emit_queue_item_status_changed.call_args_list]
+    assert sorted(q.item_id for q in canceled) == sorted(q.item_id for q in in_progress if q)
+    assert all(q.status == "canceled" for q in canceled)
+    assert sqlite_session_queue.get_queue_status("default").in_progress == 0
+
+
+def test_session_queue_does_not_parse_stored_session(batch_graph, sqlite_session_queue: SqliteSessionQueue):
+    asyncio.run(sqlite_session_queue.enqueue_batch("default", Batch(graph=batch_graph), prepend=False))
+    queue_item = sqlite_session_queue.dequeue()
+    assert queue_item is not None
+    session = queue_item.session
+    session.errors["1"] = "error"
+
+    stored = sqlite_session_queue.set_queue_item_session(queue_item.item_id, session)
+    assert stored.session is session
+    completed = sqlite_session_queue.complete_queue_item(queue_item.item_id)
+    assert completed.status == "completed"
+    assert completed.session is session
+
+    # Reading the queue item parses the stored session
+    read = sqlite_session_queue.get_queue_item(queue_item.item_id)
+    assert read.session is not session
+    assert read.session == session
+
+
+def test_session_queue_compresses_and_reads_legacy_json(
+    batch_graph, configuration: InvokeAIAppConfig, sqlite_session_queue: SqliteSessionQueue
+):
+    configuration.queue_session_templates = True
+    b = Batch(graph=batch_graph)
+    result = asyncio.run(sqlite_session_queue.enqueue_batch("default", b, prepend=False))
+    item_id = result.item_ids[0]
+    with sqlite_session_queue._db.transaction() as cursor:
+        cursor.execute("SELECT typeof(field_values) FROM session_queue WHERE item_id = ?;", (item_id,))
+        assert cursor.fetchone()[0] == "blob"
+        cursor.execute("SELECT typeof(session) FROM session_queue_templates WHERE batch_id = ?;", (b.batch_id,))
+        assert cursor.fetchone()[0] == "blob"
+
+    # Legacy queue items store uncompressed JSON text
+    session = sqlite_session_queue.get_queue_item(item_id).session
+    legacy_values = (session.model_dump_json(warnings=False, exclude_none=True), "[]", session.id + "-legacy")
+    with sqlite_session_queue._db.transaction() as cursor:
+        cursor.execute(
+            """--sql
+            INSERT INTO session_queue (queue_id, session, field_values, session_id, batch_id)
+            VALUES ('default', ?, ?, ?, 'legacy');
+            """,
+            legacy_values,
+        )
+        legacy_item_id = cursor.lastrowid
+    assert legacy_item_id is not None
+    assert sqlite_session_queue.get_queue_item(legacy_item_id).session.graph == session.graph
+
+    # The migration compresses legacy queue items
+    with sqlite_session_queue._db.transaction() as cursor:
+        Migration30Callback()(cursor)
+        cursor.execute("SELECT typeof(session) FROM session_queue WHERE item_id = ?;", (legacy_item_id,))
+        assert cursor.fetchone()[0] == "blob"
+    assert sqlite_session_queue.get_queue_item(legacy_item_id).session.graph == session.graph